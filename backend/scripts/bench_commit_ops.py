@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Commit transaction time for large proposals: one single-row statement per op (before) vs grouped UNWIND (after).
+
+Builds a synthetic proposal under the BENCH- uid prefix (topics, skills, PREREQ chain, USES_SKILL links,
+evidence on every other op), applies it in one write transaction with each variant and removes the
+written nodes after every run.
+
+Usage: NEO4J_URI=... NEO4J_USER=... NEO4J_PASSWORD=... python scripts/bench_commit_ops.py [ops] [runs]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.graph.neo4j_repo import get_driver
+from src.services.graph.neo4j_writer import link_evidence_batch, merge_nodes_batch, merge_rels_batch
+from src.workers.commit import _apply_ops_tx
+
+PREFIX = "BENCH-"
+TENANT = "bench-commit"
+
+
+def synthetic_ops(total: int) -> list:
+    topics = max(2, total * 2 // 5)
+    skills = max(1, total // 10)
+    ops = []
+    for i in range(topics):
+        ev = {"source_chunk_id": f"{PREFIX}SC-{i // 10}", "quote": f"chunk {i // 10}"} if i % 2 == 0 else {}
+        ops.append({"op_type": "CREATE_NODE", "target_id": f"{PREFIX}T-{i}", "properties_delta": {"type": "Topic", "uid": f"{PREFIX}T-{i}", "title": f"Topic {i}"}, "evidence": ev})
+    for i in range(skills):
+        ops.append({"op_type": "CREATE_NODE", "target_id": f"{PREFIX}S-{i}", "properties_delta": {"type": "Skill", "uid": f"{PREFIX}S-{i}", "title": f"Skill {i}"}})
+    i = 0
+    while len(ops) < total:
+        fu = f"{PREFIX}T-{i % topics}"
+        if i % 2:
+            pd = {"type": "USES_SKILL", "uid": f"{PREFIX}E-{i}", "from_uid": fu, "to_uid": f"{PREFIX}S-{i % skills}"}
+        else:
+            pd = {"type": "PREREQ", "uid": f"{PREFIX}E-{i}", "from_uid": fu, "to_uid": f"{PREFIX}T-{(i + 1) % topics}", "weight": 1.0}
+        ev = {"source_chunk_id": f"{PREFIX}SC-R{i // 10}", "quote": "rel"} if i % 2 == 0 else {}
+        ops.append({"op_type": "CREATE_REL", "properties_delta": pd, "evidence": ev})
+        i += 1
+    return ops
+
+
+def legacy_apply(tx, tenant_id: str, ops: list) -> None:
+    """Every op in a statement of its own, with the same writers and label resolution as the grouped path."""
+    labels = {}
+    for op in ops:
+        pd = op["properties_delta"]
+        ev = op.get("evidence") or {}
+        if op["op_type"] == "CREATE_NODE":
+            props = dict(pd, tenant_id=tenant_id, lifecycle_status="ACTIVE")
+            merge_nodes_batch(tx, tenant_id, pd["type"], [{"uid": pd["uid"], "props": props}])
+            labels[pd["uid"]] = pd["type"]
+            anchor = pd["uid"]
+        else:
+            merge_rels_batch(tx, tenant_id, pd["type"], labels.get(pd["from_uid"]), labels.get(pd["to_uid"]), [{"fu": pd["from_uid"], "tu": pd["to_uid"], "rid": pd["uid"], "props": dict(pd)}])
+            anchor = pd["from_uid"]
+        if ev.get("source_chunk_id") and ev.get("quote"):
+            link_evidence_batch(tx, tenant_id, labels.get(anchor), [{"uid": anchor, "cid": ev["source_chunk_id"], "quote": ev["quote"]}])
+
+
+def cleanup(drv) -> None:
+    with drv.session() as s:
+        s.run("MATCH (n) WHERE n.uid STARTS WITH $p DETACH DELETE n", {"p": PREFIX}).consume()
+
+
+def timed(drv, fn, ops: list, runs: int) -> list:
+    lat = []
+    for _ in range(runs):
+        cleanup(drv)
+        t0 = time.perf_counter()
+        with drv.session() as s:
+            s.execute_write(lambda tx: fn(tx, TENANT, ops))
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    return lat
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    ops = synthetic_ops(total)
+    drv = get_driver()
+    try:
+        print(f"proposal of {len(ops)} ops, {runs} runs")
+        for name, fn in (("per-op statements", legacy_apply), ("grouped UNWIND", _apply_ops_tx)):
+            lat = timed(drv, fn, ops, runs)
+            print(f"{name:<18} median={statistics.median(lat):9.1f}ms min={min(lat):9.1f}ms ops/s={len(ops) * 1000.0 / statistics.median(lat):9.0f}")
+    finally:
+        cleanup(drv)
+        drv.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Latency of node panel / adaptive roadmap reads: per-item queries (before) vs single projection (after).
+
+Seeds a synthetic subject under the BENCH- uid prefix, runs both variants and removes the seed afterwards.
+
+Usage: NEO4J_URI=... NEO4J_USER=... NEO4J_PASSWORD=... python scripts/bench_node_details.py [topics] [iterations]
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.graph import neo4j_repo, utils
+from src.services.graph.neo4j_repo import Neo4jRepo
+
+PREFIX = "BENCH-"
+
+
+def seed(repo: Neo4jRepo, topics: int) -> None:
+    su = PREFIX + "SUB"
+    secs = [{"uid": f"{PREFIX}SEC-{i}", "title": f"Section {i}"} for i in range(max(1, topics // 20))]
+    tops = [{"uid": f"{PREFIX}TOP-{i}", "title": f"Topic {i}", "sec": secs[i % len(secs)]["uid"], "w": (i % 10) / 10.0} for i in range(topics)]
+    skills = [{"uid": f"{PREFIX}SK-{i}", "title": f"Skill {i}"} for i in range(max(1, topics // 4))]
+    methods = [{"uid": f"{PREFIX}M-{i}", "title": f"Method {i}", "sk": skills[i % len(skills)]["uid"]} for i in range(len(skills) * 2)]
+    repo.write("MERGE (s:Subject {uid:$uid}) SET s.title='Bench'", {"uid": su})
+    repo.write_unwind("UNWIND $rows AS r MATCH (s:Subject {uid:'" + su + "'}) MERGE (x:Section {uid:r.uid}) SET x.title=r.title MERGE (s)-[:CONTAINS]->(x)", secs)
+    repo.write_unwind("UNWIND $rows AS r MATCH (x:Section {uid:r.sec}) MERGE (t:Topic {uid:r.uid}) SET t.title=r.title, t.static_weight=r.w, t.dynamic_weight=r.w MERGE (x)-[:CONTAINS]->(t)", tops)
+    repo.write_unwind("UNWIND $rows AS r MERGE (k:Skill {uid:r.uid}) SET k.title=r.title, k.static_weight=0.5, k.dynamic_weight=0.5", skills)
+    repo.write_unwind("UNWIND $rows AS r MATCH (k:Skill {uid:r.sk}) MERGE (m:Method {uid:r.uid}) SET m.title=r.title MERGE (k)-[:LINKED {weight:'linked'}]->(m)", methods)
+    links = [{"t": t["uid"], "sk": skills[(i * 7 + j) % len(skills)]["uid"], "pre": tops[i - 1 - j]["uid"] if i > j else None} for i, t in enumerate(tops) for j in range(3)]
+    repo.write_unwind("UNWIND $rows AS r MATCH (t:Topic {uid:r.t}), (k:Skill {uid:r.sk}) MERGE (t)-[:USES_SKILL]->(k)", links)
+    repo.write_unwind("UNWIND $rows AS r MATCH (t:Topic {uid:r.t}), (p:Topic {uid:r.pre}) MERGE (t)-[:PREREQ]->(p)", [l for l in links if l["pre"]])
+
+
+def cleanup(repo: Neo4jRepo) -> None:
+    repo.write("MATCH (n) WHERE n.uid STARTS WITH $p DETACH DELETE n", {"p": PREFIX})
+
+
+def legacy_node_details(uid: str) -> dict:
+    repo = Neo4jRepo()
+    rows = repo.read("MATCH (n) WHERE n.uid=$uid RETURN labels(n) AS labels, n.title AS title", {"uid": uid})
+    if not rows:
+        return {"found": False}
+    repo.read("MATCH (t:Topic {uid:$uid}) RETURN t.static_weight AS sw, t.dynamic_weight AS dw", {"uid": uid})
+    repo.read("MATCH (t:Topic {uid:$uid})-[:TARGETS]->(g) RETURN g.uid AS uid, g.title AS title, labels(g)[0] AS label", {"uid": uid})
+    repo.read("MATCH (t:Topic {uid:$uid})-[:PREREQ]->(p:Topic) RETURN p.uid AS uid, p.title AS title", {"uid": uid})
+    repo.read("MATCH (t:Topic {uid:$uid})-[:USES_SKILL]->(sk:Skill)-[:LINKED]->(m:Method) RETURN DISTINCT m.uid AS uid, m.title AS title", {"uid": uid})
+    return {"found": True}
+
+
+def legacy_repo_node_details(uid: str) -> dict:
+    with neo4j_repo.get_driver().session() as s:
+        s.run("MATCH (n {uid:$uid}) RETURN n", {"uid": uid}).single()
+        list(s.run("MATCH (n {uid:$uid})<-[r]-(other) RETURN type(r) as rel, other.uid as uid, other.title as title", {"uid": uid}))
+        list(s.run("MATCH (n {uid:$uid})-[r]->(other) RETURN type(r) as rel, other.uid as uid, other.title as title", {"uid": uid}))
+    return {}
+
+
+def legacy_adaptive_roadmap(subject_uid: str, limit: int) -> list:
+    repo = Neo4jRepo()
+    rows = repo.read("MATCH (sub:Subject {uid:$su})-[:CONTAINS]->(:Section)-[:CONTAINS]->(t:Topic) RETURN t.uid AS uid, t.dynamic_weight AS dw", {"su": subject_uid})
+    rows.sort(key=lambda r: (r["dw"] or 0.0), reverse=True)
+    for r in rows[:limit]:
+        repo.read("MATCH (t:Topic {uid:$uid})-[:USES_SKILL]->(sk:Skill) RETURN DISTINCT sk.uid AS uid, sk.title AS title, sk.static_weight AS sw, sk.dynamic_weight AS dw", {"uid": r["uid"]})
+        repo.read("MATCH (t:Topic {uid:$uid})-[:USES_SKILL]->(sk:Skill)-[:LINKED]->(m:Method) RETURN DISTINCT m.uid AS uid, m.title AS title", {"uid": r["uid"]})
+    return rows[:limit]
+
+
+def timed(fn, iterations: int):
+    fn()
+    lat = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        lat.append((time.perf_counter() - t0) * 1000.0)
+    lat.sort()
+    return statistics.median(lat), lat[max(0, int(len(lat) * 0.95) - 1)]
+
+
+def main():
+    topics = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    repo = Neo4jRepo()
+    seed(repo, topics)
+    try:
+        uid = f"{PREFIX}TOP-{topics // 2}"
+        su = PREFIX + "SUB"
+        cases = [
+            ("utils.get_node_details", lambda: legacy_node_details(uid), lambda: utils.get_node_details(uid)),
+            ("neo4j_repo.get_node_details", lambda: legacy_repo_node_details(uid), lambda: neo4j_repo.get_node_details(uid)),
+            ("build_adaptive_roadmap(limit=50)", lambda: legacy_adaptive_roadmap(su, 50), lambda: utils.build_adaptive_roadmap(su, limit=50)),
+        ]
+        print(f"seeded {topics} topics, {iterations} iterations")
+        for name, before, after in cases:
+            b50, b95 = timed(before, iterations)
+            a50, a95 = timed(after, iterations)
+            print(f"{name:<34} before p50={b50:7.1f}ms p95={b95:7.1f}ms | after p50={a50:7.1f}ms p95={a95:7.1f}ms")
+    finally:
+        cleanup(repo)
+        repo.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Postgres side of the proposals/commit path: connect-per-call with per-commit DDL (before) vs pooled connections with prepared statements (after).
+
+Each cycle inserts a proposal, loads it as the commit worker does, reads the tenant graph_version, writes the
+audit/outbox/version rows in one transaction, marks the proposal DONE and lists the tenant's proposals.
+Rows are written under the bench-pg tenant and removed at the end; Neo4j is not involved.
+
+Usage: PG_DSN=... python scripts/bench_pg_commit.py [cycles] [threads]
+"""
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+
+from src.config.settings import settings
+from src.db import pg
+
+TENANT = "bench-pg"
+OPS = json.dumps([{"op_id": str(i), "op_type": "CREATE_NODE", "target_id": f"BENCH-{i}", "properties_delta": {"type": "Topic"}} for i in range(20)])
+
+
+def _connect():
+    return psycopg2.connect(str(settings.pg_dsn))
+
+
+def legacy_cycle(_: int) -> None:
+    pid = "BENCH-" + uuid.uuid4().hex[:12]
+    conn = _connect(); conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO proposals (proposal_id, tenant_id, base_graph_version, proposal_checksum, status, operations_json) VALUES (%s,%s,0,'x','DRAFT',%s)", (pid, TENANT, OPS))
+    conn.close()
+    pg.ensure_tables()  # _load_proposal used to run the DDL before every commit
+    conn = _connect()
+    with conn.cursor() as cur:
+        cur.execute("SELECT tenant_id, base_graph_version, status, operations_json FROM proposals WHERE proposal_id=%s", (pid,))
+        cur.fetchone()
+    conn.close()
+    conn = _connect()
+    with conn.cursor() as cur:
+        cur.execute("SELECT graph_version FROM tenant_graph_version WHERE tenant_id=%s", (TENANT,))
+        row = cur.fetchone()
+    conn.close()
+    ver = (int(row[0]) if row else 0) + 1
+    conn = _connect()
+    with conn.cursor() as cur:
+        _write_audit(cur, pid, ver)
+    conn.commit(); conn.close()
+    conn = _connect(); conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("UPDATE proposals SET status=%s WHERE proposal_id=%s", ("DONE", pid))
+    conn.close()
+    conn = _connect()
+    with conn.cursor() as cur:
+        cur.execute("SELECT proposal_id, tenant_id, base_graph_version, proposal_checksum, status, created_at FROM proposals WHERE tenant_id=%s ORDER BY created_at DESC LIMIT %s OFFSET %s", (TENANT, 20, 0))
+        cur.fetchall()
+    conn.close()
+
+
+def pooled_cycle(_: int) -> None:
+    pid = "BENCH-" + uuid.uuid4().hex[:12]
+    with pg.pg_conn() as conn, conn.cursor() as cur:
+        cur.execute("INSERT INTO proposals (proposal_id, tenant_id, base_graph_version, proposal_checksum, status, operations_json) VALUES (%s,%s,0,'x','DRAFT',%s)", (pid, TENANT, OPS))
+    pg.get_proposal(pid)
+    ver = pg.get_graph_version(TENANT) + 1
+    with pg.pg_conn(autocommit=False) as conn, conn.cursor() as cur:
+        _write_audit(cur, pid, ver)
+    pg.set_proposal_status(pid, "DONE")
+    pg.list_proposals(TENANT, limit=20)
+
+
+def _write_audit(cur, pid: str, ver: int) -> None:
+    pg.ensure_graph_changes_partition(TENANT, ver)
+    cur.execute("INSERT INTO tenant_graph_version (tenant_id, graph_version) VALUES (%s,%s) ON CONFLICT (tenant_id) DO UPDATE SET graph_version=GREATEST(tenant_graph_version.graph_version, EXCLUDED.graph_version)", (TENANT, ver))
+    for i in range(5):
+        cur.execute("INSERT INTO graph_changes (tenant_id, graph_version, target_id, change_type) VALUES (%s,%s,%s,%s) ON CONFLICT DO NOTHING", (TENANT, ver, f"{pid}-{i}", "NODE"))
+    cur.execute("INSERT INTO audit_log (tx_id, tenant_id, proposal_id, operations_applied, revert_operations, correlation_id) VALUES (%s,%s,%s,%s,'[]','')", ("TX-" + uuid.uuid4().hex[:16], TENANT, pid, OPS))
+    cur.execute("INSERT INTO events_outbox (event_id, tenant_id, event_type, payload, published) VALUES (%s,%s,'bench','{}',TRUE)", ("EV-" + uuid.uuid4().hex[:16], TENANT))
+
+
+def cleanup() -> None:
+    conn = _connect(); conn.autocommit = True
+    with conn.cursor() as cur:
+        for table in ("proposals", "audit_log", "graph_changes", "events_outbox", "tenant_graph_version"):
+            cur.execute(f"DELETE FROM {table} WHERE tenant_id=%s", (TENANT,))
+    conn.close()
+
+
+def run(fn, cycles: int, threads: int) -> float:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        list(ex.map(fn, range(cycles)))
+    return time.perf_counter() - t0
+
+
+def main():
+    cycles = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    pg.ensure_tables()
+    pg.init_pool()
+    try:
+        print(f"{cycles} commit cycles on {threads} threads, pool max {settings.pg_pool_max_size}, prepared={settings.pg_prepared_statements}")
+        for name, fn in (("connect per call", legacy_cycle), ("pool + prepared", pooled_cycle)):
+            sec = run(fn, cycles, threads)
+            print(f"{name:<17} {sec * 1000.0 / cycles:7.2f}ms/cycle {cycles / sec:8.1f} cycles/s")
+    finally:
+        cleanup()
+        pg.close_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""PREREQ cycle detection on synthetic graphs: recursive path-copying DFS (before) vs iterative Tarjan SCC (after).
+
+Builds a random DAG (edges only from lower to higher ids, plus a long chain so depth grows with size)
+and injects back edges that close cycles. No database is needed.
+
+Usage: python scripts/bench_prereq_cycles.py [nodes] [avg_degree] [cycles]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.graph.scc import find_cycles
+
+
+def synthetic_graph(n: int, degree: int, cycles: int, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    adj = {f"T{i}": [] for i in range(n)}
+    for i in range(n - 1):
+        adj[f"T{i}"].append(f"T{i + 1}")
+        for _ in range(degree - 1):
+            j = rng.randrange(i + 1, min(n, i + 200))
+            adj[f"T{i}"].append(f"T{j}")
+    for _ in range(cycles):
+        i = rng.randrange(1, n)
+        adj[f"T{i}"].append(f"T{rng.randrange(max(0, i - 50), i)}")
+    return adj
+
+
+def legacy_cycles(graph: dict) -> list:
+    cycles = []
+    visited = set()
+    stack = set()
+
+    def dfs(u, path):
+        if u in stack:
+            cycle_start = path.index(u) if u in path else 0
+            cycles.append(path[cycle_start:] + [u])
+            return
+        if u in visited:
+            return
+        visited.add(u)
+        stack.add(u)
+        for v in graph.get(u, []):
+            dfs(v, path + [u])
+        stack.remove(u)
+    for node in list(graph.keys()):
+        dfs(node, [])
+    return cycles
+
+
+def timed(fn, graph: dict):
+    t0 = time.perf_counter()
+    try:
+        res = fn(graph)
+    except RecursionError:
+        return None, (time.perf_counter() - t0) * 1000.0
+    return res, (time.perf_counter() - t0) * 1000.0
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    degree = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    injected = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    graph = synthetic_graph(n, degree, injected)
+    print(f"{n} nodes, {sum(len(v) for v in graph.values())} edges, {injected} injected back edges")
+    for name, fn in (("recursive DFS", legacy_cycles), ("iterative SCC", find_cycles)):
+        res, ms = timed(fn, graph)
+        if res is None:
+            print(f"{name:<14} RecursionError after {ms:9.1f}ms (limit {sys.getrecursionlimit()})")
+        else:
+            print(f"{name:<14} {ms:9.1f}ms cycles reported={len(res)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""Concurrent proposal creation on a single uvicorn worker: psycopg2 on the event loop (before) vs the asyncpg pool (after).
+
+A /ping probe runs alongside the load; its latency shows whether the loop is blocked by database calls.
+
+Usage: PG_DSN=... python scripts/bench_proposals_concurrency.py
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from src.db import pg, pg_async
+
+HOST = "127.0.0.1"
+PORT = int(os.getenv("BENCH_PORT", "8766"))
+LEVELS = [int(x) for x in os.getenv("BENCH_CONCURRENCY", "1,8,32,64,128").split(",")]
+REQUESTS_PER_LEVEL = int(os.getenv("BENCH_REQUESTS", "512"))
+TENANT = os.getenv("BENCH_TENANT", "bench-proposals")
+OPERATIONS = [{"op_id": f"op-{i}", "op_type": "CREATE_NODE", "target_id": None, "properties_delta": {"uid": f"bench-{i}", "title": "x" * 64}, "match_criteria": {}, "evidence": {}, "semantic_impact": "COMPATIBLE"} for i in range(10)]
+
+app = FastAPI()
+
+@app.post("/before")
+async def before():
+    pid = "P-" + uuid.uuid4().hex
+    with pg.pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO proposals (proposal_id, tenant_id, base_graph_version, proposal_checksum, status, operations_json) VALUES (%s,%s,%s,%s,%s,%s)",
+                (pid, TENANT, 0, "bench", "DRAFT", json.dumps(OPERATIONS)),
+            )
+    return {"proposal_id": pid}
+
+@app.post("/after")
+async def after():
+    pid = "P-" + uuid.uuid4().hex
+    await pg_async.insert_proposal(pid, TENANT, 0, "bench", "DRAFT", OPERATIONS)
+    return {"proposal_id": pid}
+
+@app.get("/ping")
+async def ping():
+    return {"ok": True}
+
+def _p95(lat):
+    lat.sort()
+    return lat[max(0, int(len(lat) * 0.95) - 1)]
+
+async def _run_level(path: str, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+    lat = []
+    ping_lat = []
+    done = asyncio.Event()
+    async with httpx.AsyncClient(base_url=f"http://{HOST}:{PORT}", timeout=60.0, limits=httpx.Limits(max_connections=concurrency + 1)) as client:
+        async def one():
+            async with sem:
+                t0 = time.perf_counter()
+                r = await client.post(path)
+                r.raise_for_status()
+                lat.append((time.perf_counter() - t0) * 1000.0)
+        async def probe():
+            while not done.is_set():
+                t0 = time.perf_counter()
+                (await client.get("/ping")).raise_for_status()
+                ping_lat.append((time.perf_counter() - t0) * 1000.0)
+                await asyncio.sleep(0.01)
+        prober = asyncio.create_task(probe())
+        t0 = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(REQUESTS_PER_LEVEL)])
+        wall = time.perf_counter() - t0
+        done.set()
+        await prober
+    return {"rps": REQUESTS_PER_LEVEL / wall, "p50": statistics.median(lat), "p95": _p95(lat), "ping_p95": _p95(ping_lat) if ping_lat else 0.0}
+
+def _cleanup():
+    with pg.pg_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM proposals WHERE tenant_id=%s", (TENANT,))
+
+def main():
+    pg.init_pool()
+    pg.ensure_tables()
+    server = uvicorn.Server(uvicorn.Config(app, host=HOST, port=PORT, workers=1, log_level="warning"))
+    th = threading.Thread(target=server.run, daemon=True)
+    th.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        for path in ("/before", "/after"):
+            print(f"{path}:")
+            for c in LEVELS:
+                res = asyncio.run(_run_level(path, c))
+                print(f"  concurrency={c:<4} rps={res['rps']:8.1f} p50={res['p50']:7.1f}ms p95={res['p95']:7.1f}ms ping_p95={res['ping_p95']:6.1f}ms")
+    finally:
+        server.should_exit = True
+        th.join()
+        _cleanup()
+        pg.close_pool()
+
+if __name__ == "__main__":
+    main()
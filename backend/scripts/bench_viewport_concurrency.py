@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Concurrent /viewport load on a single uvicorn worker: sync neo4j driver (before) vs AsyncNeo4jRepo (after).
+
+Usage: NEO4J_URI=... NEO4J_USER=... NEO4J_PASSWORD=... python scripts/bench_viewport_concurrency.py TOP-UID [depth]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from src.services.graph import neo4j_repo, neo4j_async_repo
+
+HOST = "127.0.0.1"
+PORT = int(os.getenv("BENCH_PORT", "8765"))
+LEVELS = [int(x) for x in os.getenv("BENCH_CONCURRENCY", "1,8,32,64,128").split(",")]
+REQUESTS_PER_LEVEL = int(os.getenv("BENCH_REQUESTS", "256"))
+SLO_P95_MS = float(os.getenv("BENCH_SLO_P95_MS", "250"))
+
+app = FastAPI()
+
+@app.get("/before")
+async def before(center_uid: str, depth: int = 1):
+    ns, es = neo4j_repo.neighbors(center_uid, depth=depth)
+    return {"nodes": len(ns), "edges": len(es)}
+
+@app.get("/after")
+async def after(center_uid: str, depth: int = 1):
+    ns, es = await neo4j_async_repo.neighbors(center_uid, depth=depth)
+    return {"nodes": len(ns), "edges": len(es)}
+
+async def _run_level(path: str, uid: str, depth: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+    lat = []
+    async with httpx.AsyncClient(base_url=f"http://{HOST}:{PORT}", timeout=60.0, limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def one():
+            async with sem:
+                t0 = time.perf_counter()
+                r = await client.get(path, params={"center_uid": uid, "depth": depth})
+                r.raise_for_status()
+                lat.append((time.perf_counter() - t0) * 1000.0)
+        t0 = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(REQUESTS_PER_LEVEL)])
+        wall = time.perf_counter() - t0
+    lat.sort()
+    p95 = lat[int(len(lat) * 0.95) - 1]
+    return {"rps": REQUESTS_PER_LEVEL / wall, "p50": statistics.median(lat), "p95": p95}
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    uid = sys.argv[1]
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    server = uvicorn.Server(uvicorn.Config(app, host=HOST, port=PORT, workers=1, log_level="warning"))
+    th = threading.Thread(target=server.run, daemon=True)
+    th.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        for path in ("/before", "/after"):
+            best = 0
+            print(f"{path}:")
+            for c in LEVELS:
+                res = asyncio.run(_run_level(path, uid, depth, c))
+                ok = res["p95"] <= SLO_P95_MS
+                if ok:
+                    best = c
+                print(f"  concurrency={c:<4} rps={res['rps']:8.1f} p50={res['p50']:7.1f}ms p95={res['p95']:7.1f}ms {'ok' if ok else 'over SLO'}")
+            print(f"  max concurrency within p95<={SLO_P95_MS:.0f}ms: {best}")
+    finally:
+        server.should_exit = True
+        th.join()
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,8 @@ from src.config.settings import settings
 from src.services.graph.neo4j_repo import relation_context, neighbors
 from src.services.roadmap_planner import plan_route
 from src.api.analytics import stats as analytics_stats
-from src.services.questions import select_examples_for_topics, all_topic_uids_from_examples
+from src.services.question_sampler import sample_questions
+from src.core.context import get_tenant_id
 from src.api.common import ApiError
 
 router = APIRouter(prefix="/v1/assistant", tags=["ИИ ассистент"])
@@ -117,14 +118,14 @@ async def chat(payload: AssistantChatInput) -> Dict:
         return await analytics_stats()
 
     if payload.action == "questions":
-        roadmap = plan_route(payload.subject_uid, payload.progress, limit=payload.count * 3)
-        topic_uids = [it["uid"] for it in roadmap] or all_topic_uids_from_examples()
-        examples = select_examples_for_topics(
-            topic_uids=topic_uids,
-            limit=payload.count,
+        examples = sample_questions(
+            payload.subject_uid,
+            payload.progress,
+            payload.count,
             difficulty_min=payload.difficulty_min,
             difficulty_max=payload.difficulty_max,
-            exclude_uids=set(payload.exclude),
+            exclude=frozenset(payload.exclude),
+            tenant_id=get_tenant_id(),
         )
         return {"questions": examples}
 
@@ -1,56 +1,62 @@
 from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import Dict, List, Set
-from src.services.graph.neo4j_repo import get_driver
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional
+from src.services.graph.reachability import get_prereq_index, MASTERY_THRESHOLD
+from src.core.context import get_tenant_id
 
 router = APIRouter(prefix="/v1/curriculum", tags=["Учебные планы"])
 
 class PathfindInput(BaseModel):
     target_uid: str
+    progress: Optional[Dict[str, float]] = Field(None, description="Карта прогресса {TopicUID: mastery 0.0–1.0}; освоенные темы и их пререквизиты исключаются из пути.")
+    threshold: float = Field(MASTERY_THRESHOLD, ge=0.0, le=1.0, description="Уровень освоения, начиная с которого тема считается пройденной.")
 
 class PathfindResponse(BaseModel):
     target: str
     path: List[str]
+    frontier: List[str] = []
 
 @router.post("/pathfind", summary="Построить порядок темы", description="Возвращает упорядоченный список тем из транзитивного замыкания PREREQ для указанной цели.", response_model=PathfindResponse)
 async def pathfind(payload: PathfindInput) -> Dict:
     """
     Принимает:
       - target_uid: UID конечной темы
+      - progress: (опц.) карта прогресса ученика
+      - threshold: порог освоения
 
     Возвращает:
       - target: исходный UID
-      - path: упорядоченный список UID тем для прохождения
+      - path: упорядоченный список UID ещё не освоенных тем для прохождения
+      - frontier: темы из path, доступные для изучения сразу (все пререквизиты освоены)
     """
-    drv = get_driver()
-    with drv.session() as s:
-        res = s.run(
-            "MATCH (t:Topic {uid:$uid})-[:PREREQ*0..]->(p:Topic) RETURN collect(DISTINCT p.uid) AS uids",
-            {"uid": payload.target_uid}
-        ).single()
-        closure: List[str] = res["uids"] if res else []
-        edges = s.run(
-            "MATCH (a:Topic)-[:PREREQ]->(b:Topic) WHERE a.uid IN $uids AND b.uid IN $uids "
-            "RETURN a.uid AS a, b.uid AS b",
-            {"uids": closure}
-        )
-        g: Dict[str, List[str]] = {u: [] for u in closure}
-        indeg: Dict[str, int] = {u: 0 for u in closure}
-        for r in edges:
-            g[r["b"]].append(r["a"])
-            indeg[r["a"]] += 1
-    drv.close()
-    q: List[str] = [u for u, d in indeg.items() if d == 0]
-    ordered: List[str] = []
-    seen: Set[str] = set()
-    while q:
-        u = q.pop(0)
-        if u in seen:
-            continue
-        seen.add(u)
-        ordered.append(u)
-        for v in g.get(u, []):
-            indeg[v] -= 1
-            if indeg[v] == 0:
-                q.append(v)
-    return {"target": payload.target_uid, "path": ordered}
+    index = await run_in_threadpool(get_prereq_index, get_tenant_id())
+    plan = await run_in_threadpool(index.remaining_plan, [payload.target_uid], payload.progress, payload.threshold)
+    return {"target": payload.target_uid, "path": plan["path"], "frontier": plan["frontier"]}
+
+class MultiPathfindInput(BaseModel):
+    target_uids: List[str] = Field(..., min_length=1, max_length=500)
+    progress: Optional[Dict[str, float]] = None
+    threshold: float = Field(MASTERY_THRESHOLD, ge=0.0, le=1.0)
+
+class MultiPathfindResponse(BaseModel):
+    targets: List[str]
+    path: List[str]
+    frontier: List[str] = []
+
+@router.post("/pathfind/multi", summary="Построить общий порядок тем", description="Возвращает объединённый упорядоченный план из транзитивного замыкания PREREQ для набора целей.", response_model=MultiPathfindResponse)
+async def pathfind_multi(payload: MultiPathfindInput) -> Dict:
+    """
+    Принимает:
+      - target_uids: список UID целевых тем
+      - progress: (опц.) карта прогресса ученика
+      - threshold: порог освоения
+
+    Возвращает:
+      - targets: исходные UID
+      - path: упорядоченный список UID неосвоенных тем (каждая тема один раз, пререквизиты раньше зависимых)
+      - frontier: темы из path, доступные для изучения сразу
+    """
+    index = await run_in_threadpool(get_prereq_index, get_tenant_id())
+    plan = await run_in_threadpool(index.remaining_plan, payload.target_uids, payload.progress, payload.threshold)
+    return {"targets": payload.target_uids, "path": plan["path"], "frontier": plan["frontier"]}
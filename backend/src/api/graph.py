@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException
+import json
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from typing import Dict, List, Optional
-from src.services.graph.neo4j_repo import relation_context, neighbors, get_node_details
+from src.services.graph.neo4j_async_repo import relation_context, neighbors, get_node_details
+from src.core.context import get_tenant_id
 from src.config.settings import settings
-from src.services.roadmap_planner import plan_route
-from src.services.questions import select_examples_for_topics, all_topic_uids_from_examples
+from src.services.roadmap_planner import plan_route_async, load_route_rows_async, CohortPlanner
+from src.services.question_sampler import BloomFilter, ExcludeSet, sample_questions
 from src.api.common import ApiError
 
 router = APIRouter(prefix="/v1/graph", tags=["Интеграция с LMS"])
@@ -44,7 +48,7 @@ class ViewportResponse(BaseModel):
 
 @router.get("/node/{uid}")
 async def get_node(uid: str) -> Dict:
-    data = get_node_details(uid)
+    data = await get_node_details(uid)
     if not data:
         raise HTTPException(status_code=404, detail="Node not found")
     return data
@@ -62,7 +66,8 @@ async def viewport(center_uid: str, depth: int = 1) -> Dict:
       - center_uid: исходный UID
       - depth: фактическая глубина обхода
     """
-    ns, es = neighbors(center_uid, depth=depth)
+    # not served from the graph snapshot: the viewport walks every rel type and label of the graph and returns Neo4j ids
+    ns, es = await neighbors(center_uid, depth=depth)
     return {"nodes": ns, "edges": es, "center_uid": center_uid, "depth": depth}
 
 class ChatInput(BaseModel):
@@ -126,7 +131,7 @@ async def chat(payload: ChatInput) -> Dict:
     except Exception:
         raise HTTPException(status_code=503, detail="OpenAI client is not available")
 
-    ctx = relation_context(payload.from_uid, payload.to_uid)
+    ctx = await relation_context(payload.from_uid, payload.to_uid)
     oai = AsyncOpenAI(api_key=settings.openai_api_key.get_secret_value())
     messages = [
         {"role": "system", "content": "You are a graph expert. Explain why the relationship exists using provided metadata."},
@@ -201,9 +206,83 @@ async def roadmap(payload: RoadmapInput) -> Dict:
     Возвращает:
       - items: список объектов {uid, title, mastered, missing_prereqs, priority}
     """
-    items = plan_route(payload.subject_uid, payload.progress, limit=payload.limit)
+    items = await plan_route_async(payload.subject_uid, payload.progress, limit=payload.limit)
     return {"items": items}
 
+ROADMAP_BATCH_CHUNK = 512
+
+async def _ndjson_lines(request: Request):
+    buf = b""
+    async for chunk in request.stream():
+        buf += chunk
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            yield line
+    yield buf
+
+@router.post(
+    "/roadmap/batch",
+    summary="Дорожные карты для группы учеников",
+    description="Принимает NDJSON (по строке {id, progress} на ученика) и потоково возвращает NDJSON с дорожной картой для каждого.",
+    responses={
+        400: {"model": ApiError, "description": "Некорректные параметры запроса"},
+        500: {"model": ApiError, "description": "Внутренняя ошибка сервера"},
+    },
+)
+async def roadmap_batch(request: Request, subject_uid: Optional[str] = Query(None), limit: int = Query(30, ge=1, le=500)) -> StreamingResponse:
+    """
+    Принимает:
+      - тело NDJSON: строки {"id": идентификатор ученика, "progress": {TopicUID: mastery 0.0–1.0}}
+      - subject_uid: UID предмета (query)
+      - limit: максимальное число тем на ученика (query)
+
+    Возвращает:
+      - NDJSON: строки {"id", "items": [{uid, title, mastered, missing_prereqs, priority}]} в порядке входа;
+        для непрочитанных строк — {"line", "error"} на их месте
+    """
+    planner = CohortPlanner(await load_route_rows_async(subject_uid))
+
+    async def _plan(batch: List[Dict]) -> bytes:
+        plans = await run_in_threadpool(planner.plan_batch, [b["progress"] for b in batch], limit)
+        return b"".join(json.dumps({"id": b["id"], "items": items}, ensure_ascii=False).encode("utf-8") + b"\n" for b, items in zip(batch, plans))
+
+    # the body is parsed before the response starts: Starlette's StreamingResponse listens for disconnects on the same receive channel
+    entries: List[Dict] = []
+    n = 0
+    async for raw in _ndjson_lines(request):
+        n += 1
+        if not raw.strip():
+            continue
+        try:
+            rec = json.loads(raw)
+            progress = {str(k): float(v or 0.0) for k, v in (rec.get("progress") or {}).items()}
+        except (ValueError, TypeError, AttributeError):
+            entries.append({"line": n, "error": "invalid_parameters"})
+            continue
+        entries.append({"id": rec.get("id"), "progress": progress})
+
+    async def _stream():
+        batch: List[Dict] = []
+        for e in entries:
+            if "error" in e:
+                if batch:
+                    yield await _plan(batch)
+                    batch = []
+                yield json.dumps(e).encode("utf-8") + b"\n"
+                continue
+            batch.append(e)
+            if len(batch) >= ROADMAP_BATCH_CHUNK:
+                yield await _plan(batch)
+                batch = []
+        if batch:
+            yield await _plan(batch)
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+class ExcludeBloom(BaseModel):
+    bits: str = Field(..., description="Битовый массив в base64 (бит i — байт i // 8, маска 1 << (i % 8)).")
+    k: int = Field(..., ge=1, le=32, description="Число хеш-функций (двойное хеширование BLAKE2b-128 от UID).")
+
 class AdaptiveQuestionsInput(BaseModel):
     subject_uid: Optional[str] = Field(None, description="UID предмета.")
     progress: Dict[str, float] = Field(..., description="Текущий прогресс пользователя.")
@@ -211,6 +290,8 @@ class AdaptiveQuestionsInput(BaseModel):
     difficulty_min: int = Field(1, ge=1, le=10, description="Минимальная сложность (1–10).")
     difficulty_max: int = Field(5, ge=1, le=10, description="Максимальная сложность (1–10).")
     exclude: List[str] = Field([], description="Список UID вопросов для исключения (уже отвечены).")
+    exclude_bloom: Optional[ExcludeBloom] = Field(None, description="Фильтр Блума по UID уже отвеченных вопросов (для больших историй вместо exclude).")
+    seed: Optional[int] = Field(None, description="Зерно генератора для воспроизводимой выборки.")
 
 class QuestionDTO(BaseModel):
     uid: Optional[str] = None
@@ -253,17 +334,25 @@ async def adaptive_questions(payload: AdaptiveQuestionsInput) -> Dict:
       - difficulty_min: минимальная сложность (1–10)
       - difficulty_max: максимальная сложность (1–10)
       - exclude: список UID вопросов для исключения
+      - exclude_bloom: (опц.) фильтр Блума по UID для исключения
+      - seed: (опц.) зерно генератора
 
     Возвращает:
       - questions: список объектов вопросов {uid, title, statement, difficulty 0.0–1.0, topic_uid}
     """
-    roadmap = plan_route(payload.subject_uid, payload.progress, limit=payload.count * 3)
-    topic_uids = [it["uid"] for it in roadmap] or all_topic_uids_from_examples()
-    examples = select_examples_for_topics(
-        topic_uids=topic_uids,
-        limit=payload.count,
+    try:
+        bloom = BloomFilter.from_payload(payload.exclude_bloom.bits, payload.exclude_bloom.k) if payload.exclude_bloom else None
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="exclude_bloom.bits must be base64")
+    examples = await run_in_threadpool(
+        sample_questions,
+        payload.subject_uid,
+        payload.progress,
+        payload.count,
         difficulty_min=payload.difficulty_min,
         difficulty_max=payload.difficulty_max,
-        exclude_uids=set(payload.exclude),
+        exclude=ExcludeSet(frozenset(payload.exclude), bloom),
+        seed=payload.seed,
+        tenant_id=get_tenant_id(),
     )
     return {"questions": examples}
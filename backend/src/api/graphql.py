@@ -1,7 +1,7 @@
 import strawberry
 from strawberry.fastapi import GraphQLRouter
 from typing import Optional, List
-from src.services.graph.neo4j_repo import get_driver
+from src.services.graph.neo4j_async_repo import get_async_driver
 from src.services.curriculum.repo import get_graph_view
 import os
 import json
@@ -60,12 +60,12 @@ class Curriculum:
     code: str
     nodes: List[CurriculumNode]
 
-def _graph_from_subject(subject_uid: Optional[str]) -> GraphView:
-    drv = get_driver()
+async def _graph_from_subject(subject_uid: Optional[str]) -> GraphView:
+    drv = get_async_driver()
     nodes: List[Node] = []
     edges: List[Edge] = []
-    with drv.session() as s:
-        rows = s.run(
+    async with drv.session() as s:
+        rows = await (await s.run(
             (
                 "WITH $uid AS filter "
                 "MATCH (s:Subject) WHERE filter IS NULL OR s.uid = filter "
@@ -89,13 +89,12 @@ def _graph_from_subject(subject_uid: Optional[str]) -> GraphView:
                 "collect({source:sk.uid, target:m.uid, rel:coalesce(r.weight,'linked')}) AS method_edges "
                 "RETURN subjects, sections, topics, skills, methods, sec_edges, topic_edges, skill_edges, method_edges"
             ), {"uid": subject_uid}
-        ).single()
+        )).single()
         if rows:
             ns = rows["subjects"] + rows["sections"] + rows["topics"] + rows["skills"] + rows["methods"]
             es = rows["sec_edges"] + rows["topic_edges"] + rows["skill_edges"] + rows["method_edges"]
             nodes = [Node(uid=n["uid"], title=n["title"], type=n["type"]) for n in ns]
             edges = [Edge(source=e["source"], target=e["target"], rel=e["rel"]) for e in es]
-    drv.close()
     return GraphView(nodes=nodes, edges=edges)
 
 @strawberry.type
@@ -131,25 +130,25 @@ class TopicDetails:
     examples: List[Example]
     errors: List[Node]
 
-def _topic_details(uid: str) -> TopicDetails:
-    drv = get_driver()
+async def _topic_details(uid: str) -> TopicDetails:
+    drv = get_async_driver()
     t_title = ""
     prereqs: List[Node] = []
     goals: List[Goal] = []
     objectives: List[Objective] = []
     methods: List[Node] = []
-    with drv.session() as s:
-        row = s.run("MATCH (t:Topic {uid:$u}) RETURN t.title AS title", {"u": uid}).single()
+    async with drv.session() as s:
+        row = await (await s.run("MATCH (t:Topic {uid:$u}) RETURN t.title AS title", {"u": uid})).single()
         t_title = (row["title"] if row else "") or ""
-        pr = s.run("MATCH (t:Topic {uid:$u})-[:PREREQ]->(p:Topic) RETURN p.uid AS uid, p.title AS title", {"u": uid})
-        prereqs = [Node(uid=r["uid"], title=r["title"], type="topic") for r in pr]
-        tg = s.run("MATCH (t:Topic {uid:$u})-[:TARGETS]->(g:Goal) RETURN g.uid AS uid, g.title AS title", {"u": uid})
-        goals = [Goal(uid=r["uid"], title=r["title"]) for r in tg]
-        obj = s.run("MATCH (t:Topic {uid:$u})-[:TARGETS]->(o:Objective) RETURN o.uid AS uid, o.title AS title", {"u": uid})
-        objectives = [Objective(uid=r["uid"], title=r["title"]) for r in obj]
-        ms = s.run("MATCH (t:Topic {uid:$u})-[:USES_SKILL]->(sk:Skill)-[:LINKED]->(m:Method) RETURN DISTINCT m.uid AS uid, m.title AS title", {"u": uid})
-        methods = [Node(uid=r["uid"], title=r["title"], type="method") for r in ms]
-        ex_rows = s.run("MATCH (t:Topic {uid:$u})-[:HAS_QUESTION]->(q) RETURN q.uid AS uid, q.title AS title, q.statement AS statement, q.difficulty AS difficulty", {"u": uid}).data()
+        pr = await s.run("MATCH (t:Topic {uid:$u})-[:PREREQ]->(p:Topic) RETURN p.uid AS uid, p.title AS title", {"u": uid})
+        prereqs = [Node(uid=r["uid"], title=r["title"], type="topic") async for r in pr]
+        tg = await s.run("MATCH (t:Topic {uid:$u})-[:TARGETS]->(g:Goal) RETURN g.uid AS uid, g.title AS title", {"u": uid})
+        goals = [Goal(uid=r["uid"], title=r["title"]) async for r in tg]
+        obj = await s.run("MATCH (t:Topic {uid:$u})-[:TARGETS]->(o:Objective) RETURN o.uid AS uid, o.title AS title", {"u": uid})
+        objectives = [Objective(uid=r["uid"], title=r["title"]) async for r in obj]
+        ms = await s.run("MATCH (t:Topic {uid:$u})-[:USES_SKILL]->(sk:Skill)-[:LINKED]->(m:Method) RETURN DISTINCT m.uid AS uid, m.title AS title", {"u": uid})
+        methods = [Node(uid=r["uid"], title=r["title"], type="method") async for r in ms]
+        ex_rows = await (await s.run("MATCH (t:Topic {uid:$u})-[:HAS_QUESTION]->(q) RETURN q.uid AS uid, q.title AS title, q.statement AS statement, q.difficulty AS difficulty", {"u": uid})).data()
     if not ex_rows:
         ex_json = [e for e in _load_jsonl('examples.jsonl') if e.get('topic_uid') == uid]
         examples = [Example(uid=e.get('uid',''), title=e.get('title',''), statement=e.get('statement',''), difficulty=float(e.get('difficulty', 3))) for e in ex_json]
@@ -162,26 +161,25 @@ def _topic_details(uid: str) -> TopicDetails:
             return xf if xf <= 1.0 else max(0.0, min(1.0, xf / 5.0))
         examples = [Example(uid=r.get('uid',''), title=r.get('title',''), statement=r.get('statement',''), difficulty=_norm(r.get('difficulty', 3))) for r in ex_rows]
     errors = []
-    with drv.session() as s2:
-        err_rows = s2.run(
+    async with drv.session() as s2:
+        err_rows = await s2.run(
             "MATCH (t:Topic {uid:$u})-[:USES_SKILL]->(sk:Skill)<-[:TRIGGERS]-(e:Error) RETURN DISTINCT e.uid AS uid, e.title AS title",
             {"u": uid}
         )
-        errors = [Node(uid=r["uid"], title=r["title"], type="error") for r in err_rows]
-    drv.close()
+        errors = [Node(uid=r["uid"], title=r["title"], type="error") async for r in err_rows]
     return TopicDetails(uid=uid, title=t_title, prereqs=prereqs, goals=goals, objectives=objectives, methods=methods, examples=examples, errors=errors)
 
-def _error_details(uid: str) -> ErrorNode:
-    drv = get_driver()
+async def _error_details(uid: str) -> ErrorNode:
+    drv = get_async_driver()
     title = ""
     triggers: List[Node] = []
     examples: List[Example] = []
-    with drv.session() as s:
-        row = s.run("MATCH (e:Error {uid:$u}) RETURN e.title AS title", {"u": uid}).single()
+    async with drv.session() as s:
+        row = await (await s.run("MATCH (e:Error {uid:$u}) RETURN e.title AS title", {"u": uid})).single()
         title = (row["title"] if row else "") or ""
-        trs = s.run("MATCH (e:Error {uid:$u})-[:TRIGGERS]->(sk:Skill) RETURN sk.uid AS uid, sk.title AS title", {"u": uid})
-        triggers = [Node(uid=r["uid"], title=r["title"], type="skill") for r in trs]
-        exq = s.run("MATCH (e:Error {uid:$u})-[:ILLUSTRATED_BY]->(q) RETURN q.uid AS uid, q.title AS title, q.statement AS statement, q.difficulty AS difficulty", {"u": uid}).data()
+        trs = await s.run("MATCH (e:Error {uid:$u})-[:TRIGGERS]->(sk:Skill) RETURN sk.uid AS uid, sk.title AS title", {"u": uid})
+        triggers = [Node(uid=r["uid"], title=r["title"], type="skill") async for r in trs]
+        exq = await (await s.run("MATCH (e:Error {uid:$u})-[:ILLUSTRATED_BY]->(q) RETURN q.uid AS uid, q.title AS title, q.statement AS statement, q.difficulty AS difficulty", {"u": uid})).data()
     if not exq:
         ex_json = [e for e in _load_jsonl('examples.jsonl') if uid in (e.get('error_uids') or [])]
         examples = [Example(uid=e.get('uid',''), title=e.get('title',''), statement=e.get('statement',''), difficulty=float(e.get('difficulty', 3))) for e in ex_json]
@@ -193,46 +191,43 @@ def _error_details(uid: str) -> ErrorNode:
                 return 0.6
             return xf if xf <= 1.0 else max(0.0, min(1.0, xf / 5.0))
         examples = [Example(uid=r.get('uid',''), title=r.get('title',''), statement=r.get('statement',''), difficulty=_norm(r.get('difficulty', 3))) for r in exq]
-    drv.close()
     return ErrorNode(uid=uid, title=title, triggers=triggers, examples=examples)
 
 @strawberry.type
 class Query:
     @strawberry.field
-    def graph(self, subject_uid: Optional[str] = None) -> GraphView:
-        return _graph_from_subject(subject_uid)
+    async def graph(self, subject_uid: Optional[str] = None) -> GraphView:
+        return await _graph_from_subject(subject_uid)
 
     def curriculum(self, code: str) -> Curriculum:
         res = get_graph_view(code)
         nodes = [CurriculumNode(kind=n["kind"], canonical_uid=n["canonical_uid"], order_index=int(n["order_index"])) for n in res.get("nodes", [])]
         return Curriculum(code=code, nodes=nodes)
-    def topic(self, uid: str) -> TopicDetails:
-        return _topic_details(uid)
-    def error(self, uid: str) -> ErrorNode:
-        return _error_details(uid)
-    def errorsBySkill(self, skill_uid: str) -> List[ErrorNode]:
-        drv = get_driver()
+    async def topic(self, uid: str) -> TopicDetails:
+        return await _topic_details(uid)
+    async def error(self, uid: str) -> ErrorNode:
+        return await _error_details(uid)
+    async def errorsBySkill(self, skill_uid: str) -> List[ErrorNode]:
+        drv = get_async_driver()
         out: List[ErrorNode] = []
-        with drv.session() as s:
-            rows = s.run("MATCH (e:Error)-[:TRIGGERS]->(sk:Skill {uid:$u}) RETURN e.uid AS uid", {"u": skill_uid}).data()
-            for r in rows:
-                out.append(_error_details(r["uid"]))
-        drv.close()
+        async with drv.session() as s:
+            rows = await (await s.run("MATCH (e:Error)-[:TRIGGERS]->(sk:Skill {uid:$u}) RETURN e.uid AS uid", {"u": skill_uid})).data()
+        for r in rows:
+            out.append(await _error_details(r["uid"]))
         return out
-    def errorsByTopic(self, topic_uid: str) -> List[ErrorNode]:
-        drv = get_driver()
+    async def errorsByTopic(self, topic_uid: str) -> List[ErrorNode]:
+        drv = get_async_driver()
         out: List[ErrorNode] = []
-        with drv.session() as s:
-            rows = s.run(
+        async with drv.session() as s:
+            rows = await (await s.run(
                 "MATCH (t:Topic {uid:$u})-[:USES_SKILL]->(sk:Skill)<-[:TRIGGERS]-(e:Error) RETURN DISTINCT e.uid AS uid",
                 {"u": topic_uid}
-            ).data()
-            for r in rows:
-                out.append(_error_details(r["uid"]))
-        drv.close()
+            )).data()
+        for r in rows:
+            out.append(await _error_details(r["uid"]))
         return out
-    def examplesByError(self, error_uid: str) -> List[Example]:
-        e = _error_details(error_uid)
+    async def examplesByError(self, error_uid: str) -> List[Example]:
+        e = await _error_details(error_uid)
         return e.examples
 
 schema = strawberry.Schema(Query)
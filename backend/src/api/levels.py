@@ -1,6 +1,8 @@
-from fastapi import APIRouter
-from typing import Dict
-from src.services.graph.utils import get_user_topic_level, get_user_skill_level
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List
+from src.services.graph.utils import get_user_topic_level_async, get_user_skill_level_async, update_dynamic_weights_batch
 
 router = APIRouter(prefix="/v1/levels", tags=["Уровни"])
 
@@ -13,7 +15,7 @@ async def level_topic(uid: str) -> Dict:
     Возвращает:
       - объект уровня навыка/темы согласно алгоритму get_user_topic_level
     """
-    return get_user_topic_level(user_id="stateless", topic_uid=uid)
+    return await get_user_topic_level_async(user_id="stateless", topic_uid=uid)
 
 @router.get("/skill/{uid}", summary="Уровень навыка", description="Возвращает уровень освоения навыка для статeless-пользователя.")
 async def level_skill(uid: str) -> Dict:
@@ -24,4 +26,35 @@ async def level_skill(uid: str) -> Dict:
     Возвращает:
       - объект уровня навыка согласно алгоритму get_user_skill_level
     """
-    return get_user_skill_level(user_id="stateless", skill_uid=uid)
+    return await get_user_skill_level_async(user_id="stateless", skill_uid=uid)
+
+LEVELS_BATCH_MAX_ITEMS = 1000
+
+class LevelScore(BaseModel):
+    uid: str = Field(..., description="UID темы или навыка")
+    score: float = Field(..., ge=0.0, le=100.0, description="Результат (0–100)")
+
+class LevelsBatchInput(BaseModel):
+    topics: List[LevelScore] = Field(default_factory=list, max_length=LEVELS_BATCH_MAX_ITEMS)
+    skills: List[LevelScore] = Field(default_factory=list, max_length=LEVELS_BATCH_MAX_ITEMS)
+
+@router.post("/batch", summary="Пакетное обновление уровней", description="Применяет результаты теста сразу ко всем темам и навыкам одной транзакцией.")
+async def levels_batch(payload: LevelsBatchInput) -> Dict:
+    """
+    Принимает:
+      - topics: список {uid, score} по темам
+      - skills: список {uid, score} по навыкам
+
+    Возвращает:
+      - items: новые веса и уровни по найденным узлам
+      - not_found: UID, отсутствующие в графе
+      - updated_links: число пересчитанных связей LINKED
+    """
+    try:
+        return await run_in_threadpool(
+            update_dynamic_weights_batch,
+            [(s.uid, s.score) for s in payload.topics],
+            [(s.uid, s.score) for s in payload.skills],
+        )
+    except RuntimeError:
+        raise HTTPException(status_code=503, detail="Graph database is not configured")
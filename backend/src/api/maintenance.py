@@ -1,11 +1,14 @@
 from fastapi import APIRouter, HTTPException, Header, Security
 from fastapi.security import HTTPBearer
-from typing import Dict, Optional
+from typing import Dict, List, Literal, Optional
 from pydantic import BaseModel
 from src.services.jobs.rebuild import start_rebuild_async, get_job_status
 from src.services.graph.utils import recompute_relationship_weights
-from src.workers.integrity_async import process_once
-from src.workers.outbox_publisher import process_once as outbox_publish_once
+from starlette.concurrency import run_in_threadpool
+from src.workers.integrity_async import process_once_async
+from src.workers.outbox_publisher import process_once_async as outbox_publish_once
+from src.workers.commit import rebase_queued_proposals
+from src.workers import graph_changes_compaction
 
 router = APIRouter(prefix="/v1/maintenance", tags=["Обслуживание"], dependencies=[Security(HTTPBearer())])
 
@@ -25,11 +28,16 @@ class ProcessedResponse(BaseModel):
     ok: bool
     processed: int
 
+class RebaseCheckResponse(BaseModel):
+    ok: bool
+    checked: int
+    conflicts: Dict[str, List[str]]
+
 @router.post("/kb/rebuild_async", summary="Асинхронная пересборка KB", description="Запускает задачу пересборки базы знаний (ARQ/Redis), возвращает job_id и WebSocket для прогресса.", response_model=JobQueuedResponse)
-async def kb_rebuild_async(x_tenant_id: str = Header(..., alias="X-Tenant-ID")) -> Dict:
+async def kb_rebuild_async(mode: Literal["full", "incremental"] = "incremental", x_tenant_id: str = Header(..., alias="X-Tenant-ID")) -> Dict:
     """
     Принимает:
-      - нет входных параметров
+      - mode: full — полная перезаливка JSONL, incremental — только изменённые строки (по манифесту)
 
     Возвращает:
       - job_id: идентификатор задачи
@@ -40,17 +48,18 @@ async def kb_rebuild_async(x_tenant_id: str = Header(..., alias="X-Tenant-ID"))
     try:
         from arq.connections import RedisSettings, ArqRedis
         redis = await ArqRedis.create(RedisSettings(host='redis', port=6379))
-        await redis.enqueue_job('kb_rebuild_job', job_id)
+        await redis.enqueue_job('kb_rebuild_job', job_id, False, mode)
         await redis.close()
         return {"job_id": job_id, "queued": True, "ws": f"/ws/progress?job_id={job_id}"}
     except Exception:
-        return start_rebuild_async()
+        return start_rebuild_async(mode)
 
 @router.post("/kb/pipeline_async", summary="Асинхронный конвейер KB", description="Запускает конвейер пересборки, опционально публикует результаты после валидации.", response_model=JobQueuedResponse)
-async def kb_pipeline_async(auto_publish: bool = False, x_tenant_id: str = Header(..., alias="X-Tenant-ID")) -> Dict:
+async def kb_pipeline_async(auto_publish: bool = False, mode: Literal["full", "incremental"] = "incremental", x_tenant_id: str = Header(..., alias="X-Tenant-ID")) -> Dict:
     """
     Принимает:
       - auto_publish: публиковать ли автоматически после успешной валидации
+      - mode: режим синхронизации JSONL (full | incremental)
 
     Возвращает:
       - job_id: идентификатор задачи
@@ -62,11 +71,11 @@ async def kb_pipeline_async(auto_publish: bool = False, x_tenant_id: str = Heade
     try:
         from arq.connections import RedisSettings, ArqRedis
         redis = await ArqRedis.create(RedisSettings(host='redis', port=6379))
-        await redis.enqueue_job('kb_rebuild_job', job_id, auto_publish)
+        await redis.enqueue_job('kb_rebuild_job', job_id, auto_publish, mode)
         await redis.close()
         return {"job_id": job_id, "queued": True, "ws": f"/ws/progress?job_id={job_id}", "auto_publish": auto_publish}
     except Exception:
-        return start_rebuild_async()
+        return start_rebuild_async(mode)
 
 @router.get("/kb/rebuild_status", summary="Статус пересборки", description="Возвращает статус задачи пересборки по job_id.")
 async def kb_rebuild_status(job_id: str) -> Dict:
@@ -230,7 +239,7 @@ async def recompute_links(x_tenant_id: str = Header(..., alias="X-Tenant-ID")) -
       - ok: True
       - stats: объект статистики пересчета
     """
-    stats = recompute_relationship_weights()
+    stats = await run_in_threadpool(recompute_relationship_weights)
     return {"ok": True, "stats": stats}
 
 @router.post("/proposals/run_integrity_async", summary="Асинхронная проверка целостности заявок", description="Запускает проверку заявок на целостность в фоне.", response_model=ProcessedResponse)
@@ -244,7 +253,40 @@ async def run_integrity_async(limit: int = 20, x_tenant_id: str = Header(..., al
       - processed: количество обработанных заявок
     """
     try:
-        res = process_once(limit=limit)
+        res = await process_once_async(limit=limit)
+        return {"ok": True, "processed": res.get("processed", 0)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/proposals/rebase_check", summary="Пакетная проверка ребейза заявок", description="Одним запросом проверяет ребейз заявок в очереди тенанта и помечает конфликтующие как CONFLICT.", response_model=RebaseCheckResponse)
+async def rebase_check_queued(limit: int = 500, x_tenant_id: str = Header(..., alias="X-Tenant-ID")) -> Dict:
+    """
+    Принимает:
+      - limit: максимальное количество заявок (DRAFT, WAITING_REVIEW, APPROVED) за запуск
+
+    Возвращает:
+      - ok: True
+      - checked: количество проверенных заявок
+      - conflicts: {proposal_id: [target_id, ...]} для заявок с конфликтом
+    """
+    try:
+        res = await run_in_threadpool(rebase_queued_proposals, x_tenant_id, limit)
+        return {"ok": True, **res}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/graph_changes/compact", summary="Компактификация истории изменений", description="Сворачивает graph_changes ниже минимальной base_graph_version открытых заявок в таблицу последних версий по целям и удаляет старые партиции.", response_model=ProcessedResponse)
+async def compact_graph_changes(x_tenant_id: str = Header(..., alias="X-Tenant-ID")) -> Dict:
+    """
+    Принимает:
+      - X-Tenant-ID: тенант, историю которого нужно сжать
+
+    Возвращает:
+      - ok: True
+      - processed: количество обработанных тенантов
+    """
+    try:
+        res = await run_in_threadpool(graph_changes_compaction.process_once, x_tenant_id)
         return {"ok": True, "processed": res.get("processed", 0)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -260,7 +302,7 @@ async def publish_outbox(limit: int = 100, x_tenant_id: str = Header(..., alias=
       - processed: количество опубликованных событий
     """
     try:
-        res = outbox_publish_once(limit=limit)
+        res = await outbox_publish_once(limit=limit)
         return {"ok": True, "processed": res.get("processed", 0)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
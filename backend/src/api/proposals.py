@@ -3,11 +3,12 @@ from fastapi.security import HTTPBearer
 from typing import Dict, Optional
 from pydantic import BaseModel, Field
 from src.schemas.proposal import Proposal, Operation, ProposalStatus
-from src.db.pg import get_conn, ensure_tables
+from starlette.concurrency import run_in_threadpool
 from src.services.proposal_service import create_draft_proposal
 from src.core.context import get_tenant_id
 from src.workers.commit import commit_proposal
-from src.db.pg import get_proposal, set_proposal_status, list_proposals
+from src.db.pg import encode_proposal_cursor
+from src.db.pg_async import get_proposal, set_proposal_status, list_proposals, insert_proposal
 from src.services.diff import build_diff
 from src.services.impact import impact_subgraph_for_proposal
 
@@ -51,24 +52,8 @@ async def create_proposal(payload: Dict, tenant_id: str = Depends(require_tenant
     try:
         ops = [Operation.model_validate(o) for o in (payload.get("operations") or [])]
         base_graph_version = int(payload.get("base_graph_version") or 0)
-        ensure_tables()
         p = create_draft_proposal(tenant_id, base_graph_version, ops)
-        conn = get_conn()
-        conn.autocommit = True
-        import json
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO proposals (proposal_id, tenant_id, base_graph_version, proposal_checksum, status, operations_json) VALUES (%s,%s,%s,%s,%s,%s)",
-                (
-                    p.proposal_id,
-                    p.tenant_id,
-                    p.base_graph_version,
-                    p.proposal_checksum,
-                    ProposalStatus.DRAFT.value,
-                    json.dumps(p.model_dump()["operations"]),
-                ),
-            )
-        conn.close()
+        await insert_proposal(p.proposal_id, p.tenant_id, p.base_graph_version, p.proposal_checksum, ProposalStatus.DRAFT.value, p.model_dump(mode="json")["operations"])
         return {"proposal_id": p.proposal_id, "proposal_checksum": p.proposal_checksum, "status": ProposalStatus.DRAFT.value}
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
@@ -93,7 +78,7 @@ async def commit(proposal_id: str, tenant_id: str = Depends(require_tenant), x_t
       - violations: детали нарушений целостности (если есть)
       - error: текст ошибки (если есть)
     """
-    res = commit_proposal(proposal_id)
+    res = await run_in_threadpool(commit_proposal, proposal_id)
     if not res.get("ok"):
         status = res.get("status") or "FAILED"
         code = 409 if status == "CONFLICT" else 400
@@ -113,7 +98,7 @@ async def get(proposal_id: str, tenant_id: str = Depends(require_tenant)) -> Dic
     Возвращает:
       - объект заявки из БД: {tenant_id, base_graph_version, status, operations_json}
     """
-    p = get_proposal(proposal_id)
+    p = await get_proposal(proposal_id)
     if not p or p["tenant_id"] != tenant_id:
         raise HTTPException(status_code=404, detail="proposal not found")
     return p
@@ -121,21 +106,27 @@ async def get(proposal_id: str, tenant_id: str = Depends(require_tenant)) -> Dic
 @router.get(
     "",
     summary="Список заявок",
-    description="Возвращает список заявок, с фильтрацией по статусу и пагинацией."
+    description="Возвращает список заявок (новые первыми), с фильтрацией по статусу и курсорной пагинацией."
 )
-async def list(status: str | None = None, limit: int = 20, offset: int = 0, tenant_id: str = Depends(require_tenant)) -> Dict:
+async def list(status: str | None = None, limit: int = 20, offset: int = 0, cursor: str | None = None, tenant_id: str = Depends(require_tenant)) -> Dict:
     """
     Принимает:
       - status: фильтр по статусу
       - limit: лимит
-      - offset: смещение
+      - cursor: next_cursor из предыдущего ответа; следующая страница начинается сразу после него
+      - offset: смещение (устаревшее, игнорируется при cursor)
 
     Возвращает:
-      - items: список заявок
+      - items: список заявок (без operations)
+      - next_cursor: курсор следующей страницы или null, если страница последняя
       - limit, offset: параметры пагинации
     """
-    items = list_proposals(tenant_id, status, limit, offset)
-    return {"items": items, "limit": limit, "offset": offset}
+    try:
+        items = await list_proposals(tenant_id, status, limit, offset, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    next_cursor = encode_proposal_cursor(items[-1]) if items and len(items) >= limit else None
+    return {"items": items, "next_cursor": next_cursor, "limit": limit, "offset": offset}
 
 @router.post(
     "/{proposal_id}/approve",
@@ -151,11 +142,11 @@ async def approve(proposal_id: str, tenant_id: str = Depends(require_tenant), x_
     Возвращает:
       - результат коммита (см. /commit): {ok, status, graph_version, ...}
     """
-    p = get_proposal(proposal_id)
+    p = await get_proposal(proposal_id)
     if not p or p["tenant_id"] != tenant_id:
         raise HTTPException(status_code=404, detail="proposal not found")
-    set_proposal_status(proposal_id, ProposalStatus.APPROVED.value)
-    res = commit_proposal(proposal_id)
+    await set_proposal_status(proposal_id, ProposalStatus.APPROVED.value)
+    res = await run_in_threadpool(commit_proposal, proposal_id)
     if not res.get("ok"):
         status = res.get("status") or "FAILED"
         code = 409 if status == "CONFLICT" else 400
@@ -176,10 +167,10 @@ async def reject(proposal_id: str, tenant_id: str = Depends(require_tenant), x_t
       - ok: True
       - status: REJECTED
     """
-    p = get_proposal(proposal_id)
+    p = await get_proposal(proposal_id)
     if not p or p["tenant_id"] != tenant_id:
         raise HTTPException(status_code=404, detail="proposal not found")
-    set_proposal_status(proposal_id, ProposalStatus.REJECTED.value)
+    await set_proposal_status(proposal_id, ProposalStatus.REJECTED.value)
     return {"ok": True, "status": ProposalStatus.REJECTED.value}
 
 @router.get(
@@ -195,10 +186,10 @@ async def diff(proposal_id: str, tenant_id: str = Depends(require_tenant)) -> Di
     Возвращает:
       - diff: объект различий (до/после) и фрагменты доказательств (evidence)
     """
-    p = get_proposal(proposal_id)
+    p = await get_proposal(proposal_id)
     if not p or p["tenant_id"] != tenant_id:
         raise HTTPException(status_code=404, detail="proposal not found")
-    return build_diff(proposal_id)
+    return await run_in_threadpool(build_diff, proposal_id)
 
 @router.get(
     "/{proposal_id}/impact",
@@ -214,7 +205,7 @@ async def impact(proposal_id: str, depth: int = 1, tenant_id: str = Depends(requ
     Возвращает:
       - подграф влияния: узлы и связи, затрагиваемые предложенными изменениями
     """
-    p = get_proposal(proposal_id)
+    p = await get_proposal(proposal_id)
     if not p or p["tenant_id"] != tenant_id:
         raise HTTPException(status_code=404, detail="proposal not found")
-    return impact_subgraph_for_proposal(proposal_id, depth=depth)
+    return await run_in_threadpool(impact_subgraph_for_proposal, proposal_id, depth=depth)
@@ -25,12 +25,30 @@ class Settings(BaseSettings):
     app_env: AppEnv = Field(default=AppEnv.dev, alias="APP_ENV", description="Application environment (dev/stage/prod)")
 
     pg_dsn: PostgresDsn | str = Field(default="", alias="PG_DSN", validation_alias="PG_DSN")
+    pg_pool_min_size: int = Field(default=1, alias="PG_POOL_MIN_SIZE")
+    pg_pool_max_size: int = Field(default=10, alias="PG_POOL_MAX_SIZE")
+    pg_pool_acquire_timeout_sec: float = Field(default=10.0, alias="PG_POOL_ACQUIRE_TIMEOUT_SEC")
+    pg_pool_health_check_sec: float = Field(default=30.0, alias="PG_POOL_HEALTH_CHECK_SEC")
+    pg_prepared_statements: bool = Field(default=True, alias="PG_PREPARED_STATEMENTS")
+    graph_changes_partition_versions: int = Field(default=10000, alias="GRAPH_CHANGES_PARTITION_VERSIONS")
+    outbox_batch_size: int = Field(default=100, alias="OUTBOX_BATCH_SIZE")
+    outbox_max_attempts: int = Field(default=8, alias="OUTBOX_MAX_ATTEMPTS")
+    outbox_backoff_base_sec: float = Field(default=1.0, alias="OUTBOX_BACKOFF_BASE_SEC")
+    outbox_backoff_max_sec: float = Field(default=600.0, alias="OUTBOX_BACKOFF_MAX_SEC")
+    outbox_idle_wakeup_sec: float = Field(default=60.0, alias="OUTBOX_IDLE_WAKEUP_SEC")
 
     openai_api_key: SecretStr = Field(default=SecretStr(""), alias="OPENAI_API_KEY")
 
     neo4j_uri: str = Field(default="", alias="NEO4J_URI")
     neo4j_user: str = Field(default="", alias="NEO4J_USER")
     neo4j_password: SecretStr = Field(default=SecretStr(""), alias="NEO4J_PASSWORD")
+    neo4j_max_pool_size: int = Field(default=50, alias="NEO4J_MAX_POOL_SIZE")
+    neo4j_acquisition_timeout_sec: float = Field(default=30.0, alias="NEO4J_ACQUISITION_TIMEOUT_SEC")
+    neo4j_liveness_check_timeout_sec: float = Field(default=30.0, alias="NEO4J_LIVENESS_CHECK_TIMEOUT_SEC")
+    neo4j_max_connection_lifetime_sec: float = Field(default=3600.0, alias="NEO4J_MAX_CONNECTION_LIFETIME_SEC")
+    neo4j_bulk_parallelism: int = Field(default=4, alias="NEO4J_BULK_PARALLELISM")
+    neo4j_bulk_target_tx_ms: float = Field(default=500.0, alias="NEO4J_BULK_TARGET_TX_MS")
+    graph_snapshot_enabled: bool = Field(default=False, alias="GRAPH_SNAPSHOT_ENABLED")
 
     qdrant_url: AnyUrl = Field(default="http://qdrant:6333", alias="QDRANT_URL")
     redis_url: AnyUrl = Field(default="redis://redis:6379/0", alias="REDIS_URL")
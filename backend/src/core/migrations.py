@@ -1,9 +1,15 @@
-from src.db.pg import ensure_schema_version, get_schema_version, get_tenant_schema_version
+from src.db.pg import ensure_schema_version, ensure_tables, get_schema_version, get_tenant_schema_version
 
 CODE_SCHEMA_VERSION = 1
 
-def check_and_gatekeep(tenant_id: str | None = None) -> bool:
+def run_migrations() -> None:
+    """Postgres DDL for the app tables; run once at startup instead of on every request/commit."""
+    from src.services.auth.users_repo import ensure_users_table
     ensure_schema_version()
+    ensure_tables()
+    ensure_users_table()
+
+def check_and_gatekeep(tenant_id: str | None = None) -> bool:
     if tenant_id:
         dbv = get_tenant_schema_version(tenant_id)
         return CODE_SCHEMA_VERSION <= dbv
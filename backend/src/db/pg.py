@@ -1,17 +1,239 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Sequence, Set, Tuple
 import psycopg2
-from typing import Any, Dict, Tuple
+import psycopg2.extensions
+import psycopg2.pool
 from src.config.settings import settings
+from src.core.logging import logger
+try:
+    from prometheus_client import Gauge
+    PG_POOL_IN_USE = Gauge("pg_pool_in_use_connections", "Postgres pooled connections currently borrowed")
+    PG_POOL_IDLE = Gauge("pg_pool_idle_connections", "Postgres pooled connections currently idle")
+    PG_POOL_MAX_SIZE = Gauge("pg_pool_max_size", "Configured Postgres connection pool size")
+except Exception:
+    class _Dummy:
+        def set(self, *args, **kwargs): ...
+        def set_function(self, *args, **kwargs): ...
+    PG_POOL_IN_USE = _Dummy()
+    PG_POOL_IDLE = _Dummy()
+    PG_POOL_MAX_SIZE = _Dummy()
 
-def get_conn():
-    dsn = str(settings.pg_dsn)
+# LISTEN/NOTIFY channel raised by inserts into events_outbox
+OUTBOX_CHANNEL = "events_outbox"
+_PROPOSAL_LIST_COLUMNS = "proposal_id, tenant_id, base_graph_version, proposal_checksum, status, created_at"
+# hot statements, PREPAREd once per pooled connection; parameters are numbered in order of appearance
+PREPARED_STATEMENTS = {
+    "graph_version_get": "SELECT graph_version FROM tenant_graph_version WHERE tenant_id=$1",
+    # history at or below the compaction horizon lives on only as graph_change_heads (last changed version per target)
+    "graph_changes_since": "SELECT target_id FROM graph_changes WHERE tenant_id=$1 AND graph_version>$2 UNION SELECT target_id FROM graph_change_heads WHERE tenant_id=$1 AND last_version>$2",
+    "graph_changes_since_type": "SELECT target_id FROM graph_changes WHERE tenant_id=$1 AND graph_version>$2 AND change_type=$3 UNION SELECT target_id FROM graph_change_heads WHERE tenant_id=$1 AND last_version>$2 AND change_type=$3",
+    # one index probe per proposal target on idx_graph_changes_tenant_target_version; EXISTS stops at the first newer change
+    "graph_changes_conflicts": (
+        "SELECT t FROM unnest($3::text[]) AS t WHERE EXISTS (SELECT 1 FROM graph_changes c WHERE c.tenant_id=$1 AND c.target_id=t AND c.graph_version>$2) "
+        "OR EXISTS (SELECT 1 FROM graph_change_heads h WHERE h.tenant_id=$1 AND h.target_id=t AND h.last_version>$2)"
+    ),
+    "graph_change_add": "INSERT INTO graph_changes (tenant_id, graph_version, target_id, change_type) VALUES ($1,$2,$3,$4) ON CONFLICT DO NOTHING",
+    "proposal_get": "SELECT proposal_id, tenant_id, base_graph_version, proposal_checksum, status, operations_json FROM proposals WHERE proposal_id=$1",
+    "proposal_set_status": "UPDATE proposals SET status=$1 WHERE proposal_id=$2",
+    # list pages never read operations_json: every column comes from the covering idx_proposals_tenant_*_keyset indexes
+    "proposals_list": f"SELECT {_PROPOSAL_LIST_COLUMNS} FROM proposals WHERE tenant_id=$1 ORDER BY created_at DESC, proposal_id DESC LIMIT $2 OFFSET $3",
+    "proposals_list_status": f"SELECT {_PROPOSAL_LIST_COLUMNS} FROM proposals WHERE tenant_id=$1 AND status=$2 ORDER BY created_at DESC, proposal_id DESC LIMIT $3 OFFSET $4",
+    "proposals_list_after": f"SELECT {_PROPOSAL_LIST_COLUMNS} FROM proposals WHERE tenant_id=$1 AND (created_at, proposal_id) < ($2, $3) ORDER BY created_at DESC, proposal_id DESC LIMIT $4",
+    "proposals_list_status_after": f"SELECT {_PROPOSAL_LIST_COLUMNS} FROM proposals WHERE tenant_id=$1 AND status=$2 AND (created_at, proposal_id) < ($3, $4) ORDER BY created_at DESC, proposal_id DESC LIMIT $5",
+}
+_PARAM = re.compile(r"\$\d+")
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """psycopg2 connection that remembers its prepared statements and when it was last handed out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared: Set[str] = set()
+        self.last_used = time.monotonic()
+
+
+class PgPool:
+    """ThreadedConnectionPool that waits for a free connection instead of failing, and pings connections idle for too long."""
+
+    def __init__(self, dsn: str, min_size: int, max_size: int, acquire_timeout_sec: float, health_check_sec: float):
+        self.max_size = max(1, int(max_size))
+        self.acquire_timeout_sec = float(acquire_timeout_sec)
+        self.health_check_sec = float(health_check_sec)
+        self._pool = psycopg2.pool.ThreadedConnectionPool(max(0, min(int(min_size), self.max_size)), self.max_size, dsn, connection_factory=PooledConnection)
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._in_use = 0
+        self._lock = threading.Lock()
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - conn.last_used < self.health_check_sec:
+            return True
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.acquire_timeout_sec):
+            raise RuntimeError(f"postgres pool exhausted: no connection within {self.acquire_timeout_sec}s")
+        try:
+            conn = self._pool.getconn()
+            if not self._healthy(conn):
+                logger.warning("pg_pool_connection_replaced")
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_use += 1
+        return conn
+
+    def release(self, conn, discard: bool = False) -> None:
+        try:
+            conn.last_used = time.monotonic()
+            self._pool.putconn(conn, close=discard or bool(conn.closed))
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def closeall(self) -> None:
+        self._pool.closeall()
+
+    def stats(self) -> Dict[str, int]:
+        idle = len(getattr(self._pool, "_pool", ()))
+        return {"in_use": self._in_use, "idle": idle, "max_size": self.max_size}
+
+
+_pool: Optional[PgPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def _dsn() -> str:
+    dsn = str(settings.pg_dsn) if settings.pg_dsn else ""
     if not dsn:
         raise RuntimeError("PG_DSN is not configured")
-    return psycopg2.connect(dsn)
+    return dsn
+
+
+def init_pool() -> PgPool:
+    """Create the process-wide connection pool (idempotent, fork-aware)."""
+    global _pool, _pool_pid
+    pid = os.getpid()
+    pool = _pool
+    if pool is not None and _pool_pid == pid:
+        return pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid != pid:
+            # inherited from the parent process: its sockets belong to the parent, drop without closing
+            _pool = None
+        if _pool is None:
+            _pool = PgPool(_dsn(), settings.pg_pool_min_size, settings.pg_pool_max_size, settings.pg_pool_acquire_timeout_sec, settings.pg_pool_health_check_sec)
+            _pool_pid = pid
+            logger.info("pg_pool_created", pid=pid, min_size=settings.pg_pool_min_size, max_size=_pool.max_size)
+        return _pool
+
+
+def close_pool() -> None:
+    global _pool, _pool_pid
+    with _pool_lock:
+        pool = _pool
+        _pool = None
+        owned = _pool_pid == os.getpid()
+        _pool_pid = None
+    if pool is not None and owned:
+        try:
+            pool.closeall()
+        except Exception:
+            ...
+
+
+def _reset_after_fork() -> None:
+    global _pool, _pool_pid, _pool_lock
+    _pool = None
+    _pool_pid = None
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def pool_stats() -> Dict[str, int]:
+    pool = _pool
+    if pool is None or _pool_pid != os.getpid():
+        return {"in_use": 0, "idle": 0, "max_size": int(settings.pg_pool_max_size)}
+    return pool.stats()
+
+
+PG_POOL_IN_USE.set_function(lambda: pool_stats()["in_use"])
+PG_POOL_IDLE.set_function(lambda: pool_stats()["idle"])
+PG_POOL_MAX_SIZE.set_function(lambda: pool_stats()["max_size"])
+
+
+@contextmanager
+def pg_conn(autocommit: bool = True) -> Iterator[Any]:
+    """Borrow a pooled connection. Without autocommit the block is one transaction: committed on success, rolled back on error."""
+    pool = init_pool()
+    conn = pool.acquire()
+    discard = False
+    try:
+        conn.autocommit = autocommit
+        yield conn
+        if not autocommit:
+            conn.commit()
+    except Exception as e:
+        discard = bool(conn.closed) or isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+        if not conn.closed and not autocommit:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        raise
+    finally:
+        pool.release(conn, discard=discard)
+
+
+def execute_prepared(cur, name: str, params: Sequence[Any]) -> None:
+    """Run PREPARED_STATEMENTS[name] as a server-side prepared statement.
+
+    Statements are only prepared on autocommit connections, so a rolled back transaction can never
+    take a prepared statement with it; elsewhere, and with PG_PREPARED_STATEMENTS off, it runs as plain SQL.
+    """
+    sql = PREPARED_STATEMENTS[name]
+    conn = cur.connection
+    prepared = getattr(conn, "prepared", None)
+    if not settings.pg_prepared_statements or prepared is None or (name not in prepared and not conn.autocommit):
+        cur.execute(_PARAM.sub("%s", sql), tuple(params))
+        return
+    if name not in prepared:
+        cur.execute(f"PREPARE {name} AS {sql}")
+        prepared.add(name)
+    cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", tuple(params))
+
+
+def get_conn():
+    """Dedicated connection outside the pool, for scripts and tests; the caller closes it. Services use pg_conn()."""
+    return psycopg2.connect(_dsn())
 
 def ensure_tables():
-    conn = get_conn()
-    conn.autocommit = True
-    with conn.cursor() as cur:
+    """Proposal/audit/outbox DDL. Runs once per process at migration time (see src.core.migrations.run_migrations)."""
+    with pg_conn() as conn, conn.cursor() as cur:
         cur.execute(
             """
             CREATE TABLE IF NOT EXISTS proposals (
@@ -25,8 +247,12 @@ def ensure_tables():
             )
             """
         )
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_proposals_tenant_status ON proposals (tenant_id, status)")
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_proposals_created_at ON proposals (created_at DESC)")
+        # keyset pages walk these in index order; INCLUDE makes them covering (index-only scans, no heap/TOAST reads)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_proposals_tenant_status_keyset ON proposals (tenant_id, status, created_at DESC, proposal_id DESC) INCLUDE (base_graph_version, proposal_checksum)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_proposals_tenant_keyset ON proposals (tenant_id, created_at DESC, proposal_id DESC) INCLUDE (status, base_graph_version, proposal_checksum)")
+        # superseded by the keyset indexes above
+        cur.execute("DROP INDEX IF EXISTS idx_proposals_tenant_status")
+        cur.execute("DROP INDEX IF EXISTS idx_proposals_created_at")
         cur.execute(
             """
             CREATE TABLE IF NOT EXISTS audit_log (
@@ -51,12 +277,23 @@ def ensure_tables():
         )
         cur.execute(
             """
-            CREATE TABLE IF NOT EXISTS graph_changes (
+            CREATE TABLE IF NOT EXISTS graph_change_heads (
               tenant_id TEXT NOT NULL,
-              graph_version BIGINT NOT NULL,
               target_id TEXT NOT NULL,
+              last_version BIGINT NOT NULL,
               change_type TEXT NOT NULL DEFAULT '',
-              PRIMARY KEY (tenant_id, graph_version, target_id)
+              PRIMARY KEY (tenant_id, target_id)
+            )
+            """
+        )
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS graph_changes_partitions (
+              tenant_id TEXT NOT NULL,
+              lo BIGINT NOT NULL,
+              hi BIGINT NOT NULL,
+              relname TEXT NOT NULL,
+              PRIMARY KEY (tenant_id, lo)
             )
             """
         )
@@ -74,69 +311,195 @@ def ensure_tables():
             )
             """
         )
-    conn.close()
+    with pg_conn(autocommit=False) as conn, conn.cursor() as cur:
+        _ensure_graph_changes(cur)
     try:
-        conn = get_conn()
-        conn.autocommit = True
-        with conn.cursor() as cur:
+        with pg_conn() as conn, conn.cursor() as cur:
             cur.execute("ALTER TABLE audit_log ADD COLUMN IF NOT EXISTS correlation_id TEXT DEFAULT ''")
             cur.execute("ALTER TABLE proposals ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT NOW()")
             cur.execute("ALTER TABLE events_outbox ADD COLUMN IF NOT EXISTS attempts INTEGER DEFAULT 0")
             cur.execute("ALTER TABLE events_outbox ADD COLUMN IF NOT EXISTS last_error TEXT DEFAULT ''")
-            cur.execute("ALTER TABLE graph_changes ADD COLUMN IF NOT EXISTS change_type TEXT DEFAULT ''")
-        conn.close()
+            cur.execute("ALTER TABLE events_outbox ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP DEFAULT NOW()")
     except Exception:
         ...
+    with pg_conn() as conn, conn.cursor() as cur:
+        # publishers claim due events in created_at order; published rows are not indexed
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_events_outbox_pending ON events_outbox (next_attempt_at, created_at) WHERE published=FALSE")
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS events_outbox_dead (
+              event_id TEXT PRIMARY KEY,
+              tenant_id TEXT NOT NULL,
+              event_type TEXT NOT NULL,
+              payload JSONB NOT NULL,
+              attempts INTEGER NOT NULL,
+              last_error TEXT DEFAULT '',
+              created_at TIMESTAMP,
+              dead_at TIMESTAMP DEFAULT NOW()
+            )
+            """
+        )
+        # one NOTIFY per inserting statement, delivered when its transaction commits; wakes the outbox publishers
+        cur.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION events_outbox_notify() RETURNS trigger AS $$
+            BEGIN
+              PERFORM pg_notify('{OUTBOX_CHANNEL}', '');
+              RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+            """
+        )
+        cur.execute("DROP TRIGGER IF EXISTS events_outbox_notify ON events_outbox")
+        cur.execute("CREATE TRIGGER events_outbox_notify AFTER INSERT ON events_outbox FOR EACH STATEMENT EXECUTE FUNCTION events_outbox_notify()")
+
+_GRAPH_CHANGES_DDL = """
+CREATE TABLE IF NOT EXISTS graph_changes (
+  tenant_id TEXT NOT NULL,
+  graph_version BIGINT NOT NULL,
+  target_id TEXT NOT NULL,
+  change_type TEXT NOT NULL DEFAULT '',
+  PRIMARY KEY (tenant_id, graph_version, target_id)
+) PARTITION BY RANGE (tenant_id, graph_version)
+"""
+# (tenant_id, lo) of partitions this process has seen; versions only grow per tenant, so a dropped (compacted) one is never written again
+_known_partitions: Set[Tuple[str, int]] = set()
+
+
+def _ensure_graph_changes(cur) -> None:
+    """graph_changes is range-partitioned by (tenant_id, graph_version); an older plain table is copied over once.
+
+    Runs in the caller's transaction under the partition DDL lock, so concurrent migrations see one another's result.
+    """
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext('graph_changes_partitions'))")
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('graph_changes')")
+    row = cur.fetchone()
+    if row and row[0] == "p":
+        return
+    if row:
+        cur.execute("ALTER TABLE graph_changes ADD COLUMN IF NOT EXISTS change_type TEXT DEFAULT ''")
+        cur.execute("ALTER TABLE graph_changes RENAME TO graph_changes_unpartitioned")
+        cur.execute("ALTER INDEX IF EXISTS graph_changes_pkey RENAME TO graph_changes_unpartitioned_pkey")
+        cur.execute("DROP INDEX IF EXISTS idx_graph_changes_tenant_target_version")
+    cur.execute(_GRAPH_CHANGES_DDL)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_graph_changes_tenant_target_version ON graph_changes (tenant_id, target_id, graph_version)")
+    if row:
+        span = _partition_span()
+        cur.execute("SELECT DISTINCT tenant_id, graph_version / %s FROM graph_changes_unpartitioned", (span,))
+        for tenant_id, bucket in cur.fetchall():
+            _create_graph_changes_partition(cur, tenant_id, int(bucket) * span)
+        cur.execute("INSERT INTO graph_changes (tenant_id, graph_version, target_id, change_type) SELECT tenant_id, graph_version, target_id, COALESCE(change_type, '') FROM graph_changes_unpartitioned")
+        cur.execute("DROP TABLE graph_changes_unpartitioned")
+        logger.info("graph_changes_partitioned")
+
+
+def _partition_span() -> int:
+    return max(1, int(settings.graph_changes_partition_versions))
+
+
+def graph_changes_partition_name(tenant_id: str, lo: int) -> str:
+    return f"graph_changes_{hashlib.md5(tenant_id.encode('utf-8')).hexdigest()[:16]}_{int(lo)}"
+
+
+def _create_graph_changes_partition(cur, tenant_id: str, lo: int) -> None:
+    hi = lo + _partition_span()
+    name = graph_changes_partition_name(tenant_id, lo)
+    cur.execute("INSERT INTO graph_changes_partitions (tenant_id, lo, hi, relname) VALUES (%s,%s,%s,%s) ON CONFLICT DO NOTHING", (tenant_id, lo, hi, name))
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF graph_changes FOR VALUES FROM (%s, %s) TO (%s, %s)", (tenant_id, lo, tenant_id, hi))
+
+
+def ensure_graph_changes_partition(tenant_id: str, graph_version: int) -> None:
+    """Create the partition that will hold (tenant_id, graph_version) rows; a no-op once this process has seen it."""
+    lo = int(graph_version) // _partition_span() * _partition_span()
+    if (tenant_id, lo) in _known_partitions:
+        return
+    with pg_conn(autocommit=False) as conn, conn.cursor() as cur:
+        # partition DDL is serialized; a partition covering the version may exist under another span setting
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('graph_changes_partitions'))")
+        cur.execute("SELECT lo FROM graph_changes_partitions WHERE tenant_id=%s AND lo<=%s AND %s<hi", (tenant_id, int(graph_version), int(graph_version)))
+        row = cur.fetchone()
+        if row:
+            lo = int(row[0])
+        else:
+            _create_graph_changes_partition(cur, tenant_id, lo)
+    _known_partitions.add((tenant_id, lo))
+
 
 def get_graph_version(tenant_id: str) -> int:
-    conn = get_conn()
-    with conn.cursor() as cur:
-        cur.execute("SELECT graph_version FROM tenant_graph_version WHERE tenant_id=%s", (tenant_id,))
+    with pg_conn() as conn, conn.cursor() as cur:
+        execute_prepared(cur, "graph_version_get", (tenant_id,))
         row = cur.fetchone()
-        conn.close()
-        return int(row[0]) if row else 0
+    return int(row[0]) if row else 0
 
 def set_graph_version(tenant_id: str, version: int) -> None:
-    conn = get_conn()
-    conn.autocommit = True
-    with conn.cursor() as cur:
+    with pg_conn() as conn, conn.cursor() as cur:
         cur.execute(
             "INSERT INTO tenant_graph_version (tenant_id, graph_version) VALUES (%s,%s) ON CONFLICT (tenant_id) DO UPDATE SET graph_version=EXCLUDED.graph_version",
             (tenant_id, version),
         )
-    conn.close()
 
 def add_graph_change(tenant_id: str, graph_version: int, target_id: str, change_type: str = "") -> None:
-    conn = get_conn()
-    conn.autocommit = True
-    with conn.cursor() as cur:
-        cur.execute(
-            "INSERT INTO graph_changes (tenant_id, graph_version, target_id, change_type) VALUES (%s,%s,%s,%s) ON CONFLICT DO NOTHING",
-            (tenant_id, graph_version, target_id, change_type),
-        )
-    conn.close()
+    ensure_graph_changes_partition(tenant_id, graph_version)
+    with pg_conn() as conn, conn.cursor() as cur:
+        execute_prepared(cur, "graph_change_add", (tenant_id, graph_version, target_id, change_type))
 
 def get_changed_targets_since(tenant_id: str, from_version: int, change_type: str | None = None) -> list[str]:
-    conn = get_conn()
-    with conn.cursor() as cur:
+    with pg_conn() as conn, conn.cursor() as cur:
         if change_type:
-            cur.execute(
-                "SELECT target_id FROM graph_changes WHERE tenant_id=%s AND graph_version>%s AND change_type=%s",
-                (tenant_id, from_version, change_type),
-            )
+            execute_prepared(cur, "graph_changes_since_type", (tenant_id, from_version, change_type))
         else:
-            cur.execute(
-                "SELECT target_id FROM graph_changes WHERE tenant_id=%s AND graph_version>%s",
-                (tenant_id, from_version),
-            )
+            execute_prepared(cur, "graph_changes_since", (tenant_id, from_version))
+        rows = cur.fetchall()
+    return [r[0] for r in rows]
+
+# batch rebase: per proposal the tenant's current graph_version and the distinct targets changed after its base version
+REBASE_CONFLICTS_BATCH_SQL = """
+WITH q AS (
+  SELECT * FROM unnest(%s::text[], %s::text[], %s::bigint[]) AS q(proposal_id, tenant_id, base_version)
+), t AS (
+  SELECT DISTINCT * FROM unnest(%s::text[], %s::text[]) AS t(proposal_id, target_id)
+), c AS (
+  SELECT t.proposal_id, t.target_id FROM t JOIN q ON q.proposal_id = t.proposal_id
+  WHERE EXISTS (SELECT 1 FROM graph_changes g WHERE g.tenant_id = q.tenant_id AND g.target_id = t.target_id AND g.graph_version > q.base_version)
+     OR EXISTS (SELECT 1 FROM graph_change_heads h WHERE h.tenant_id = q.tenant_id AND h.target_id = t.target_id AND h.last_version > q.base_version)
+)
+SELECT q.proposal_id, COALESCE(v.graph_version, 0), COALESCE(array_agg(c.target_id ORDER BY c.target_id) FILTER (WHERE c.target_id IS NOT NULL), '{}')
+FROM q
+LEFT JOIN tenant_graph_version v ON v.tenant_id = q.tenant_id
+LEFT JOIN c ON c.proposal_id = q.proposal_id
+GROUP BY q.proposal_id, v.graph_version
+"""
+
+def get_conflicting_targets(tenant_id: str, from_version: int, target_ids: Sequence[str]) -> list[str]:
+    """Those of target_ids changed after from_version; the intersection runs in Postgres."""
+    targets = list(dict.fromkeys(t for t in target_ids if t))
+    if not targets:
+        return []
+    with pg_conn() as conn, conn.cursor() as cur:
+        execute_prepared(cur, "graph_changes_conflicts", (tenant_id, from_version, targets))
         rows = cur.fetchall()
-        conn.close()
-        return [r[0] for r in rows]
+    return [r[0] for r in rows]
+
+def get_conflicting_targets_batch(items: Sequence[Tuple[str, str, int, Sequence[str]]]) -> Dict[str, Tuple[int, list[str]]]:
+    """(proposal_id, tenant_id, base_graph_version, target_ids) rows -> {proposal_id: (current graph_version, conflicting targets)} in one query."""
+    if not items:
+        return {}
+    pids, tids, bases, t_pids, t_ids = [], [], [], [], []
+    for pid, tid, base, targets in items:
+        pids.append(pid)
+        tids.append(tid)
+        bases.append(int(base))
+        for t in targets:
+            if t:
+                t_pids.append(pid)
+                t_ids.append(t)
+    with pg_conn() as conn, conn.cursor() as cur:
+        cur.execute(REBASE_CONFLICTS_BATCH_SQL, (pids, tids, bases, t_pids, t_ids))
+        rows = cur.fetchall()
+    return {r[0]: (int(r[1]), list(r[2] or [])) for r in rows}
 
 def ensure_schema_version():
-    conn = get_conn()
-    conn.autocommit = True
-    with conn.cursor() as cur:
+    with pg_conn() as conn, conn.cursor() as cur:
         cur.execute(
             """
             CREATE TABLE IF NOT EXISTS schema_version (
@@ -155,100 +518,80 @@ def ensure_schema_version():
             """
         )
         cur.execute("INSERT INTO schema_version_tenant (tenant_id, version) VALUES (%s, %s) ON CONFLICT (tenant_id) DO NOTHING", ("system", 1))
-    conn.close()
 
 def get_schema_version() -> int:
-    conn = get_conn()
-    with conn.cursor() as cur:
+    with pg_conn() as conn, conn.cursor() as cur:
         cur.execute("SELECT version FROM schema_version WHERE id=1")
         row = cur.fetchone()
-    conn.close()
     return int(row[0]) if row else 0
 
 def set_schema_version(version: int) -> None:
-    conn = get_conn()
-    conn.autocommit = True
-    with conn.cursor() as cur:
+    with pg_conn() as conn, conn.cursor() as cur:
         cur.execute("INSERT INTO schema_version (id, version) VALUES (1, %s) ON CONFLICT (id) DO UPDATE SET version=EXCLUDED.version", (version,))
-    conn.close()
 
 def get_tenant_schema_version(tenant_id: str) -> int:
-    conn = get_conn()
-    with conn.cursor() as cur:
+    with pg_conn() as conn, conn.cursor() as cur:
         cur.execute("SELECT version FROM schema_version_tenant WHERE tenant_id=%s", (tenant_id,))
         row = cur.fetchone()
-    conn.close()
     return int(row[0]) if row else 0
 
 def set_tenant_schema_version(tenant_id: str, version: int) -> None:
-    conn = get_conn()
-    conn.autocommit = True
-    with conn.cursor() as cur:
+    with pg_conn() as conn, conn.cursor() as cur:
         cur.execute("INSERT INTO schema_version_tenant (tenant_id, version) VALUES (%s, %s) ON CONFLICT (tenant_id) DO UPDATE SET version=EXCLUDED.version", (tenant_id, version))
-    conn.close()
 
 def get_proposal(proposal_id: str) -> dict | None:
-    conn = get_conn()
-    with conn.cursor() as cur:
-        cur.execute("SELECT proposal_id, tenant_id, base_graph_version, proposal_checksum, status, operations_json FROM proposals WHERE proposal_id=%s", (proposal_id,))
+    with pg_conn() as conn, conn.cursor() as cur:
+        execute_prepared(cur, "proposal_get", (proposal_id,))
         row = cur.fetchone()
-    conn.close()
     if not row:
         return None
     return {"proposal_id": row[0], "tenant_id": row[1], "base_graph_version": int(row[2]), "proposal_checksum": row[3], "status": row[4], "operations": row[5]}
 
 def set_proposal_status(proposal_id: str, status: str) -> None:
-    conn = get_conn()
-    conn.autocommit = True
-    with conn.cursor() as cur:
-        cur.execute("UPDATE proposals SET status=%s WHERE proposal_id=%s", (status, proposal_id))
-    conn.close()
-
-def list_proposals(tenant_id: str, status: str | None = None, limit: int = 20, offset: int = 0) -> list[dict]:
-    conn = get_conn()
-    with conn.cursor() as cur:
+    with pg_conn() as conn, conn.cursor() as cur:
+        execute_prepared(cur, "proposal_set_status", (status, proposal_id))
+
+def encode_proposal_cursor(item: dict) -> str:
+    """Opaque next-page cursor for the last listed proposal: urlsafe base64 of [created_at ISO, proposal_id]."""
+    raw = json.dumps([item["created_at"].isoformat(), item["proposal_id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_proposal_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, proposal_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(proposal_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+def proposal_list_query(tenant_id: str, status: str | None, limit: int, offset: int, cursor: str | None) -> Tuple[str, Tuple]:
+    """Statement name and parameters for a proposals page; with a cursor the page starts right after it and offset is ignored."""
+    if cursor:
+        created_at, proposal_id = decode_proposal_cursor(cursor)
         if status:
-            cur.execute(
-                "SELECT proposal_id, tenant_id, base_graph_version, proposal_checksum, status, created_at FROM proposals WHERE tenant_id=%s AND status=%s ORDER BY created_at DESC LIMIT %s OFFSET %s",
-                (tenant_id, status, limit, offset),
-            )
-        else:
-            cur.execute(
-                "SELECT proposal_id, tenant_id, base_graph_version, proposal_checksum, status, created_at FROM proposals WHERE tenant_id=%s ORDER BY created_at DESC LIMIT %s OFFSET %s",
-                (tenant_id, limit, offset),
-            )
+            return "proposals_list_status_after", (tenant_id, status, created_at, proposal_id, int(limit))
+        return "proposals_list_after", (tenant_id, created_at, proposal_id, int(limit))
+    if status:
+        return "proposals_list_status", (tenant_id, status, int(limit), int(offset))
+    return "proposals_list", (tenant_id, int(limit), int(offset))
+
+
+def proposal_list_item(r: Sequence[Any]) -> dict:
+    return {"proposal_id": r[0], "tenant_id": r[1], "base_graph_version": int(r[2]), "proposal_checksum": r[3], "status": r[4], "created_at": r[5]}
+
+
+def list_proposals(tenant_id: str, status: str | None = None, limit: int = 20, offset: int = 0, cursor: str | None = None) -> list[dict]:
+    name, params = proposal_list_query(tenant_id, status, limit, offset, cursor)
+    with pg_conn() as conn, conn.cursor() as cur:
+        execute_prepared(cur, name, params)
         rows = cur.fetchall()
-    conn.close()
-    return [{"proposal_id": r[0], "tenant_id": r[1], "base_graph_version": int(r[2]), "proposal_checksum": r[3], "status": r[4], "created_at": r[5]} for r in rows]
+    return [proposal_list_item(r) for r in rows]
 
 def outbox_add(tenant_id: str, event_type: str, payload: Dict) -> str:
-    conn = get_conn()
-    conn.autocommit = True
-    with conn.cursor() as cur:
-        import uuid, json
-        eid = "EV-" + uuid.uuid4().hex[:16]
+    import uuid, json
+    eid = "EV-" + uuid.uuid4().hex[:16]
+    with pg_conn() as conn, conn.cursor() as cur:
         cur.execute("INSERT INTO events_outbox (event_id, tenant_id, event_type, payload, published) VALUES (%s,%s,%s,%s,FALSE)", (eid, tenant_id, event_type, json.dumps(payload)))
-    conn.close()
     return eid
-
-def outbox_fetch_unpublished(limit: int = 100) -> list[dict]:
-    conn = get_conn()
-    with conn.cursor() as cur:
-        cur.execute("SELECT event_id, tenant_id, event_type, payload FROM events_outbox WHERE published=FALSE ORDER BY created_at ASC LIMIT %s", (limit,))
-        rows = cur.fetchall()
-    conn.close()
-    return [{"event_id": r[0], "tenant_id": r[1], "event_type": r[2], "payload": r[3]} for r in rows]
-
-def outbox_mark_published(event_id: str) -> None:
-    conn = get_conn()
-    conn.autocommit = True
-    with conn.cursor() as cur:
-        cur.execute("UPDATE events_outbox SET published=TRUE WHERE event_id=%s", (event_id,))
-    conn.close()
-
-def outbox_mark_failed(event_id: str, error: str | None = None) -> None:
-    conn = get_conn()
-    conn.autocommit = True
-    with conn.cursor() as cur:
-        cur.execute("UPDATE events_outbox SET attempts=attempts+1, last_error=%s WHERE event_id=%s", (error or "", event_id))
-    conn.close()
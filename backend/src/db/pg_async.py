@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from src.config.settings import settings
+from src.core.logging import logger
+from src.db.pg import PREPARED_STATEMENTS, ensure_graph_changes_partition, proposal_list_item, proposal_list_query
+
+# asyncpg pools are bound to the event loop they were created on, so the registry is keyed by (pid, loop)
+_async_pool = None
+_async_pool_key: Optional[Tuple[int, int]] = None
+# creation lock of the loop it was made for; asyncio locks cannot be shared across loops
+_create_lock: Optional[asyncio.Lock] = None
+_create_lock_key: Optional[Tuple[int, int]] = None
+
+
+def _loop_key() -> Tuple[int, int]:
+    return (os.getpid(), id(asyncio.get_running_loop()))
+
+
+async def _init_connection(conn) -> None:
+    # JSONB in and out as Python objects, like psycopg2 does for reads
+    for typ in ("json", "jsonb"):
+        await conn.set_type_codec(typ, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+async def get_async_pool():
+    """Shared asyncpg pool for the current process and event loop. Callers must not close it.
+
+    asyncpg prepares and caches every statement per connection; PG_PREPARED_STATEMENTS=false turns the cache off.
+    """
+    global _async_pool, _async_pool_key, _create_lock, _create_lock_key
+    key = _loop_key()
+    pool = _async_pool
+    if pool is not None and _async_pool_key == key:
+        return pool
+    if _create_lock is None or _create_lock_key != key:
+        # no await between the check and the assignment, so every task of this loop gets the same lock
+        _create_lock = asyncio.Lock()
+        _create_lock_key = key
+    async with _create_lock:
+        if _async_pool is not None and _async_pool_key == key:
+            return _async_pool
+        dsn = str(settings.pg_dsn) if settings.pg_dsn else ""
+        if not dsn:
+            raise RuntimeError("PG_DSN is not configured")
+        import asyncpg
+        _async_pool = await asyncpg.create_pool(
+            dsn,
+            min_size=max(0, min(int(settings.pg_pool_min_size), int(settings.pg_pool_max_size))),
+            max_size=max(1, int(settings.pg_pool_max_size)),
+            statement_cache_size=100 if settings.pg_prepared_statements else 0,
+            max_inactive_connection_lifetime=float(settings.pg_pool_health_check_sec) * 10,
+            init=_init_connection,
+        )
+        _async_pool_key = key
+        logger.info("pg_async_pool_created", pid=key[0], max_size=int(settings.pg_pool_max_size))
+        return _async_pool
+
+
+async def close_async_pool() -> None:
+    global _async_pool, _async_pool_key
+    pool = _async_pool
+    owned = pool is not None and _async_pool_key == _loop_key()
+    _async_pool = None
+    _async_pool_key = None
+    if owned:
+        try:
+            await pool.close()
+        except Exception:
+            ...
+
+
+@asynccontextmanager
+async def apg_conn(transaction: bool = False) -> AsyncIterator[Any]:
+    """Borrow a pooled asyncpg connection; with transaction=True the block is one transaction."""
+    pool = await get_async_pool()
+    async with pool.acquire(timeout=float(settings.pg_pool_acquire_timeout_sec)) as conn:
+        if transaction:
+            async with conn.transaction():
+                yield conn
+        else:
+            yield conn
+
+
+async def get_graph_version(tenant_id: str) -> int:
+    async with apg_conn() as conn:
+        v = await conn.fetchval(PREPARED_STATEMENTS["graph_version_get"], tenant_id)
+    return int(v) if v is not None else 0
+
+
+async def set_graph_version(tenant_id: str, version: int) -> None:
+    async with apg_conn() as conn:
+        await conn.execute(
+            "INSERT INTO tenant_graph_version (tenant_id, graph_version) VALUES ($1,$2) ON CONFLICT (tenant_id) DO UPDATE SET graph_version=EXCLUDED.graph_version",
+            tenant_id, int(version),
+        )
+
+
+async def add_graph_change(tenant_id: str, graph_version: int, target_id: str, change_type: str = "") -> None:
+    # graph_changes has no default partition; the (cached) partition DDL goes through the sync pool
+    await asyncio.to_thread(ensure_graph_changes_partition, tenant_id, graph_version)
+    async with apg_conn() as conn:
+        await conn.execute(PREPARED_STATEMENTS["graph_change_add"], tenant_id, int(graph_version), target_id, change_type)
+
+
+async def get_changed_targets_since(tenant_id: str, from_version: int, change_type: str | None = None) -> List[str]:
+    async with apg_conn() as conn:
+        if change_type:
+            rows = await conn.fetch(PREPARED_STATEMENTS["graph_changes_since_type"], tenant_id, int(from_version), change_type)
+        else:
+            rows = await conn.fetch(PREPARED_STATEMENTS["graph_changes_since"], tenant_id, int(from_version))
+    return [r[0] for r in rows]
+
+
+async def get_conflicting_targets(tenant_id: str, from_version: int, target_ids: List[str]) -> List[str]:
+    targets = list(dict.fromkeys(t for t in target_ids if t))
+    if not targets:
+        return []
+    async with apg_conn() as conn:
+        rows = await conn.fetch(PREPARED_STATEMENTS["graph_changes_conflicts"], tenant_id, int(from_version), targets)
+    return [r[0] for r in rows]
+
+
+async def insert_proposal(proposal_id: str, tenant_id: str, base_graph_version: int, proposal_checksum: str, status: str, operations: List[Dict]) -> None:
+    async with apg_conn() as conn:
+        await conn.execute(
+            "INSERT INTO proposals (proposal_id, tenant_id, base_graph_version, proposal_checksum, status, operations_json) VALUES ($1,$2,$3,$4,$5,$6)",
+            proposal_id, tenant_id, int(base_graph_version), proposal_checksum, status, operations,
+        )
+
+
+async def get_proposal(proposal_id: str) -> dict | None:
+    async with apg_conn() as conn:
+        row = await conn.fetchrow(PREPARED_STATEMENTS["proposal_get"], proposal_id)
+    if not row:
+        return None
+    return {"proposal_id": row[0], "tenant_id": row[1], "base_graph_version": int(row[2]), "proposal_checksum": row[3], "status": row[4], "operations": row[5]}
+
+
+async def set_proposal_status(proposal_id: str, status: str) -> None:
+    async with apg_conn() as conn:
+        await conn.execute(PREPARED_STATEMENTS["proposal_set_status"], status, proposal_id)
+
+
+async def list_proposals(tenant_id: str, status: str | None = None, limit: int = 20, offset: int = 0, cursor: str | None = None) -> List[dict]:
+    name, params = proposal_list_query(tenant_id, status, limit, offset, cursor)
+    async with apg_conn() as conn:
+        rows = await conn.fetch(PREPARED_STATEMENTS[name], *params)
+    return [proposal_list_item(r) for r in rows]
+
+
+async def get_audit_log(proposal_id: str) -> List[dict]:
+    async with apg_conn() as conn:
+        rows = await conn.fetch(
+            "SELECT tx_id, tenant_id, proposal_id, operations_applied, revert_operations, correlation_id, created_at FROM audit_log WHERE proposal_id=$1 ORDER BY created_at",
+            proposal_id,
+        )
+    return [{"tx_id": r[0], "tenant_id": r[1], "proposal_id": r[2], "operations_applied": r[3], "revert_operations": r[4], "correlation_id": r[5], "created_at": r[6]} for r in rows]
+
+
+async def outbox_add(tenant_id: str, event_type: str, payload: Dict) -> str:
+    eid = "EV-" + uuid.uuid4().hex[:16]
+    async with apg_conn() as conn:
+        await conn.execute("INSERT INTO events_outbox (event_id, tenant_id, event_type, payload, published) VALUES ($1,$2,$3,$4,FALSE)", eid, tenant_id, event_type, payload)
+    return eid
@@ -1,11 +1,52 @@
 import json
-from typing import Dict
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
 import redis
 from src.config.settings import settings
 
+GRAPH_COMMITTED_CHANNEL = "events:graph_committed:broadcast"
+GRAPH_COMMITTED_QUEUE = "events:graph_committed"
+
+# one client (and connection pool) per process; redis.Redis is thread-safe
+_client: Optional[redis.Redis] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
 def get_redis():
-    return redis.Redis.from_url(str(settings.redis_url))
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = redis.Redis.from_url(str(settings.redis_url))
+                _client_pid = pid
+    return _client
 
 def publish_graph_committed(event: Dict) -> None:
     r = get_redis()
-    r.lpush("events:graph_committed", json.dumps(event))
+    payload = json.dumps(event)
+    r.lpush(GRAPH_COMMITTED_QUEUE, payload)
+    # the list is a work queue for a single consumer; API processes refresh graph snapshots from the broadcast
+    r.publish(GRAPH_COMMITTED_CHANNEL, payload)
+
+def publish_graph_committed_batch(events: Sequence[Dict]) -> List[Optional[str]]:
+    """Push and broadcast all events in one pipelined round trip; returns an error message (or None) per event."""
+    if not events:
+        return []
+    pipe = get_redis().pipeline(transaction=False)
+    for event in events:
+        payload = json.dumps(event)
+        pipe.lpush(GRAPH_COMMITTED_QUEUE, payload)
+        pipe.publish(GRAPH_COMMITTED_CHANNEL, payload)
+    results = pipe.execute(raise_on_error=False)
+    errors: List[Optional[str]] = []
+    for i in range(len(events)):
+        # only the queue push counts: broadcast listeners are best effort
+        res = results[2 * i]
+        errors.append(str(res) if isinstance(res, Exception) else None)
+    return errors
+
+def publish_graph_rebuilt(job_id: str) -> None:
+    """Tells API processes that a KB rebuild changed the graph for every tenant (broadcast only, no vector sync work)."""
+    get_redis().publish(GRAPH_COMMITTED_CHANNEL, json.dumps({"tenant_id": None, "source": "kb_rebuild", "job_id": job_id}))
@@ -26,7 +26,13 @@ except Exception:
 from src.api.validation import router as validation_router
 from src.api.auth import router as auth_router
 from src.services.auth.users_repo import ensure_bootstrap_admin
-from src.core.migrations import check_and_gatekeep
+from src.core.migrations import check_and_gatekeep, run_migrations
+from src.db.pg import init_pool, close_pool
+from src.db.pg_async import close_async_pool
+from src.services.graph.neo4j_repo import init_driver, close_driver, Neo4jRepo
+from src.services.graph.utils import ensure_weight_defaults_migrated, WEIGHT_DEFAULTS_MIGRATION
+from src.services.graph.neo4j_async_repo import close_async_driver
+from src.services.graph.snapshot import refresh_snapshot, listen_graph_committed
 try:
     from prometheus_client import Counter, Histogram
 except Exception:
@@ -100,10 +106,47 @@ LATENCY = Histogram("http_request_latency_ms", "Request latency ms", ["method",
 async def on_startup():
     setup_logging()
     logger.info("startup", neo4j_uri=settings.neo4j_uri)
+    init_pool()
+    run_migrations()
     ok = check_and_gatekeep()
     if not ok:
         raise SystemExit("Schema version gate failed")
     ensure_bootstrap_admin()
+    if settings.neo4j_uri:
+        try:
+            init_driver()
+        except Exception as e:
+            logger.warning("neo4j_driver_init_failed", error=str(e))
+        asyncio.get_running_loop().run_in_executor(None, _run_graph_migrations)
+    if settings.graph_snapshot_enabled:
+        asyncio.get_running_loop().run_in_executor(None, _load_graph_snapshot)
+    if settings.neo4j_uri:
+        app.state.snapshot_listener = asyncio.create_task(listen_graph_committed())
+
+def _run_graph_migrations():
+    try:
+        repo = Neo4jRepo()
+        if ensure_weight_defaults_migrated(repo):
+            logger.info("graph_migration_applied", migration=WEIGHT_DEFAULTS_MIGRATION)
+        repo.close()
+    except Exception as e:
+        logger.warning("graph_migration_failed", error=str(e))
+
+def _load_graph_snapshot():
+    try:
+        refresh_snapshot(None)
+    except Exception as e:
+        logger.warning("graph_snapshot_load_failed", error=str(e))
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    task = getattr(app.state, "snapshot_listener", None)
+    if task is not None:
+        task.cancel()
+    await close_async_driver()
+    close_driver()
+    await close_async_pool()
+    close_pool()
 
 @app.middleware("http")
 async def tenant_middleware(request, call_next):
@@ -0,0 +1,137 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from neo4j.exceptions import DriverError, Neo4jError
+from src.config.settings import settings
+from src.core.correlation import get_correlation_id
+from src.core.logging import logger
+
+BULK_MIN_CHUNK = 50
+BULK_MAX_CHUNK = 5000
+
+# progress(phase, rows_done, rows_total)
+ProgressFn = Callable[[str, int, int], None]
+
+
+class BulkPhase(NamedTuple):
+    name: str
+    query: str
+    rows: List[Dict]
+    parallel: bool = False
+
+
+def is_transient(exc: Exception) -> bool:
+    """Deadlocks, leader switches and dropped connections are worth a retry; syntax and constraint errors are not."""
+    if isinstance(exc, (Neo4jError, DriverError)):
+        try:
+            return bool(exc.is_retryable())
+        except Exception:
+            return False
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+class ChunkSizer:
+    """Steers chunk size towards target_ms per transaction from observed timings."""
+
+    def __init__(self, initial: int, target_ms: float, lo: int = BULK_MIN_CHUNK, hi: int = BULK_MAX_CHUNK):
+        self.lo = lo
+        self.hi = max(lo, hi)
+        self.size = max(self.lo, min(self.hi, int(initial)))
+        self.target_ms = target_ms
+        self._lock = threading.Lock()
+
+    def observe(self, rows: int, ms: float) -> None:
+        if rows <= 0 or ms <= 0:
+            return
+        ideal = rows * self.target_ms / ms
+        with self._lock:
+            # half-step towards the ideal size keeps one slow transaction from collapsing the chunk size
+            self.size = max(self.lo, min(self.hi, int(0.5 * self.size + 0.5 * ideal)))
+
+
+class BulkWriter:
+    """UNWIND bulk writes over a shared driver.
+
+    Parallel phases (node upserts keyed by a unique uid) write independent chunks on
+    `parallelism` sessions; other phases (relationships) run chunk by chunk, and phases
+    always run in the order given so relationships see the nodes they match.
+    """
+
+    def __init__(self, driver, parallelism: Optional[int] = None, chunk_size: int = 500, target_tx_ms: Optional[float] = None, max_retries: int = 3, backoff_sec: float = 0.8, progress: Optional[ProgressFn] = None):
+        self.driver = driver
+        self.parallelism = max(1, int(parallelism or settings.neo4j_bulk_parallelism))
+        self.chunk_size = chunk_size
+        self.target_tx_ms = float(target_tx_ms or settings.neo4j_bulk_target_tx_ms)
+        self.max_retries = max(1, max_retries)
+        self.backoff_sec = backoff_sec
+        self.progress = progress
+
+    def _write_chunk(self, query: str, chunk: List[Dict]) -> Tuple[int, float]:
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            try:
+                with self.driver.session() as session:
+                    session.execute_write(lambda tx: tx.run(query, rows=chunk).consume())
+                return len(chunk), (time.perf_counter() - t0) * 1000.0
+            except Exception as e:
+                attempt += 1
+                if attempt >= self.max_retries or not is_transient(e):
+                    raise
+                time.sleep(self.backoff_sec * attempt)
+
+    def _report(self, phase: str, done: int, total: int) -> None:
+        if self.progress is None:
+            return
+        try:
+            self.progress(phase, done, total)
+        except Exception:
+            ...
+
+    def run_phase(self, phase: BulkPhase) -> Dict:
+        rows = phase.rows
+        total = len(rows)
+        if not total:
+            return {"phase": phase.name, "rows": 0, "chunks": 0, "ms": 0}
+        sizer = ChunkSizer(self.chunk_size, self.target_tx_ms)
+        workers = self.parallelism if phase.parallel else 1
+        t0 = time.perf_counter()
+        done = 0
+        chunks = 0
+        pos = 0
+        if workers == 1:
+            while pos < total:
+                chunk = rows[pos:pos + sizer.size]
+                pos += len(chunk)
+                n, ms = self._write_chunk(phase.query, chunk)
+                sizer.observe(n, ms)
+                done += n
+                chunks += 1
+                self._report(phase.name, done, total)
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="neo4j-bulk") as ex:
+                pending = set()
+                try:
+                    while pos < total or pending:
+                        while pos < total and len(pending) < workers:
+                            chunk = rows[pos:pos + sizer.size]
+                            pos += len(chunk)
+                            pending.add(ex.submit(self._write_chunk, phase.query, chunk))
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for f in finished:
+                            n, ms = f.result()
+                            sizer.observe(n, ms)
+                            done += n
+                            chunks += 1
+                            self._report(phase.name, done, total)
+                except BaseException:
+                    for f in pending:
+                        f.cancel()
+                    raise
+        stats = {"phase": phase.name, "rows": done, "chunks": chunks, "ms": int((time.perf_counter() - t0) * 1000)}
+        logger.info("neo4j_bulk_phase", correlation_id=get_correlation_id() or "", parallel=workers, last_chunk_size=sizer.size, **stats)
+        return stats
+
+    def run(self, phases: List[BulkPhase]) -> List[Dict]:
+        return [self.run_phase(p) for p in phases]
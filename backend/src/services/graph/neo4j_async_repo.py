@@ -0,0 +1,143 @@
+import asyncio
+import os
+from typing import List, Dict, Tuple, Callable, Awaitable, Any, Optional
+from neo4j import AsyncGraphDatabase
+from src.config.settings import settings
+from src.core.correlation import get_correlation_id
+from src.core.logging import logger
+from src.services.graph.neo4j_repo import (
+    _driver_config,
+    RELATION_CONTEXT_QUERY,
+    NODE_DETAILS_QUERY,
+    neighbors_query,
+    neighbors_from_record,
+    relation_context_from_record,
+    node_details_from_records,
+)
+
+# AsyncDriver is bound to the event loop it was first used on, so the registry is keyed by (pid, loop)
+_async_driver = None
+_async_driver_key: Optional[Tuple[int, int]] = None
+
+
+def _loop_key() -> Tuple[int, int]:
+    return (os.getpid(), id(asyncio.get_running_loop()))
+
+
+def get_async_driver():
+    """Shared async driver for the current process and event loop. Callers must not close it."""
+    global _async_driver, _async_driver_key
+    key = _loop_key()
+    drv = _async_driver
+    if drv is not None and _async_driver_key == key and not getattr(drv, "_closed", False):
+        return drv
+    uri = settings.neo4j_uri
+    user = settings.neo4j_user
+    password = settings.neo4j_password.get_secret_value()
+    if not (uri and user and password):
+        raise RuntimeError('Missing Neo4j connection environment variables')
+    _async_driver = AsyncGraphDatabase.driver(uri, auth=(user, password), **_driver_config())
+    _async_driver_key = key
+    logger.info("neo4j_async_driver_created", pid=key[0])
+    return _async_driver
+
+
+async def close_async_driver() -> None:
+    global _async_driver, _async_driver_key
+    drv = _async_driver
+    owned = drv is not None and _async_driver_key == _loop_key()
+    _async_driver = None
+    _async_driver_key = None
+    if owned:
+        try:
+            await drv.close()
+        except Exception:
+            ...
+
+
+class AsyncNeo4jRepo:
+    def __init__(self, max_retries: int = 3, backoff_sec: float = 0.8):
+        self.driver = get_async_driver()
+        self.max_retries = max_retries
+        self.backoff_sec = backoff_sec
+
+    async def close(self):
+        ...
+
+    async def _retry(self, fn: Callable[[Any], Awaitable[Any]]) -> Any:
+        attempt = 0
+        last_exc = None
+        while attempt < self.max_retries:
+            try:
+                async with self.driver.session() as session:
+                    return await fn(session)
+            except Exception as e:
+                last_exc = e
+                attempt += 1
+                await asyncio.sleep(self.backoff_sec * attempt)
+        raise last_exc
+
+    async def write(self, query: str, params: Dict | None = None) -> None:
+        async def _fn(session):
+            cid = get_correlation_id() or ""
+            logger.info("neo4j_write", correlation_id=cid)
+            async def writer(tx):
+                res = await tx.run(query, **(params or {}))
+                await res.consume()
+            await session.execute_write(writer)
+        return await self._retry(_fn)
+
+    async def read(self, query: str, params: Dict | None = None) -> List[Dict]:
+        async def _fn(session):
+            async def reader(tx):
+                cid = get_correlation_id() or ""
+                logger.info("neo4j_read", correlation_id=cid)
+                res = await tx.run(query, **(params or {}))
+                return [dict(r) async for r in res]
+            return await session.execute_read(reader)
+        return await self._retry(_fn)
+
+    async def read_single(self, query: str, params: Dict | None = None):
+        async def _fn(session):
+            async def reader(tx):
+                res = await tx.run(query, **(params or {}))
+                return await res.single()
+            return await session.execute_read(reader)
+        return await self._retry(_fn)
+
+    def _chunks(self, rows: List[Dict], size: int) -> List[List[Dict]]:
+        return [rows[i:i+size] for i in range(0, len(rows), size)]
+
+    async def write_unwind(self, query: str, rows: List[Dict], chunk_size: int = 500) -> None:
+        if not rows:
+            return
+        for chunk in self._chunks(rows, chunk_size):
+            async def _fn(session):
+                cid = get_correlation_id() or ""
+                logger.info("neo4j_write_unwind", correlation_id=cid, rows=len(chunk))
+                async def writer(tx):
+                    res = await tx.run(query, rows=chunk)
+                    await res.consume()
+                await session.execute_write(writer)
+            await self._retry(_fn)
+
+
+async def relation_context(from_uid: str, to_uid: str) -> Dict:
+    repo = AsyncNeo4jRepo()
+    res = await repo.read_single(RELATION_CONTEXT_QUERY, {"from": from_uid, "to": to_uid})
+    return relation_context_from_record(res)
+
+
+async def neighbors(center_uid: str, depth: int = 1) -> Tuple[List[Dict], List[Dict]]:
+    depth = max(0, min(int(depth), 6))
+    repo = AsyncNeo4jRepo()
+    res = await repo.read_single(neighbors_query(depth), {"uid": center_uid})
+    return neighbors_from_record(res)
+
+
+async def get_node_details(uid: str) -> Dict:
+    repo = AsyncNeo4jRepo()
+    rec = await repo.read_single(NODE_DETAILS_QUERY, {"uid": uid})
+    if not rec:
+        return {}
+    return node_details_from_records(rec["n"], rec["incoming"], rec["outgoing"])
@@ -1,18 +1,115 @@
+import os
+import threading
 import time
 from typing import List, Dict, Tuple, Callable, Any, Optional
 from neo4j import GraphDatabase
 from src.config.settings import settings
 from src.core.correlation import get_correlation_id
 from src.core.logging import logger
+from src.services.graph.bulk_writer import BulkWriter, BulkPhase, ProgressFn
+try:
+    from prometheus_client import Gauge
+    NEO4J_POOL_IN_USE = Gauge("neo4j_pool_in_use_connections", "Neo4j pooled connections currently borrowed")
+    NEO4J_POOL_IDLE = Gauge("neo4j_pool_idle_connections", "Neo4j pooled connections currently idle")
+    NEO4J_POOL_MAX_SIZE = Gauge("neo4j_pool_max_size", "Configured Neo4j connection pool size")
+except Exception:
+    class _Dummy:
+        def set(self, *args, **kwargs): ...
+        def set_function(self, *args, **kwargs): ...
+    NEO4J_POOL_IN_USE = _Dummy()
+    NEO4J_POOL_IDLE = _Dummy()
+    NEO4J_POOL_MAX_SIZE = _Dummy()
 
+_driver = None
+_driver_pid: Optional[int] = None
+_driver_lock = threading.Lock()
 
-def get_driver():
+
+def _driver_config() -> Dict[str, Any]:
+    return {
+        "max_connection_pool_size": int(settings.neo4j_max_pool_size),
+        "connection_acquisition_timeout": float(settings.neo4j_acquisition_timeout_sec),
+        "liveness_check_timeout": float(settings.neo4j_liveness_check_timeout_sec),
+        "max_connection_lifetime": float(settings.neo4j_max_connection_lifetime_sec),
+    }
+
+
+def _create_driver():
     uri = settings.neo4j_uri
     user = settings.neo4j_user
     password = settings.neo4j_password.get_secret_value()
     if not (uri and user and password):
         raise RuntimeError('Missing Neo4j connection environment variables')
-    return GraphDatabase.driver(uri, auth=(user, password))
+    return GraphDatabase.driver(uri, auth=(user, password), **_driver_config())
+
+
+def init_driver():
+    """Create the process-wide pooled driver (idempotent, fork-aware)."""
+    global _driver, _driver_pid
+    pid = os.getpid()
+    drv = _driver
+    if drv is not None and _driver_pid == pid and not getattr(drv, "_closed", False):
+        return drv
+    with _driver_lock:
+        if _driver is not None and _driver_pid != pid:
+            # inherited from the parent process: its sockets belong to the parent, drop without closing
+            _driver = None
+        if _driver is None or getattr(_driver, "_closed", False):
+            _driver = _create_driver()
+            _driver_pid = pid
+            logger.info("neo4j_driver_created", pid=pid, **_driver_config())
+        return _driver
+
+
+def get_driver():
+    """Shared pooled driver. Callers borrow sessions from it and must not close it."""
+    return init_driver()
+
+
+def close_driver() -> None:
+    global _driver, _driver_pid
+    with _driver_lock:
+        drv = _driver
+        _driver = None
+        owned = _driver_pid == os.getpid()
+        _driver_pid = None
+    if drv is not None and owned:
+        try:
+            drv.close()
+        except Exception:
+            ...
+
+
+def _reset_after_fork() -> None:
+    global _driver, _driver_pid, _driver_lock
+    _driver = None
+    _driver_pid = None
+    _driver_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def pool_stats() -> Dict[str, int]:
+    stats = {"in_use": 0, "idle": 0, "max_size": int(settings.neo4j_max_pool_size)}
+    drv = _driver
+    if drv is None or _driver_pid != os.getpid():
+        return stats
+    pool = getattr(drv, "_pool", None)
+    conns = getattr(pool, "connections", None) or {}
+    for address in list(conns):
+        for c in list(conns.get(address, ())):
+            if getattr(c, "in_use", False):
+                stats["in_use"] += 1
+            else:
+                stats["idle"] += 1
+    return stats
+
+
+NEO4J_POOL_IN_USE.set_function(lambda: pool_stats()["in_use"])
+NEO4J_POOL_IDLE.set_function(lambda: pool_stats()["idle"])
+NEO4J_POOL_MAX_SIZE.set_function(lambda: pool_stats()["max_size"])
 
 class Neo4jRepo:
     def __init__(self, uri: Optional[str] = None, user: Optional[str] = None, password: Optional[str] = None, max_retries: int = 3, backoff_sec: float = 0.8):
@@ -21,12 +118,18 @@ class Neo4jRepo:
         self.password = password or settings.neo4j_password.get_secret_value()
         if not self.uri or not self.user or not self.password:
             raise RuntimeError('Missing Neo4j connection environment variables')
-        self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
+        # explicit credentials get a dedicated driver, otherwise borrow the process-wide pool
+        self._owns_driver = bool(uri or user or password)
+        if self._owns_driver:
+            self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password), **_driver_config())
+        else:
+            self.driver = get_driver()
         self.max_retries = max_retries
         self.backoff_sec = backoff_sec
 
     def close(self):
-        self.driver.close()
+        if self._owns_driver:
+            self.driver.close()
 
     def _retry(self, fn: Callable[[Any], Any]) -> Any:
         attempt = 0
@@ -48,6 +151,25 @@ class Neo4jRepo:
             session.execute_write(lambda tx: tx.run(query, **(params or {})))
         return self._retry(_fn)
 
+    def write_returning(self, query: str, params: Dict | None = None) -> List[Dict]:
+        """Write transaction that also returns its rows (e.g. SET ... RETURN)."""
+        def _fn(session):
+            def writer(tx):
+                cid = get_correlation_id() or ""
+                logger.info("neo4j_write", correlation_id=cid)
+                res = tx.run(query, **(params or {}))
+                return [dict(r) for r in res]
+            return session.execute_write(writer)
+        return self._retry(_fn)
+
+    def write_transaction(self, work: Callable[[Any], Any]) -> Any:
+        """Runs work(tx) as one managed write transaction; work may issue several statements and must be idempotent on retry."""
+        def _fn(session):
+            cid = get_correlation_id() or ""
+            logger.info("neo4j_write", correlation_id=cid)
+            return session.execute_write(work)
+        return self._retry(_fn)
+
     def read(self, query: str, params: Dict | None = None) -> List[Dict]:
         def _fn(session):
             def reader(tx):
@@ -61,15 +183,12 @@ class Neo4jRepo:
     def _chunks(self, rows: List[Dict], size: int) -> List[List[Dict]]:
         return [rows[i:i+size] for i in range(0, len(rows), size)]
 
-    def write_unwind(self, query: str, rows: List[Dict], chunk_size: int = 500) -> None:
+    def write_unwind(self, query: str, rows: List[Dict], chunk_size: int = 500, parallel: bool = False, progress: Optional[ProgressFn] = None) -> None:
+        """Chunked UNWIND write; parallel=True only for independent rows (e.g. MERGE on a unique uid)."""
         if not rows:
             return
-        for chunk in self._chunks(rows, chunk_size):
-            def _fn(session):
-                cid = get_correlation_id() or ""
-                logger.info("neo4j_write_unwind", correlation_id=cid, rows=len(chunk))
-                session.execute_write(lambda tx: tx.run(query, rows=chunk))
-            self._retry(_fn)
+        writer = BulkWriter(self.driver, chunk_size=chunk_size, max_retries=self.max_retries, backoff_sec=self.backoff_sec, progress=progress)
+        writer.run_phase(BulkPhase("write_unwind", query, rows, parallel))
 
 def read_graph(subject_uid: str | None = None) -> Tuple[List[Dict], List[Dict]]:
     drv = get_driver()
@@ -89,67 +208,71 @@ def read_graph(subject_uid: str | None = None) -> Tuple[List[Dict], List[Dict]]:
         es = res["es"] if res else []
         nodes = [{"id": n["id"], "uid": n.get("uid"), "label": n.get("label"), "labels": n.get("labels", [])} for n in ns]
         edges = [{"from": e.get("source"), "to": e.get("target"), "type": e.get("rel")} for e in es]
-    drv.close()
+    return nodes, edges
+
+RELATION_CONTEXT_QUERY = (
+    "MATCH (a {uid:$from})-[r]->(b {uid:$to}) "
+    "RETURN type(r) AS rel, properties(r) AS props, a.title AS a_title, b.title AS b_title"
+)
+
+def neighbors_query(depth: int) -> str:
+    return (
+        "MATCH p=(c {uid:$uid})-[:CONTAINS|PREREQ|HAS_SKILL|LINKED|TARGETS|HAS_SECTION|HAS_TOPIC|REQUIRES_SKILL|HAS_METHOD|HAS_EXAMPLE|HAS_THEORY|HAS_STEP*0.." + str(depth) + "]-(n) "
+        "RETURN collect(DISTINCT n) AS ns, collect(DISTINCT relationships(p)) AS rs"
+    )
+
+def relation_context_from_record(res) -> Dict:
+    if not res:
+        return {}
+    return {"rel": res["rel"], "props": res["props"], "from_title": res["a_title"], "to_title": res["b_title"]}
+
+def neighbors_from_record(res) -> Tuple[List[Dict], List[Dict]]:
+    nodes: List[Dict] = []
+    edges: List[Dict] = []
+    ns = res["ns"] if res else []
+    rs = res["rs"] if res else []
+    seen = set()
+    for n in ns:
+        nid = n.id
+        if nid in seen:
+            continue
+        seen.add(nid)
+        # kind - это первая метка (например, Topic, Subject)
+        kind = list(n.labels)[0] if n.labels else "Unknown"
+        nodes.append({
+            "id": nid, 
+            "uid": n.get("uid"), 
+            "title": n.get("title"), # Было label
+            "kind": kind,            # Добавили kind
+            "labels": list(n.labels)
+        })
+    added = set()
+    for rels in rs:
+        for r in rels:
+            key = (r.start_node["uid"], r.end_node["uid"], type(r).__name__)
+            if key in added:
+                continue
+            added.add(key)
+            edges.append({
+                "source": r.start_node["uid"], # Было from
+                "target": r.end_node["uid"],   # Было to
+                "kind": type(r).__name__,      # Было type
+                "weight": r.get("weight", 1.0)
+            })
     return nodes, edges
 
 def relation_context(from_uid: str, to_uid: str) -> Dict:
     drv = get_driver()
-    ctx: Dict = {}
     with drv.session() as s:
-        res = s.run(
-            (
-                "MATCH (a {uid:$from})-[r]->(b {uid:$to}) "
-                "RETURN type(r) AS rel, properties(r) AS props, a.title AS a_title, b.title AS b_title"
-            ), {"from": from_uid, "to": to_uid}
-        ).single()
-        if res:
-            ctx = {"rel": res["rel"], "props": res["props"], "from_title": res["a_title"], "to_title": res["b_title"]}
-    drv.close()
-    return ctx
+        res = s.run(RELATION_CONTEXT_QUERY, {"from": from_uid, "to": to_uid}).single()
+        return relation_context_from_record(res)
 
 def neighbors(center_uid: str, depth: int = 1) -> Tuple[List[Dict], List[Dict]]:
     drv = get_driver()
-    nodes: List[Dict] = []
-    edges: List[Dict] = []
     depth = max(0, min(int(depth), 6))
     with drv.session() as s:
-        query = (
-            "MATCH p=(c {uid:$uid})-[:CONTAINS|PREREQ|HAS_SKILL|LINKED|TARGETS|HAS_SECTION|HAS_TOPIC|REQUIRES_SKILL|HAS_METHOD|HAS_EXAMPLE|HAS_THEORY|HAS_STEP*0.." + str(depth) + "]-(n) "
-            "RETURN collect(DISTINCT n) AS ns, collect(DISTINCT relationships(p)) AS rs"
-        )
-        res = s.run(query, {"uid": center_uid}).single()
-        ns = res["ns"] if res else []
-        rs = res["rs"] if res else []
-        seen = set()
-        for n in ns:
-            nid = n.id
-            if nid in seen:
-                continue
-            seen.add(nid)
-            # kind - это первая метка (например, Topic, Subject)
-            kind = list(n.labels)[0] if n.labels else "Unknown"
-            nodes.append({
-                "id": nid, 
-                "uid": n.get("uid"), 
-                "title": n.get("title"), # Было label
-                "kind": kind,            # Добавили kind
-                "labels": list(n.labels)
-            })
-        added = set()
-        for rels in rs:
-            for r in rels:
-                key = (r.start_node["uid"], r.end_node["uid"], type(r).__name__)
-                if key in added:
-                    continue
-                added.add(key)
-                edges.append({
-                    "source": r.start_node["uid"], # Было from
-                    "target": r.end_node["uid"],   # Было to
-                    "kind": type(r).__name__,      # Было type
-                    "weight": r.get("weight", 1.0)
-                })
-    drv.close()
-    return nodes, edges
+        res = s.run(neighbors_query(depth), {"uid": center_uid}).single()
+        return neighbors_from_record(res)
 
 def node_by_uid(uid: str, tenant_id: str) -> Dict:
     drv = get_driver()
@@ -158,7 +281,6 @@ def node_by_uid(uid: str, tenant_id: str) -> Dict:
         res = s.run("MATCH (n {uid:$uid, tenant_id:$tid}) RETURN properties(n) AS p", {"uid": uid, "tid": tenant_id}).single()
         if res and res.get("p"):
             data = dict(res.get("p"))
-    drv.close()
     return data
 
 def relation_by_pair(from_uid: str, to_uid: str, typ: str, tenant_id: str) -> Dict:
@@ -171,7 +293,6 @@ def relation_by_pair(from_uid: str, to_uid: str, typ: str, tenant_id: str) -> Di
         ).single()
         if res and res.get("p"):
             data = dict(res.get("p"))
-    drv.close()
     return data
 
 def purge_user_artifacts() -> Dict:
@@ -183,31 +304,29 @@ def purge_user_artifacts() -> Dict:
         deleted_users = res["c"] if res else 0
         res2 = s.run("MATCH ()-[r:COMPLETED]-() DELETE r RETURN COUNT(r) AS c").single()
         deleted_rels = res2["c"] if res2 else 0
-    drv.close()
     return {"deleted_users": deleted_users, "deleted_completed_rels": deleted_rels}
 
+NODE_DETAILS_QUERY = (
+    "MATCH (n {uid:$uid}) WITH n LIMIT 1 "
+    "RETURN n, "
+    "[(n)<-[r]-(other) | {rel: type(r), uid: other.uid, title: other.title}] AS incoming, "
+    "[(n)-[r]->(other) | {rel: type(r), uid: other.uid, title: other.title}] AS outgoing"
+)
+
+def node_details_from_records(node, incoming, outgoing) -> Dict:
+    data = dict(node)
+    data["labels"] = list(node.labels)
+    # Kind
+    data["kind"] = list(node.labels)[0] if node.labels else "Unknown"
+    data["incoming"] = [{"rel": r["rel"], "uid": r["uid"], "title": r["title"]} for r in incoming]
+    data["outgoing"] = [{"rel": r["rel"], "uid": r["uid"], "title": r["title"]} for r in outgoing]
+    return data
+
 def get_node_details(uid: str) -> Dict:
     drv = get_driver()
-    data = {}
     with drv.session() as s:
-        # Получаем свойства узла
-        res = s.run("MATCH (n {uid:$uid}) RETURN n", {"uid": uid}).single()
+        # Свойства узла и входящие/исходящие связи одним запросом
+        res = s.run(NODE_DETAILS_QUERY, {"uid": uid}).single()
         if not res:
             return {}
-        
-        node = res["n"]
-        data = dict(node)
-        data["labels"] = list(node.labels)
-        # Kind
-        data["kind"] = list(node.labels)[0] if node.labels else "Unknown"
-        
-        # Получаем входящие связи
-        in_res = s.run("MATCH (n {uid:$uid})<-[r]-(other) RETURN type(r) as rel, other.uid as uid, other.title as title", {"uid": uid})
-        data["incoming"] = [{"rel": r["rel"], "uid": r["uid"], "title": r["title"]} for r in in_res]
-        
-        # Получаем исходящие связи
-        out_res = s.run("MATCH (n {uid:$uid})-[r]->(other) RETURN type(r) as rel, other.uid as uid, other.title as title", {"uid": uid})
-        data["outgoing"] = [{"rel": r["rel"], "uid": r["uid"], "title": r["title"]} for r in out_res]
-        
-    drv.close()
-    return data
+        return node_details_from_records(res["n"], res["incoming"], res["outgoing"])
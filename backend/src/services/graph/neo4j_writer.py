@@ -1,56 +1,60 @@
-from typing import Dict
-from datetime import datetime
-
-def merge_node(tx, tenant_id: str, typ: str, uid: str, props: Dict, evidence: Dict | None = None) -> None:
-    p = dict(props)
-    p["uid"] = uid
-    p["tenant_id"] = tenant_id
-    p.setdefault("lifecycle_status", "ACTIVE")
-    p.setdefault("created_at", datetime.utcnow().isoformat())
-    tx.run(f"MERGE (n:{typ} {{uid:$uid, tenant_id:$tenant_id}}) SET n += $props", uid=uid, tenant_id=tenant_id, props=p)
-    ev = evidence or {}
-    cid = ev.get("source_chunk_id")
-    quote = ev.get("quote")
-    if cid and quote:
-        tx.run("MERGE (sc:SourceChunk {uid:$cid, tenant_id:$tid}) SET sc.quote=$quote", cid=cid, tid=tenant_id, quote=quote)
-        tx.run("MATCH (n {uid:$uid, tenant_id:$tid}), (sc:SourceChunk {uid:$cid, tenant_id:$tid}) MERGE (n)-[:EVIDENCED_BY]->(sc)", uid=uid, cid=cid, tid=tenant_id)
-
-def update_node(tx, tenant_id: str, uid: str, props: Dict) -> None:
-    tx.run("MATCH (n {uid:$uid, tenant_id:$tenant_id}) SET n += $props", uid=uid, tenant_id=tenant_id, props=props or {})
-
-def merge_rel(tx, tenant_id: str, typ: str, fu: str, tu: str, rid: str, props: Dict, evidence: Dict | None = None) -> None:
-    p = dict(props or {})
-    p["uid"] = rid
+import re
+from typing import Dict, Iterable, List, Optional
+
+# labels that carry static/dynamic weights; their defaults are set on write instead of by full-graph scans
+WEIGHTED_LABELS = ("Topic", "Skill")
+
+# labels with a uid uniqueness constraint (see utils.ensure_constraints): matches on them are index seeks
+UID_INDEXED_LABELS = ("Subject", "Section", "Topic", "Skill", "Method", "Example", "Error", "ContentUnit", "Goal", "Objective")
+_IDENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def _ident(name: str) -> str:
+    if not _IDENT.match(name or ""):
+        raise ValueError(f"invalid label or relationship type: {name!r}")
+    return name
+
+def _node(var: str, label: Optional[str], uid_expr: str) -> str:
+    lab = f":{_ident(label)}" if label else ""
+    return f"({var}{lab} {{uid:{uid_expr}, tenant_id:$tid}})"
+
+def resolve_labels(tx, tenant_id: str, uids: Iterable[str]) -> Dict[str, str]:
+    """uid -> label for nodes of the tenant found under exactly one uid-indexed label."""
+    uids = sorted(set(u for u in uids if u))
+    if not uids:
+        return {}
+    parts = [f"UNWIND $uids AS u MATCH (n:{l} {{uid:u}}) WHERE n.tenant_id = $tid RETURN u AS uid, '{l}' AS label" for l in UID_INDEXED_LABELS]
+    found: Dict[str, List[str]] = {}
+    for r in tx.run("CALL { " + " UNION ALL ".join(parts) + " } RETURN uid, label", uids=uids, tid=tenant_id):
+        found.setdefault(r["uid"], []).append(r["label"])
+    return {u: ls[0] for u, ls in found.items() if len(ls) == 1}
+
+def merge_nodes_batch(tx, tenant_id: str, label: str, rows: List[Dict]) -> None:
+    """rows: {uid, props}; props already carry uid/tenant_id/lifecycle defaults (see commit._batch_ops)."""
+    defaults = ", n.static_weight = coalesce(n.static_weight, 0.5), n.dynamic_weight = coalesce(n.dynamic_weight, n.static_weight, 0.5)" if label in WEIGHTED_LABELS else ""
+    tx.run(f"UNWIND $rows AS r MERGE {_node('n', label, 'r.uid')} SET n += r.props{defaults}", rows=rows, tid=tenant_id)
+
+def update_nodes_batch(tx, tenant_id: str, label: Optional[str], rows: List[Dict]) -> None:
+    tx.run(f"UNWIND $rows AS r MATCH {_node('n', label, 'r.uid')} SET n += r.props", rows=rows, tid=tenant_id)
+
+def merge_rels_batch(tx, tenant_id: str, typ: str, from_label: Optional[str], to_label: Optional[str], rows: List[Dict]) -> None:
+    """rows: {fu, tu, rid, props}."""
+    tx.run(
+        f"UNWIND $rows AS r MATCH {_node('a', from_label, 'r.fu')} MATCH {_node('b', to_label, 'r.tu')} "
+        f"MERGE (a)-[x:{_ident(typ)} {{uid:r.rid}}]->(b) SET x += r.props",
+        rows=rows, tid=tenant_id,
+    )
+
+def update_rels_batch(tx, tenant_id: str, typ: Optional[str], from_label: Optional[str], to_label: Optional[str], rows: List[Dict]) -> None:
+    rel = f"x:{_ident(typ)} {{uid:r.rid}}" if typ else "x {uid:r.rid}"
+    tx.run(
+        f"UNWIND $rows AS r MATCH {_node('a', from_label, 'r.fu')}-[{rel}]->{_node('b', to_label, 'r.tu')} SET x += r.props",
+        rows=rows, tid=tenant_id,
+    )
+
+def link_evidence_batch(tx, tenant_id: str, label: Optional[str], rows: List[Dict]) -> None:
+    """rows: {uid, cid, quote}; upserts the SourceChunks and EVIDENCED_BY from the anchor nodes."""
     tx.run(
-        f"MATCH (a {{uid:$fu, tenant_id:$tid}}), (b {{uid:$tu, tenant_id:$tid}}) "
-        f"MERGE (a)-[r:{typ} {{uid:$rid}}]->(b) "
-        f"SET r += $props",
-        fu=fu, tu=tu, rid=rid, props=p, tid=tenant_id
+        "UNWIND $rows AS r MERGE (sc:SourceChunk {uid:r.cid, tenant_id:$tid}) SET sc.quote = r.quote "
+        f"WITH r, sc MATCH {_node('n', label, 'r.uid')} MERGE (n)-[:EVIDENCED_BY]->(sc)",
+        rows=rows, tid=tenant_id,
     )
-    ev = evidence or {}
-    cid = ev.get("source_chunk_id")
-    quote = ev.get("quote")
-    if cid and quote and fu:
-        tx.run("MERGE (sc:SourceChunk {uid:$cid, tenant_id:$tid}) SET sc.quote=$quote", cid=cid, tid=tenant_id, quote=quote)
-        tx.run("MATCH (a {uid:$fu, tenant_id:$tid}), (sc:SourceChunk {uid:$cid, tenant_id:$tid}) MERGE (a)-[:EVIDENCED_BY]->(sc)", fu=fu, cid=cid, tid=tenant_id)
-
-def update_rel(tx, tenant_id: str, typ: str | None, fu: str, tu: str, rid: str, props: Dict, evidence: Dict | None = None) -> None:
-    p = dict(props or {})
-    if typ:
-        tx.run(
-            f"MATCH (a {{uid:$fu, tenant_id:$tid}})-[r:{typ} {{uid:$rid}}]->(b {{uid:$tu, tenant_id:$tid}}) "
-            f"SET r += $props",
-            fu=fu, tu=tu, rid=rid, props=p, tid=tenant_id
-        )
-    else:
-        tx.run(
-            "MATCH (a {uid:$fu, tenant_id:$tid})-[r {uid:$rid}]->(b {uid:$tu, tenant_id:$tid}) "
-            "SET r += $props",
-            fu=fu, tu=tu, rid=rid, props=p, tid=tenant_id
-        )
-    ev = evidence or {}
-    cid = ev.get("source_chunk_id")
-    quote = ev.get("quote")
-    if cid and quote and fu:
-        tx.run("MERGE (sc:SourceChunk {uid:$cid, tenant_id:$tid}) SET sc.quote=$quote", cid=cid, tid=tenant_id, quote=quote)
-        tx.run("MATCH (a {uid:$fu, tenant_id:$tid}), (sc:SourceChunk {uid:$cid, tenant_id:$tid}) MERGE (a)-[:EVIDENCED_BY]->(sc)", fu=fu, cid=cid, tid=tenant_id)
@@ -0,0 +1,213 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from src.core.logging import logger
+from src.services.graph.reachability import refresh_prereq_index
+
+
+class IncrementalTopoOrder:
+    """Topological order of a PREREQ graph kept up to date edge by edge (Pearce–Kelly).
+
+    Every edge a->b has pos[a] < pos[b]. Inserting a->b with pos[b] < pos[a] searches only the
+    affected window pos[b]..pos[a]: forward from b and backward from a. Reaching a from b means
+    the edge closes a cycle; otherwise the two visited sets swap their positions inside the window.
+    """
+
+    def __init__(self, graph_version: int = 0):
+        self.pos: Dict[str, int] = {}
+        self.succ: Dict[str, Set[str]] = {}
+        self.pred: Dict[str, Set[str]] = {}
+        self.graph_version = graph_version
+        self._top = -1
+        # edges of the loaded graph that already close a cycle; they stay out of the order
+        self.skipped = 0
+
+    def __len__(self) -> int:
+        return len(self.pos)
+
+    def _add_node(self, uid: str, log: Optional[List[Tuple]]) -> None:
+        if uid in self.pos:
+            return
+        self._top += 1
+        self.pos[uid] = self._top
+        self.succ[uid] = set()
+        self.pred[uid] = set()
+        if log is not None:
+            log.append(("node", uid))
+
+    def add_edge(self, a: str, b: str, log: Optional[List[Tuple]] = None) -> Optional[List[str]]:
+        """Insert a->b unless it closes a cycle; returns the cycle as a path [a, b, ..., a] in that case.
+
+        With a log, every change is recorded so that rollback(log) restores the previous state.
+        """
+        if a == b:
+            return [a, a]
+        self._add_node(a, log)
+        self._add_node(b, log)
+        if b in self.succ[a]:
+            return None
+        lb, ub = self.pos[b], self.pos[a]
+        if lb < ub:
+            parent: Dict[str, str] = {b: ""}
+            fwd: List[str] = []
+            stack = [b]
+            while stack:
+                u = stack.pop()
+                fwd.append(u)
+                for w in self.succ[u]:
+                    if w in parent:
+                        continue
+                    pw = self.pos[w]
+                    if pw == ub:
+                        path = [w, u]
+                        while parent[u]:
+                            u = parent[u]
+                            path.append(u)
+                        path.reverse()
+                        return [a] + path
+                    if pw < ub:
+                        parent[w] = u
+                        stack.append(w)
+            seen = {a}
+            bwd: List[str] = []
+            stack = [a]
+            while stack:
+                u = stack.pop()
+                bwd.append(u)
+                for w in self.pred[u]:
+                    if w not in seen and self.pos[w] > lb:
+                        seen.add(w)
+                        stack.append(w)
+            bwd.sort(key=self.pos.__getitem__)
+            fwd.sort(key=self.pos.__getitem__)
+            moved = bwd + fwd
+            slots = sorted(self.pos[u] for u in moved)
+            for u, p in zip(moved, slots):
+                if log is not None and self.pos[u] != p:
+                    log.append(("pos", u, self.pos[u]))
+                self.pos[u] = p
+        self.succ[a].add(b)
+        self.pred[b].add(a)
+        if log is not None:
+            log.append(("edge", a, b))
+        return None
+
+    def rollback(self, log: List[Tuple]) -> None:
+        for entry in reversed(log):
+            if entry[0] == "edge":
+                self.succ[entry[1]].discard(entry[2])
+                self.pred[entry[2]].discard(entry[1])
+            elif entry[0] == "pos":
+                self.pos[entry[1]] = entry[2]
+            else:
+                uid = entry[1]
+                del self.pos[uid], self.succ[uid], self.pred[uid]
+        log.clear()
+
+    def check(self, edges: Iterable[Tuple[str, str]]) -> Optional[List[str]]:
+        """First cycle the edges would close together with the current graph; the order is left unchanged."""
+        log: List[Tuple] = []
+        try:
+            for a, b in edges:
+                path = self.add_edge(a, b, log)
+                if path:
+                    return path
+            return None
+        finally:
+            self.rollback(log)
+
+    @classmethod
+    def from_edges(cls, edges: Iterable[Tuple[str, str]], graph_version: int = 0) -> "IncrementalTopoOrder":
+        edges = [(a, b) for a, b in edges if a and b]
+        order = cls(graph_version)
+        succ: Dict[str, List[str]] = {}
+        indeg: Dict[str, int] = {}
+        for a, b in edges:
+            succ.setdefault(a, []).append(b)
+            indeg.setdefault(a, 0)
+            indeg[b] = indeg.get(b, 0) + 1
+        # Kahn order first, so acyclic input is inserted with forward edges only
+        q = deque(u for u, d in indeg.items() if d == 0)
+        while q:
+            u = q.popleft()
+            order._add_node(u, None)
+            for w in succ.get(u, ()):
+                indeg[w] -= 1
+                if indeg[w] == 0:
+                    q.append(w)
+        for a, b in edges:
+            if order.add_edge(a, b):
+                order.skipped += 1
+        return order
+
+
+_orders: Dict[str, IncrementalTopoOrder] = {}
+# guards _orders and in-place checks; never held across an index load
+_lock = threading.Lock()
+# one cold load per tenant at a time, without blocking other tenants' gates
+_load_locks: Dict[str, threading.Lock] = {}
+
+
+def load_prereq_order(tenant_id: str, graph_version: int = 0) -> IncrementalTopoOrder:
+    """Order over the PREREQ adjacency of the tenant's PrereqIndex at graph_version; one Neo4j read serves both."""
+    t0 = time.time()
+    index = refresh_prereq_index(tenant_id, graph_version)
+    uids = index.order
+    edges = [(uids[i], uids[p]) for i, ps in enumerate(index.prereqs) for p in ps]
+    order = IncrementalTopoOrder.from_edges(edges, graph_version)
+    if order.skipped:
+        logger.warning("prereq_order_existing_cycles", tenant_id=tenant_id, edges=order.skipped)
+    logger.info("prereq_order_built", tenant_id=tenant_id, graph_version=graph_version, nodes=len(order), edges=len(edges), ms=int((time.time() - t0) * 1000))
+    return order
+
+
+def find_prereq_cycle(tenant_id: str, edges: Iterable[Tuple[str, str]], graph_version: int) -> Optional[List[str]]:
+    """Cycle path [a, b, ..., a] that the proposed PREREQ edges would close in the tenant graph at graph_version, or None."""
+    edges = list(edges)
+    with _lock:
+        order = _orders.get(tenant_id)
+        if order is not None and order.graph_version == graph_version:
+            return order.check(edges)
+        load_lock = _load_locks.setdefault(tenant_id, threading.Lock())
+    with load_lock:
+        with _lock:
+            order = _orders.get(tenant_id)
+            if order is not None and order.graph_version == graph_version:
+                return order.check(edges)
+        loaded = load_prereq_order(tenant_id, graph_version)
+        with _lock:
+            order = _orders.get(tenant_id)
+            if order is not None and order.graph_version == graph_version:
+                loaded = order
+            elif order is None or order.graph_version < graph_version:
+                _orders[tenant_id] = loaded
+            # else: a later commit already moved the cached order past graph_version; check against our load only
+            return loaded.check(edges)
+
+
+def record_prereq_edges(tenant_id: str, edges: Iterable[Tuple[str, str]], from_version: int, to_version: int) -> None:
+    """Moves the cached order from from_version to to_version with the committed edges; any other history drops it."""
+    with _lock:
+        order = _orders.get(tenant_id)
+        if order is None:
+            return
+        if order.graph_version != from_version:
+            _orders.pop(tenant_id, None)
+            return
+        for a, b in edges:
+            if order.add_edge(a, b):
+                # committed around the gate (e.g. a concurrent writer): rebuild from the graph next time
+                _orders.pop(tenant_id, None)
+                return
+        order.graph_version = to_version
+
+
+def on_graph_committed(event: Dict) -> None:
+    tenant_id = event.get("tenant_id")
+    version = event.get("graph_version")
+    with _lock:
+        for key in list(_orders.keys()):
+            # rebuilds carry no tenant; commits from other processes arrive with a version this cache has not seen
+            if not tenant_id or (key == tenant_id and (version is None or _orders[key].graph_version < int(version))):
+                _orders.pop(key, None)
@@ -0,0 +1,289 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from src.core.logging import logger
+from src.services.graph.neo4j_repo import Neo4jRepo
+
+PREREQ_INDEX_QUERY = (
+    "MATCH (t:Topic) WHERE t.uid IS NOT NULL AND ($tid IS NULL OR t.tenant_id IS NULL OR t.tenant_id = $tid) "
+    "RETURN t.uid AS uid, [(t)-[:PREREQ]->(p:Topic) | p.uid] AS prereqs, "
+    "[(s:Subject)-[:CONTAINS]->(:Section)-[:CONTAINS]->(t) | s.uid] AS subjects"
+)
+# progress value from which a topic counts as mastered and is pruned from study plans
+MASTERY_THRESHOLD = 0.7
+# remaining plans remembered per index; a student session re-asks with the same mastered set until it changes
+PLAN_CACHE_SIZE = 4096
+# seconds between checks of a tenant index against tenant_graph_version, in case a commit broadcast was missed
+VERSION_CHECK_SEC = 5.0
+
+
+class PrereqIndex:
+    """PREREQ reachability for one tenant at one graph_version.
+
+    Topics are numbered by a topological order (prereqs first) and each topic keeps the bitset of
+    itself plus all its transitive prereqs, so a study plan is the set bits of an OR of bitsets read
+    in ascending position. Topics on a PREREQ cycle come after the acyclic order.
+    """
+
+    def __init__(self, order: List[str], ancestors: List[int], prereqs: List[List[int]], tenant_id: Optional[str] = None, graph_version: int = 0, subjects: Optional[Dict[str, List[int]]] = None):
+        self.order = order
+        self.ancestors = ancestors
+        # prereqs[i]: positions of the direct prereqs of order[i]
+        self.prereqs = prereqs
+        # subject uid -> positions of its topics
+        self.subjects: Dict[str, List[int]] = subjects or {}
+        self.position: Dict[str, int] = {u: i for i, u in enumerate(order)}
+        self._plan_cache: "OrderedDict[Tuple, Dict[str, List[str]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.tenant_id = tenant_id
+        self.graph_version = graph_version
+        self.built_at = time.time()
+        self.checked_at = self.built_at
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict], tenant_id: Optional[str] = None, graph_version: int = 0) -> "PrereqIndex":
+        uids: List[str] = []
+        index: Dict[str, int] = {}
+        prereq_uids: List[List[str]] = []
+        subject_uids: List[List[str]] = []
+        for r in rows:
+            uid = r.get("uid")
+            if not uid or uid in index:
+                continue
+            index[uid] = len(uids)
+            uids.append(uid)
+            prereq_uids.append(list(r.get("prereqs") or []))
+            subject_uids.append(list(r.get("subjects") or []))
+        n = len(uids)
+        prereqs: List[List[int]] = [sorted({index[p] for p in ps if p in index and p != uids[i]}) for i, ps in enumerate(prereq_uids)]
+        dependents: List[List[int]] = [[] for _ in range(n)]
+        indeg = [0] * n
+        for t, ps in enumerate(prereqs):
+            indeg[t] = len(ps)
+            for p in ps:
+                dependents[p].append(t)
+        q = deque(i for i in range(n) if indeg[i] == 0)
+        topo: List[int] = []
+        while q:
+            u = q.popleft()
+            topo.append(u)
+            for v in dependents[u]:
+                indeg[v] -= 1
+                if indeg[v] == 0:
+                    q.append(v)
+        cyclic = [i for i in range(n) if indeg[i] > 0]
+        topo.extend(cyclic)
+        pos = [0] * n
+        for i, t in enumerate(topo):
+            pos[t] = i
+        anc = [0] * n
+        for t in topo:
+            m = 1 << pos[t]
+            for p in prereqs[t]:
+                m |= anc[p]
+            anc[t] = m
+        # acyclic nodes are final after one pass; cycle members need a fixpoint
+        changed = bool(cyclic)
+        while changed:
+            changed = False
+            for t in cyclic:
+                m = anc[t]
+                for p in prereqs[t]:
+                    m |= anc[p]
+                if m != anc[t]:
+                    anc[t] = m
+                    changed = True
+        subjects: Dict[str, List[int]] = {}
+        for t in topo:
+            for su in dict.fromkeys(subject_uids[t]):
+                subjects.setdefault(su, []).append(pos[t])
+        return cls([uids[t] for t in topo], [anc[t] for t in topo], [[pos[p] for p in prereqs[t]] for t in topo], tenant_id=tenant_id, graph_version=graph_version, subjects=subjects)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def mask(self, uids: Iterable[str]) -> int:
+        m = 0
+        for u in uids:
+            i = self.position.get(u)
+            if i is not None:
+                m |= self.ancestors[i]
+        return m
+
+    @staticmethod
+    def _positions(m: int) -> List[int]:
+        bits = bin(m)[:1:-1]
+        out: List[int] = []
+        i = bits.find("1")
+        while i >= 0:
+            out.append(i)
+            i = bits.find("1", i + 1)
+        return out
+
+    def plan(self, target_uids: Iterable[str]) -> List[str]:
+        """Ordered plan for all targets together: every transitive prereq once, prereqs before dependents."""
+        return [self.order[i] for i in self._positions(self.mask(target_uids))]
+
+    def topic_uids(self, subject_uid: Optional[str] = None) -> List[str]:
+        if not subject_uid:
+            return list(self.order)
+        return [self.order[i] for i in self.subjects.get(subject_uid, ())]
+
+    def missing_prereqs(self, uid: str, progress: Dict[str, float], threshold: float) -> int:
+        """Direct prereqs of uid with progress below threshold."""
+        i = self.position.get(uid)
+        if i is None:
+            return 0
+        return sum(1 for p in self.prereqs[i] if float(progress.get(self.order[p], 0.0) or 0.0) < threshold)
+
+    def mastered_positions(self, progress: Dict[str, float], threshold: float = MASTERY_THRESHOLD) -> FrozenSet[int]:
+        pos = self.position
+        return frozenset(pos[u] for u, v in progress.items() if u in pos and float(v or 0.0) >= threshold)
+
+    def remaining_plan(self, target_uids: Iterable[str], progress: Optional[Dict[str, float]] = None, threshold: float = MASTERY_THRESHOLD) -> Dict[str, List[str]]:
+        """Unmastered part of the targets' prereq closure: {"path": ordered remaining topics, "frontier": the ones ready to study now}.
+
+        Without mastered topics in the closure this is plan(); otherwise the walk stays inside the closure
+        mask and does not descend below mastered topics, so it costs only the unmastered fringe.
+        """
+        targets = tuple(dict.fromkeys(target_uids))
+        closure = self.mask(targets)
+        mastered = frozenset(i for i in self.mastered_positions(progress or {}, threshold) if (closure >> i) & 1)
+        if not mastered:
+            path = self._positions(closure)
+            return {"path": [self.order[i] for i in path], "frontier": [self.order[i] for i in path if not self.prereqs[i]]}
+        key = (targets, mastered)
+        with self._cache_lock:
+            hit = self._plan_cache.get(key)
+            if hit is not None:
+                self._plan_cache.move_to_end(key)
+                return hit
+        remaining = 0
+        stack = []
+        for u in targets:
+            i = self.position.get(u)
+            if i is not None and i not in mastered and not (remaining >> i) & 1:
+                remaining |= 1 << i
+                stack.append(i)
+        while stack:
+            i = stack.pop()
+            for p in self.prereqs[i]:
+                if p not in mastered and not (remaining >> p) & 1:
+                    remaining |= 1 << p
+                    stack.append(p)
+        path = self._positions(remaining)
+        res = {
+            "path": [self.order[i] for i in path],
+            "frontier": [self.order[i] for i in path if all(p in mastered for p in self.prereqs[i])],
+        }
+        with self._cache_lock:
+            self._plan_cache[key] = res
+            if len(self._plan_cache) > PLAN_CACHE_SIZE:
+                self._plan_cache.popitem(last=False)
+        return res
+
+    def is_prereq(self, prereq_uid: str, topic_uid: str) -> bool:
+        i = self.position.get(prereq_uid)
+        j = self.position.get(topic_uid)
+        return i is not None and j is not None and bool((self.ancestors[j] >> i) & 1)
+
+    def nbytes(self) -> int:
+        return sum((m.bit_length() + 7) // 8 for m in self.ancestors)
+
+
+_indexes: Dict[str, PrereqIndex] = {}
+# guards _indexes; never held across a Neo4j read
+_lock = threading.Lock()
+# one load per tenant at a time, without blocking other tenants' loads and refreshes
+_load_locks: Dict[str, threading.Lock] = {}
+
+
+def _key(tenant_id: Optional[str]) -> str:
+    return tenant_id or ""
+
+
+def load_prereq_index(tenant_id: Optional[str] = None, graph_version: int = 0) -> PrereqIndex:
+    t0 = time.time()
+    repo = Neo4jRepo()
+    try:
+        rows = repo.read(PREREQ_INDEX_QUERY, {"tid": tenant_id})
+    finally:
+        repo.close()
+    idx = PrereqIndex.from_rows(rows, tenant_id=tenant_id, graph_version=graph_version)
+    logger.info("prereq_index_built", tenant_id=tenant_id or "", graph_version=graph_version, topics=len(idx), bytes=idx.nbytes(), ms=int((time.time() - t0) * 1000))
+    return idx
+
+
+def _load_lock(key: str) -> threading.Lock:
+    with _lock:
+        return _load_locks.setdefault(key, threading.Lock())
+
+
+def refresh_prereq_index(tenant_id: Optional[str] = None, graph_version: Optional[int] = None) -> PrereqIndex:
+    """Rebuild and swap the tenant index unless it is already at graph_version; without a version it always rebuilds."""
+    key = _key(tenant_id)
+    with _load_lock(key):
+        cur = _indexes.get(key)
+        if cur is not None and graph_version is not None and cur.graph_version >= int(graph_version):
+            return cur
+        version = int(graph_version) if graph_version is not None else (cur.graph_version if cur is not None else 0)
+        idx = load_prereq_index(tenant_id, version)
+        with _lock:
+            _indexes[key] = idx
+        return idx
+
+
+def _tenant_graph_version(tenant_id: Optional[str]) -> int:
+    if not tenant_id:
+        return 0
+    try:
+        from src.db.pg import get_graph_version
+        return get_graph_version(tenant_id)
+    except Exception:
+        return 0
+
+
+def get_prereq_index(tenant_id: Optional[str] = None) -> PrereqIndex:
+    """Current index for the tenant at its Postgres graph_version.
+
+    Built on first use and refreshed on commit/rebuild events; every VERSION_CHECK_SEC the version is
+    compared with Postgres as well, so a missed broadcast cannot leave the index stale.
+    """
+    key = _key(tenant_id)
+    idx = _indexes.get(key)
+    if idx is not None:
+        if not tenant_id or time.time() - idx.checked_at < VERSION_CHECK_SEC:
+            return idx
+        idx.checked_at = time.time()
+        version = _tenant_graph_version(tenant_id)
+        if version > idx.graph_version:
+            logger.info("prereq_index_lagging", tenant_id=tenant_id, graph_version=idx.graph_version, current=version)
+            return refresh_prereq_index(tenant_id, version)
+        return idx
+    with _load_lock(key):
+        idx = _indexes.get(key)
+        if idx is None:
+            idx = load_prereq_index(tenant_id, _tenant_graph_version(tenant_id))
+            with _lock:
+                _indexes[key] = idx
+        return idx
+
+
+def on_graph_committed(event: Dict) -> None:
+    tenant_id = event.get("tenant_id")
+    version = event.get("graph_version")
+    if tenant_id:
+        # the shared (tenant-less) index spans every tenant; it is dropped rather than rebuilt on each commit
+        # and is loaded again on its next use
+        with _lock:
+            _indexes.pop("", None)
+        keys = [tenant_id] if tenant_id in _indexes else []
+    else:
+        # KB rebuild: every loaded index is stale
+        keys = list(_indexes.keys())
+    for key in keys:
+        try:
+            refresh_prereq_index(key or None, version if key else None)
+        except Exception as e:
+            logger.warning("prereq_index_refresh_failed", tenant_id=key, error=str(e))
@@ -0,0 +1,113 @@
+from collections import deque
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+def index_graph(adjacency: Dict[str, Iterable[str]]) -> Tuple[List[str], List[int], List[int]]:
+    """uid adjacency -> (uids, indptr, indices): CSR arrays over integer ids, successors of i in indices[indptr[i]:indptr[i + 1]]."""
+    ids: Dict[str, int] = {}
+    uids: List[str] = []
+    rows: List[List[int]] = []
+
+    def _id(u: str) -> int:
+        i = ids.get(u)
+        if i is None:
+            i = ids[u] = len(uids)
+            uids.append(u)
+            rows.append([])
+        return i
+
+    for u, vs in adjacency.items():
+        i = _id(u)
+        for v in vs:
+            rows[i].append(_id(v))
+    indptr = [0] * (len(uids) + 1)
+    indices: List[int] = []
+    for i, row in enumerate(rows):
+        indices.extend(row)
+        indptr[i + 1] = len(indices)
+    return uids, indptr, indices
+
+
+def strongly_connected_components(indptr: Sequence[int], indices: Sequence[int]) -> List[List[int]]:
+    """Iterative Tarjan: every SCC once, in reverse topological order; O(V + E), no recursion."""
+    n = len(indptr) - 1
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    nxt = [0] * n
+    stack: List[int] = []
+    comps: List[List[int]] = []
+    counter = 0
+    for s in range(n):
+        if index[s] != -1:
+            continue
+        index[s] = low[s] = counter
+        counter += 1
+        stack.append(s)
+        on_stack[s] = True
+        nxt[s] = indptr[s]
+        call = [s]
+        while call:
+            v = call[-1]
+            i = nxt[v]
+            if i < indptr[v + 1]:
+                nxt[v] = i + 1
+                w = indices[i]
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    nxt[w] = indptr[w]
+                    call.append(w)
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+            call.pop()
+            if call and low[v] < low[call[-1]]:
+                low[call[-1]] = low[v]
+            if low[v] == index[v]:
+                comp: List[int] = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    comp.append(w)
+                    if w == v:
+                        break
+                comps.append(comp)
+    return comps
+
+
+def witness_cycle(comp: Sequence[int], indptr: Sequence[int], indices: Sequence[int]) -> List[int]:
+    """Shortest closed walk [s, ..., s] through the root of a non-trivial SCC (BFS inside the component)."""
+    s = comp[-1]
+    members = set(comp)
+    parent = {s: -1}
+    q = deque([s])
+    while q:
+        u = q.popleft()
+        for k in range(indptr[u], indptr[u + 1]):
+            w = indices[k]
+            if w == s:
+                path = [u]
+                while parent[path[-1]] != -1:
+                    path.append(parent[path[-1]])
+                path.reverse()
+                return path + [s]
+            if w in members and w not in parent:
+                parent[w] = u
+                q.append(w)
+    return []
+
+
+def find_cycles(adjacency: Dict[str, Iterable[str]]) -> List[List[str]]:
+    """One witness cycle [u, ..., u] per non-trivial SCC (two or more nodes, or a self-loop)."""
+    uids, indptr, indices = index_graph(adjacency)
+    out: List[List[str]] = []
+    for comp in strongly_connected_components(indptr, indices):
+        if len(comp) == 1:
+            v = comp[0]
+            if v not in indices[indptr[v]:indptr[v + 1]]:
+                continue
+        out.append([uids[i] for i in witness_cycle(comp, indptr, indices)])
+    return out
@@ -0,0 +1,289 @@
+import asyncio
+import json
+import math
+import sys
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.config.settings import settings
+from src.core.logging import logger
+from src.services.graph.neo4j_repo import Neo4jRepo
+
+NODE_KINDS: Tuple[str, ...] = ("Subject", "Section", "Topic", "Skill", "Method", "Goal", "Objective")
+REL_TYPES: Tuple[str, ...] = ("CONTAINS", "PREREQ", "USES_SKILL", "LINKED", "TARGETS", "HAS_SKILL")
+
+SNAPSHOT_NODES_QUERY = (
+    "MATCH (n) WHERE (n:Subject OR n:Section OR n:Topic OR n:Skill OR n:Method OR n:Goal OR n:Objective) "
+    "AND n.uid IS NOT NULL AND ($tid IS NULL OR n.tenant_id IS NULL OR n.tenant_id = $tid) "
+    "RETURN n.uid AS uid, n.title AS title, labels(n) AS labels, n.static_weight AS sw, n.dynamic_weight AS dw"
+)
+SNAPSHOT_EDGES_QUERY = (
+    "MATCH (a)-[r:CONTAINS|PREREQ|USES_SKILL|LINKED|TARGETS|HAS_SKILL]->(b) "
+    "WHERE a.uid IS NOT NULL AND b.uid IS NOT NULL "
+    "AND ($tid IS NULL OR ((a.tenant_id IS NULL OR a.tenant_id = $tid) AND (b.tenant_id IS NULL OR b.tenant_id = $tid))) "
+    "RETURN a.uid AS a, b.uid AS b, type(r) AS rel, r.weight AS w"
+)
+# seconds before a failed background load of a tenant snapshot is tried again
+LOAD_RETRY_SEC = 30.0
+
+_NAN = float("nan")
+
+
+def _as_float(x) -> float:
+    try:
+        return float(x)
+    except (TypeError, ValueError):
+        return _NAN
+
+
+class CSR:
+    """Compressed sparse row adjacency: targets of node i are targets[offsets[i]:offsets[i+1]]."""
+    __slots__ = ("offsets", "targets", "weights")
+
+    def __init__(self, offsets: array, targets: array, weights: array):
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+
+    @classmethod
+    def build(cls, n: int, src: array, dst: array, w: array) -> "CSR":
+        offsets = array("i", bytes(4 * (n + 1)))
+        for s in src:
+            offsets[s + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+        pos = array("i", offsets)
+        targets = array("i", bytes(4 * len(src)))
+        weights = array("d", bytes(8 * len(src)))
+        for k in range(len(src)):
+            s = src[k]
+            p = pos[s]
+            targets[p] = dst[k]
+            weights[p] = w[k]
+            pos[s] = p + 1
+        return cls(offsets, targets, weights)
+
+    def row(self, i: int) -> memoryview:
+        return memoryview(self.targets)[self.offsets[i]:self.offsets[i + 1]]
+
+    def nbytes(self) -> int:
+        return sum(a.itemsize * len(a) for a in (self.offsets, self.targets, self.weights))
+
+
+class GraphSnapshot:
+    """Immutable, array-backed copy of the curriculum graph for one tenant at one graph_version."""
+
+    def __init__(self, tenant_id: Optional[str], graph_version: int, uids: List[str], titles: List[str], kinds: array, static_weight: array, dynamic_weight: array, out: Dict[str, CSR]):
+        self.tenant_id = tenant_id
+        self.graph_version = graph_version
+        self.uids = uids
+        self.titles = titles
+        self.kinds = kinds
+        self.static_weight = static_weight
+        self.dynamic_weight = dynamic_weight
+        self.out = out
+        self.index: Dict[str, int] = {u: i for i, u in enumerate(uids)}
+        self.built_at = time.time()
+
+    @classmethod
+    def from_rows(cls, nodes: Iterable[Dict], edges: Iterable[Dict], tenant_id: Optional[str] = None, graph_version: int = 0) -> "GraphSnapshot":
+        uids: List[str] = []
+        titles: List[str] = []
+        kinds = array("B")
+        sw = array("d")
+        dw = array("d")
+        index: Dict[str, int] = {}
+        kind_code = {k: i for i, k in enumerate(NODE_KINDS)}
+        for n in nodes:
+            uid = n.get("uid")
+            if not uid or uid in index:
+                continue
+            code = next((kind_code[l] for l in (n.get("labels") or []) if l in kind_code), None)
+            if code is None:
+                continue
+            index[uid] = len(uids)
+            uids.append(sys.intern(str(uid)))
+            titles.append(sys.intern(str(n.get("title") or "")))
+            kinds.append(code)
+            sw.append(_as_float(n.get("sw")))
+            dw.append(_as_float(n.get("dw")))
+        per_rel = {r: (array("i"), array("i"), array("d")) for r in REL_TYPES}
+        for e in edges:
+            rel = e.get("rel")
+            a = index.get(e.get("a"))
+            b = index.get(e.get("b"))
+            if rel not in per_rel or a is None or b is None:
+                continue
+            src, dst, w = per_rel[rel]
+            src.append(a)
+            dst.append(b)
+            wf = _as_float(e.get("w"))
+            w.append(1.0 if math.isnan(wf) else wf)
+        n = len(uids)
+        out = {r: CSR.build(n, s, d, w) for r, (s, d, w) in per_rel.items()}
+        return cls(tenant_id, graph_version, uids, titles, kinds, sw, dw, out)
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+    def edge_count(self) -> int:
+        return sum(len(c.targets) for c in self.out.values())
+
+    def nbytes(self) -> int:
+        arrays = sum(c.nbytes() for c in self.out.values())
+        arrays += sum(a.itemsize * len(a) for a in (self.kinds, self.static_weight, self.dynamic_weight))
+        return arrays
+
+    def subject_topics(self, subject_uid: Optional[str]) -> List[int]:
+        topic_code = NODE_KINDS.index("Topic")
+        if not subject_uid:
+            return [i for i in range(len(self.uids)) if self.kinds[i] == topic_code]
+        s = self.index.get(subject_uid)
+        if s is None:
+            return []
+        out: List[int] = []
+        contains = self.out["CONTAINS"]
+        for sec in contains.row(s):
+            for t in contains.row(sec):
+                if self.kinds[t] == topic_code:
+                    out.append(t)
+        return out
+
+    def topic_rows(self, subject_uid: Optional[str]) -> List[Dict]:
+        """Rows shaped like roadmap_planner's PLAN_ROUTE_* queries: {uid, title, prereqs}."""
+        prereq = self.out["PREREQ"]
+        return [
+            {"uid": self.uids[t], "title": self.titles[t], "prereqs": [self.uids[p] for p in prereq.row(t)]}
+            for t in self.subject_topics(subject_uid)
+        ]
+
+
+_snapshots: Dict[str, GraphSnapshot] = {}
+_load_lock = threading.Lock()
+# keys with a background load in flight, and when the last one failed
+_pending: Dict[str, float] = {}
+_failed_at: Dict[str, float] = {}
+_pending_lock = threading.Lock()
+
+
+def _key(tenant_id: Optional[str]) -> str:
+    return tenant_id or ""
+
+
+def current_snapshot(tenant_id: Optional[str] = None) -> Optional[GraphSnapshot]:
+    """Loaded snapshot for the tenant, or None. Never loads on the request path: a missing one is loaded in the background."""
+    if not settings.graph_snapshot_enabled:
+        return None
+    snap = _snapshots.get(_key(tenant_id))
+    if snap is None:
+        _schedule_load(tenant_id)
+    return snap
+
+
+def _schedule_load(tenant_id: Optional[str]) -> None:
+    key = _key(tenant_id)
+    now = time.time()
+    with _pending_lock:
+        if key in _pending or now - _failed_at.get(key, 0.0) < LOAD_RETRY_SEC:
+            return
+        _pending[key] = now
+    threading.Thread(target=_background_load, args=(tenant_id,), name=f"graph-snapshot-{key or 'shared'}", daemon=True).start()
+
+
+def _background_load(tenant_id: Optional[str]) -> None:
+    key = _key(tenant_id)
+    try:
+        if key not in _snapshots:
+            refresh_snapshot(tenant_id)
+        _failed_at.pop(key, None)
+    except Exception as e:
+        _failed_at[key] = time.time()
+        logger.warning("graph_snapshot_load_failed", tenant_id=key, error=str(e))
+    finally:
+        with _pending_lock:
+            _pending.pop(key, None)
+
+
+def _tenant_graph_version(tenant_id: Optional[str]) -> int:
+    if not tenant_id:
+        return 0
+    try:
+        from src.db.pg import get_graph_version
+        return get_graph_version(tenant_id)
+    except Exception:
+        return 0
+
+
+def load_snapshot(tenant_id: Optional[str] = None, graph_version: Optional[int] = None) -> GraphSnapshot:
+    version = _tenant_graph_version(tenant_id) if graph_version is None else int(graph_version)
+    repo = Neo4jRepo()
+    t0 = time.time()
+    nodes = repo.read(SNAPSHOT_NODES_QUERY, {"tid": tenant_id})
+    edges = repo.read(SNAPSHOT_EDGES_QUERY, {"tid": tenant_id})
+    repo.close()
+    snap = GraphSnapshot.from_rows(nodes, edges, tenant_id=tenant_id, graph_version=version)
+    logger.info("graph_snapshot_loaded", tenant_id=tenant_id or "", graph_version=version, nodes=len(snap), edges=snap.edge_count(), bytes=snap.nbytes(), ms=int((time.time() - t0) * 1000))
+    return snap
+
+
+def refresh_snapshot(tenant_id: Optional[str] = None, graph_version: Optional[int] = None) -> GraphSnapshot:
+    """Rebuild and atomically swap the tenant snapshot unless it is already at graph_version."""
+    key = _key(tenant_id)
+    with _load_lock:
+        cur = _snapshots.get(key)
+        if cur is not None and graph_version is not None and tenant_id and cur.graph_version >= int(graph_version):
+            return cur
+        snap = load_snapshot(tenant_id, graph_version)
+        _snapshots[key] = snap
+        return snap
+
+
+def on_graph_committed(event: Dict) -> None:
+    tenant_id = event.get("tenant_id")
+    version = event.get("graph_version")
+    if tenant_id:
+        # the shared (tenant-less) view holds every tenant's nodes; it is dropped rather than reloaded on each commit
+        # and comes back in the background on its next use
+        _snapshots.pop("", None)
+        keys = [tenant_id] if tenant_id in _snapshots else []
+    else:
+        # KB rebuild: every loaded view is stale
+        keys = list(_snapshots.keys())
+    for key in keys:
+        try:
+            refresh_snapshot(key or None, version if key else None)
+        except Exception as e:
+            logger.warning("graph_snapshot_refresh_failed", tenant_id=key, error=str(e))
+
+
+async def listen_graph_committed() -> None:
+    """Refreshes in-memory graph views (snapshots, PREREQ reachability and order, question index) on commit/rebuild broadcasts."""
+    from redis.asyncio import Redis
+    from src.events.publisher import GRAPH_COMMITTED_CHANNEL
+    from src.services.graph import prereq_order, reachability
+    from src.services import questions
+    handlers = (on_graph_committed, reachability.on_graph_committed, questions.on_graph_committed, prereq_order.on_graph_committed)
+    while True:
+        try:
+            r = Redis.from_url(str(settings.redis_url))
+            pubsub = r.pubsub()
+            await pubsub.subscribe(GRAPH_COMMITTED_CHANNEL)
+            async for msg in pubsub.listen():
+                if msg.get("type") != "message":
+                    continue
+                try:
+                    ev = json.loads(msg.get("data") or "{}")
+                except Exception:
+                    continue
+                for handler in handlers:
+                    # one failing view must not leave the others stale or drop the subscription
+                    try:
+                        await asyncio.to_thread(handler, ev)
+                    except Exception as e:
+                        logger.warning("graph_committed_handler_failed", handler=f"{handler.__module__}.{handler.__name__}", error=str(e))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("graph_snapshot_listener_error", error=str(e))
+            await asyncio.sleep(5.0)
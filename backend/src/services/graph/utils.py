@@ -1,11 +1,18 @@
 import os
 import json
-from typing import Dict, List
+import hashlib
+from collections import deque
+from typing import Dict, List, NamedTuple, Tuple
+import numpy as np
 from neo4j import GraphDatabase
 from src.config.settings import settings
 from src.services.graph.neo4j_repo import Neo4jRepo, get_driver
+from src.services.graph.neo4j_async_repo import AsyncNeo4jRepo
+from src.services.graph.bulk_writer import BulkWriter, BulkPhase, ProgressFn, BULK_MAX_CHUNK
+from src.services.graph.scc import find_cycles
 from src.services.kb.jsonl_io import load_jsonl, get_path
 from src.services.kb.jsonl_io import normalize_skill_topics_to_topic_skills
+from src.services.kb.search_index import search_kb_titles
 
 def compute_user_weight(base_weight: float, score: float) -> float:
     delta = (50.0 - float(score)) / 100.0
@@ -48,6 +55,9 @@ def knowledge_level_from_weight(weight: float) -> str:
         return "medium"
     return "high"
 
+CONTENT_FULLTEXT_INDEX = "content_fulltext_idx"
+SEARCH_LABELS = ("Subject", "Section", "Topic", "Skill", "Method", "Example", "Error", "ContentUnit", "Goal", "Objective")
+
 def ensure_constraints(session):
     session.run("CREATE CONSTRAINT subject_uid_unique IF NOT EXISTS FOR (n:Subject) REQUIRE n.uid IS UNIQUE")
     session.run("CREATE CONSTRAINT section_uid_unique IF NOT EXISTS FOR (n:Section) REQUIRE n.uid IS UNIQUE")
@@ -69,6 +79,7 @@ def ensure_constraints(session):
     session.run("CREATE CONSTRAINT skill_title_scope_unique IF NOT EXISTS FOR (n:Skill) REQUIRE (n.subject_uid, n.title) IS UNIQUE")
     session.run("CREATE INDEX example_title_idx IF NOT EXISTS FOR (n:Example) ON (n.title)")
     session.run("CREATE INDEX example_difficulty_idx IF NOT EXISTS FOR (n:Example) ON (n.difficulty)")
+    session.run("CREATE FULLTEXT INDEX " + CONTENT_FULLTEXT_INDEX + " IF NOT EXISTS FOR (n:" + "|".join(SEARCH_LABELS) + ") ON EACH [n.title, n.definition, n.description]")
 
 def ensure_weight_defaults(session):
     session.run("MATCH (t:Topic) WHERE t.static_weight IS NULL SET t.static_weight = 0.5")
@@ -82,8 +93,68 @@ def ensure_weight_defaults_repo(repo: Neo4jRepo):
     repo.write("MATCH (s:Skill) WHERE s.static_weight IS NULL SET s.static_weight = 0.5")
     repo.write("MATCH (s:Skill) WHERE s.dynamic_weight IS NULL SET s.dynamic_weight = s.static_weight")
 
+# Topic/Skill writers (sync, commit) set weight defaults themselves; this one-off backfill covers nodes written before that
+WEIGHT_DEFAULTS_MIGRATION = "weight_defaults_v1"
+_applied_migrations: set = set()
 
-def sync_from_jsonl() -> Dict:
+def ensure_weight_defaults_migrated(repo: Neo4jRepo) -> bool:
+    """Runs the weight-defaults backfill once per database, recorded as a (:GraphMigration) marker node."""
+    if WEIGHT_DEFAULTS_MIGRATION in _applied_migrations:
+        return False
+    rows = repo.read("MATCH (m:GraphMigration {id:$id}) RETURN m.id AS id", {"id": WEIGHT_DEFAULTS_MIGRATION})
+    applied = False
+    if not rows:
+        ensure_weight_defaults_repo(repo)
+        repo.write("MERGE (m:GraphMigration {id:$id}) SET m.applied_at = datetime()", {"id": WEIGHT_DEFAULTS_MIGRATION})
+        applied = True
+    _applied_migrations.add(WEIGHT_DEFAULTS_MIGRATION)
+    return applied
+
+
+WEIGHT_DEFAULTS_SET = "n.static_weight=COALESCE(n.static_weight,0.5), n.dynamic_weight=COALESCE(n.dynamic_weight,n.static_weight,0.5)"
+SYNC_MANIFEST_FILE = 'sync_manifest.json'
+SYNC_MODES = ('full', 'incremental')
+
+class SyncSpec(NamedTuple):
+    name: str
+    rows: List[Dict]
+    fields: Tuple[str, ...]
+    key: Tuple[str, ...]
+    upserts: Tuple[str, ...]
+    delete: str | None = None
+
+def _stable_hash(text: str) -> int:
+    return int(hashlib.md5(text.encode('utf-8')).hexdigest()[:12], 16)
+
+def _row_hash(row: Dict) -> str:
+    return hashlib.sha1(json.dumps(row, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()[:16]
+
+def _spec_key(spec: SyncSpec, row: Dict) -> str:
+    return '|'.join(str(row.get(f)) for f in spec.key)
+
+def _key_row(spec: SyncSpec, key: str) -> Dict:
+    parts = key.split('|', len(spec.key) - 1)
+    return {'k%d' % i: v for i, v in enumerate(parts)}
+
+def load_sync_manifest() -> Dict[str, Dict[str, str]]:
+    path = get_path(SYNC_MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('specs', {}) if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+def save_sync_manifest(specs: Dict[str, Dict[str, str]]) -> None:
+    path = get_path(SYNC_MANIFEST_FILE)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'version': 1, 'specs': specs}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def build_sync_specs() -> Tuple[List[SyncSpec], Dict]:
     subjects = load_jsonl(get_path('subjects.jsonl'))
     sections = load_jsonl(get_path('sections.jsonl'))
     topics = load_jsonl(get_path('topics.jsonl'))
@@ -96,21 +167,7 @@ def sync_from_jsonl() -> Dict:
     topic_objectives = load_jsonl(get_path('topic_objectives.jsonl'))
     topic_prereqs = load_jsonl(get_path('topic_prereqs.jsonl'))
     content_units = load_jsonl(get_path('content_units.jsonl'))
-    repo = Neo4jRepo()
-    with repo.driver.session() as session:
-        ensure_constraints(session)
-    ensure_weight_defaults_repo(repo)
-    repo.write_unwind("UNWIND $rows AS r MERGE (n:Subject {uid:r.uid}) SET n.title=r.title, n.description=COALESCE(r.description,'')", subjects, 500)
-    repo.write_unwind("UNWIND $rows AS r MERGE (n:Section {uid:r.uid}) SET n.title=r.title, n.description=COALESCE(r.description,'')", sections, 500)
-    repo.write_unwind("UNWIND $rows AS r MERGE (n:Topic {uid:r.uid}) SET n.title=r.title, n.description=COALESCE(r.description,'')", topics, 500)
-    repo.write_unwind("UNWIND $rows AS r MERGE (n:Skill {uid:r.uid}) SET n.title=r.title, n.definition=COALESCE(r.definition,'')", skills, 500)
-    repo.write_unwind("UNWIND $rows AS r MERGE (n:Method {uid:r.uid}) SET n.title=r.title, n.method_text=COALESCE(r.method_text,''), n.applicability_types=COALESCE(r.applicability_types,[])", methods, 500)
-    unit_rows = [{"uid": (u.get("uid") or f"UNIT-{u.get('topic_uid')}-{abs(hash((u.get('type') or '')+(u.get('branch') or '')))%100000}"), "topic_uid": u.get("topic_uid"), "branch": u.get("branch"), "type": u.get("type"), "payload": json.dumps(u.get("payload", {}), ensure_ascii=False), "complexity": float(u.get("complexity", 0.0) or 0.0)} for u in content_units if u.get("topic_uid")]
-    repo.write_unwind("UNWIND $rows AS r MERGE (n:ContentUnit {uid:r.uid}) SET n.branch=r.branch, n.type=r.type, n.payload=r.payload, n.complexity=r.complexity", unit_rows, 500)
-    repo.write_unwind("UNWIND $rows AS r MATCH (a:Subject {uid:r.subject_uid}), (b:Section {uid:r.uid}) MERGE (a)-[:CONTAINS]->(b)", [sec for sec in sections if sec.get('subject_uid')], 500)
-    repo.write_unwind("UNWIND $rows AS r MATCH (a:Section {uid:r.section_uid}), (b:Topic {uid:r.uid}) MERGE (a)-[:CONTAINS]->(b)", [t for t in topics if t.get('section_uid')], 500)
-    repo.write_unwind("UNWIND $rows AS r MATCH (a:Subject {uid:r.subject_uid}), (b:Skill {uid:r.uid}) MERGE (a)-[:HAS_SKILL]->(b)", [sk for sk in skills if sk.get('subject_uid')], 500)
-    repo.write_unwind("UNWIND $rows AS r MATCH (t:Topic {uid:r.topic_uid}), (s:Skill {uid:r.skill_uid}) MERGE (t)-[rel:USES_SKILL]->(s) SET rel.weight=COALESCE(r.weight,'linked'), rel.confidence=COALESCE(r.confidence,0.9)", [ts for ts in topic_skills if ts.get('topic_uid') and ts.get('skill_uid')], 500)
+    unit_rows = [{"uid": (u.get("uid") or f"UNIT-{u.get('topic_uid')}-{_stable_hash((u.get('type') or '')+(u.get('branch') or ''))%100000}"), "topic_uid": u.get("topic_uid"), "branch": u.get("branch"), "type": u.get("type"), "payload": json.dumps(u.get("payload", {}), ensure_ascii=False), "complexity": float(u.get("complexity", 0.0) or 0.0)} for u in content_units if u.get("topic_uid")]
     pr_rows = []
     for pr in topic_prereqs:
         tu = pr.get('topic_uid') or pr.get('target_uid')
@@ -118,19 +175,121 @@ def sync_from_jsonl() -> Dict:
         if not tu or not pu:
             continue
         pr_rows.append({'topic_uid': tu, 'prereq_uid': pu, 'weight': pr.get('weight', 1.0), 'confidence': pr.get('confidence', 0.9)})
-    repo.write_unwind("UNWIND $rows AS r MATCH (t:Topic {uid:r.topic_uid}), (p:Topic {uid:r.prereq_uid}) MERGE (t)-[rel:PREREQ]->(p) SET rel.weight=COALESCE(r.weight,1.0), rel.confidence=COALESCE(r.confidence,0.9)", pr_rows, 500)
-    repo.write_unwind("UNWIND $rows AS r MATCH (t:Topic {uid:r.topic_uid}), (u:ContentUnit {uid:r.uid}) WHERE r.branch='learning' MERGE (t)-[:HAS_LEARNING_PATH]->(u)", unit_rows, 500)
-    repo.write_unwind("UNWIND $rows AS r MATCH (t:Topic {uid:r.topic_uid}), (u:ContentUnit {uid:r.uid}) WHERE r.branch='consolidation' MERGE (t)-[:HAS_PRACTICE_PATH]->(u)", unit_rows, 500)
-    repo.write_unwind("UNWIND $rows AS r MATCH (t:Topic {uid:r.topic_uid}), (u:ContentUnit {uid:r.uid}) WHERE r.branch='repetition' MERGE (t)-[:HAS_MASTERY_PATH]->(u)", unit_rows, 500)
-    repo.write_unwind("UNWIND $rows AS r MATCH (a:Skill {uid:r.skill_uid}), (b:Method {uid:r.method_uid}) MERGE (a)-[rel:LINKED]->(b) SET rel.weight=COALESCE(r.weight,'linked'), rel.confidence=COALESCE(r.confidence,0.9)", [sm for sm in skill_methods if sm.get('skill_uid') and sm.get('method_uid')], 500)
-    goals_rows = [{"uid": g.get('uid') or f"GOAL-{g.get('topic_uid')}-{abs(hash(g.get('title','')))%100000}", "title": g.get('title'), "topic_uid": g.get('topic_uid')} for g in topic_goals]
-    repo.write_unwind("UNWIND $rows AS r MERGE (n:Goal {uid:r.uid}) SET n.title=r.title", goals_rows, 500)
-    repo.write_unwind("UNWIND $rows AS r MATCH (a:Topic {uid:r.topic_uid}), (b:Goal {uid:r.uid}) MERGE (a)-[:TARGETS]->(b)", [g for g in goals_rows if g.get('topic_uid')], 500)
-    objs_rows = [{"uid": o.get('uid') or f"OBJ-{o.get('topic_uid')}-{abs(hash(o.get('title','')))%100000}", "title": o.get('title'), "topic_uid": o.get('topic_uid')} for o in topic_objectives]
-    repo.write_unwind("UNWIND $rows AS r MERGE (n:Objective {uid:r.uid}) SET n.title=r.title", objs_rows, 500)
-    repo.write_unwind("UNWIND $rows AS r MATCH (a:Topic {uid:r.topic_uid}), (b:Objective {uid:r.uid}) MERGE (a)-[:TARGETS]->(b)", [o for o in objs_rows if o.get('topic_uid')], 500)
+    goals_rows = [{"uid": g.get('uid') or f"GOAL-{g.get('topic_uid')}-{_stable_hash(g.get('title',''))%100000}", "title": g.get('title'), "topic_uid": g.get('topic_uid')} for g in topic_goals]
+    objs_rows = [{"uid": o.get('uid') or f"OBJ-{o.get('topic_uid')}-{_stable_hash(o.get('title',''))%100000}", "title": o.get('title'), "topic_uid": o.get('topic_uid')} for o in topic_objectives]
+    specs = [
+        SyncSpec('subjects', subjects, ('uid', 'title', 'description'), ('uid',), ("UNWIND $rows AS r MERGE (n:Subject {uid:r.uid}) SET n.title=r.title, n.description=COALESCE(r.description,'')",)),
+        SyncSpec('sections', sections, ('uid', 'title', 'description'), ('uid',), ("UNWIND $rows AS r MERGE (n:Section {uid:r.uid}) SET n.title=r.title, n.description=COALESCE(r.description,'')",)),
+        SyncSpec('topics', topics, ('uid', 'title', 'description'), ('uid',), ("UNWIND $rows AS r MERGE (n:Topic {uid:r.uid}) SET n.title=r.title, n.description=COALESCE(r.description,''), " + WEIGHT_DEFAULTS_SET,)),
+        SyncSpec('skills', skills, ('uid', 'title', 'definition'), ('uid',), ("UNWIND $rows AS r MERGE (n:Skill {uid:r.uid}) SET n.title=r.title, n.definition=COALESCE(r.definition,''), " + WEIGHT_DEFAULTS_SET,)),
+        SyncSpec('methods', methods, ('uid', 'title', 'method_text', 'applicability_types'), ('uid',), ("UNWIND $rows AS r MERGE (n:Method {uid:r.uid}) SET n.title=r.title, n.method_text=COALESCE(r.method_text,''), n.applicability_types=COALESCE(r.applicability_types,[])",)),
+        SyncSpec('content_units', unit_rows, ('uid', 'branch', 'type', 'payload', 'complexity'), ('uid',), ("UNWIND $rows AS r MERGE (n:ContentUnit {uid:r.uid}) SET n.branch=r.branch, n.type=r.type, n.payload=r.payload, n.complexity=r.complexity",)),
+        SyncSpec('subject_sections', [sec for sec in sections if sec.get('subject_uid')], ('subject_uid', 'uid'), ('subject_uid', 'uid'),
+                 ("UNWIND $rows AS r MATCH (a:Subject {uid:r.subject_uid}), (b:Section {uid:r.uid}) MERGE (a)-[:CONTAINS]->(b)",),
+                 "UNWIND $rows AS r MATCH (:Subject {uid:r.k0})-[rel:CONTAINS]->(:Section {uid:r.k1}) DELETE rel"),
+        SyncSpec('section_topics', [t for t in topics if t.get('section_uid')], ('section_uid', 'uid'), ('section_uid', 'uid'),
+                 ("UNWIND $rows AS r MATCH (a:Section {uid:r.section_uid}), (b:Topic {uid:r.uid}) MERGE (a)-[:CONTAINS]->(b)",),
+                 "UNWIND $rows AS r MATCH (:Section {uid:r.k0})-[rel:CONTAINS]->(:Topic {uid:r.k1}) DELETE rel"),
+        SyncSpec('subject_skills', [sk for sk in skills if sk.get('subject_uid')], ('subject_uid', 'uid'), ('subject_uid', 'uid'),
+                 ("UNWIND $rows AS r MATCH (a:Subject {uid:r.subject_uid}), (b:Skill {uid:r.uid}) MERGE (a)-[:HAS_SKILL]->(b)",),
+                 "UNWIND $rows AS r MATCH (:Subject {uid:r.k0})-[rel:HAS_SKILL]->(:Skill {uid:r.k1}) DELETE rel"),
+        SyncSpec('topic_skills', [ts for ts in topic_skills if ts.get('topic_uid') and ts.get('skill_uid')], ('topic_uid', 'skill_uid', 'weight', 'confidence'), ('topic_uid', 'skill_uid'),
+                 ("UNWIND $rows AS r MATCH (t:Topic {uid:r.topic_uid}), (s:Skill {uid:r.skill_uid}) MERGE (t)-[rel:USES_SKILL]->(s) SET rel.weight=COALESCE(r.weight,'linked'), rel.confidence=COALESCE(r.confidence,0.9)",),
+                 "UNWIND $rows AS r MATCH (:Topic {uid:r.k0})-[rel:USES_SKILL]->(:Skill {uid:r.k1}) DELETE rel"),
+        SyncSpec('topic_prereqs', pr_rows, ('topic_uid', 'prereq_uid', 'weight', 'confidence'), ('topic_uid', 'prereq_uid'),
+                 ("UNWIND $rows AS r MATCH (t:Topic {uid:r.topic_uid}), (p:Topic {uid:r.prereq_uid}) MERGE (t)-[rel:PREREQ]->(p) SET rel.weight=COALESCE(r.weight,1.0), rel.confidence=COALESCE(r.confidence,0.9)",),
+                 "UNWIND $rows AS r MATCH (:Topic {uid:r.k0})-[rel:PREREQ]->(:Topic {uid:r.k1}) DELETE rel"),
+        SyncSpec('content_unit_paths', unit_rows, ('topic_uid', 'uid', 'branch'), ('topic_uid', 'uid'), (
+                 "UNWIND $rows AS r MATCH (t:Topic {uid:r.topic_uid}), (u:ContentUnit {uid:r.uid}) WHERE r.branch='learning' MERGE (t)-[:HAS_LEARNING_PATH]->(u)",
+                 "UNWIND $rows AS r MATCH (t:Topic {uid:r.topic_uid}), (u:ContentUnit {uid:r.uid}) WHERE r.branch='consolidation' MERGE (t)-[:HAS_PRACTICE_PATH]->(u)",
+                 "UNWIND $rows AS r MATCH (t:Topic {uid:r.topic_uid}), (u:ContentUnit {uid:r.uid}) WHERE r.branch='repetition' MERGE (t)-[:HAS_MASTERY_PATH]->(u)"),
+                 "UNWIND $rows AS r MATCH (:Topic {uid:r.k0})-[rel:HAS_LEARNING_PATH|HAS_PRACTICE_PATH|HAS_MASTERY_PATH]->(:ContentUnit {uid:r.k1}) DELETE rel"),
+        SyncSpec('skill_methods', [sm for sm in skill_methods if sm.get('skill_uid') and sm.get('method_uid')], ('skill_uid', 'method_uid', 'weight', 'confidence'), ('skill_uid', 'method_uid'),
+                 ("UNWIND $rows AS r MATCH (a:Skill {uid:r.skill_uid}), (b:Method {uid:r.method_uid}) MERGE (a)-[rel:LINKED]->(b) SET rel.weight=COALESCE(r.weight,'linked'), rel.confidence=COALESCE(r.confidence,0.9)",),
+                 "UNWIND $rows AS r MATCH (:Skill {uid:r.k0})-[rel:LINKED]->(:Method {uid:r.k1}) DELETE rel"),
+        SyncSpec('goals', goals_rows, ('uid', 'title'), ('uid',), ("UNWIND $rows AS r MERGE (n:Goal {uid:r.uid}) SET n.title=r.title",)),
+        SyncSpec('goal_targets', [g for g in goals_rows if g.get('topic_uid')], ('topic_uid', 'uid'), ('topic_uid', 'uid'),
+                 ("UNWIND $rows AS r MATCH (a:Topic {uid:r.topic_uid}), (b:Goal {uid:r.uid}) MERGE (a)-[:TARGETS]->(b)",),
+                 "UNWIND $rows AS r MATCH (:Topic {uid:r.k0})-[rel:TARGETS]->(:Goal {uid:r.k1}) DELETE rel"),
+        SyncSpec('objectives', objs_rows, ('uid', 'title'), ('uid',), ("UNWIND $rows AS r MERGE (n:Objective {uid:r.uid}) SET n.title=r.title",)),
+        SyncSpec('objective_targets', [o for o in objs_rows if o.get('topic_uid')], ('topic_uid', 'uid'), ('topic_uid', 'uid'),
+                 ("UNWIND $rows AS r MATCH (a:Topic {uid:r.topic_uid}), (b:Objective {uid:r.uid}) MERGE (a)-[:TARGETS]->(b)",),
+                 "UNWIND $rows AS r MATCH (:Topic {uid:r.k0})-[rel:TARGETS]->(:Objective {uid:r.k1}) DELETE rel"),
+    ]
+    stats = {'subjects': len(subjects), 'sections': len(sections), 'topics': len(topics), 'skills': len(skills), 'methods': len(methods), 'topic_skills': len(topic_skills), 'skill_methods': len(skill_methods), 'goals': len(topic_goals), 'objectives': len(topic_objectives), 'prereqs': len(topic_prereqs), 'content_units': len(content_units)}
+    return specs, stats
+
+def diff_sync_spec(spec: SyncSpec, previous: Dict[str, str]) -> Tuple[List[Dict], List[Dict], Dict[str, str], int]:
+    """Returns (rows to upsert, key rows to delete, new manifest entries, unchanged count)."""
+    current: Dict[str, str] = {}
+    upserts: List[Dict] = []
+    unchanged = 0
+    for r in spec.rows:
+        row = {f: r.get(f) for f in spec.fields}
+        k = _spec_key(spec, row)
+        if k in current:
+            # duplicate key: later row wins, same as repeated MERGE/SET
+            current[k] = _row_hash(row)
+            upserts.append(row)
+            continue
+        h = _row_hash(row)
+        current[k] = h
+        if previous.get(k) == h:
+            unchanged += 1
+        else:
+            upserts.append(row)
+    removed = [_key_row(spec, k) for k in previous if k not in current] if spec.delete else []
+    return upserts, removed, current, unchanged
+
+def sync_from_jsonl(mode: str = 'incremental', progress: ProgressFn | None = None) -> Dict:
+    """Push the JSONL KB into Neo4j. mode=full re-MERGEs every row; mode=incremental only pushes rows whose content hash
+    changed since the last sync (per-file manifest in the KB dir). Both modes delete relationships whose rows disappeared.
+    progress(phase, done, total) is called after every written chunk."""
+    if mode not in SYNC_MODES:
+        raise ValueError(f"mode must be one of {SYNC_MODES}")
+    specs, stats = build_sync_specs()
+    repo = Neo4jRepo()
+    with repo.driver.session() as session:
+        ensure_constraints(session)
+    manifest = load_sync_manifest()
+    if mode == 'incremental' and manifest.get('subjects'):
+        # a wiped or different database would otherwise be treated as already in sync
+        rows = repo.read("MATCH (n:Subject) RETURN count(n) AS c")
+        if not rows or not rows[0]['c']:
+            mode = 'full'
+    plan = []
+    for spec in specs:
+        upserts, removed, current, unchanged = diff_sync_spec(spec, manifest.get(spec.name, {}))
+        if mode == 'full':
+            upserts = [{f: r.get(f) for f in spec.fields} for r in spec.rows]
+            unchanged = 0
+        plan.append((spec, upserts, removed, current, unchanged))
+    new_manifest: Dict[str, Dict[str, str]] = {}
+    upserted = deleted = skipped = 0
+    phases: List[BulkPhase] = []
+    for spec, upserts, removed, current, unchanged in plan:
+        is_node = spec.delete is None
+        if is_node:
+            # chunks of a node phase run concurrently, so a uid must not appear in two of them
+            upserts = list({r['uid']: r for r in upserts}.values())
+        for i, q in enumerate(spec.upserts):
+            phases.append(BulkPhase(spec.name if len(spec.upserts) == 1 else f"{spec.name}.{i}", q, upserts, is_node))
+        upserted += len(upserts)
+        skipped += unchanged
+        new_manifest[spec.name] = current
+    for spec, upserts, removed, current, unchanged in plan:
+        if removed:
+            phases.append(BulkPhase(f"{spec.name}.delete", spec.delete, removed))
+            deleted += len(removed)
+    BulkWriter(repo.driver, progress=progress).run(phases)
+    ensure_weight_defaults_migrated(repo)
     repo.close()
-    return {'subjects': len(subjects), 'sections': len(sections), 'topics': len(topics), 'skills': len(skills), 'methods': len(methods), 'topic_skills': len(topic_skills), 'skill_methods': len(skill_methods), 'goals': len(topic_goals), 'objectives': len(topic_objectives), 'prereqs': len(topic_prereqs), 'content_units': len(content_units)}
+    try:
+        save_sync_manifest(new_manifest)
+    except OSError:
+        # without a manifest the next incremental sync simply pushes everything
+        ...
+    return {**stats, 'mode': mode, 'upserted': upserted, 'deleted': deleted, 'skipped': skipped}
 
 def build_graph_from_neo4j(subject_filter: str | None = None) -> Dict:
     repo = Neo4jRepo()
@@ -222,169 +381,286 @@ def analyze_knowledge(subject_uid: str | None = None) -> Dict:
         total_skills = metrics['skills']
         linked_skills = total_skills - len(skills_without_methods)
         metrics['skill_linkage_coverage'] = (linked_skills / total_skills) if total_skills else 0.0
-    driver.close()
     return metrics
 
+def _clamped_weight_shift(var: str) -> str:
+    # evaluated inside SET, so the read happens under the node write lock and concurrent updates do not get lost
+    w = f"coalesce({var}.dynamic_weight, {var}.static_weight, 0.5) + $delta"
+    return f"CASE WHEN {w} < 0.0 THEN 0.0 WHEN {w} > 1.0 THEN 1.0 ELSE {w} END"
+
+UPDATE_TOPIC_DYNAMIC_WEIGHT_QUERY = (
+    "MATCH (t:Topic {uid:$uid}) "
+    "SET t.dynamic_weight = " + _clamped_weight_shift("t") + " "
+    "RETURN t.uid AS uid, t.title AS title, t.static_weight AS static_weight, t.dynamic_weight AS dynamic_weight"
+)
+UPDATE_SKILL_DYNAMIC_WEIGHT_QUERY = (
+    "MATCH (s:Skill {uid:$uid}) "
+    "SET s.dynamic_weight = " + _clamped_weight_shift("s") + " "
+    "WITH s OPTIONAL MATCH (s)-[r:LINKED]->(:Method) "
+    "WITH s, collect(r) AS rels "
+    "FOREACH (r IN rels | SET r.adaptive_weight = s.dynamic_weight) "
+    "RETURN s.uid AS uid, s.title AS title, s.static_weight AS static_weight, s.dynamic_weight AS dynamic_weight"
+)
+
 def update_dynamic_weight(topic_uid: str, score: float) -> Dict:
-    driver = get_driver()
     delta = (50.0 - float(score)) / 100.0
-    with driver.session() as session:
-        ensure_weight_defaults(session)
-        cur = session.run("MATCH (t:Topic {uid:$uid}) RETURN t.uid AS uid, t.title AS title, t.static_weight AS static_weight, t.dynamic_weight AS dynamic_weight", uid=topic_uid).single()
-        if not cur:
-            driver.close()
-            return {'uid': topic_uid, 'title': None, 'static_weight': None, 'dynamic_weight': None}
-        new_dw = cur['dynamic_weight'] + delta
-        if new_dw < 0.0:
-            new_dw = 0.0
-        if new_dw > 1.0:
-            new_dw = 1.0
-        session.run("MATCH (t:Topic {uid:$uid}) SET t.dynamic_weight = $dw", uid=topic_uid, dw=new_dw)
-    driver.close()
-    return {'uid': cur['uid'], 'title': cur['title'], 'static_weight': cur['static_weight'], 'dynamic_weight': new_dw}
+    repo = Neo4jRepo()
+    rows = repo.write_returning(UPDATE_TOPIC_DYNAMIC_WEIGHT_QUERY, {"uid": topic_uid, "delta": delta})
+    repo.close()
+    if not rows:
+        return {'uid': topic_uid, 'title': None, 'static_weight': None, 'dynamic_weight': None}
+    return dict(rows[0])
 
 def update_skill_dynamic_weight(skill_uid: str, score: float) -> Dict:
-    driver = get_driver()
+    """Shifts the skill weight and its LINKED adaptive weights in one statement."""
     delta = (50.0 - float(score)) / 100.0
-    with driver.session() as session:
-        ensure_weight_defaults(session)
-        cur = session.run("MATCH (s:Skill {uid:$uid}) RETURN s.uid AS uid, s.title AS title, s.static_weight AS static_weight, s.dynamic_weight AS dynamic_weight", uid=skill_uid).single()
-        if not cur:
-            driver.close()
-            return {'uid': skill_uid, 'title': None, 'static_weight': None, 'dynamic_weight': None}
-        new_dw = cur['dynamic_weight'] + delta
-        if new_dw < 0.0:
-            new_dw = 0.0
-        if new_dw > 1.0:
-            new_dw = 1.0
-        session.run("MATCH (s:Skill {uid:$uid}) SET s.dynamic_weight = $dw", uid=skill_uid, dw=new_dw)
-    driver.close()
-    recompute_adaptive_for_skill(skill_uid)
-    return {'uid': cur['uid'], 'title': cur['title'], 'static_weight': cur['static_weight'], 'dynamic_weight': new_dw}
+    repo = Neo4jRepo()
+    rows = repo.write_returning(UPDATE_SKILL_DYNAMIC_WEIGHT_QUERY, {"uid": skill_uid, "delta": delta})
+    repo.close()
+    if not rows:
+        return {'uid': skill_uid, 'title': None, 'static_weight': None, 'dynamic_weight': None}
+    return dict(rows[0])
+
+# the no-op SET takes the node write locks up front, so nothing can change the base weights between this read and the write below
+BATCH_WEIGHTS_LOCK_READ_QUERY = (
+    "CALL { "
+    "UNWIND $topics AS uid MATCH (n:Topic {uid:uid}) RETURN n, 'topic' AS kind "
+    "UNION "
+    "UNWIND $skills AS uid MATCH (n:Skill {uid:uid}) RETURN n, 'skill' AS kind "
+    "} "
+    "SET n.dynamic_weight = coalesce(n.dynamic_weight, n.static_weight, 0.5) "
+    "RETURN kind, n.uid AS uid, n.title AS title, coalesce(n.static_weight, 0.5) AS static_weight, n.dynamic_weight AS base_weight"
+)
+BATCH_WEIGHTS_WRITE_QUERY = (
+    "CALL { UNWIND $topics AS r MATCH (t:Topic {uid:r.uid}) SET t.dynamic_weight = r.w RETURN count(t) AS topics } "
+    "CALL { UNWIND $skills AS r MATCH (s:Skill {uid:r.uid}) SET s.dynamic_weight = r.w "
+    "WITH s OPTIONAL MATCH (s)-[l:LINKED]->(:Method) SET l.adaptive_weight = s.dynamic_weight "
+    "RETURN count(DISTINCT s) AS skills, count(l) AS links } "
+    "RETURN topics, skills, links"
+)
+
+def batch_user_weights(base: np.ndarray, scores: np.ndarray, groups: np.ndarray | None = None) -> np.ndarray:
+    """Vectorized compute_user_weight: one clipped shift per group, with the deltas of repeated scores in a group summed."""
+    deltas = (50.0 - np.asarray(scores, dtype=float)) / 100.0
+    base = np.asarray(base, dtype=float)
+    if groups is not None:
+        deltas = np.bincount(groups, weights=deltas, minlength=len(base))
+    return np.clip(base + deltas, 0.0, 1.0)
+
+def _group_scores(items: List[Tuple[str, float]]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    uids: List[str] = []
+    pos: Dict[str, int] = {}
+    groups = np.empty(len(items), dtype=np.int64)
+    scores = np.empty(len(items), dtype=float)
+    for i, (uid, score) in enumerate(items):
+        if uid not in pos:
+            pos[uid] = len(uids)
+            uids.append(uid)
+        groups[i] = pos[uid]
+        scores[i] = float(score)
+    return uids, groups, scores
+
+def update_dynamic_weights_batch(topics: List[Tuple[str, float]], skills: List[Tuple[str, float]]) -> Dict:
+    """Applies a whole quiz result: one locking read of all base weights, one vectorized pass, one write that also refreshes LINKED weights.
+
+    Several scores for the same uid are applied as one combined shift. Unknown uids are reported in not_found.
+    """
+    kinds = {"topic": _group_scores(topics), "skill": _group_scores(skills)}
+
+    def work(tx):
+        found = {(r["kind"], r["uid"]): dict(r) for r in tx.run(BATCH_WEIGHTS_LOCK_READ_QUERY, topics=kinds["topic"][0], skills=kinds["skill"][0])}
+        items: List[Dict] = []
+        writes: Dict[str, List[Dict]] = {"topic": [], "skill": []}
+        not_found: List[Dict] = []
+        for kind, (uids, groups, scores) in kinds.items():
+            if not uids:
+                continue
+            base = np.array([found[(kind, u)]["base_weight"] if (kind, u) in found else np.nan for u in uids], dtype=float)
+            new = batch_user_weights(np.nan_to_num(base, nan=0.5), scores, groups)
+            for i, uid in enumerate(uids):
+                rec = found.get((kind, uid))
+                if rec is None:
+                    not_found.append({"kind": kind, "uid": uid})
+                    continue
+                w = float(new[i])
+                writes[kind].append({"uid": uid, "w": w})
+                items.append({"kind": kind, "uid": uid, "title": rec["title"], "static_weight": rec["static_weight"], "base_weight": float(base[i]), "dynamic_weight": w, "level": knowledge_level_from_weight(w)})
+        counts = tx.run(BATCH_WEIGHTS_WRITE_QUERY, topics=writes["topic"], skills=writes["skill"]).single()
+        return {"items": items, "not_found": not_found, "updated_links": int(counts["links"]) if counts else 0}
+
+    if not topics and not skills:
+        return {"items": [], "not_found": [], "updated_links": 0}
+    repo = Neo4jRepo()
+    try:
+        return repo.write_transaction(work)
+    finally:
+        repo.close()
 
 def get_current_knowledge_level(topic_uid: str) -> Dict:
     repo = Neo4jRepo()
-    ensure_weight_defaults_repo(repo)
-    rows = repo.read("MATCH (t:Topic {uid:$uid}) RETURN t.uid AS uid, t.title AS title, t.static_weight AS static_weight, t.dynamic_weight AS dynamic_weight", {"uid": topic_uid})
+    rows = repo.read("MATCH (t:Topic {uid:$uid}) RETURN t.uid AS uid, t.title AS title, coalesce(t.static_weight, 0.5) AS static_weight, coalesce(t.dynamic_weight, t.static_weight, 0.5) AS dynamic_weight", {"uid": topic_uid})
     repo.close()
     rec = rows[0] if rows else {'uid': topic_uid, 'title': None, 'static_weight': None, 'dynamic_weight': None}
     return {'uid': rec['uid'], 'title': rec['title'], 'static_weight': rec['static_weight'], 'dynamic_weight': rec['dynamic_weight']}
 
 def get_current_skill_level(skill_uid: str) -> Dict:
     repo = Neo4jRepo()
-    ensure_weight_defaults_repo(repo)
-    rows = repo.read("MATCH (s:Skill {uid:$uid}) RETURN s.uid AS uid, s.title AS title, s.static_weight AS static_weight, s.dynamic_weight AS dynamic_weight", {"uid": skill_uid})
+    rows = repo.read("MATCH (s:Skill {uid:$uid}) RETURN s.uid AS uid, s.title AS title, coalesce(s.static_weight, 0.5) AS static_weight, coalesce(s.dynamic_weight, s.static_weight, 0.5) AS dynamic_weight", {"uid": skill_uid})
     repo.close()
     rec = rows[0] if rows else {'uid': skill_uid, 'title': None, 'static_weight': None, 'dynamic_weight': None}
     return {'uid': rec['uid'], 'title': rec['title'], 'static_weight': rec['static_weight'], 'dynamic_weight': rec['dynamic_weight']}
 
+ADAPTIVE_ROADMAP_PROJECTION = (
+    "WITH t ORDER BY coalesce(t.dynamic_weight, t.static_weight, 0.5) DESC LIMIT $limit "
+    "RETURN t.uid AS uid, t.title AS title, coalesce(t.static_weight, 0.5) AS sw, coalesce(t.dynamic_weight, t.static_weight, 0.5) AS dw, "
+    "[(t)-[:USES_SKILL]->(sk:Skill) | {uid: sk.uid, title: sk.title, static_weight: coalesce(sk.static_weight, 0.5), dynamic_weight: coalesce(sk.dynamic_weight, sk.static_weight, 0.5)}] AS skills, "
+    "[(t)-[:USES_SKILL]->(:Skill)-[:LINKED]->(m:Method) | {uid: m.uid, title: m.title}] AS methods"
+)
+ADAPTIVE_ROADMAP_SUBJECT_QUERY = "MATCH (sub:Subject {uid:$su})-[:CONTAINS]->(:Section)-[:CONTAINS]->(t:Topic) " + ADAPTIVE_ROADMAP_PROJECTION
+ADAPTIVE_ROADMAP_ALL_QUERY = "MATCH (t:Topic) " + ADAPTIVE_ROADMAP_PROJECTION
+
+def _distinct_by_uid(items: List[Dict]) -> List[Dict]:
+    seen = set()
+    out: List[Dict] = []
+    for it in items or []:
+        if it.get('uid') in seen:
+            continue
+        seen.add(it.get('uid'))
+        out.append(it)
+    return out
+
 def build_adaptive_roadmap(subject_uid: str | None = None, limit: int = 50) -> List[Dict]:
     repo = Neo4jRepo()
-    ensure_weight_defaults_repo(repo)
     if subject_uid:
-        rows = repo.read("MATCH (sub:Subject {uid:$su})-[:CONTAINS]->(:Section)-[:CONTAINS]->(t:Topic) RETURN t.uid AS uid, t.title AS title, t.static_weight AS sw, t.dynamic_weight AS dw", {"su": subject_uid})
+        rows = repo.read(ADAPTIVE_ROADMAP_SUBJECT_QUERY, {"su": subject_uid, "limit": int(limit)})
     else:
-        rows = repo.read("MATCH (t:Topic) RETURN t.uid AS uid, t.title AS title, t.static_weight AS sw, t.dynamic_weight AS dw")
-    items = [{'uid': r['uid'], 'title': r['title'], 'static_weight': r['sw'], 'dynamic_weight': r['dw']} for r in rows]
-    items.sort(key=lambda x: (x['dynamic_weight'] or 0.0), reverse=True)
-    items = items[:limit]
+        rows = repo.read(ADAPTIVE_ROADMAP_ALL_QUERY, {"limit": int(limit)})
+    repo.close()
+    return adaptive_roadmap_from_rows(rows)
+
+def adaptive_roadmap_from_rows(rows: List[Dict]) -> List[Dict]:
     roadmap: List[Dict] = []
-    for it in items:
+    for r in rows:
+        it = {'uid': r['uid'], 'title': r['title'], 'static_weight': r['sw'], 'dynamic_weight': r['dw']}
         pr = 'high' if (it['dynamic_weight'] or 0.0) >= 0.7 else ('medium' if (it['dynamic_weight'] or 0.0) >= 0.4 else 'low')
-        skills_rows = repo.read("MATCH (t:Topic {uid:$uid})-[:USES_SKILL]->(sk:Skill) RETURN DISTINCT sk.uid AS uid, sk.title AS title, sk.static_weight AS sw, sk.dynamic_weight AS dw", {"uid": it['uid']})
-        skills = [{'uid': r['uid'], 'title': r['title'], 'static_weight': r['sw'], 'dynamic_weight': r['dw']} for r in skills_rows]
-        method_rows = repo.read("MATCH (t:Topic {uid:$uid})-[:USES_SKILL]->(sk:Skill)-[:LINKED]->(m:Method) RETURN DISTINCT m.uid AS uid, m.title AS title", {"uid": it['uid']})
-        methods = [{'uid': r['uid'], 'title': r['title']} for r in method_rows]
-        roadmap.append({'topic': it, 'priority': pr, 'skills': skills, 'methods': methods})
-    repo.close()
+        roadmap.append({'topic': it, 'priority': pr, 'skills': _distinct_by_uid(r.get('skills')), 'methods': _distinct_by_uid(r.get('methods'))})
     return roadmap
 
-def build_user_roadmap_stateless(subject_uid: str | None, user_topic_weights: Dict[str, float], user_skill_weights: Dict[str, float] | None = None, limit: int = 50, penalty_factor: float = 0.15) -> List[Dict]:
-    if not (settings.neo4j_uri and settings.neo4j_user and settings.neo4j_password.get_secret_value()):
-        topics = load_jsonl(get_path('topics.jsonl'))
-        sections = load_jsonl(get_path('sections.jsonl'))
-        subj_by_section = {s.get('uid'): s.get('subject_uid') for s in sections}
-        roadmap: List[Dict] = []
-        for t in topics:
-            sec_uid = t.get('section_uid')
-            subj_uid = subj_by_section.get(sec_uid)
-            if subject_uid and subj_uid != subject_uid:
-                continue
-            tuid = t.get('uid')
-            title = t.get('title') or tuid
-            base_weight = 0.5
-            user_w = float(user_topic_weights.get(tuid, base_weight))
-            effective_weight = max(0.0, min(1.0, user_w))
-            pr = "high" if user_w < 0.3 else ("medium" if user_w < 0.7 else "low")
-            roadmap.append({"topic_uid": tuid, "title": title, "base_weight": base_weight, "user_weight": user_w, "effective_weight": effective_weight, "priority": pr, "prereqs": [], "skills": []})
-        roadmap.sort(key=lambda x: x.get("effective_weight", 0.0), reverse=True)
-        return roadmap[:limit]
-    repo = Neo4jRepo()
-    if subject_uid:
-        rows = repo.read(("MATCH (sub:Subject {uid:$su})-[:CONTAINS]->(:Section)-[:CONTAINS]->(t:Topic) OPTIONAL MATCH (t)-[:PREREQ]->(pre:Topic) RETURN t.uid AS uid, t.title AS title, coalesce(t.static_weight, 0.5) AS sw, coalesce(t.dynamic_weight, t.static_weight, 0.5) AS dw, collect(pre.uid) AS prereqs"), {"su": subject_uid})
+ROADMAP_TOPICS_SUBJECT_QUERY = (
+    "MATCH (sub:Subject {uid:$su})-[:CONTAINS]->(:Section)-[:CONTAINS]->(t:Topic) "
+    "RETURN t.uid AS uid, t.title AS title, coalesce(t.static_weight, 0.5) AS sw, coalesce(t.dynamic_weight, t.static_weight, 0.5) AS dw, "
+    "[(t)-[:PREREQ]->(pre:Topic) | pre.uid] AS prereqs, "
+    "[(t)-[:USES_SKILL]->(sk:Skill) | {uid: sk.uid, title: sk.title, w: coalesce(sk.dynamic_weight, sk.static_weight, 0.5)}] AS skills"
+)
+ROADMAP_TOPICS_ALL_QUERY = (
+    "MATCH (t:Topic) "
+    "RETURN t.uid AS uid, t.title AS title, coalesce(t.static_weight, 0.5) AS sw, coalesce(t.dynamic_weight, t.static_weight, 0.5) AS dw, "
+    "[(t)-[:PREREQ]->(pre:Topic) | pre.uid] AS prereqs, "
+    "[(t)-[:USES_SKILL]->(sk:Skill) | {uid: sk.uid, title: sk.title, w: coalesce(sk.dynamic_weight, sk.static_weight, 0.5)}] AS skills"
+)
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, descending; ties keep input order (same as a stable full sort)."""
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        kth = scores[np.argpartition(-scores, k - 1)[:k]].min()
+        cand = np.flatnonzero(scores >= kth)
     else:
-        rows = repo.read(("MATCH (t:Topic) OPTIONAL MATCH (t)-[:PREREQ]->(pre:Topic) RETURN t.uid AS uid, t.title AS title, coalesce(t.static_weight, 0.5) AS sw, coalesce(t.dynamic_weight, t.static_weight, 0.5) AS dw, collect(pre.uid) AS prereqs"))
-    if not rows:
-        topics = load_jsonl(get_path('topics.jsonl'))
-        sections = load_jsonl(get_path('sections.jsonl'))
-        subj_by_section = {s.get('uid'): s.get('subject_uid') for s in sections}
-        roadmap: List[Dict] = []
-        for t in topics:
-            sec_uid = t.get('section_uid')
-            subj_uid = subj_by_section.get(sec_uid)
-            if subject_uid and subj_uid != subject_uid:
-                continue
-            tuid = t.get('uid')
-            title = t.get('title') or tuid
-            base_weight = 0.5
-            user_w = float(user_topic_weights.get(tuid, base_weight))
-            effective_weight = max(0.0, min(1.0, user_w))
-            pr = "high" if user_w < 0.3 else ("medium" if user_w < 0.7 else "low")
-            roadmap.append({"topic_uid": tuid, "title": title, "base_weight": base_weight, "user_weight": user_w, "effective_weight": effective_weight, "priority": pr, "prereqs": [], "skills": []})
-        repo.close()
-        roadmap.sort(key=lambda x: x.get("effective_weight", 0.0), reverse=True)
-        return roadmap[:limit]
-    topic_index = {r["uid"]: r for r in rows}
-    roadmap: List[Dict] = []
-    for r in rows:
-        tuid = r["uid"]
-        base_weight = float(r["dw"] or r["sw"] or 0.5)
-        user_w = float(user_topic_weights.get(tuid, base_weight))
-        missing = 0
-        for pre_uid in r.get("prereqs", []) or []:
-            pre_base = 0.5
+        cand = np.arange(n)
+    return cand[np.argsort(-scores[cand], kind="stable")][:k]
+
+def score_roadmap_rows(rows: List[Dict], user_topic_weights: Dict[str, float], penalty_factor: float = 0.15):
+    """Vectorized roadmap scoring: returns (user_weight, effective_weight, base_weight) arrays aligned with rows."""
+    n = len(rows)
+    idx = {r["uid"]: i for i, r in enumerate(rows)}
+    base = np.fromiter((float(r["dw"] or r["sw"] or 0.5) for r in rows), dtype=np.float64, count=n)
+    user_w = np.fromiter((float(user_topic_weights.get(r["uid"], b)) for r, b in zip(rows, base)), dtype=np.float64, count=n)
+    # weight of a topic when it is someone's prereq: user weight if known, else the graph weight
+    as_prereq = np.fromiter(
+        (float(user_topic_weights[r["uid"]]) if r["uid"] in user_topic_weights else float(r["dw"] or 0.5) for r in rows),
+        dtype=np.float64, count=n,
+    )
+    src: List[int] = []
+    pre_w: List[float] = []
+    for i, r in enumerate(rows):
+        for pre_uid in r.get("prereqs") or []:
+            src.append(i)
+            j = idx.get(pre_uid)
             if pre_uid in user_topic_weights:
-                pre_w = float(user_topic_weights.get(pre_uid, pre_base))
+                pre_w.append(float(user_topic_weights[pre_uid]))
+            elif j is not None:
+                pre_w.append(as_prereq[j])
             else:
-                pre_row = topic_index.get(pre_uid)
-                pre_w = float((pre_row.get("dw") if pre_row else pre_base) or pre_base)
-            if pre_w <= 0.3:
-                missing += 1
-        effective_weight = max(0.0, user_w - penalty_factor * missing)
-        pr = "high" if user_w < 0.3 else ("medium" if user_w < 0.7 else "low")
-        skills_rows = repo.read("MATCH (t:Topic {uid:$uid})-[:USES_SKILL]->(sk:Skill) RETURN DISTINCT sk.uid AS uid, sk.title AS title, coalesce(sk.dynamic_weight, sk.static_weight, 0.5) AS w", {"uid": tuid})
+                pre_w.append(0.5)
+    missing = np.bincount(np.asarray(src, dtype=np.int64), weights=(np.asarray(pre_w, dtype=np.float64) <= 0.3), minlength=n) if src else np.zeros(n)
+    effective = np.maximum(0.0, user_w - penalty_factor * missing)
+    return user_w, effective, base
+
+def _priority(user_w: float) -> str:
+    return "high" if user_w < 0.3 else ("medium" if user_w < 0.7 else "low")
+
+def _roadmap_from_jsonl(subject_uid: str | None, user_topic_weights: Dict[str, float], limit: int) -> List[Dict]:
+    topics = load_jsonl(get_path('topics.jsonl'))
+    sections = load_jsonl(get_path('sections.jsonl'))
+    subj_by_section = {s.get('uid'): s.get('subject_uid') for s in sections}
+    roadmap: List[Dict] = []
+    for t in topics:
+        sec_uid = t.get('section_uid')
+        subj_uid = subj_by_section.get(sec_uid)
+        if subject_uid and subj_uid != subject_uid:
+            continue
+        tuid = t.get('uid')
+        title = t.get('title') or tuid
+        base_weight = 0.5
+        user_w = float(user_topic_weights.get(tuid, base_weight))
+        effective_weight = max(0.0, min(1.0, user_w))
+        roadmap.append({"topic_uid": tuid, "title": title, "base_weight": base_weight, "user_weight": user_w, "effective_weight": effective_weight, "priority": _priority(user_w), "prereqs": [], "skills": []})
+    scores = np.fromiter((x["effective_weight"] for x in roadmap), dtype=np.float64, count=len(roadmap))
+    return [roadmap[i] for i in top_k_indices(scores, limit)]
+
+def roadmap_from_rows(rows: List[Dict], user_topic_weights: Dict[str, float], user_skill_weights: Dict[str, float] | None = None, limit: int = 50, penalty_factor: float = 0.15) -> List[Dict]:
+    user_w, effective, base = score_roadmap_rows(rows, user_topic_weights, penalty_factor)
+    roadmap: List[Dict] = []
+    for i in top_k_indices(effective, limit):
+        r = rows[i]
         skills = []
-        for s in skills_rows:
+        seen = set()
+        for s in r.get("skills") or []:
             suid = s["uid"]
+            if suid in seen:
+                continue
+            seen.add(suid)
             bw = float(s["w"] or 0.5)
             uw = float((user_skill_weights or {}).get(suid, bw))
             skills.append({"uid": suid, "title": s["title"], "base_weight": bw, "user_weight": uw})
-        roadmap.append({"topic_uid": tuid, "title": r["title"], "base_weight": base_weight, "user_weight": user_w, "effective_weight": effective_weight, "priority": pr, "prereqs": r.get("prereqs", []) or [], "skills": skills})
+        uw = float(user_w[i])
+        roadmap.append({"topic_uid": r["uid"], "title": r["title"], "base_weight": float(base[i]), "user_weight": uw, "effective_weight": float(effective[i]), "priority": _priority(uw), "prereqs": r.get("prereqs", []) or [], "skills": skills})
+    return roadmap
+
+def build_user_roadmap_stateless(subject_uid: str | None, user_topic_weights: Dict[str, float], user_skill_weights: Dict[str, float] | None = None, limit: int = 50, penalty_factor: float = 0.15) -> List[Dict]:
+    if not (settings.neo4j_uri and settings.neo4j_user and settings.neo4j_password.get_secret_value()):
+        return _roadmap_from_jsonl(subject_uid, user_topic_weights, limit)
+    repo = Neo4jRepo()
+    if subject_uid:
+        rows = repo.read(ROADMAP_TOPICS_SUBJECT_QUERY, {"su": subject_uid})
+    else:
+        rows = repo.read(ROADMAP_TOPICS_ALL_QUERY)
     repo.close()
-    roadmap.sort(key=lambda x: x.get("effective_weight", 0.0), reverse=True)
-    return roadmap[:limit]
+    if not rows:
+        return _roadmap_from_jsonl(subject_uid, user_topic_weights, limit)
+    return roadmap_from_rows(rows, user_topic_weights, user_skill_weights, limit=limit, penalty_factor=penalty_factor)
 
 def recompute_relationship_weights() -> Dict:
     repo = Neo4jRepo()
-    ensure_weight_defaults_repo(repo)
-    rows = repo.read("MATCH (sk:Skill)-[r:LINKED]->(m:Method) SET r.adaptive_weight = COALESCE(sk.dynamic_weight, sk.static_weight, 0.5) RETURN count(r) AS c")
+    rows = repo.write_returning("MATCH (sk:Skill)-[r:LINKED]->(m:Method) SET r.adaptive_weight = COALESCE(sk.dynamic_weight, sk.static_weight, 0.5) RETURN count(r) AS c")
     repo.close()
     return {"updated_links": (rows[0]['c'] if rows else 0)}
 
 def recompute_adaptive_for_skill(skill_uid: str) -> Dict:
     repo = Neo4jRepo()
-    ensure_weight_defaults_repo(repo)
-    rows = repo.read("MATCH (sk:Skill {uid:$uid})-[r:LINKED]->(m:Method) SET r.adaptive_weight = COALESCE(sk.dynamic_weight, sk.static_weight, 0.5) RETURN count(r) AS c", {"uid": skill_uid})
+    rows = repo.write_returning("MATCH (sk:Skill {uid:$uid})-[r:LINKED]->(m:Method) SET r.adaptive_weight = COALESCE(sk.dynamic_weight, sk.static_weight, 0.5) RETURN count(r) AS c", {"uid": skill_uid})
     repo.close()
     return {"updated_links": (rows[0]['c'] if rows else 0)}
 
@@ -396,29 +672,46 @@ def update_user_skill_weight(user_id: str, skill_uid: str, score: float) -> Dict
     res = compute_skill_user_weight(skill_uid=skill_uid, score=score)
     return {"user_id": user_id, **res}
 
+USER_TOPIC_LEVEL_QUERY = "MATCH (t:Topic {uid:$uid}) RETURN t.title AS title, coalesce(t.dynamic_weight,t.static_weight,0.5) AS bw"
+USER_SKILL_LEVEL_QUERY = "MATCH (s:Skill {uid:$uid}) RETURN s.title AS title, coalesce(s.dynamic_weight,s.static_weight,0.5) AS bw"
+
+def _user_level_from_rows(user_id: str, uid: str, rows: List[Dict]) -> Dict:
+    if not rows:
+        return {"uid": uid, "user_id": user_id, "title": None, "base_weight": 0.5, "level": knowledge_level_from_weight(0.5)}
+    bw = float(rows[0]["bw"] or 0.5)
+    return {"uid": uid, "user_id": user_id, "title": rows[0]["title"], "base_weight": bw, "level": knowledge_level_from_weight(bw)}
+
 def get_user_topic_level(user_id: str, topic_uid: str) -> Dict:
     try:
         repo = Neo4jRepo()
-        rows = repo.read("MATCH (t:Topic {uid:$uid}) RETURN t.title AS title, coalesce(t.dynamic_weight,t.static_weight,0.5) AS bw", {"uid": topic_uid})
+        rows = repo.read(USER_TOPIC_LEVEL_QUERY, {"uid": topic_uid})
         repo.close()
     except Exception:
         rows = []
-    if not rows:
-        return {"uid": topic_uid, "user_id": user_id, "title": None, "base_weight": 0.5, "level": knowledge_level_from_weight(0.5)}
-    bw = float(rows[0]["bw"] or 0.5)
-    return {"uid": topic_uid, "user_id": user_id, "title": rows[0]["title"], "base_weight": bw, "level": knowledge_level_from_weight(bw)}
+    return _user_level_from_rows(user_id, topic_uid, rows)
 
 def get_user_skill_level(user_id: str, skill_uid: str) -> Dict:
     try:
         repo = Neo4jRepo()
-        rows = repo.read("MATCH (s:Skill {uid:$uid}) RETURN s.title AS title, coalesce(s.dynamic_weight,s.static_weight,0.5) AS bw", {"uid": skill_uid})
+        rows = repo.read(USER_SKILL_LEVEL_QUERY, {"uid": skill_uid})
         repo.close()
     except Exception:
         rows = []
-    if not rows:
-        return {"uid": skill_uid, "user_id": user_id, "title": None, "base_weight": 0.5, "level": knowledge_level_from_weight(0.5)}
-    bw = float(rows[0]["bw"] or 0.5)
-    return {"uid": skill_uid, "user_id": user_id, "title": rows[0]["title"], "base_weight": bw, "level": knowledge_level_from_weight(bw)}
+    return _user_level_from_rows(user_id, skill_uid, rows)
+
+async def get_user_topic_level_async(user_id: str, topic_uid: str) -> Dict:
+    try:
+        rows = await AsyncNeo4jRepo().read(USER_TOPIC_LEVEL_QUERY, {"uid": topic_uid})
+    except Exception:
+        rows = []
+    return _user_level_from_rows(user_id, topic_uid, rows)
+
+async def get_user_skill_level_async(user_id: str, skill_uid: str) -> Dict:
+    try:
+        rows = await AsyncNeo4jRepo().read(USER_SKILL_LEVEL_QUERY, {"uid": skill_uid})
+    except Exception:
+        rows = []
+    return _user_level_from_rows(user_id, skill_uid, rows)
 
 def build_user_roadmap(user_id: str, subject_uid: str | None = None, limit: int = 50, penalty_factor: float = 0.15) -> List[Dict]:
     return build_user_roadmap_stateless(subject_uid=subject_uid, user_topic_weights={}, user_skill_weights={}, limit=limit, penalty_factor=penalty_factor)
@@ -429,11 +722,37 @@ def complete_user_topic(user_id: str, topic_uid: str, time_spent_sec: float, err
 def complete_user_skill(user_id: str, skill_uid: str, time_spent_sec: float, errors: int) -> Dict:
     return {"ok": True, "stored": False}
 
-def search_titles(q: str, limit: int = 20) -> List[Dict]:
-    repo = Neo4jRepo()
-    rows = repo.read("MATCH (n) WHERE toLower(n.title) CONTAINS toLower($q) RETURN n.uid AS uid, labels(n)[0] AS type, n.title AS title LIMIT $limit", {"q": q, "limit": int(limit)})
-    repo.close()
-    return rows
+SEARCH_TITLES_QUERY = (
+    "CALL db.index.fulltext.queryNodes($index, $q) YIELD node, score "
+    "WITH node, score WHERE size($labels) = 0 OR any(l IN labels(node) WHERE l IN $labels) "
+    "RETURN node.uid AS uid, labels(node)[0] AS type, node.title AS title, score "
+    "ORDER BY score DESC SKIP $offset LIMIT $limit"
+)
+_LUCENE_SPECIAL = set('+-&|!(){}[]^"~*?:\\/')
+
+def fulltext_query(q: str) -> str:
+    """Every word of q must match, the last one as a prefix (search-as-you-type)."""
+    words = ["".join("\\" + ch if ch in _LUCENE_SPECIAL else ch for ch in w) for w in (q or "").split()]
+    words = [w for w in words if w]
+    if not words:
+        return ""
+    return " AND ".join(words[:-1] + [words[-1] + "*"])
+
+def search_titles(q: str, limit: int = 20, offset: int = 0, labels: List[str] | None = None) -> List[Dict]:
+    limit = max(1, int(limit))
+    offset = max(0, int(offset))
+    if settings.neo4j_uri and settings.neo4j_user and settings.neo4j_password.get_secret_value():
+        lucene = fulltext_query(q)
+        if not lucene:
+            return []
+        try:
+            repo = Neo4jRepo()
+            rows = repo.read(SEARCH_TITLES_QUERY, {"index": CONTENT_FULLTEXT_INDEX, "q": lucene, "labels": list(labels or []), "offset": offset, "limit": limit})
+            repo.close()
+            return rows
+        except Exception:
+            ...
+    return search_kb_titles(q, limit=limit, offset=offset, labels=labels)
 
 def health() -> Dict:
     try:
@@ -470,86 +789,117 @@ def list_items(kind: str, subject_uid: str | None = None, section_uid: str | Non
     repo.close()
     return rows
 
+NODE_SUMMARY_QUERY = (
+    "MATCH (n) WHERE n.uid=$uid WITH n LIMIT 1 "
+    "RETURN labels(n) AS labels, n.title AS title, n.static_weight AS sw, n.dynamic_weight AS dw, "
+    "[(n)-[:TARGETS]->(g) WHERE n:Topic | {uid: g.uid, title: g.title, label: labels(g)[0]}] AS targets, "
+    "[(n)-[:PREREQ]->(p:Topic) WHERE n:Topic | {uid: p.uid, title: p.title}] AS prereqs, "
+    "[(n)-[:USES_SKILL]->(:Skill)-[:LINKED]->(m:Method) WHERE n:Topic | {uid: m.uid, title: m.title}] AS methods, "
+    "[(n)-[r:LINKED]->(m:Method) WHERE n:Skill | {uid: m.uid, title: m.title, weight: r.weight}] AS linked_methods, "
+    "[(n)-[:CONTAINS]->(t:Topic) WHERE n:Section | {uid: t.uid, title: t.title}] AS topics, "
+    "[(n)-[:CONTAINS]->(sec:Section) WHERE n:Subject | {uid: sec.uid, title: sec.title}] AS sections, "
+    "[(n)-[:HAS_SKILL]->(sk:Skill) WHERE n:Subject | {uid: sk.uid, title: sk.title}] AS skills"
+)
+
 def get_node_details(uid: str) -> Dict:
     repo = Neo4jRepo()
-    rows = repo.read("MATCH (n) WHERE n.uid=$uid RETURN labels(n) AS labels, n.title AS title", {"uid": uid})
+    rows = repo.read(NODE_SUMMARY_QUERY, {"uid": uid})
+    repo.close()
     if not rows:
-        repo.close()
         return {"found": False}
-    labels = rows[0]['labels']
+    return node_details_from_row(uid, rows[0])
+
+def node_details_from_row(uid: str, row: Dict) -> Dict:
+    labels = row['labels']
     typ = labels[0] if labels else None
-    details: Dict = {"found": True, "type": typ, "uid": uid, "title": rows[0]['title']}
+    details: Dict = {"found": True, "type": typ, "uid": uid, "title": row['title']}
     if typ == 'Topic':
-        wrows = repo.read("MATCH (t:Topic {uid:$uid}) RETURN t.static_weight AS sw, t.dynamic_weight AS dw", {"uid": uid})
-        if wrows:
-            details["static_weight"] = wrows[0]['sw']
-            details["dynamic_weight"] = wrows[0]['dw']
-        g = repo.read("MATCH (t:Topic {uid:$uid})-[:TARGETS]->(g) RETURN g.uid AS uid, g.title AS title, labels(g)[0] AS label", {"uid": uid})
-        details["targets"] = [{"uid": r['uid'], "title": r['title'], "type": ('objective' if r['label'] == 'Objective' else 'goal')} for r in g]
-        pr = repo.read("MATCH (t:Topic {uid:$uid})-[:PREREQ]->(p:Topic) RETURN p.uid AS uid, p.title AS title", {"uid": uid})
-        details["prereqs"] = pr
-        m = repo.read("MATCH (t:Topic {uid:$uid})-[:USES_SKILL]->(sk:Skill)-[:LINKED]->(m:Method) RETURN DISTINCT m.uid AS uid, m.title AS title", {"uid": uid})
-        details["methods"] = [{"uid": r['uid'], "title": r['title']} for r in m]
+        details["static_weight"] = row['sw']
+        details["dynamic_weight"] = row['dw']
+        details["targets"] = [{"uid": r['uid'], "title": r['title'], "type": ('objective' if r['label'] == 'Objective' else 'goal')} for r in row['targets']]
+        details["prereqs"] = row['prereqs']
+        details["methods"] = _distinct_by_uid(row['methods'])
         details["summary"] = {"title": details["title"], "prereqs_count": len(details.get("prereqs", [])), "targets_count": len(details.get("targets", [])), "methods_count": len(details.get("methods", []))}
     elif typ == 'Skill':
-        wrows = repo.read("MATCH (s:Skill {uid:$uid}) RETURN s.static_weight AS sw, s.dynamic_weight AS dw", {"uid": uid})
-        if wrows:
-            details["static_weight"] = wrows[0]['sw']
-            details["dynamic_weight"] = wrows[0]['dw']
-        lm = repo.read("MATCH (s:Skill {uid:$uid})-[r:LINKED]->(m:Method) RETURN m.uid AS uid, m.title AS title, r.weight AS weight", {"uid": uid})
-        details["linked_methods"] = lm
+        details["static_weight"] = row['sw']
+        details["dynamic_weight"] = row['dw']
+        details["linked_methods"] = row['linked_methods']
     elif typ == 'Section':
-        t = repo.read("MATCH (sec:Section {uid:$uid})-[:CONTAINS]->(t:Topic) RETURN t.uid AS uid, t.title AS title", {"uid": uid})
-        details["topics"] = t
+        details["topics"] = row['topics']
     elif typ == 'Subject':
-        sec = repo.read("MATCH (s:Subject {uid:$uid})-[:CONTAINS]->(sec:Section) RETURN sec.uid AS uid, sec.title AS title", {"uid": uid})
-        sk = repo.read("MATCH (s:Subject {uid:$uid})-[:HAS_SKILL]->(sk:Skill) RETURN sk.uid AS uid, sk.title AS title", {"uid": uid})
-        details["sections"] = sec
-        details["skills"] = sk
-    repo.close()
+        details["sections"] = row['sections']
+        details["skills"] = row['skills']
     return details
 
 def fix_orphan_section(section_uid: str, subject_uid: str) -> Dict:
     driver = get_driver()
     with driver.session() as session:
         session.run("MATCH (sub:Subject {uid:$su}), (sec:Section {uid:$uid}) MERGE (sub)-[:CONTAINS]->(sec)", su=subject_uid, uid=section_uid)
-    driver.close()
     return {"fixed": section_uid, "subject": subject_uid}
 
-def compute_static_weights() -> Dict:
-    driver = get_driver()
-    updated_topics = 0
-    updated_skills = 0
-    adv_terms = ['логарифм','экспонен','диофант','тригонометр','интеграл','предел','комбинатор','вектор','матриц','дифференц','производн','градиент']
-    def score(text: str) -> float:
+STATIC_WEIGHT_ADV_TERMS = ('логарифм','экспонен','диофант','тригонометр','интеграл','предел','комбинатор','вектор','матриц','дифференц','производн','градиент')
+
+def static_weight_scores(texts: List[str]) -> np.ndarray:
+    """0.3 + min(0.7, 0.02 * word count + 0.1 * advanced terms), clipped to [0, 1], for every text at once."""
+    n = len(texts)
+    token_count = np.zeros(n)
+    adv = np.zeros(n)
+    for i, text in enumerate(texts):
         t = (text or '').lower()
-        tokens = [c for c in t if c.isalnum() or c.isspace()]
-        token_count = len(''.join(tokens).split())
-        adv = sum(1 for term in adv_terms if term in t)
-        base = 0.3
-        s = base + min(0.7, 0.02 * token_count + 0.1 * adv)
-        return max(0.0, min(1.0, s))
-    with driver.session() as session:
-        res = session.run("MATCH (t:Topic) RETURN t.uid AS uid, t.title AS title, t.description AS desc")
-        for r in res:
-            sw = score((r['title'] or '') + ' ' + (r['desc'] or ''))
-            session.run("MATCH (t:Topic {uid:$uid}) SET t.static_weight = $sw, t.dynamic_weight = COALESCE(t.dynamic_weight, $sw)", uid=r['uid'], sw=sw)
-            updated_topics += 1
-        res = session.run("MATCH (s:Skill) RETURN s.uid AS uid, s.title AS title, s.definition AS def")
-        for r in res:
-            sw = score((r['title'] or '') + ' ' + (r['def'] or ''))
-            session.run("MATCH (s:Skill {uid:$uid}) SET s.static_weight = $sw, s.dynamic_weight = COALESCE(s.dynamic_weight, $sw)", uid=r['uid'], sw=sw)
-            updated_skills += 1
-    with driver.session() as session:
-        res = session.run("MATCH (a:Topic)-[:PREREQ]->(b:Topic) RETURN a.uid AS au, b.uid AS bu, a.static_weight AS aw, b.static_weight AS bw")
-        for r in res:
-            aw = float(r["aw"] or 0.0)
-            bw = float(r["bw"] or 0.0)
-            if aw > bw:
-                session.run("MATCH (t:Topic {uid:$uid}) SET t.static_weight = $bw", uid=r["au"], bw=bw)
-                updated_topics += 1
-    driver.close()
-    return {"topics": updated_topics, "skills": updated_skills}
+        token_count[i] = len(''.join(c for c in t if c.isalnum() or c.isspace()).split())
+        adv[i] = sum(1 for term in STATIC_WEIGHT_ADV_TERMS if term in t)
+    return np.clip(0.3 + np.minimum(0.7, 0.02 * token_count + 0.1 * adv), 0.0, 1.0)
+
+def propagate_prereq_min(weights: Dict[str, float], edges: List[Tuple[str, str]]) -> Dict[str, float]:
+    """Caps each topic at the minimum weight over all of its transitive prereqs; edges are (topic, prereq)."""
+    out = dict(weights)
+    prereqs: Dict[str, List[str]] = {}
+    dependents: Dict[str, List[str]] = {}
+    pending: Dict[str, int] = {u: 0 for u in out}
+    for a, b in edges:
+        if a not in out or b not in out or a == b:
+            continue
+        prereqs.setdefault(a, []).append(b)
+        dependents.setdefault(b, []).append(a)
+        pending[a] += 1
+    # Kahn order from prereq-free topics upward: a topic is settled once all its prereqs are
+    queue = deque(u for u, c in pending.items() if c == 0)
+    while queue:
+        u = queue.popleft()
+        for v in dependents.get(u, ()):
+            if out[u] < out[v]:
+                out[v] = out[u]
+            pending[v] -= 1
+            if pending[v] == 0:
+                queue.append(v)
+    # topics on PREREQ cycles never reach zero; relax them until the minimum settles
+    cyclic = [u for u, c in pending.items() if c > 0]
+    for _ in range(len(cyclic)):
+        changed = False
+        for u in cyclic:
+            m = min((out[p] for p in prereqs.get(u, ())), default=out[u])
+            if m < out[u]:
+                out[u] = m
+                changed = True
+        if not changed:
+            break
+    return out
+
+def compute_static_weights() -> Dict:
+    repo = Neo4jRepo()
+    topics = repo.read("MATCH (t:Topic) RETURN t.uid AS uid, t.title AS title, t.description AS desc")
+    skills = repo.read("MATCH (s:Skill) RETURN s.uid AS uid, s.title AS title, s.definition AS def")
+    edges = repo.read("MATCH (a:Topic)-[:PREREQ]->(b:Topic) RETURN a.uid AS au, b.uid AS bu")
+    topic_scores = static_weight_scores([(r['title'] or '') + ' ' + (r['desc'] or '') for r in topics])
+    skill_scores = static_weight_scores([(r['title'] or '') + ' ' + (r['def'] or '') for r in skills])
+    raw = {r['uid']: float(w) for r, w in zip(topics, topic_scores)}
+    final = propagate_prereq_min(raw, [(e['au'], e['bu']) for e in edges])
+    topic_rows = [{"uid": u, "sw": w} for u, w in final.items()]
+    skill_rows = [{"uid": r['uid'], "sw": float(w)} for r, w in zip(skills, skill_scores)]
+    repo.write_unwind("UNWIND $rows AS r MATCH (t:Topic {uid:r.uid}) SET t.static_weight = r.sw, t.dynamic_weight = COALESCE(t.dynamic_weight, r.sw)", topic_rows, chunk_size=BULK_MAX_CHUNK, parallel=True)
+    repo.write_unwind("UNWIND $rows AS r MATCH (s:Skill {uid:r.uid}) SET s.static_weight = r.sw, s.dynamic_weight = COALESCE(s.dynamic_weight, r.sw)", skill_rows, chunk_size=BULK_MAX_CHUNK, parallel=True)
+    repo.close()
+    return {"topics": len(topic_rows), "skills": len(skill_rows), "capped_by_prereqs": sum(1 for u, w in final.items() if w < raw[u])}
 
 def analyze_prereqs(subject_uid: str | None = None) -> Dict:
     driver = get_driver()
@@ -566,22 +916,7 @@ def analyze_prereqs(subject_uid: str | None = None) -> Dict:
         res = session.run("MATCH (a:Topic)-[:PREREQ]->(b:Topic) RETURN a.uid AS au, b.uid AS bu")
         for r in res:
             graph.setdefault(r["au"], []).append(r["bu"])
-        visited = set()
-        stack = set()
-        def dfs(u: str, path: List[str]):
-            if u in stack:
-                cycle_start = path.index(u) if u in path else 0
-                cycles.append(path[cycle_start:] + [u])
-                return
-            if u in visited:
-                return
-            visited.add(u)
-            stack.add(u)
-            for v in graph.get(u, []):
-                dfs(v, path + [u])
-            stack.remove(u)
-        for node in list(graph.keys()):
-            dfs(node, [])
+        cycles = find_cycles(graph)
         res = session.run("MATCH (sa:Subject)-[:CONTAINS]->(:Section)-[:CONTAINS]->(a:Topic)-[:PREREQ]->(b:Topic)<-[:CONTAINS]-(:Section)<-[:CONTAINS]-(sb:Subject) RETURN a.uid AS au, b.uid AS bu, sa.uid AS asu, sb.uid AS bsu")
         for r in res:
             if allowed is None or (r["au"] in allowed and r["bu"] in allowed):
@@ -589,7 +924,6 @@ def analyze_prereqs(subject_uid: str | None = None) -> Dict:
                     cross_subject_errors.append({"topic_uid": r["au"], "prereq_uid": r["bu"], "subject": r["asu"], "prereq_subject": r["bsu"]})
         res = session.run("MATCH (:Topic)-[rel:PREREQ]->(:Topic) WHERE rel.weight < 0 OR rel.weight > 1 RETURN rel")
         anomalies = ["edge" for _ in res]
-    driver.close()
     return {"cycles": cycles, "cross_subject_errors": cross_subject_errors, "anomalies": anomalies}
 
 def add_prereqs_heuristic() -> Dict:
@@ -612,7 +946,6 @@ def add_prereqs_heuristic() -> Dict:
                     continue
                 session.run("MATCH (p:Topic {uid:$pre}), (t:Topic {uid:$tgt}) MERGE (t)-[:PREREQ]->(p)", pre=pre, tgt=rule['target'])
                 created += 1
-    driver.close()
     return {"created_prereq_edges": created}
 
 def link_remaining_skills_methods() -> Dict:
@@ -640,7 +973,6 @@ def link_remaining_skills_methods() -> Dict:
                 continue
             session.run("MATCH (s:Skill {uid:$su}), (m:Method {uid:$mu}) MERGE (s)-[r:LINKED]->(m) SET r.weight=COALESCE(r.weight,'secondary'), r.confidence=COALESCE(r.confidence,0.8)", su=su, mu=mu)
             created += 1
-    driver.close()
     return {"created_links": created}
 
 def link_skill_to_best(skill_uid: str, method_candidates: List[str]) -> Dict:
@@ -654,6 +986,5 @@ def link_skill_to_best(skill_uid: str, method_candidates: List[str]) -> Dict:
             session.run("MATCH (s:Skill {uid:$su}), (m:Method {uid:$mu}) MERGE (s)-[r:LINKED]->(m) SET r.weight=COALESCE(r.weight,'primary'), r.confidence=COALESCE(r.confidence,0.9)", su=skill_uid, mu=mu)
             created = True
             break
-    driver.close()
     return {"skill": skill_uid, "linked": created}
 
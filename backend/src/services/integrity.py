@@ -1,27 +1,23 @@
 from typing import Dict, List, Set, Tuple
-import networkx as nx
+from src.services.graph.prereq_order import IncrementalTopoOrder
 import os
 
 def check_prereq_cycles(rels: List[Dict]) -> List[Tuple[str, str]]:
     """
     rels: list of {'type': 'PREREQ', 'from_uid': str, 'to_uid': str}
+    Edges along one offending path per edge that closes a cycle (the edge itself is left out of the order).
     """
-    g = nx.DiGraph()
+    order = IncrementalTopoOrder()
+    violations: List[Tuple[str, str]] = []
     for r in rels:
         if str(r.get("type")) != "PREREQ":
             continue
         a = str(r.get("from_uid"))
         b = str(r.get("to_uid"))
         if a and b:
-            g.add_edge(a, b)
-    cycles = list(nx.simple_cycles(g))
-    violations: List[Tuple[str, str]] = []
-    for cyc in cycles:
-        if len(cyc) == 1:
-            violations.append((cyc[0], cyc[0]))
-        else:
-            for i in range(len(cyc)):
-                violations.append((cyc[i], cyc[(i + 1) % len(cyc)]))
+            path = order.add_edge(a, b)
+            if path:
+                violations.extend(zip(path, path[1:]))
     return violations
 
 def check_dangling_skills(nodes: List[Dict], rels: List[Dict]) -> List[str]:
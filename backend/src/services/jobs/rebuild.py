@@ -5,11 +5,11 @@ from src.services.graph.utils import sync_from_jsonl, analyze_knowledge, compute
 
 _jobs: Dict[str, Dict] = {}
 
-def _run_job(job_id: str):
+def _run_job(job_id: str, mode: str = "incremental"):
     _jobs[job_id] = {"status": "running", "stages": []}
     try:
         _jobs[job_id]["stages"].append("import_jsonl")
-        stats = sync_from_jsonl()
+        stats = sync_from_jsonl(mode=mode)
         _jobs[job_id]["sync_stats"] = stats
         _jobs[job_id]["stages"].append("compute_static_weights")
         sw = compute_static_weights()
@@ -30,12 +30,17 @@ def _run_job(job_id: str):
         _jobs[job_id]["status"] = "done"
         _jobs[job_id]["ok"] = True
         _jobs[job_id]["warnings"] = warnings
+        try:
+            from src.events.publisher import publish_graph_rebuilt
+            publish_graph_rebuilt(job_id)
+        except Exception:
+            pass
     except Exception as e:
         _jobs[job_id] = {"status": "error", "error": str(e), "ok": False}
 
-def start_rebuild_async() -> Dict:
+def start_rebuild_async(mode: str = "incremental") -> Dict:
     job_id = str(int(time.time() * 1000))
-    t = threading.Thread(target=_run_job, args=(job_id,), daemon=True)
+    t = threading.Thread(target=_run_job, args=(job_id, mode), daemon=True)
     t.start()
     return {"job_id": job_id}
 
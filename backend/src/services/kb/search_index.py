@@ -0,0 +1,149 @@
+import os
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.services.kb.jsonl_io import load_jsonl, get_path
+
+# JSONL node files and the graph label each one is loaded as
+KB_NODE_FILES: Tuple[Tuple[str, str], ...] = (
+    ("subjects.jsonl", "Subject"),
+    ("sections.jsonl", "Section"),
+    ("topics.jsonl", "Topic"),
+    ("skills.jsonl", "Skill"),
+    ("methods.jsonl", "Method"),
+    ("examples.jsonl", "Example"),
+    ("errors.jsonl", "Error"),
+)
+
+
+def _words(text: str) -> List[str]:
+    return "".join(ch if ch.isalnum() else " " for ch in text).split()
+
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TitleSearchIndex:
+    """In-memory title/definition index over the JSONL KB: token prefixes via bisect, substrings via trigram postings."""
+
+    def __init__(self, docs: Sequence[Tuple[str, str, str, str]]):
+        # docs: (uid, label, title, extra text)
+        self.uids: List[str] = []
+        self.labels: List[str] = []
+        self.titles: List[str] = []
+        self.texts: List[str] = []
+        self.title_lc: List[str] = []
+        postings: Dict[str, List[int]] = {}
+        prefix_keys: List[Tuple[str, int]] = []
+        for uid, label, title, extra in docs:
+            i = len(self.uids)
+            self.uids.append(uid)
+            self.labels.append(label)
+            self.titles.append(title)
+            tl = title.lower()
+            text = (tl + "\n" + extra.lower()) if extra else tl
+            self.title_lc.append(tl)
+            self.texts.append(text)
+            for g in _trigrams(text):
+                postings.setdefault(g, []).append(i)
+            for w in set(_words(text)):
+                prefix_keys.append((w, i))
+        self.postings = postings
+        prefix_keys.sort()
+        self.prefix_words = [w for w, _ in prefix_keys]
+        self.prefix_docs = [i for _, i in prefix_keys]
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+    def _candidates(self, q: str) -> List[int]:
+        if len(q) >= 3:
+            grams = sorted(_trigrams(q), key=lambda g: len(self.postings.get(g, ())))
+            if not grams or grams[0] not in self.postings:
+                return []
+            cand = set(self.postings[grams[0]])
+            for g in grams[1:]:
+                cand.intersection_update(self.postings.get(g, ()))
+                if not cand:
+                    return []
+            return [i for i in cand if q in self.texts[i]]
+        # too short for trigrams: match word prefixes only
+        out = set()
+        lo = bisect_left(self.prefix_words, q)
+        while lo < len(self.prefix_words) and self.prefix_words[lo].startswith(q):
+            out.add(self.prefix_docs[lo])
+            lo += 1
+        return list(out)
+
+    def _rank(self, q: str, i: int) -> Tuple[int, int, str]:
+        tl = self.title_lc[i]
+        if tl == q:
+            tier = 0
+        elif tl.startswith(q):
+            tier = 1
+        elif any(w.startswith(q) for w in _words(tl)):
+            tier = 2
+        elif q in tl:
+            tier = 3
+        else:
+            tier = 4
+        return (tier, len(tl), self.uids[i])
+
+    def search(self, q: str, limit: int = 20, offset: int = 0, labels: Optional[Sequence[str]] = None) -> List[Dict]:
+        q = (q or "").strip().lower()
+        if not q:
+            return []
+        cand = self._candidates(q)
+        if labels:
+            allowed = set(labels)
+            cand = [i for i in cand if self.labels[i] in allowed]
+        ranked = sorted((self._rank(q, i), i) for i in cand)[offset:offset + limit]
+        return [{"uid": self.uids[i], "type": self.labels[i], "title": self.titles[i], "score": 1.0 / (1 + rank[0])} for rank, i in ranked]
+
+
+_index: Optional[TitleSearchIndex] = None
+_index_sig: Optional[Tuple] = None
+_lock = threading.Lock()
+
+
+def _kb_signature() -> Tuple:
+    sig = []
+    for name, _ in KB_NODE_FILES:
+        try:
+            st = os.stat(get_path(name))
+            sig.append((name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append((name, 0, 0))
+    return tuple(sig)
+
+
+def build_index() -> TitleSearchIndex:
+    docs: List[Tuple[str, str, str, str]] = []
+    for name, label in KB_NODE_FILES:
+        for r in load_jsonl(get_path(name)):
+            uid = r.get("uid")
+            title = r.get("title") or r.get("statement") or ""
+            if not uid or not title:
+                continue
+            extra = " ".join(str(r[k]) for k in ("definition", "description") if r.get(k))
+            docs.append((uid, label, str(title), extra))
+    return TitleSearchIndex(docs)
+
+
+def get_index() -> TitleSearchIndex:
+    """Shared JSONL search index, rebuilt when any KB node file changes on disk."""
+    global _index, _index_sig
+    sig = _kb_signature()
+    idx = _index
+    if idx is not None and _index_sig == sig:
+        return idx
+    with _lock:
+        if _index is None or _index_sig != sig:
+            _index = build_index()
+            _index_sig = sig
+        return _index
+
+
+def search_kb_titles(q: str, limit: int = 20, offset: int = 0, labels: Optional[Sequence[str]] = None) -> List[Dict]:
+    return get_index().search(q, limit=limit, offset=offset, labels=labels)
@@ -0,0 +1,187 @@
+import base64
+import hashlib
+import random
+from bisect import bisect_left
+from typing import Container, Dict, List, Optional, Sequence, Tuple
+from src.services.questions import QuestionIndex, get_question_index, select_examples_for_topics
+from src.services.roadmap_planner import PREREQ_MASTERED_THRESHOLD
+from src.services.graph.reachability import MASTERY_THRESHOLD, get_prereq_index
+
+# target difficulty sits this far above current mastery (normalized 0..1 scale)
+ZPD_STRETCH = 0.15
+# topic weight multiplier per unmastered direct prereq
+READINESS_DECAY = 0.35
+# topics at or above MASTERY_THRESHOLD are still drawn sometimes, for review
+REVIEW_WEIGHT = 0.05
+# draws per requested question before falling back to a deterministic fill
+MAX_DRAWS_PER_QUESTION = 8
+# probes around the target difficulty within one topic before giving up on the draw
+MAX_PROBES = 12
+
+
+class BloomFilter:
+    """Bit array with k positions per uid from double hashing of a BLAKE2b digest.
+
+    Wire format for the LMS: {"bits": base64 of the bit array (bit i = byte i // 8, mask 1 << (i % 8)), "k": hashes}.
+    """
+
+    __slots__ = ("bits", "m", "k")
+
+    def __init__(self, bits: bytearray, k: int):
+        self.bits = bits
+        self.m = len(bits) * 8
+        self.k = max(1, int(k))
+
+    @classmethod
+    def empty(cls, m_bits: int, k: int) -> "BloomFilter":
+        return cls(bytearray((max(8, m_bits) + 7) // 8), k)
+
+    @classmethod
+    def from_payload(cls, bits: str, k: int) -> "BloomFilter":
+        return cls(bytearray(base64.b64decode(bits)), k)
+
+    def to_payload(self) -> Dict:
+        return {"bits": base64.b64encode(bytes(self.bits)).decode("ascii"), "k": self.k}
+
+    def _positions(self, uid: str):
+        d = hashlib.blake2b(uid.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        for i in range(self.k):
+            yield (h1 + i * h2) % self.m
+
+    def add(self, uid: str) -> None:
+        for p in self._positions(uid):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, uid) -> bool:
+        if not self.m:
+            return False
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(str(uid)))
+
+
+class ExcludeSet:
+    """Union of exclusion containers: exact uid sets, Bloom filters (a false positive only skips a question), drawn uids."""
+
+    __slots__ = ("parts",)
+
+    def __init__(self, *parts: Optional[Container[str]]):
+        self.parts = tuple(p for p in parts if p is not None)
+
+    def __contains__(self, uid) -> bool:
+        return any(uid in p for p in self.parts)
+
+
+class AliasTable:
+    """Vose alias method: O(n) build, O(1) per weighted draw."""
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        total = float(sum(weights))
+        self.n = n
+        self.prob = [0.0] * n
+        self.alias = [0] * n
+        if n == 0 or total <= 0.0:
+            self.n = 0
+            return
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def draw(self, rng: random.Random) -> int:
+        i = rng.randrange(self.n)
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+def target_difficulty(mastery: float) -> float:
+    return max(0.05, min(1.0, mastery + ZPD_STRETCH))
+
+
+def topic_weight(mastery: float, missing_prereqs: int) -> float:
+    if mastery >= MASTERY_THRESHOLD:
+        return REVIEW_WEIGHT
+    return (1.0 - mastery) * (READINESS_DECAY ** missing_prereqs)
+
+
+def _pick_near(index: QuestionIndex, tuid: str, target: float, difficulty_min: int, difficulty_max: int, skip: Container[str], rng: random.Random):
+    diffs, recs = index.by_difficulty[tuid]
+    pos = bisect_left(diffs, target)
+    n = len(recs)
+    for _ in range(MAX_PROBES):
+        # two-sided geometric offset: questions closest to the target are the most likely
+        off = 0
+        while rng.random() < 0.5 and off < n:
+            off += 1
+        i = pos + off if rng.random() < 0.5 else pos - off - 1
+        if not 0 <= i < n:
+            continue
+        q = recs[i]
+        if q.uid in skip or not difficulty_min <= q.level <= difficulty_max:
+            continue
+        return q
+    return None
+
+
+def sample_questions(
+    subject_uid: Optional[str],
+    progress: Dict[str, float],
+    count: int,
+    difficulty_min: int = 1,
+    difficulty_max: int = 5,
+    exclude: Optional[Container[str]] = None,
+    seed: Optional[int] = None,
+    tenant_id: Optional[str] = None,
+) -> List[Dict]:
+    """Weighted draw of questions for the student's zone of proximal development.
+
+    Topics are weighted by how much is left to learn and how ready the student is (unmastered direct
+    prereqs shrink the weight); within a topic, questions near mastery + ZPD_STRETCH are preferred.
+    """
+    rng = random.Random(seed)
+    qindex = get_question_index()
+    try:
+        pindex = get_prereq_index(tenant_id)
+    except Exception:
+        pindex = None
+    if pindex is not None and subject_uid:
+        subject_topics = pindex.topic_uids(subject_uid)
+        candidates = [t for t in subject_topics if t in qindex.by_difficulty]
+    else:
+        subject_topics = candidates = qindex.topics()
+    weights: List[float] = []
+    topics: List[Tuple[str, float]] = []
+    for t in candidates:
+        m = float(progress.get(t, 0.0) or 0.0)
+        missing = pindex.missing_prereqs(t, progress, PREREQ_MASTERED_THRESHOLD) if pindex is not None else 0
+        weights.append(topic_weight(m, missing))
+        topics.append((t, target_difficulty(m)))
+    table = AliasTable(weights)
+    out: List[Dict] = []
+    taken: set = set()
+    skip = ExcludeSet(exclude, taken)
+    if table.n:
+        for _ in range(count * MAX_DRAWS_PER_QUESTION):
+            if len(out) >= count:
+                break
+            tuid, target = topics[table.draw(rng)]
+            q = _pick_near(qindex, tuid, target, difficulty_min, difficulty_max, skip, rng)
+            if q is not None:
+                taken.add(q.uid)
+                out.append(q.to_dict())
+    if len(out) < count:
+        # sparse pools: fill deterministically from the heaviest topics
+        order = [t for (t, _), _w in sorted(zip(topics, weights), key=lambda x: -x[1])]
+        out.extend(qindex.select(order, count - len(out), difficulty_min, difficulty_max, skip))
+    if not out:
+        # no indexed questions at all: keep the stub questions of the plain selector
+        return select_examples_for_topics(subject_topics, count, difficulty_min, difficulty_max, skip)
+    return out
@@ -1,7 +1,9 @@
 import os
 import json
-from functools import lru_cache
-from typing import Dict, List, Set
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
 from src.config.settings import settings
 from src.services.graph.neo4j_repo import Neo4jRepo
 
@@ -24,16 +26,159 @@ def load_jsonl(filename: str) -> List[Dict]:
                 continue
     return data
 
-@lru_cache(maxsize=1)
-def get_examples_indexed():
-    ex = load_jsonl('examples.jsonl')
-    by_topic: Dict[str, List[Dict]] = {}
-    for e in ex:
-        tuid = e.get('topic_uid')
-        if not tuid:
-            continue
-        by_topic.setdefault(tuid, []).append(e)
-    return {"all": ex, "by_topic": by_topic}
+# difficulty bucket used for range filters when a record has none or an unparsable one
+DEFAULT_DIFFICULTY_LEVEL = 3
+# per-topic picks in the first, breadth-first pass of the selection
+PER_TOPIC_FIRST_PASS = 2
+GRAPH_QUESTIONS_QUERY = (
+    "MATCH (t:Topic)-[:HAS_QUESTION]->(q:Question) "
+    "RETURN q.uid AS uid, q.title AS title, q.statement AS statement, q.difficulty AS difficulty, t.uid AS topic_uid"
+)
+# how long a failed graph load is remembered before the next attempt
+GRAPH_RETRY_SEC = 60.0
+
+class QuestionRecord(NamedTuple):
+    uid: str
+    title: Optional[str]
+    statement: Optional[str]
+    difficulty: float
+    topic_uid: str
+    level: int
+
+    def to_dict(self) -> Dict:
+        return {"uid": self.uid, "title": self.title, "statement": self.statement, "difficulty": self.difficulty, "topic_uid": self.topic_uid}
+
+def normalize_difficulty(x) -> float:
+    try:
+        xf = float(x)
+    except Exception:
+        return 0.6
+    return xf if xf <= 1.0 else max(0.0, min(1.0, xf / 5.0))
+
+def difficulty_level(x) -> int:
+    try:
+        return int(float(x))
+    except Exception:
+        return DEFAULT_DIFFICULTY_LEVEL
+
+class QuestionIndex:
+    """Immutable per-topic question lists ordered by difficulty level; a level range is a bisect slice."""
+
+    def __init__(self, rows: Iterable[Dict]):
+        by_topic: Dict[str, List[QuestionRecord]] = {}
+        for r in rows:
+            tuid = r.get("topic_uid")
+            if not tuid:
+                continue
+            d_raw = r.get("difficulty", DEFAULT_DIFFICULTY_LEVEL)
+            by_topic.setdefault(tuid, []).append(QuestionRecord(r.get("uid"), r.get("title"), r.get("statement"), normalize_difficulty(d_raw), tuid, difficulty_level(d_raw)))
+        self.records: Dict[str, Tuple[QuestionRecord, ...]] = {}
+        self.levels: Dict[str, Tuple[int, ...]] = {}
+        # the same records ordered by normalized difficulty, for samplers aiming at a target difficulty
+        self.by_difficulty: Dict[str, Tuple[Tuple[float, ...], Tuple[QuestionRecord, ...]]] = {}
+        for tuid, recs in by_topic.items():
+            # stable: equal levels keep their source order
+            recs.sort(key=lambda q: q.level)
+            self.records[tuid] = tuple(recs)
+            self.levels[tuid] = tuple(q.level for q in recs)
+            by_d = tuple(sorted(recs, key=lambda q: q.difficulty))
+            self.by_difficulty[tuid] = (tuple(q.difficulty for q in by_d), by_d)
+
+    def __len__(self) -> int:
+        return sum(len(r) for r in self.records.values())
+
+    def topics(self) -> List[str]:
+        return list(self.records.keys())
+
+    def _in_range(self, tuid: str, lo: int, hi: int, exclude: Set[str]) -> Iterator[QuestionRecord]:
+        levels = self.levels.get(tuid)
+        if not levels:
+            return
+        recs = self.records[tuid]
+        for i in range(bisect_left(levels, lo), bisect_right(levels, hi)):
+            if recs[i].uid not in exclude:
+                yield recs[i]
+
+    def select(self, topic_uids: Sequence[str], limit: int, difficulty_min: int, difficulty_max: int, exclude: Set[str]) -> List[Dict]:
+        """Up to PER_TOPIC_FIRST_PASS questions per topic in topic order, then the rest topic by topic until limit."""
+        streams = [self._in_range(tu, difficulty_min, difficulty_max, exclude) for tu in dict.fromkeys(topic_uids)]
+        out: List[Dict] = []
+        taken: Set[str] = set()
+        for per_topic in (PER_TOPIC_FIRST_PASS, None):
+            for it in streams:
+                n = 0
+                while len(out) < limit and (per_topic is None or n < per_topic):
+                    rec = next(it, None)
+                    if rec is None:
+                        break
+                    if rec.uid in taken:
+                        continue
+                    taken.add(rec.uid)
+                    out.append(rec.to_dict())
+                    n += 1
+                if len(out) >= limit:
+                    return out
+        return out
+
+_lock = threading.Lock()
+_jsonl_index: Optional[QuestionIndex] = None
+_jsonl_sig: Optional[Tuple[int, int]] = None
+_graph_index: Optional[QuestionIndex] = None
+_graph_failed_at = 0.0
+
+def _examples_signature() -> Tuple[int, int]:
+    try:
+        st = os.stat(os.path.join(KB_DIR, 'examples.jsonl'))
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return (0, 0)
+
+def get_examples_index() -> QuestionIndex:
+    """examples.jsonl index, rebuilt when the file changes on disk."""
+    global _jsonl_index, _jsonl_sig
+    sig = _examples_signature()
+    idx = _jsonl_index
+    if idx is not None and _jsonl_sig == sig:
+        return idx
+    with _lock:
+        if _jsonl_index is None or _jsonl_sig != sig:
+            _jsonl_index = QuestionIndex(load_jsonl('examples.jsonl'))
+            _jsonl_sig = sig
+        return _jsonl_index
+
+def _graph_configured() -> bool:
+    return bool(settings.neo4j_uri and settings.neo4j_user and settings.neo4j_password.get_secret_value())
+
+def get_graph_question_index() -> Optional[QuestionIndex]:
+    """Question nodes of the graph, loaded once and kept until the next graph commit/rebuild event."""
+    global _graph_index, _graph_failed_at
+    idx = _graph_index
+    if idx is not None or not _graph_configured():
+        return idx
+    with _lock:
+        if _graph_index is None and time.time() - _graph_failed_at >= GRAPH_RETRY_SEC:
+            try:
+                repo = Neo4jRepo()
+                try:
+                    _graph_index = QuestionIndex(repo.read(GRAPH_QUESTIONS_QUERY))
+                finally:
+                    repo.close()
+            except Exception:
+                _graph_failed_at = time.time()
+        return _graph_index
+
+def get_question_index() -> QuestionIndex:
+    """Graph questions when the graph has any, otherwise examples.jsonl."""
+    idx = get_graph_question_index()
+    if idx is not None and len(idx):
+        return idx
+    return get_examples_index()
+
+def on_graph_committed(event: Dict) -> None:
+    global _graph_index, _graph_failed_at
+    with _lock:
+        _graph_index = None
+        _graph_failed_at = 0.0
 
 def select_examples_for_topics(
     topic_uids: List[str],
@@ -44,63 +189,15 @@ def select_examples_for_topics(
 ):
     exclude = exclude_uids or set()
     pool: List[Dict] = []
-    if settings.neo4j_uri and settings.neo4j_user and settings.neo4j_password.get_secret_value():
-        try:
-            repo = Neo4jRepo()
-            rows = repo.read(
-                (
-                    "UNWIND $t AS tuid "
-                    "MATCH (t:Topic {uid:tuid})-[:HAS_QUESTION]->(q:Question) "
-                    "RETURN q.uid AS uid, q.title AS title, q.statement AS statement, q.difficulty AS difficulty, t.uid AS topic_uid"
-                ),
-                {"t": topic_uids}
-            )
-            def _norm(x):
-                try:
-                    xf = float(x)
-                except Exception:
-                    return 0.6
-                return xf if xf <= 1.0 else max(0.0, min(1.0, xf / 5.0))
-            for r in rows:
-                d_raw = r.get('difficulty', 3)
-                try:
-                    d_int = int(float(d_raw))
-                except Exception:
-                    d_int = 3
-                if d_int < difficulty_min or d_int > difficulty_max:
-                    continue
-                if r.get('uid') in exclude:
-                    continue
-                r['difficulty'] = _norm(d_raw)
-                pool.append(r)
-            repo.close()
-        except Exception:
-            pool = []
+    graph_idx = get_graph_question_index()
+    if graph_idx is not None:
+        pool = graph_idx.select(topic_uids, limit, difficulty_min, difficulty_max, exclude)
     if not pool:
-        idx = get_examples_indexed()
-        def _norm(x):
-            try:
-                xf = float(x)
-            except Exception:
-                return 0.6
-            return xf if xf <= 1.0 else max(0.0, min(1.0, xf / 5.0))
-        for tu in topic_uids:
-            for e in idx["by_topic"].get(tu, []):
-                d_raw = e.get('difficulty', 3)
-                try:
-                    d = int(float(d_raw))
-                except Exception:
-                    d = 3
-                if d < difficulty_min or d > difficulty_max:
-                    continue
-                if e.get('uid') in exclude:
-                    continue
-                e['difficulty'] = _norm(d_raw)
-                pool.append(e)
+        pool = get_examples_index().select(topic_uids, limit, difficulty_min, difficulty_max, exclude)
     if not pool:
         titles: Dict[str, str] = {}
         topics_source: List[Dict] = []
-        if settings.neo4j_uri and settings.neo4j_user and settings.neo4j_password.get_secret_value():
+        if _graph_configured():
             try:
                 repo = Neo4jRepo()
                 if topic_uids:
@@ -145,24 +242,7 @@ def select_examples_for_topics(
                 )
                 if len(pool) >= limit:
                     break
-    selected: List[Dict] = []
-    seen_by_topic: Dict[str, int] = {tu: 0 for tu in topic_uids}
-    for e in pool:
-        tu = e.get('topic_uid')
-        if len(selected) >= limit:
-            break
-        if seen_by_topic.get(tu, 0) <= 1:
-            selected.append(e)
-            seen_by_topic[tu] = seen_by_topic.get(tu, 0) + 1
-    if len(selected) < limit:
-        for e in pool:
-            if e in selected:
-                continue
-            selected.append(e)
-            if len(selected) >= limit:
-                break
-    return selected
+    return pool[:limit]
 
 def all_topic_uids_from_examples() -> List[str]:
-    idx = get_examples_indexed()
-    return list(idx["by_topic"].keys())
+    return get_examples_index().topics()
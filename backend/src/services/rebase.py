@@ -1,18 +1,33 @@
 from enum import Enum
-from typing import List
-from src.db.pg import get_graph_version, get_changed_targets_since
+from typing import Dict, List, Sequence, Tuple
+from src.db.pg import get_graph_version, get_conflicting_targets, get_conflicting_targets_batch
 
 class RebaseResult(str, Enum):
     SAME_VERSION = "SAME_VERSION"
     FAST_REBASE = "FAST_REBASE"
     CONFLICT = "CONFLICT"
 
-def rebase_check(tenant_id: str, base_graph_version: int, target_ids: List[str]) -> RebaseResult:
-    current = get_graph_version(tenant_id)
+def _result(current: int, base_graph_version: int, conflicts: List[str]) -> RebaseResult:
     if current == base_graph_version:
         return RebaseResult.SAME_VERSION
-    changed = set(get_changed_targets_since(tenant_id, base_graph_version))
-    intersect = changed.intersection(set(target_ids))
-    if intersect:
-        return RebaseResult.CONFLICT
-    return RebaseResult.FAST_REBASE
+    return RebaseResult.CONFLICT if conflicts else RebaseResult.FAST_REBASE
+
+def rebase_check_conflicts(tenant_id: str, base_graph_version: int, target_ids: List[str]) -> Tuple[RebaseResult, List[str]]:
+    """Rebase result plus the proposal targets changed since base_graph_version."""
+    current = get_graph_version(tenant_id)
+    if current == base_graph_version:
+        return RebaseResult.SAME_VERSION, []
+    conflicts = get_conflicting_targets(tenant_id, base_graph_version, target_ids)
+    return _result(current, base_graph_version, conflicts), conflicts
+
+def rebase_check(tenant_id: str, base_graph_version: int, target_ids: List[str]) -> RebaseResult:
+    return rebase_check_conflicts(tenant_id, base_graph_version, target_ids)[0]
+
+def rebase_check_batch(items: Sequence[Tuple[str, str, int, Sequence[str]]]) -> Dict[str, Tuple[RebaseResult, List[str]]]:
+    """(proposal_id, tenant_id, base_graph_version, target_ids) rows -> {proposal_id: (result, conflicting targets)}, one query for all."""
+    rows = get_conflicting_targets_batch(items)
+    out: Dict[str, Tuple[RebaseResult, List[str]]] = {}
+    for pid, _tid, base, _targets in items:
+        current, conflicts = rows.get(pid, (0, []))
+        out[pid] = (_result(current, int(base), conflicts), conflicts if current != int(base) else [])
+    return out
@@ -1,39 +1,159 @@
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
 from src.services.graph import neo4j_repo
+from src.services.graph.neo4j_async_repo import AsyncNeo4jRepo
+from src.services.graph.snapshot import current_snapshot
+from src.core.context import get_tenant_id
 from src.services.questions import all_topic_uids_from_examples
 
 
+PLAN_ROUTE_SUBJECT_QUERY = (
+    "MATCH (sub:Subject {uid:$su})-[:CONTAINS]->(:Section)-[:CONTAINS]->(t:Topic) "
+    "OPTIONAL MATCH (t)-[:PREREQ]->(pre:Topic) "
+    "RETURN t.uid AS uid, t.title AS title, collect(pre.uid) AS prereqs"
+)
+PLAN_ROUTE_ALL_QUERY = (
+    "MATCH (t:Topic) OPTIONAL MATCH (t)-[:PREREQ]->(pre:Topic) "
+    "RETURN t.uid AS uid, t.title AS title, collect(pre.uid) AS prereqs"
+)
+
+
 def plan_route(subject_uid: str | None, progress: Dict[str, float], limit: int = 30, penalty_factor: float = 0.15) -> List[Dict]:
     drv = neo4j_repo.get_driver()
-    items: List[Dict] = []
     s = drv.session()
     if subject_uid:
-        rows = s.run(
-            "MATCH (sub:Subject {uid:$su})-[:CONTAINS]->(:Section)-[:CONTAINS]->(t:Topic) "
-            "OPTIONAL MATCH (t)-[:PREREQ]->(pre:Topic) "
-            "RETURN t.uid AS uid, t.title AS title, collect(pre.uid) AS prereqs",
-            {"su": subject_uid}
-        ).data()
+        rows = s.run(PLAN_ROUTE_SUBJECT_QUERY, {"su": subject_uid}).data()
     else:
-        rows = s.run(
-            "MATCH (t:Topic) OPTIONAL MATCH (t)-[:PREREQ]->(pre:Topic) "
-            "RETURN t.uid AS uid, t.title AS title, collect(pre.uid) AS prereqs"
-        ).data()
+        rows = s.run(PLAN_ROUTE_ALL_QUERY).data()
+    try:
+        s.close()
+    except Exception:
+        pass
+    return route_from_rows(rows, progress, limit=limit, penalty_factor=penalty_factor)
+
+
+async def load_route_rows_async(subject_uid: str | None) -> List[Dict]:
+    """{uid, title, prereqs} rows of the subject's topics, from the in-memory snapshot when one is loaded."""
+    snap = current_snapshot(get_tenant_id())
+    if snap is not None:
+        return snap.topic_rows(subject_uid)
+    repo = AsyncNeo4jRepo()
+    if subject_uid:
+        return await repo.read(PLAN_ROUTE_SUBJECT_QUERY, {"su": subject_uid})
+    return await repo.read(PLAN_ROUTE_ALL_QUERY)
+
+
+async def plan_route_async(subject_uid: str | None, progress: Dict[str, float], limit: int = 30, penalty_factor: float = 0.15) -> List[Dict]:
+    rows = await load_route_rows_async(subject_uid)
+    return route_from_rows(rows, progress, limit=limit, penalty_factor=penalty_factor)
+
+
+PREREQ_MASTERED_THRESHOLD = 0.3
+# students x prereq-edges cells materialized at once when counting missing prereqs
+COHORT_BLOCK_CELLS = 1 << 22
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row-wise top_k_indices: k highest scores per row, descending, ties in column order (same as a stable sort)."""
+    n_rows, n = scores.shape
+    k = min(k, n)
+    if k <= 0:
+        return np.empty((n_rows, 0), dtype=np.int64)
+    if k == n:
+        return np.argsort(-scores, axis=1, kind="stable")
+    kth = -np.partition(-scores, k - 1, axis=1)[:, k - 1:k]
+    above = scores > kth
+    tie = scores == kth
+    # of the values equal to the k-th, keep the leftmost ones that still fit
+    room = k - above.sum(axis=1, keepdims=True)
+    keep = above | (tie & (np.cumsum(tie, axis=1) <= room))
+    cols = np.nonzero(keep)[1].reshape(n_rows, k)
+    order = np.argsort(-np.take_along_axis(scores, cols, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(cols, order, axis=1)
+
+
+class CohortPlanner:
+    """route_from_rows for many students at once.
+
+    Columns of the mastery matrix are the subject's topics followed by prereqs outside the subject;
+    PREREQ adjacency is kept as CSR index arrays (indptr/indices) over those columns.
+    """
+
+    def __init__(self, rows: List[Dict]):
+        self.uids: List[str] = [r["uid"] for r in rows]
+        self.titles: List[Optional[str]] = [r.get("title") for r in rows]
+        self.columns: Dict[str, int] = {}
+        for u in self.uids:
+            self.columns.setdefault(u, len(self.columns))
+        indptr = [0]
+        indices: List[int] = []
+        for r in rows:
+            for pre in (r.get("prereqs") or []):
+                indices.append(self.columns.setdefault(pre, len(self.columns)))
+            indptr.append(len(indices))
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.topic_cols = np.asarray([self.columns[u] for u in self.uids], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+    def mastery_matrix(self, progresses: Iterable[Dict[str, float]]) -> np.ndarray:
+        progresses = list(progresses)
+        m = np.zeros((len(progresses), len(self.columns)), dtype=np.float64)
+        for s, progress in enumerate(progresses):
+            for uid, v in progress.items():
+                j = self.columns.get(uid)
+                if j is not None:
+                    m[s, j] = float(v or 0.0)
+        return m
+
+    def missing_prereqs(self, mastery: np.ndarray) -> np.ndarray:
+        """(mastery < threshold) @ PREREQᵀ, computed block-wise as prefix sums over the gathered CSR columns."""
+        n_students = mastery.shape[0]
+        out = np.zeros((n_students, len(self.uids)), dtype=np.int64)
+        if not len(self.indices):
+            return out
+        block = max(1, COHORT_BLOCK_CELLS // len(self.indices))
+        for lo in range(0, n_students, block):
+            below = mastery[lo:lo + block, self.indices] < PREREQ_MASTERED_THRESHOLD
+            csum = np.zeros((below.shape[0], below.shape[1] + 1), dtype=np.int64)
+            np.cumsum(below, axis=1, out=csum[:, 1:])
+            out[lo:lo + block] = csum[:, self.indptr[1:]] - csum[:, self.indptr[:-1]]
+        return out
+
+    def plan(self, mastery: np.ndarray, limit: int = 30, penalty_factor: float = 0.15) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Returns (top, mastered, missing, priority); top holds topic indices per student, best first."""
+        mastered = mastery[:, self.topic_cols]
+        missing = self.missing_prereqs(mastery)
+        priority = np.maximum(0.0, (1.0 - mastered) + penalty_factor * missing)
+        return top_k_rows(priority, limit), mastered, missing, priority
+
+    def plan_batch(self, progresses: List[Dict[str, float]], limit: int = 30, penalty_factor: float = 0.15) -> List[List[Dict]]:
+        if not self.uids:
+            return [route_from_rows([], p, limit=limit, penalty_factor=penalty_factor) for p in progresses]
+        top, mastered, missing, priority = self.plan(self.mastery_matrix(progresses), limit=limit, penalty_factor=penalty_factor)
+        out: List[List[Dict]] = []
+        for s in range(top.shape[0]):
+            out.append([
+                {"uid": self.uids[t], "title": self.titles[t], "mastered": float(mastered[s, t]), "missing_prereqs": int(missing[s, t]), "priority": float(priority[s, t])}
+                for t in top[s].tolist()
+            ])
+        return out
+
+
+def route_from_rows(rows: List[Dict], progress: Dict[str, float], limit: int = 30, penalty_factor: float = 0.15) -> List[Dict]:
+    items: List[Dict] = []
     for r in rows:
         tuid = r["uid"]
         mastered = float(progress.get(tuid, 0.0) or 0.0)
         missing = 0
         for pre in (r.get("prereqs") or []):
             mastered_pre = float(progress.get(pre, 0.0) or 0.0)
-            if mastered_pre < 0.3:
+            if mastered_pre < PREREQ_MASTERED_THRESHOLD:
                 missing += 1
         priority = max(0.0, (1.0 - mastered) + penalty_factor * missing)
         items.append({"uid": tuid, "title": r["title"], "mastered": mastered, "missing_prereqs": missing, "priority": priority})
-    try:
-        s.close()
-    except Exception:
-        pass
-    drv.close()
     items.sort(key=lambda x: x["priority"], reverse=True)
     if items:
         return items[:limit]
@@ -1,4 +1,5 @@
 from typing import Dict, List, Set, Tuple
+from src.services.graph.scc import find_cycles
 
 def _as_list(x):
     if x is None:
@@ -75,28 +76,7 @@ def validate_canonical_graph_snapshot(snapshot: Dict) -> Dict:
             prereq_nodes.add(src)
             prereq_nodes.add(dst)
 
-    visited: Set[str] = set()
-    stack: Set[str] = set()
-    cycles: List[List[str]] = []
-
-    def dfs(u: str, path: List[str]):
-        if u in stack:
-            try:
-                i = path.index(u)
-            except ValueError:
-                i = 0
-            cycles.append(path[i:] + [u])
-            return
-        if u in visited:
-            return
-        visited.add(u)
-        stack.add(u)
-        for v in prereq_graph.get(u, []):
-            dfs(v, path + [u])
-        stack.remove(u)
-
-    for u in list(prereq_graph.keys()):
-        dfs(u, [])
+    cycles = find_cycles(prereq_graph)
 
     if cycles:
         errors.append(f"prereq graph has cycles: {cycles[:3]}")
@@ -49,7 +49,7 @@ async def kb_validate_job(ctx, job_id: str, subject_uid: str | None = None, auto
         await publish_progress(ctx, job_id, "validate_error", {"error": str(e)})
         return state
 
-async def kb_rebuild_job(ctx, job_id: str, auto_publish: bool = False):
+async def kb_rebuild_job(ctx, job_id: str, auto_publish: bool = False, mode: str = "incremental"):
     state = {"ok": True, "status": "running", "stages": []}
     await persist_kb_rebuild_state(ctx, job_id, state)
     await publish_progress(ctx, job_id, "started", {})
@@ -65,7 +65,10 @@ async def kb_rebuild_job(ctx, job_id: str, auto_publish: bool = False):
         state["stages"].append("import_jsonl")
         await persist_kb_rebuild_state(ctx, job_id, state)
         await publish_progress(ctx, job_id, "import_jsonl", {})
-        sync_stats = sync_from_jsonl()
+        loop = asyncio.get_running_loop()
+        def on_sync_progress(phase: str, done: int, total: int):
+            asyncio.run_coroutine_threadsafe(publish_progress(ctx, job_id, "import_jsonl", {"phase": phase, "done": done, "total": total}), loop)
+        sync_stats = await asyncio.to_thread(sync_from_jsonl, mode, on_sync_progress)
         state["sync_stats"] = sync_stats
         await persist_kb_rebuild_state(ctx, job_id, state)
 
@@ -100,6 +103,12 @@ async def kb_rebuild_job(ctx, job_id: str, auto_publish: bool = False):
         state["status"] = "done"
         await persist_kb_rebuild_state(ctx, job_id, state)
 
+        try:
+            from src.events.publisher import publish_graph_rebuilt
+            await asyncio.to_thread(publish_graph_rebuilt, job_id)
+        except Exception:
+            pass
+
         try:
             from arq.connections import RedisSettings, ArqRedis
             redis = await ArqRedis.create(RedisSettings(host='redis', port=6379))
@@ -117,7 +126,22 @@ async def kb_rebuild_job(ctx, job_id: str, auto_publish: bool = False):
         await publish_progress(ctx, job_id, "error", {"error": str(e)})
         return state
 
+async def worker_startup(ctx):
+    from src.services.graph.neo4j_repo import init_driver, Neo4jRepo
+    from src.services.graph.utils import ensure_weight_defaults_migrated
+    try:
+        init_driver()
+        ensure_weight_defaults_migrated(Neo4jRepo())
+    except Exception:
+        return
+
+async def worker_shutdown(ctx):
+    from src.services.graph.neo4j_repo import close_driver
+    close_driver()
+
 class WorkerSettings:
     redis_settings = RedisSettings(host='redis', port=6379)
     functions = [magic_fill_job, kb_rebuild_job, kb_validate_job]
+    on_startup = worker_startup
+    on_shutdown = worker_shutdown
 
@@ -1,19 +1,23 @@
 from typing import Dict, List, Any
 from src.db.pg import (
-    get_conn,
-    ensure_tables,
+    pg_conn,
+    execute_prepared,
+    set_proposal_status,
     get_graph_version,
     set_graph_version,
     add_graph_change,
+    ensure_graph_changes_partition,
 )
-from src.services.rebase import rebase_check, RebaseResult
+from src.services.rebase import rebase_check_conflicts, rebase_check_batch, RebaseResult
 from src.services.integrity import integrity_check_subgraph, check_prereq_cycles, check_dangling_skills, check_skill_based_on_rules
 from src.services.graph.neo4j_repo import get_driver
 from src.events.publisher import publish_graph_committed
-from src.services.graph.neo4j_writer import merge_node, update_node, merge_rel, update_rel
+from src.services.graph.neo4j_writer import resolve_labels, merge_nodes_batch, update_nodes_batch, merge_rels_batch, update_rels_batch, link_evidence_batch
+from src.services.graph.prereq_order import find_prereq_cycle, record_prereq_edges
 from src.core.correlation import get_correlation_id
+from src.core.logging import logger
 from datetime import datetime
-import os, time
+import os, time, uuid
 try:
     from prometheus_client import Counter, Histogram
     INTEGRITY_VIOLATION_TOTAL = Counter("integrity_violation_total", "Integrity gate violations total", ["type"])
@@ -34,27 +38,20 @@ except Exception:
     INTEGRITY_BASE_RULE_VIOLATION_TOTAL = _Dummy()
 
 def _load_proposal(proposal_id: str) -> Dict | None:
-    ensure_tables()
-    conn = get_conn()
-    with conn.cursor() as cur:
-        cur.execute("SELECT tenant_id, base_graph_version, status, operations_json FROM proposals WHERE proposal_id=%s", (proposal_id,))
+    with pg_conn() as conn, conn.cursor() as cur:
+        execute_prepared(cur, "proposal_get", (proposal_id,))
         row = cur.fetchone()
-    conn.close()
     if not row:
         return None
     return {
-        "tenant_id": row[0],
-        "base_graph_version": int(row[1]),
-        "status": str(row[2]),
-        "operations": row[3],
+        "tenant_id": row[1],
+        "base_graph_version": int(row[2]),
+        "status": str(row[4]),
+        "operations": row[5],
     }
 
 def _update_proposal_status(proposal_id: str, status: str) -> None:
-    conn = get_conn()
-    conn.autocommit = True
-    with conn.cursor() as cur:
-        cur.execute("UPDATE proposals SET status=%s WHERE proposal_id=%s", (status, proposal_id))
-    conn.close()
+    set_proposal_status(proposal_id, status)
 
 def _collect_target_ids(ops: List[Dict[str, Any]]) -> List[str]:
     ids: List[str] = []
@@ -78,35 +75,102 @@ def _collect_prereq_edges(ops: List[Dict[str, Any]]) -> List[Dict[str, str]]:
                     rels.append({"type": "PREREQ", "from_uid": fu, "to_uid": tu})
     return rels
 
-def _apply_ops_tx(tx, tenant_id: str, ops: List[Dict[str, Any]]) -> None:
+# rows per UNWIND statement; bounds the parameter map of one statement on very large proposals
+COMMIT_UNWIND_CHUNK = 1000
+# application phases inside one run of ops: node upserts, node updates, rel upserts, rel updates
+_NODE_MERGE, _NODE_UPDATE, _REL_MERGE, _REL_UPDATE = range(4)
+
+def _normalize_ops(ops: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One entry per applicable op: phase, type, endpoint uids, props and evidence, with generated uids filled in."""
+    out: List[Dict[str, Any]] = []
     for op in ops:
         t = op.get("op_type")
         pd = op.get("properties_delta") or {}
+        ev = op.get("evidence") or {}
         if t in ("CREATE_NODE", "MERGE_NODE"):
-            typ = str(pd.get("type") or "Concept")
-            uid = str(pd.get("uid") or op.get("target_id") or "")
-            if not uid:
-                uid = "N-" + __import__("uuid").uuid4().hex[:16]
-            props = dict(pd)
-            merge_node(tx, tenant_id, typ, uid, props, op.get("evidence") or {})
+            uid = str(pd.get("uid") or op.get("target_id") or "") or "N-" + uuid.uuid4().hex[:16]
+            out.append({"phase": _NODE_MERGE, "type": str(pd.get("type") or "Concept"), "uid": uid, "props": dict(pd), "evidence": ev})
         elif t == "UPDATE_NODE":
-            uid = str(op.get("target_id") or "")
-            props = dict(pd)
-            update_node(tx, tenant_id, uid, props)
+            out.append({"phase": _NODE_UPDATE, "type": None, "uid": str(op.get("target_id") or ""), "props": dict(pd), "evidence": {}})
         elif t in ("CREATE_REL", "MERGE_REL"):
-            typ = str(pd.get("type") or "LINKED")
-            fu = str(pd.get("from_uid") or "")
-            tu = str(pd.get("to_uid") or "")
-            rid = pd.get("uid") or f"E-{__import__('uuid').uuid4().hex[:16]}"
-            props = dict(pd)
-            merge_rel(tx, tenant_id, typ, fu, tu, rid, props, op.get("evidence") or {})
+            rid = pd.get("uid") or f"E-{uuid.uuid4().hex[:16]}"
+            out.append({"phase": _REL_MERGE, "type": str(pd.get("type") or "LINKED"), "fu": str(pd.get("from_uid") or ""), "tu": str(pd.get("to_uid") or ""), "rid": rid, "props": dict(pd), "evidence": ev})
         elif t == "UPDATE_REL":
-            typ = str(pd.get("type") or "")
-            fu = str(pd.get("from_uid") or "")
-            tu = str(pd.get("to_uid") or "")
-            rid = str(pd.get("uid") or "")
-            props = dict(pd)
-            update_rel(tx, tenant_id, typ or None, fu, tu, rid, props, op.get("evidence") or {})
+            out.append({"phase": _REL_UPDATE, "type": str(pd.get("type") or "") or None, "fu": str(pd.get("from_uid") or ""), "tu": str(pd.get("to_uid") or ""), "rid": str(pd.get("uid") or ""), "props": dict(pd), "evidence": ev})
+    return out
+
+def _batch_ops(tenant_id: str, entries: List[Dict[str, Any]], labels: Dict[str, str]) -> List[Dict[str, List]]:
+    """Split entries into runs whose phases never go back, and group each run by (phase, label/rel type, endpoint labels).
+
+    Inside a run every node op precedes every rel op in the original order, so applying the groups phase by
+    phase keeps what each op sees; an op of an earlier phase after a later one (e.g. a node merge after a rel
+    merge) starts a new run. Endpoints without a known label fall back to a label-less match.
+    """
+    runs: List[Dict[str, List]] = []
+    groups: Dict[tuple, List[Dict]] = {}
+    evidence: Dict[Any, List[Dict]] = {}
+    top = -1
+    for e in entries:
+        ph = e["phase"]
+        if ph < top:
+            runs.append({"groups": sorted(groups.items(), key=lambda kv: kv[0][0]), "evidence": list(evidence.items())})
+            groups, evidence = {}, {}
+        top = max(top, ph) if groups else ph
+        if ph == _NODE_MERGE:
+            p = dict(e["props"])
+            p["uid"] = e["uid"]
+            p["tenant_id"] = tenant_id
+            p.setdefault("lifecycle_status", "ACTIVE")
+            p.setdefault("created_at", datetime.utcnow().isoformat())
+            groups.setdefault((ph, e["type"]), []).append({"uid": e["uid"], "props": p})
+            anchor = e["uid"]
+        elif ph == _NODE_UPDATE:
+            groups.setdefault((ph, labels.get(e["uid"])), []).append({"uid": e["uid"], "props": e["props"]})
+            anchor = None
+        else:
+            p = dict(e["props"])
+            if ph == _REL_MERGE:
+                p["uid"] = e["rid"]
+            key = (ph, e["type"], labels.get(e["fu"]), labels.get(e["tu"]))
+            groups.setdefault(key, []).append({"fu": e["fu"], "tu": e["tu"], "rid": e["rid"], "props": p})
+            anchor = e["fu"]
+        cid = e["evidence"].get("source_chunk_id")
+        quote = e["evidence"].get("quote")
+        if anchor and cid and quote:
+            evidence.setdefault(labels.get(anchor), []).append({"uid": anchor, "cid": cid, "quote": quote})
+    if groups:
+        runs.append({"groups": sorted(groups.items(), key=lambda kv: kv[0][0]), "evidence": list(evidence.items())})
+    return runs
+
+def _chunks(rows: List[Dict]):
+    for i in range(0, len(rows), COMMIT_UNWIND_CHUNK):
+        yield rows[i:i + COMMIT_UNWIND_CHUNK]
+
+def _apply_ops_tx(tx, tenant_id: str, ops: List[Dict[str, Any]]) -> None:
+    entries = _normalize_ops(ops)
+    labels: Dict[str, str] = {}
+    for e in entries:
+        if e["phase"] == _NODE_MERGE:
+            labels.setdefault(e["uid"], e["type"])
+    lookup = set()
+    for e in entries:
+        lookup.update(u for u in (e.get("uid"), e.get("fu"), e.get("tu")) if u and u not in labels)
+    labels.update(resolve_labels(tx, tenant_id, lookup))
+    for run in _batch_ops(tenant_id, entries, labels):
+        for key, rows in run["groups"]:
+            ph = key[0]
+            for chunk in _chunks(rows):
+                if ph == _NODE_MERGE:
+                    merge_nodes_batch(tx, tenant_id, key[1], chunk)
+                elif ph == _NODE_UPDATE:
+                    update_nodes_batch(tx, tenant_id, key[1], chunk)
+                elif ph == _REL_MERGE:
+                    merge_rels_batch(tx, tenant_id, key[1], key[2], key[3], chunk)
+                else:
+                    update_rels_batch(tx, tenant_id, key[1], key[2], key[3], chunk)
+        for label, rows in run["evidence"]:
+            for chunk in _chunks(rows):
+                link_evidence_batch(tx, tenant_id, label, chunk)
 
 def commit_proposal(proposal_id: str) -> Dict:
     p = _load_proposal(proposal_id)
@@ -129,24 +193,32 @@ def commit_proposal(proposal_id: str) -> Dict:
             changes.append({"target_id": tid, "change_type": "NODE"})
         elif t in ("CREATE_REL", "MERGE_REL", "UPDATE_REL"):
             changes.append({"target_id": tid, "change_type": "REL"})
-    rb = rebase_check(tenant_id, base_ver, target_ids)
+    rb, conflicting = rebase_check_conflicts(tenant_id, base_ver, target_ids)
     if rb == RebaseResult.CONFLICT:
         _update_proposal_status(proposal_id, "CONFLICT")
-        return {"ok": False, "status": "CONFLICT"}
+        return {"ok": False, "status": "CONFLICT", "violations": {"conflicting_targets": conflicting}}
     if rb == RebaseResult.FAST_REBASE:
         PROPOSAL_AUTOREBASE_TOTAL.inc()
 
-    # Integrity gate (PREREQ cycles on proposed subgraph)
+    # Integrity gate (PREREQ cycles the proposal closes in the tenant graph)
     threshold_ms = int(os.environ.get("INTEGRITY_CHECK_THRESHOLD_MS", "500"))
     with INTEGRITY_CHECK_LATENCY_MS.time():
         t0 = time.time()
         proposed_prereq = _collect_prereq_edges(ops)
+        prereq_edges = [(r["from_uid"], r["to_uid"]) for r in proposed_prereq]
         if proposed_prereq:
-            cyc = check_prereq_cycles(proposed_prereq)
+            try:
+                path = find_prereq_cycle(tenant_id, prereq_edges, get_graph_version(tenant_id))
+                cyc = list(zip(path, path[1:])) if path else []
+            except Exception as e:
+                # graph unavailable: at least the proposal's own edges must not form a cycle
+                logger.warning("prereq_cycle_gate_fallback", tenant_id=tenant_id, error=str(e))
+                path = None
+                cyc = check_prereq_cycles(proposed_prereq)
             if cyc:
                 _update_proposal_status(proposal_id, "FAILED")
                 INTEGRITY_VIOLATION_TOTAL.labels(type="prereq_cycle").inc()
-                return {"ok": False, "status": "FAILED", "violations": {"prereq_cycles": cyc}}
+                return {"ok": False, "status": "FAILED", "violations": {"prereq_cycles": cyc, "prereq_cycle_path": path}}
         nodes = []
         for op in ops:
             pd = op.get("properties_delta") or {}
@@ -197,15 +269,14 @@ def commit_proposal(proposal_id: str) -> Dict:
             writer(s)
     except Exception as e:
         _update_proposal_status(proposal_id, "FAILED")
-        drv.close()
         return {"ok": False, "status": "FAILED", "error": str(e)}
-    drv.close()
 
     # Audit & graph_version update
-    conn = get_conn()
-    conn.autocommit = False
-    new_ver = max(get_graph_version(tenant_id), base_ver) + 1
-    with conn.cursor() as cur:
+    prev_ver = get_graph_version(tenant_id)
+    new_ver = max(prev_ver, base_ver) + 1
+    if changes:
+        ensure_graph_changes_partition(tenant_id, new_ver)
+    with pg_conn(autocommit=False) as conn, conn.cursor() as cur:
         cur.execute(
             "INSERT INTO tenant_graph_version (tenant_id, graph_version) VALUES (%s,%s) ON CONFLICT (tenant_id) DO UPDATE SET graph_version=EXCLUDED.graph_version",
             (tenant_id, new_ver),
@@ -224,7 +295,21 @@ def commit_proposal(proposal_id: str) -> Dict:
         ev_payload = {"tenant_id": tenant_id, "proposal_id": proposal_id, "graph_version": new_ver, "targets": target_ids, "correlation_id": get_correlation_id() or ""}
         eid = "EV-" + uuid.uuid4().hex[:16]
         cur.execute("INSERT INTO events_outbox (event_id, tenant_id, event_type, payload, published) VALUES (%s,%s,%s,%s,FALSE)", (eid, tenant_id, "graph_committed", json.dumps(ev_payload)))
-    conn.commit()
-    conn.close()
+    # another commit since the gate leaves the cached order at an older version, which drops it
+    record_prereq_edges(tenant_id, prereq_edges, prev_ver, new_ver)
     _update_proposal_status(proposal_id, "DONE")
     return {"ok": True, "status": "DONE", "graph_version": new_ver}
+
+def rebase_queued_proposals(tenant_id: str, limit: int = 500) -> Dict:
+    """Rebase-check the tenant's queued proposals in one query and mark the conflicting ones CONFLICT before anyone reviews them."""
+    with pg_conn() as conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT proposal_id, tenant_id, base_graph_version, operations_json FROM proposals WHERE tenant_id=%s AND status IN ('DRAFT','WAITING_REVIEW','APPROVED') ORDER BY created_at LIMIT %s",
+            (tenant_id, int(limit)),
+        )
+        rows = cur.fetchall()
+    results = rebase_check_batch([(r[0], r[1], int(r[2]), _collect_target_ids(list(r[3] or []))) for r in rows])
+    conflicts = {pid: ids for pid, (rb, ids) in results.items() if rb == RebaseResult.CONFLICT}
+    for pid in conflicts:
+        _update_proposal_status(pid, "CONFLICT")
+    return {"checked": len(results), "conflicts": conflicts}
@@ -0,0 +1,62 @@
+from typing import Dict, List, Optional
+from src.db.pg import pg_conn
+from src.core.logging import logger
+
+# proposals that may still be rebase-checked; their base versions hold the history they need
+OPEN_STATUSES = ("DRAFT", "WAITING_REVIEW", "APPROVED", "COMMITTING", "ASYNC_CHECK_REQUIRED")
+
+def compaction_horizon(cur, tenant_id: str) -> int:
+    """Lowest base_graph_version among open proposals, or the current graph_version when none is open."""
+    cur.execute(
+        "SELECT LEAST((SELECT MIN(base_graph_version) FROM proposals WHERE tenant_id=%s AND status = ANY(%s)), "
+        "(SELECT graph_version FROM tenant_graph_version WHERE tenant_id=%s))",
+        (tenant_id, list(OPEN_STATUSES), tenant_id),
+    )
+    row = cur.fetchone()
+    return int(row[0]) if row and row[0] is not None else 0
+
+def compact_tenant(tenant_id: str) -> Dict:
+    """Fold graph_changes at or below the horizon into graph_change_heads (one row per target), then drop/prune that history.
+
+    A change newer than any base at or below the horizon is still visible through its head's last_version,
+    so conflict checks give the same answer with O(targets) rows.
+    """
+    with pg_conn(autocommit=False) as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('graph_changes_compact:' || %s))", (tenant_id,))
+        horizon = compaction_horizon(cur, tenant_id)
+        if horizon <= 0:
+            return {"tenant_id": tenant_id, "horizon": horizon, "folded": 0, "dropped_partitions": 0, "deleted": 0}
+        cur.execute(
+            """
+            INSERT INTO graph_change_heads (tenant_id, target_id, last_version, change_type)
+            SELECT DISTINCT ON (target_id) tenant_id, target_id, graph_version, change_type
+            FROM graph_changes WHERE tenant_id=%s AND graph_version<=%s
+            ORDER BY target_id, graph_version DESC
+            ON CONFLICT (tenant_id, target_id) DO UPDATE
+              SET last_version=EXCLUDED.last_version, change_type=EXCLUDED.change_type
+              WHERE graph_change_heads.last_version < EXCLUDED.last_version
+            """,
+            (tenant_id, horizon),
+        )
+        folded = cur.rowcount
+        # whole partitions below the horizon go with a DROP instead of row deletes
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext('graph_changes_partitions'))")
+        cur.execute("DELETE FROM graph_changes_partitions WHERE tenant_id=%s AND hi<=%s RETURNING relname", (tenant_id, horizon + 1))
+        dropped: List[str] = [r[0] for r in cur.fetchall()]
+        for name in dropped:
+            cur.execute(f"DROP TABLE IF EXISTS {name}")
+        cur.execute("DELETE FROM graph_changes WHERE tenant_id=%s AND graph_version<=%s", (tenant_id, horizon))
+        deleted = cur.rowcount
+    logger.info("graph_changes_compacted", tenant_id=tenant_id, horizon=horizon, folded=folded, dropped_partitions=len(dropped), deleted=deleted)
+    return {"tenant_id": tenant_id, "horizon": horizon, "folded": folded, "dropped_partitions": len(dropped), "deleted": deleted}
+
+def process_once(tenant_id: Optional[str] = None) -> Dict:
+    """Compact one tenant, or every tenant with a graph_version."""
+    if tenant_id:
+        tenants = [tenant_id]
+    else:
+        with pg_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT tenant_id FROM tenant_graph_version")
+            tenants = [r[0] for r in cur.fetchall()]
+    results = [compact_tenant(t) for t in tenants]
+    return {"processed": len(results), "results": results}
@@ -1,5 +1,6 @@
 from typing import Dict, List, Any
-from src.db.pg import get_conn
+from src.db.pg import pg_conn
+from src.db.pg_async import apg_conn
 from src.services.integrity import check_prereq_cycles, check_dangling_skills
 
 def _collect_nodes_and_rels(ops: List[Dict[str, Any]]) -> Dict[str, List[Dict]]:
@@ -21,23 +22,27 @@ def _collect_nodes_and_rels(ops: List[Dict[str, Any]]) -> Dict[str, List[Dict]]:
                 rels.append({"type": typ, "from_uid": fu, "to_uid": tu})
     return {"nodes": nodes, "rels": rels}
 
+def _check(ops: List[Dict[str, Any]]) -> str:
+    x = _collect_nodes_and_rels(ops)
+    cyc = check_prereq_cycles([rel for rel in x["rels"] if rel.get("type")=="PREREQ"])
+    skills = [{"type": n["type"], "uid": n["uid"]} for n in x["nodes"] if n["type"]=="Skill"]
+    based = [{"type": rel["type"], "from_uid": rel["from_uid"], "to_uid": rel["to_uid"]} for rel in x["rels"] if rel["type"]=="BASED_ON"]
+    return "FAILED" if cyc or check_dangling_skills(skills, based) else "READY"
+
 def process_once(limit: int = 20) -> Dict:
-    conn = get_conn()
-    conn.autocommit = True
     processed = 0
-    with conn.cursor() as cur:
+    with pg_conn() as conn, conn.cursor() as cur:
         cur.execute("SELECT proposal_id, tenant_id, operations_json FROM proposals WHERE status='ASYNC_CHECK_REQUIRED' LIMIT %s", (limit,))
         rows = cur.fetchall()
         for r in rows:
-            pid = r[0]; tid = r[1]; ops = list(r[2] or [])
-            x = _collect_nodes_and_rels(ops)
-            cyc = check_prereq_cycles([rel for rel in x["rels"] if rel.get("type")=="PREREQ"])
-            skills = [{"type": n["type"], "uid": n["uid"]} for n in x["nodes"] if n["type"]=="Skill"]
-            based = [{"type": rel["type"], "from_uid": rel["from_uid"], "to_uid": rel["to_uid"]} for rel in x["rels"] if rel["type"]=="BASED_ON"]
-            if cyc or check_dangling_skills(skills, based):
-                cur.execute("UPDATE proposals SET status='FAILED' WHERE proposal_id=%s", (pid,))
-            else:
-                cur.execute("UPDATE proposals SET status='READY' WHERE proposal_id=%s", (pid,))
+            cur.execute("UPDATE proposals SET status=%s WHERE proposal_id=%s", (_check(list(r[2] or [])), r[0]))
             processed += 1
-    conn.close()
     return {"processed": processed}
+
+async def process_once_async(limit: int = 20) -> Dict:
+    async with apg_conn() as conn:
+        rows = await conn.fetch("SELECT proposal_id, tenant_id, operations_json FROM proposals WHERE status='ASYNC_CHECK_REQUIRED' LIMIT $1", int(limit))
+        updates = [(_check(list(r[2] or [])), r[0]) for r in rows]
+        if updates:
+            await conn.executemany("UPDATE proposals SET status=$1 WHERE proposal_id=$2", updates)
+    return {"processed": len(updates)}
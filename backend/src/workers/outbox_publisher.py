@@ -1,5 +1,11 @@
-from typing import Dict
-from src.db.pg import outbox_fetch_unpublished, outbox_mark_published, outbox_mark_failed
+import asyncio
+import random
+import select
+import threading
+from typing import Dict, List, Optional, Tuple
+from src.config.settings import settings
+from src.core.logging import logger
+from src.db.pg import OUTBOX_CHANNEL, get_conn, pg_conn
 try:
     from prometheus_client import Counter
     OUTBOX_PUBLISH_TOTAL = Counter("outbox_publish_total", "Outbox publish attempts total", ["result"])
@@ -8,39 +14,138 @@ except Exception:
         def labels(self, *args, **kwargs): return self
         def inc(self, *args, **kwargs): ...
     OUTBOX_PUBLISH_TOTAL = _Dummy()
-from src.events.publisher import publish_graph_committed
-
-def process_once(limit: int = 100) -> Dict:
-    events = outbox_fetch_unpublished(limit)
-    processed = 0
-    for e in events:
-        et = e["event_type"]
-        pl = e["payload"]
-        if et == "graph_committed":
-            try:
-                publish_graph_committed(pl)
-                outbox_mark_published(e["event_id"])
-                processed += 1
-                OUTBOX_PUBLISH_TOTAL.labels(result="success").inc()
-            except Exception as err:
-                outbox_mark_failed(e["event_id"], error=str(err))
-                OUTBOX_PUBLISH_TOTAL.labels(result="failed").inc()
+from src.events.publisher import publish_graph_committed_batch
+
+# due events of this batch stay row-locked until the transaction ends, so concurrent publishers skip them
+CLAIM_SQL = (
+    "SELECT event_id, event_type, payload, attempts FROM events_outbox "
+    "WHERE published=FALSE AND next_attempt_at<=NOW() ORDER BY created_at LIMIT %s FOR UPDATE SKIP LOCKED"
+)
+FAIL_SQL = """
+UPDATE events_outbox e SET attempts=e.attempts+1, last_error=f.error, next_attempt_at=NOW() + f.delay * INTERVAL '1 second'
+FROM unnest(%s::text[], %s::text[], %s::float8[]) AS f(event_id, error, delay)
+WHERE e.event_id=f.event_id
+"""
+DEAD_LETTER_SQL = """
+WITH dead AS (DELETE FROM events_outbox WHERE event_id = ANY(%s) RETURNING event_id, tenant_id, event_type, payload, attempts, last_error, created_at)
+INSERT INTO events_outbox_dead (event_id, tenant_id, event_type, payload, attempts, last_error, created_at)
+SELECT d.event_id, d.tenant_id, d.event_type, d.payload, d.attempts + 1, f.error, d.created_at
+FROM dead d JOIN unnest(%s::text[], %s::text[]) AS f(event_id, error) ON f.event_id = d.event_id
+ON CONFLICT (event_id) DO NOTHING
+"""
+
+def backoff_delay(attempts: int) -> float:
+    """Seconds until the next try after attempts failed ones: exponential, capped, with jitter so failed batches spread out."""
+    delay = min(float(settings.outbox_backoff_max_sec), float(settings.outbox_backoff_base_sec) * (2 ** max(0, int(attempts))))
+    return delay * random.uniform(0.5, 1.0)
+
+def _publish(rows: List[Tuple]) -> Dict[str, str]:
+    """event_id -> error for every claimed event that was not published."""
+    failed: Dict[str, str] = {}
+    committed = []
+    for event_id, event_type, payload, _attempts in rows:
+        if event_type == "graph_committed":
+            committed.append((event_id, payload))
         else:
-            outbox_mark_failed(e["event_id"], error="unsupported_event_type")
+            failed[event_id] = "unsupported_event_type"
             OUTBOX_PUBLISH_TOTAL.labels(result="unsupported").inc()
-    return {"processed": processed}
+    if committed:
+        try:
+            errors = publish_graph_committed_batch([p for _eid, p in committed])
+        except Exception as e:
+            errors = [str(e)] * len(committed)
+        for (event_id, _p), err in zip(committed, errors):
+            if err:
+                failed[event_id] = err
+                OUTBOX_PUBLISH_TOTAL.labels(result="failed").inc()
+            else:
+                OUTBOX_PUBLISH_TOTAL.labels(result="success").inc()
+    return failed
+
+def process_once(limit: Optional[int] = None) -> Dict:
+    """Claim one batch with SKIP LOCKED, publish it through one Redis pipeline and settle it in the same transaction.
+
+    Failed events are rescheduled with exponential backoff; after OUTBOX_MAX_ATTEMPTS they move to events_outbox_dead.
+    """
+    limit = int(limit or settings.outbox_batch_size)
+    max_attempts = max(1, int(settings.outbox_max_attempts))
+    with pg_conn(autocommit=False) as conn, conn.cursor() as cur:
+        cur.execute(CLAIM_SQL, (limit,))
+        rows = cur.fetchall()
+        if not rows:
+            return {"processed": 0, "failed": 0, "dead": 0, "claimed": 0}
+        failed = _publish(rows)
+        published = [r[0] for r in rows if r[0] not in failed]
+        if published:
+            cur.execute("UPDATE events_outbox SET published=TRUE WHERE event_id = ANY(%s)", (published,))
+        attempts = {r[0]: int(r[3] or 0) for r in rows}
+        dead = [r[0] for r in rows if r[0] in failed and attempts[r[0]] + 1 >= max_attempts]
+        retry = [r[0] for r in rows if r[0] in failed and attempts[r[0]] + 1 < max_attempts]
+        if retry:
+            cur.execute(FAIL_SQL, (retry, [failed[e] for e in retry], [backoff_delay(attempts[e]) for e in retry]))
+        if dead:
+            cur.execute(DEAD_LETTER_SQL, (dead, dead, [failed[e] for e in dead]))
+            OUTBOX_PUBLISH_TOTAL.labels(result="dead_letter").inc(len(dead))
+            logger.warning("outbox_dead_letter", events=len(dead))
+    return {"processed": len(published), "failed": len(retry), "dead": len(dead), "claimed": len(rows)}
 
 def process_retry(limit: int = 100) -> Dict:
-    evs = outbox_fetch_unpublished(limit)
-    retried = 0
-    for e in evs:
-        if e["event_type"] == "graph_committed":
-            try:
-                publish_graph_committed(e["payload"])
-                outbox_mark_published(e["event_id"])
-                retried += 1
-            except Exception as err:
-                outbox_mark_failed(e["event_id"], error=str(err))
-        else:
-            outbox_mark_failed(e["event_id"], error="unsupported_event_type")
-    return {"retried": retried}
+    # failed events are retried by process_once as soon as their backoff has elapsed
+    return {"retried": process_once(limit)["processed"]}
+
+async def process_once_async(limit: int = 100) -> Dict:
+    return await asyncio.to_thread(process_once, limit)
+
+def drain(limit: Optional[int] = None) -> int:
+    """Publish batches until no due event is left; returns the number published."""
+    limit = int(limit or settings.outbox_batch_size)
+    total = 0
+    while True:
+        res = process_once(limit)
+        total += res["processed"]
+        if res["claimed"] < limit:
+            return total
+
+def _seconds_until_due(conn) -> float:
+    with conn.cursor() as cur:
+        cur.execute("SELECT EXTRACT(EPOCH FROM (MIN(next_attempt_at) - NOW())) FROM events_outbox WHERE published=FALSE")
+        row = cur.fetchone()
+    idle = float(settings.outbox_idle_wakeup_sec)
+    if not row or row[0] is None:
+        return idle
+    # overdue rows right after a drain are claimed by another publisher: do not spin on them
+    return max(0.5, min(idle, float(row[0])))
+
+def run_forever(stop: Optional[threading.Event] = None) -> None:
+    """Long-lived publisher: drains the outbox, then sleeps until a NOTIFY from a new event or the next backoff is due.
+
+    Any number of these can run side by side; SKIP LOCKED hands every event to exactly one of them.
+    """
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        conn = None
+        try:
+            # LISTEN needs a connection of its own for the life of the loop, outside the shared pool
+            conn = get_conn()
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {OUTBOX_CHANNEL}")
+            logger.info("outbox_publisher_listening", channel=OUTBOX_CHANNEL)
+            while not stop.is_set():
+                drain()
+                # asleep until a notification, the earliest backoff, or OUTBOX_IDLE_WAKEUP_SEC (which also bounds how late stop is seen)
+                if select.select([conn], [], [], _seconds_until_due(conn))[0]:
+                    conn.poll()
+                    conn.notifies.clear()
+        except Exception as e:
+            logger.warning("outbox_publisher_error", error=str(e))
+            stop.wait(1.0)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    ...
+
+if __name__ == "__main__":
+    run_forever()
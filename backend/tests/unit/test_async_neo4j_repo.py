@@ -0,0 +1,75 @@
+import asyncio
+from src.services.graph import neo4j_async_repo
+from src.services import roadmap_planner
+
+
+class _Result:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def __aiter__(self):
+        self._it = iter(self._rows)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._it)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _Tx:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def run(self, query, **params):
+        return _Result(self.rows)
+
+
+class _Session:
+    def __init__(self, drv):
+        self.drv = drv
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *a):
+        return False
+
+    async def execute_read(self, fn):
+        self.drv.calls += 1
+        if self.drv.fail_first and self.drv.calls == 1:
+            raise RuntimeError("transient")
+        return await fn(_Tx(self.drv.rows))
+
+
+class _Driver:
+    def __init__(self, rows, fail_first=False):
+        self.rows = rows
+        self.fail_first = fail_first
+        self.calls = 0
+
+    def session(self):
+        return _Session(self)
+
+
+def test_async_repo_read_retries(monkeypatch):
+    drv = _Driver([{"uid": "A"}], fail_first=True)
+    monkeypatch.setattr(neo4j_async_repo, "get_async_driver", lambda: drv)
+    repo = neo4j_async_repo.AsyncNeo4jRepo(backoff_sec=0.0)
+    rows = asyncio.run(repo.read("MATCH (n) RETURN n.uid AS uid"))
+    assert rows == [{"uid": "A"}]
+    assert drv.calls == 2
+
+
+def test_plan_route_async_matches_sync_scoring(monkeypatch):
+    rows = [
+        {"uid": "TOP-A", "title": "A", "prereqs": []},
+        {"uid": "TOP-B", "title": "B", "prereqs": ["TOP-A"]},
+    ]
+    drv = _Driver(rows)
+    monkeypatch.setattr(neo4j_async_repo, "get_async_driver", lambda: drv)
+    progress = {"TOP-A": 0.1, "TOP-B": 0.0}
+    items = asyncio.run(roadmap_planner.plan_route_async(None, progress, limit=10))
+    assert items == roadmap_planner.route_from_rows(rows, progress, limit=10)
+    assert items[0]["uid"] == "TOP-B" and items[0]["missing_prereqs"] == 1
@@ -0,0 +1,85 @@
+import threading
+import pytest
+from neo4j.exceptions import CypherSyntaxError, TransientError
+from src.services.graph.bulk_writer import BulkPhase, BulkWriter, ChunkSizer
+
+
+class _Result:
+    def consume(self):
+        ...
+
+
+class _Session:
+    def __init__(self, drv):
+        self.drv = drv
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+    def execute_write(self, fn):
+        return fn(self)
+
+    def run(self, query, rows=None):
+        with self.drv.lock:
+            self.drv.calls += 1
+            err = self.drv.errors.pop(0) if self.drv.errors else None
+        if err is not None:
+            raise err
+        with self.drv.lock:
+            self.drv.written.append((query, list(rows)))
+            self.drv.threads.add(threading.current_thread().name)
+        return _Result()
+
+
+class _Driver:
+    def __init__(self, errors=None):
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.errors = list(errors or [])
+        self.written = []
+        self.threads = set()
+
+    def session(self):
+        return _Session(self)
+
+
+def test_parallel_node_phase_then_ordered_rel_phase():
+    drv = _Driver()
+    events = []
+    w = BulkWriter(drv, parallelism=4, chunk_size=50, progress=lambda phase, done, total: events.append((phase, done, total)))
+    nodes = [{"uid": i} for i in range(1000)]
+    rels = [{"a": i} for i in range(120)]
+    w.run([BulkPhase("nodes", "N", nodes, True), BulkPhase("rels", "R", rels)])
+    node_rows = sorted(r["uid"] for q, rows in drv.written if q == "N" for r in rows)
+    assert node_rows == list(range(1000))
+    queries = [q for q, _ in drv.written]
+    assert queries.index("R") > max(i for i, q in enumerate(queries) if q == "N")
+    assert [r["a"] for q, rows in drv.written if q == "R" for r in rows] == list(range(120))
+    assert events[-1] == ("rels", 120, 120)
+    assert max(d for p, d, t in events if p == "nodes") == 1000
+
+
+def test_retries_only_transient_errors():
+    drv = _Driver(errors=[TransientError("deadlock")])
+    BulkWriter(drv, parallelism=1, backoff_sec=0.0).run_phase(BulkPhase("x", "Q", [{"a": 1}]))
+    assert drv.calls == 2 and len(drv.written) == 1
+
+    drv = _Driver(errors=[CypherSyntaxError("bad")])
+    with pytest.raises(CypherSyntaxError):
+        BulkWriter(drv, parallelism=1, backoff_sec=0.0).run_phase(BulkPhase("x", "Q", [{"a": 1}]))
+    assert drv.calls == 1
+
+
+def test_chunk_sizer_follows_target_time():
+    s = ChunkSizer(500, target_ms=100, lo=50, hi=5000)
+    s.observe(500, 1000.0)
+    assert s.size == 275
+    for _ in range(20):
+        s.observe(s.size, 1000.0)
+    assert s.size == 50
+    for _ in range(20):
+        s.observe(s.size, 1.0)
+    assert s.size == 5000
@@ -0,0 +1,64 @@
+import json
+import random
+import numpy as np
+from src.services import roadmap_planner
+from src.services.roadmap_planner import CohortPlanner, route_from_rows, top_k_rows
+
+
+ROWS = [
+    {"uid": "T0", "title": "t0", "prereqs": []},
+    {"uid": "T1", "title": "t1", "prereqs": ["T0"]},
+    {"uid": "T2", "title": "t2", "prereqs": ["T0", "T1", "EXT-9"]},
+    {"uid": "T3", "title": "t3", "prereqs": ["T2"]},
+    {"uid": "T4", "title": "t4", "prereqs": []},
+]
+
+
+def test_top_k_rows_matches_stable_sort():
+    rng = np.random.default_rng(7)
+    scores = rng.integers(0, 4, size=(50, 12)).astype(float)
+    for k in (1, 3, 12, 20):
+        expected = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        assert np.array_equal(top_k_rows(scores, k), expected)
+
+
+def test_cohort_plan_matches_route_from_rows(monkeypatch):
+    monkeypatch.setattr(roadmap_planner, "COHORT_BLOCK_CELLS", 8)
+    rnd = random.Random(3)
+    uids = [r["uid"] for r in ROWS] + ["EXT-9", "UNKNOWN"]
+    progresses = [{u: rnd.choice([0.0, 0.1, 0.3, 0.5, 1.0]) for u in uids if rnd.random() < 0.7} for _ in range(40)]
+    planner = CohortPlanner(ROWS)
+    assert len(planner) == 5
+    for limit in (2, 5, 30):
+        batch = planner.plan_batch(progresses, limit=limit)
+        assert batch == [route_from_rows(ROWS, p, limit=limit) for p in progresses]
+
+
+def test_missing_prereqs_counts_unmastered_edges():
+    planner = CohortPlanner(ROWS)
+    m = planner.mastery_matrix([{"T0": 1.0, "T1": 0.2}, {}])
+    assert planner.missing_prereqs(m).tolist() == [[0, 0, 2, 1, 0], [0, 1, 3, 1, 0]]
+
+
+def test_roadmap_batch_endpoint_streams_ndjson(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from src.api import graph as graph_api
+
+    async def rows(subject_uid):
+        return ROWS
+
+    monkeypatch.setattr(graph_api, "load_route_rows_async", rows)
+    app = FastAPI()
+    app.include_router(graph_api.router)
+    body = "\n".join([
+        json.dumps({"id": "s1", "progress": {"T0": 1.0}}),
+        "not json",
+        json.dumps({"id": "s2", "progress": {}}),
+    ])
+    r = TestClient(app).post("/v1/graph/roadmap/batch?limit=2", content=body)
+    assert r.status_code == 200 and r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(l) for l in r.text.splitlines()]
+    assert lines[1] == {"line": 2, "error": "invalid_parameters"}
+    assert [lines[0]["id"], lines[2]["id"]] == ["s1", "s2"]
+    assert lines[0]["items"] == route_from_rows(ROWS, {"T0": 1.0}, limit=2)
@@ -0,0 +1,34 @@
+import json
+import uuid
+from src.db.pg import ensure_tables, get_conn, set_graph_version, add_graph_change, graph_changes_partition_name
+from src.services.rebase import rebase_check, RebaseResult
+from src.workers.graph_changes_compaction import compact_tenant
+
+
+def test_partition_names_are_valid_identifiers():
+    name = graph_changes_partition_name("tenant with 'quotes'", 20000)
+    assert name.startswith("graph_changes_") and name.endswith("_20000")
+    assert name.replace("_", "").isalnum() and len(name) < 63
+
+
+def test_compaction_keeps_conflict_answers_and_prunes_history():
+    ensure_tables()
+    tid = "tenant-" + uuid.uuid4().hex[:8]
+    set_graph_version(tid, 50)
+    for v, target in ((51, "A"), (52, "B"), (53, "A"), (54, "C")):
+        add_graph_change(tid, v, target)
+    set_graph_version(tid, 54)
+    conn = get_conn(); conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("INSERT INTO proposals (proposal_id, tenant_id, base_graph_version, proposal_checksum, status, operations_json) VALUES (%s,%s,53,'x','DRAFT',%s)", ("P-" + uuid.uuid4().hex, tid, json.dumps([])))
+    res = compact_tenant(tid)
+    assert res["horizon"] == 53 and res["deleted"] == 3
+    with conn.cursor() as cur:
+        cur.execute("SELECT target_id FROM graph_changes WHERE tenant_id=%s", (tid,))
+        assert [r[0] for r in cur.fetchall()] == ["C"]
+        cur.execute("SELECT target_id, last_version FROM graph_change_heads WHERE tenant_id=%s ORDER BY target_id", (tid,))
+        assert cur.fetchall() == [("A", 53), ("B", 52)]
+    conn.close()
+    assert rebase_check(tid, 52, ["A"]) == RebaseResult.CONFLICT
+    assert rebase_check(tid, 53, ["A", "B"]) == RebaseResult.FAST_REBASE
+    assert rebase_check(tid, 53, ["C"]) == RebaseResult.CONFLICT
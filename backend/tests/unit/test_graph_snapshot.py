@@ -0,0 +1,80 @@
+import time
+from src.config.settings import settings
+from src.services.graph import snapshot as snapmod
+from src.services.graph.snapshot import GraphSnapshot
+
+NODES = [
+    {"uid": "SUB-1", "title": "Math", "labels": ["Subject"]},
+    {"uid": "SEC-1", "title": "Algebra", "labels": ["Section"]},
+    {"uid": "TOP-A", "title": "A", "labels": ["Topic"], "sw": 0.4},
+    {"uid": "TOP-B", "title": "B", "labels": ["Topic"]},
+    {"uid": "TOP-C", "title": "C", "labels": ["Topic"]},
+    {"uid": "SK-1", "title": "Skill", "labels": ["Skill"]},
+]
+EDGES = [
+    {"a": "SUB-1", "b": "SEC-1", "rel": "CONTAINS"},
+    {"a": "SEC-1", "b": "TOP-A", "rel": "CONTAINS"},
+    {"a": "SEC-1", "b": "TOP-B", "rel": "CONTAINS"},
+    {"a": "SEC-1", "b": "TOP-C", "rel": "CONTAINS"},
+    {"a": "TOP-B", "b": "TOP-A", "rel": "PREREQ"},
+    {"a": "TOP-C", "b": "TOP-B", "rel": "PREREQ"},
+    {"a": "TOP-A", "b": "SK-1", "rel": "USES_SKILL", "w": "linked"},
+    {"a": "TOP-A", "b": "MISSING", "rel": "PREREQ"},
+]
+
+
+def test_csr_adjacency_and_topic_rows():
+    s = GraphSnapshot.from_rows(NODES, EDGES, graph_version=3)
+    assert len(s) == 6 and s.edge_count() == 7
+    b = s.index["TOP-B"]
+    assert [s.uids[i] for i in s.out["PREREQ"].row(b)] == ["TOP-A"]
+    rows = {r["uid"]: r["prereqs"] for r in s.topic_rows("SUB-1")}
+    assert rows == {"TOP-A": [], "TOP-B": ["TOP-A"], "TOP-C": ["TOP-B"]}
+
+
+def test_graph_committed_swaps_loaded_snapshots(monkeypatch):
+    loads = []
+    def fake_load(tenant_id=None, graph_version=None):
+        loads.append((tenant_id, graph_version))
+        return GraphSnapshot.from_rows(NODES, EDGES, tenant_id=tenant_id, graph_version=int(graph_version or 0))
+    monkeypatch.setattr(settings, "graph_snapshot_enabled", True)
+    monkeypatch.setattr(snapmod, "load_snapshot", fake_load)
+    monkeypatch.setattr(snapmod, "_snapshots", {})
+    scheduled = []
+    monkeypatch.setattr(snapmod, "_schedule_load", scheduled.append)
+    assert snapmod.current_snapshot("t1") is None
+    assert scheduled == ["t1"]
+    first = snapmod.refresh_snapshot("t1", 1)
+    snapmod.on_graph_committed({"tenant_id": "t2", "graph_version": 5})
+    assert snapmod.current_snapshot("t1") is first
+    snapmod.on_graph_committed({"tenant_id": "t1", "graph_version": 1})
+    assert snapmod.current_snapshot("t1") is first
+    snapmod.on_graph_committed({"tenant_id": "t1", "graph_version": 2})
+    assert snapmod.current_snapshot("t1").graph_version == 2
+    assert loads == [("t1", 1), ("t1", 2)]
+
+
+def test_commit_refreshes_only_its_tenant_and_drops_shared_view(monkeypatch):
+    loads = []
+    def fake_load(tenant_id=None, graph_version=None):
+        loads.append((tenant_id, graph_version))
+        return GraphSnapshot.from_rows(NODES, EDGES, tenant_id=tenant_id, graph_version=int(graph_version or 0))
+    monkeypatch.setattr(settings, "graph_snapshot_enabled", True)
+    monkeypatch.setattr(snapmod, "load_snapshot", fake_load)
+    monkeypatch.setattr(snapmod, "_snapshots", {})
+    monkeypatch.setattr(snapmod, "_pending", {})
+    monkeypatch.setattr(snapmod, "_failed_at", {})
+    snapmod.refresh_snapshot(None)
+    snapmod.refresh_snapshot("t1", 1)
+    snapmod.refresh_snapshot("t2", 1)
+    loads.clear()
+    snapmod.on_graph_committed({"tenant_id": "t1", "graph_version": 2})
+    assert loads == [("t1", 2)]
+    assert "" not in snapmod._snapshots and snapmod._snapshots["t2"].graph_version == 1
+    # a missing view is loaded off the request path
+    assert snapmod.current_snapshot(None) is None
+    for _ in range(200):
+        if "" in snapmod._snapshots:
+            break
+        time.sleep(0.01)
+    assert loads == [("t1", 2), (None, None)]
@@ -0,0 +1,106 @@
+import json
+from src.services.graph import utils
+from src.services.kb import jsonl_io
+
+
+class _Result:
+    def consume(self):
+        ...
+
+
+class _Session:
+    def __init__(self, log):
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+    def execute_write(self, fn):
+        return fn(self)
+
+    def run(self, query, rows=None, **k):
+        if rows is not None:
+            self.log.append((query, list(rows)))
+        return _Result()
+
+
+class _Driver:
+    def __init__(self):
+        self.log = []
+
+    def session(self):
+        return _Session(self.log)
+
+
+class FakeRepo:
+    def __init__(self):
+        self.driver = _Driver()
+        self.unwinds = self.driver.log
+        self.writes = []
+
+    def write(self, query, params=None):
+        self.writes.append(query)
+
+    def read(self, query, params=None):
+        return [{"c": 1}]
+
+    def close(self):
+        ...
+
+
+def _write(kb, name, rows):
+    (kb / name).write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows), encoding="utf-8")
+
+
+def _kb(tmp_path, prereqs):
+    _write(tmp_path, "subjects.jsonl", [{"uid": "SUB-1", "title": "Math"}])
+    _write(tmp_path, "sections.jsonl", [{"uid": "SEC-1", "title": "Algebra", "subject_uid": "SUB-1"}])
+    _write(tmp_path, "topics.jsonl", [{"uid": f"TOP-{i}", "title": f"T{i}", "section_uid": "SEC-1"} for i in range(3)])
+    _write(tmp_path, "topic_prereqs.jsonl", prereqs)
+
+
+def _run(monkeypatch, mode="incremental"):
+    repo = FakeRepo()
+    monkeypatch.setattr(utils, "Neo4jRepo", lambda: repo)
+    return utils.sync_from_jsonl(mode=mode), repo
+
+
+def test_incremental_pushes_only_delta(tmp_path, monkeypatch):
+    monkeypatch.setattr(jsonl_io, "KB_DIR", str(tmp_path))
+    _kb(tmp_path, [{"topic_uid": "TOP-1", "prereq_uid": "TOP-0"}, {"topic_uid": "TOP-2", "prereq_uid": "TOP-1"}])
+    first, _ = _run(monkeypatch)
+    assert first["skipped"] == 0 and first["upserted"] == 1 + 1 + 3 + 1 + 3 + 2
+
+    _kb(tmp_path, [{"topic_uid": "TOP-1", "prereq_uid": "TOP-0", "weight": 0.5}])
+    second, repo = _run(monkeypatch)
+    assert second["mode"] == "incremental"
+    assert second["upserted"] == 1 and second["deleted"] == 1
+    assert second["skipped"] == first["upserted"] - 2
+    prereq_upserts = [rows for q, rows in repo.unwinds if ":PREREQ]" in q and "MERGE" in q]
+    assert prereq_upserts == [[{"topic_uid": "TOP-1", "prereq_uid": "TOP-0", "weight": 0.5, "confidence": 0.9}]]
+    deletes = [rows for q, rows in repo.unwinds if "DELETE" in q]
+    assert deletes == [[{"k0": "TOP-2", "k1": "TOP-1"}]]
+    assert repo.writes == []
+
+    third, repo = _run(monkeypatch)
+    assert third["upserted"] == 0 and third["deleted"] == 0 and repo.unwinds == []
+
+
+def test_full_mode_repushes_everything(tmp_path, monkeypatch):
+    monkeypatch.setattr(jsonl_io, "KB_DIR", str(tmp_path))
+    _kb(tmp_path, [])
+    _run(monkeypatch)
+    full, repo = _run(monkeypatch, mode="full")
+    assert full["mode"] == "full" and full["skipped"] == 0 and full["upserted"] == 9
+    # weight defaults are part of the Topic upsert itself, not a follow-up full-graph scan
+    topic_upserts = [q for q, _ in repo.unwinds if "(n:Topic" in q]
+    assert topic_upserts and all("COALESCE(n.static_weight" in q for q in topic_upserts)
+    assert repo.writes == []
+
+
+def test_generated_uids_do_not_depend_on_hash_seed():
+    # built-in hash() of str is salted per process, which made generated Goal/Objective/ContentUnit uids unstable
+    assert utils._stable_hash("goal") == 179811044788808
@@ -0,0 +1,76 @@
+from pydantic import SecretStr
+from src.config.settings import settings
+from src.services.graph import neo4j_repo
+
+
+class _Conn:
+    def __init__(self, in_use):
+        self.in_use = in_use
+
+
+class _Pool:
+    def __init__(self):
+        self.connections = {"neo4j:7687": [_Conn(True), _Conn(False), _Conn(False)]}
+
+
+class _Driver:
+    def __init__(self, kwargs):
+        self.kwargs = kwargs
+        self._closed = False
+        self._pool = _Pool()
+
+    def close(self):
+        self._closed = True
+
+
+def _setup(monkeypatch):
+    created = []
+    def fake_driver(uri, auth=None, **kwargs):
+        d = _Driver(kwargs)
+        created.append(d)
+        return d
+    monkeypatch.setattr(settings, "neo4j_uri", "bolt://neo4j:7687")
+    monkeypatch.setattr(settings, "neo4j_user", "neo4j")
+    monkeypatch.setattr(settings, "neo4j_password", SecretStr("pw"))
+    monkeypatch.setattr(neo4j_repo.GraphDatabase, "driver", fake_driver)
+    # other tests swap the module-level accessor for a stub
+    monkeypatch.setattr(neo4j_repo, "get_driver", neo4j_repo.init_driver)
+    neo4j_repo._reset_after_fork()
+    return created
+
+
+def test_driver_is_shared_and_configured(monkeypatch):
+    created = _setup(monkeypatch)
+    d1 = neo4j_repo.get_driver()
+    d2 = neo4j_repo.get_driver()
+    repo = neo4j_repo.Neo4jRepo()
+    repo.close()
+    assert d1 is d2 is repo.driver
+    assert len(created) == 1
+    assert d1._closed is False
+    assert d1.kwargs["max_connection_pool_size"] == settings.neo4j_max_pool_size
+    assert "liveness_check_timeout" in d1.kwargs
+    neo4j_repo.close_driver()
+    assert d1._closed is True
+
+
+def test_driver_recreated_after_fork_and_close(monkeypatch):
+    created = _setup(monkeypatch)
+    d1 = neo4j_repo.get_driver()
+    neo4j_repo._reset_after_fork()
+    d2 = neo4j_repo.get_driver()
+    assert d2 is not d1 and d1._closed is False
+    d2.close()
+    d3 = neo4j_repo.get_driver()
+    assert d3 is not d2
+    assert len(created) == 3
+    neo4j_repo.close_driver()
+
+
+def test_pool_stats(monkeypatch):
+    _setup(monkeypatch)
+    assert neo4j_repo.pool_stats()["in_use"] == 0
+    neo4j_repo.get_driver()
+    stats = neo4j_repo.pool_stats()
+    assert stats["in_use"] == 1 and stats["idle"] == 2
+    neo4j_repo.close_driver()
@@ -0,0 +1,60 @@
+from src.services.graph import utils
+
+
+class FakeRepo:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def read(self, query, params=None):
+        self.queries.append(query)
+        return self.rows
+
+    def write(self, query, params=None):
+        ...
+
+    def close(self):
+        ...
+
+
+def _patch(monkeypatch, rows):
+    repo = FakeRepo(rows)
+    monkeypatch.setattr(utils, "Neo4jRepo", lambda: repo)
+    monkeypatch.setattr(utils, "ensure_weight_defaults_repo", lambda r: None)
+    return repo
+
+
+def test_topic_details_single_read(monkeypatch):
+    row = {
+        "labels": ["Topic"], "title": "Fractions", "sw": 0.4, "dw": 0.6,
+        "targets": [{"uid": "G1", "title": "Goal", "label": "Goal"}, {"uid": "O1", "title": "Obj", "label": "Objective"}],
+        "prereqs": [{"uid": "TOP-0", "title": "Numbers"}],
+        "methods": [{"uid": "M1", "title": "m"}, {"uid": "M1", "title": "m"}],
+        "linked_methods": [], "topics": [], "sections": [], "skills": [],
+    }
+    repo = _patch(monkeypatch, [row])
+    d = utils.get_node_details("TOP-1")
+    assert len(repo.queries) == 1
+    assert d["type"] == "Topic" and d["dynamic_weight"] == 0.6
+    assert [t["type"] for t in d["targets"]] == ["goal", "objective"]
+    assert d["methods"] == [{"uid": "M1", "title": "m"}]
+    assert d["summary"] == {"title": "Fractions", "prereqs_count": 1, "targets_count": 2, "methods_count": 1}
+    assert "linked_methods" not in d
+
+
+def test_missing_node(monkeypatch):
+    _patch(monkeypatch, [])
+    assert utils.get_node_details("NOPE") == {"found": False}
+
+
+def test_adaptive_roadmap_single_read(monkeypatch):
+    rows = [
+        {"uid": "T1", "title": "a", "sw": 0.5, "dw": 0.8, "skills": [{"uid": "S1", "title": "s", "static_weight": 0.5, "dynamic_weight": 0.5}] * 2, "methods": [{"uid": "M1", "title": "m"}]},
+        {"uid": "T2", "title": "b", "sw": 0.5, "dw": None, "skills": [], "methods": []},
+    ]
+    repo = _patch(monkeypatch, rows)
+    out = utils.build_adaptive_roadmap("SUB", limit=2)
+    assert len(repo.queries) == 1
+    assert [x["priority"] for x in out] == ["high", "low"]
+    assert out[0]["skills"] == [{"uid": "S1", "title": "s", "static_weight": 0.5, "dynamic_weight": 0.5}]
+    assert out[0]["topic"] == {"uid": "T1", "title": "a", "static_weight": 0.5, "dynamic_weight": 0.8}
@@ -0,0 +1,60 @@
+from contextlib import contextmanager
+from src.config.settings import settings
+from src.workers import outbox_publisher
+from src.workers.outbox_publisher import backoff_delay, process_once
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.sql = []
+
+    def execute(self, sql, params=None):
+        self.sql.append((" ".join(sql.split()), params))
+
+    def fetchall(self):
+        return self.rows
+
+
+def _patch(monkeypatch, rows, errors):
+    cur = FakeCursor(rows)
+
+    @contextmanager
+    def fake_pg_conn(autocommit=True):
+        assert autocommit is False
+
+        class Conn:
+            def cursor(self):
+                @contextmanager
+                def c():
+                    yield cur
+                return c()
+        yield Conn()
+
+    published = []
+    monkeypatch.setattr(outbox_publisher, "pg_conn", fake_pg_conn)
+    monkeypatch.setattr(outbox_publisher, "publish_graph_committed_batch", lambda evs: published.append(list(evs)) or errors)
+    return cur, published
+
+
+def test_batch_is_claimed_published_in_one_pipeline_and_settled(monkeypatch):
+    monkeypatch.setattr(settings, "outbox_max_attempts", 3)
+    rows = [("E1", "graph_committed", {"n": 1}, 0), ("E2", "graph_committed", {"n": 2}, 0), ("E3", "graph_committed", {"n": 3}, 2), ("E4", "other", {}, 0)]
+    cur, published = _patch(monkeypatch, rows, [None, "down", "down"])
+    res = process_once(limit=10)
+    assert published == [[{"n": 1}, {"n": 2}, {"n": 3}]]
+    assert res == {"processed": 1, "failed": 2, "dead": 1, "claimed": 4}
+    sqls = [s for s, _ in cur.sql]
+    assert "FOR UPDATE SKIP LOCKED" in sqls[0]
+    assert cur.sql[1] == ("UPDATE events_outbox SET published=TRUE WHERE event_id = ANY(%s)", (["E1"],))
+    retry_ids, errors, delays = cur.sql[2][1]
+    assert retry_ids == ["E2", "E4"] and errors == ["down", "unsupported_event_type"]
+    assert sqls[3].startswith("WITH dead AS (DELETE FROM events_outbox") and cur.sql[3][1][0] == ["E3"]
+
+
+def test_backoff_grows_exponentially_and_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "outbox_backoff_base_sec", 2.0)
+    monkeypatch.setattr(settings, "outbox_backoff_max_sec", 60.0)
+    assert 1.0 <= backoff_delay(0) <= 2.0
+    assert 16.0 <= backoff_delay(4) <= 32.0
+    assert 30.0 <= backoff_delay(20) <= 60.0
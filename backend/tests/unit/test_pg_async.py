@@ -0,0 +1,90 @@
+import asyncio
+from contextlib import asynccontextmanager
+from src.db import pg_async
+from src.db.pg import PREPARED_STATEMENTS
+
+
+class FakeConn:
+    def __init__(self, rows=None):
+        self.calls = []
+        self.rows = rows or []
+
+    async def fetch(self, sql, *args):
+        self.calls.append(("fetch", sql, args))
+        return self.rows
+
+    async def fetchrow(self, sql, *args):
+        self.calls.append(("fetchrow", sql, args))
+        return self.rows[0] if self.rows else None
+
+    async def fetchval(self, sql, *args):
+        self.calls.append(("fetchval", sql, args))
+        return self.rows[0][0] if self.rows else None
+
+    async def execute(self, sql, *args):
+        self.calls.append(("execute", sql, args))
+
+
+def _patch(monkeypatch, conn):
+    @asynccontextmanager
+    async def fake_conn(transaction=False):
+        yield conn
+    monkeypatch.setattr(pg_async, "apg_conn", fake_conn)
+
+
+def test_proposal_reads_map_rows_like_sync_layer(monkeypatch):
+    conn = FakeConn([("P1", "t1", 3, "sum", "DRAFT", [{"op_id": "1"}])])
+    _patch(monkeypatch, conn)
+    p = asyncio.run(pg_async.get_proposal("P1"))
+    assert p == {"proposal_id": "P1", "tenant_id": "t1", "base_graph_version": 3, "proposal_checksum": "sum", "status": "DRAFT", "operations": [{"op_id": "1"}]}
+    assert conn.calls[0][1] == PREPARED_STATEMENTS["proposal_get"]
+
+
+def test_list_and_version_use_shared_statements(monkeypatch):
+    conn = FakeConn([(7,)])
+    _patch(monkeypatch, conn)
+    assert asyncio.run(pg_async.get_graph_version("t1")) == 7
+    conn.rows = []
+    asyncio.run(pg_async.list_proposals("t1", "DRAFT", limit=5, offset=10))
+    asyncio.run(pg_async.list_proposals("t1"))
+    assert conn.calls[1] == ("fetch", PREPARED_STATEMENTS["proposals_list_status"], ("t1", "DRAFT", 5, 10))
+    assert conn.calls[2] == ("fetch", PREPARED_STATEMENTS["proposals_list"], ("t1", 20, 0))
+
+
+def test_insert_proposal_passes_operations_as_json_value(monkeypatch):
+    conn = FakeConn()
+    _patch(monkeypatch, conn)
+    asyncio.run(pg_async.insert_proposal("P1", "t1", 0, "sum", "DRAFT", [{"op_id": "1"}]))
+    kind, sql, args = conn.calls[0]
+    assert sql.startswith("INSERT INTO proposals") and args[-1] == [{"op_id": "1"}]
+
+
+def test_concurrent_first_calls_create_one_pool(monkeypatch):
+    import sys, types
+    created = []
+
+    async def create_pool(dsn, **kwargs):
+        await asyncio.sleep(0.01)
+        created.append(object())
+        return created[-1]
+
+    monkeypatch.setitem(sys.modules, "asyncpg", types.SimpleNamespace(create_pool=create_pool))
+    monkeypatch.setattr(pg_async.settings, "pg_dsn", "postgresql://u:p@localhost/db")
+    monkeypatch.setattr(pg_async, "_async_pool", None)
+    monkeypatch.setattr(pg_async, "_async_pool_key", None)
+
+    async def run():
+        return await asyncio.gather(*[pg_async.get_async_pool() for _ in range(5)])
+
+    pools = asyncio.run(run())
+    assert len(created) == 1 and all(p is created[0] for p in pools)
+
+
+def test_add_graph_change_ensures_partition_first(monkeypatch):
+    conn = FakeConn()
+    _patch(monkeypatch, conn)
+    ensured = []
+    monkeypatch.setattr(pg_async, "ensure_graph_changes_partition", lambda tid, v: ensured.append((tid, v, len(conn.calls))))
+    asyncio.run(pg_async.add_graph_change("t1", 12, "A", "NODE"))
+    assert ensured == [("t1", 12, 0)]
+    assert conn.calls[0] == ("execute", PREPARED_STATEMENTS["graph_change_add"], ("t1", 12, "A", "NODE"))
@@ -0,0 +1,101 @@
+import threading
+import pytest
+from src.config.settings import settings
+from src.db import pg
+
+
+class FakeConn:
+    def __init__(self, n):
+        self.n = n
+        self.closed = 0
+        self.autocommit = False
+        self.prepared = set()
+        self.last_used = 0.0
+        self.queries = []
+        self.fail_ping = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.connection = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        ...
+
+    def execute(self, sql, params=None):
+        if sql == "SELECT 1" and self.connection.fail_ping:
+            raise RuntimeError("server closed the connection")
+        self.connection.queries.append((sql, params))
+
+
+class FakeThreadedPool:
+    def __init__(self, minconn, maxconn, dsn, connection_factory=None):
+        self.idle = []
+        self.made = 0
+        self._pool = self.idle
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop()
+        self.made += 1
+        return FakeConn(self.made)
+
+    def putconn(self, conn, close=False):
+        if close:
+            conn.closed = 1
+        else:
+            self.idle.append(conn)
+
+    def closeall(self):
+        ...
+
+
+def _pool(monkeypatch, size=2, health=30.0):
+    monkeypatch.setattr(pg.psycopg2.pool, "ThreadedConnectionPool", FakeThreadedPool)
+    return pg.PgPool("postgresql://x", 1, size, 0.05, health)
+
+
+def test_acquire_waits_then_times_out_when_exhausted(monkeypatch):
+    pool = _pool(monkeypatch, size=1)
+    c = pool.acquire()
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    t = threading.Timer(0.01, pool.release, args=(c,))
+    pool.acquire_timeout_sec = 1.0
+    t.start()
+    assert pool.acquire() is c
+    assert pool.stats()["in_use"] == 1
+
+
+def test_stale_idle_connection_is_pinged_and_replaced(monkeypatch):
+    pool = _pool(monkeypatch, health=0.0)
+    c = pool.acquire()
+    pool.release(c)
+    c.fail_ping = True
+    c2 = pool.acquire()
+    assert c2 is not c and c.closed
+
+
+def test_prepared_statement_is_prepared_once_per_connection(monkeypatch):
+    monkeypatch.setattr(settings, "pg_prepared_statements", True)
+    conn = FakeConn(1)
+    conn.autocommit = True
+    cur = conn.cursor()
+    pg.execute_prepared(cur, "proposal_get", ("P1",))
+    pg.execute_prepared(cur, "proposal_get", ("P2",))
+    assert conn.queries[0][0].startswith("PREPARE proposal_get AS SELECT")
+    assert conn.queries[1:] == [("EXECUTE proposal_get (%s)", ("P1",)), ("EXECUTE proposal_get (%s)", ("P2",))]
+
+
+def test_unprepared_statement_in_transaction_runs_as_plain_sql(monkeypatch):
+    monkeypatch.setattr(settings, "pg_prepared_statements", True)
+    conn = FakeConn(1)
+    pg.execute_prepared(conn.cursor(), "proposal_set_status", ("DONE", "P1"))
+    assert conn.queries == [("UPDATE proposals SET status=%s WHERE proposal_id=%s", ("DONE", "P1"))]
+    assert not conn.prepared
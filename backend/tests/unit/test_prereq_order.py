@@ -0,0 +1,101 @@
+import random
+from src.services.graph import prereq_order, reachability
+from src.services.graph.prereq_order import IncrementalTopoOrder
+
+
+def _reaches(succ, src, dst):
+    stack, seen = [src], {src}
+    while stack:
+        u = stack.pop()
+        if u == dst:
+            return True
+        for w in succ.get(u, ()):
+            if w not in seen:
+                seen.add(w)
+                stack.append(w)
+    return False
+
+
+def test_order_matches_brute_force_on_random_inserts():
+    rng = random.Random(7)
+    order = IncrementalTopoOrder()
+    succ = {}
+    for _ in range(600):
+        a, b = f"T{rng.randrange(60)}", f"T{rng.randrange(60)}"
+        path = order.add_edge(a, b)
+        closes = a == b or _reaches(succ, b, a)
+        assert (path is not None) == closes
+        if path:
+            assert path[0] == a and path[1] == b and path[-1] == a
+            assert all(y in succ.get(x, ()) for x, y in zip(path[1:], path[2:]))
+        else:
+            succ.setdefault(a, set()).add(b)
+        assert all(order.pos[x] < order.pos[y] for x, ys in succ.items() for y in ys)
+
+
+def test_check_leaves_order_unchanged():
+    order = IncrementalTopoOrder.from_edges([("A", "B"), ("B", "C")])
+    before = (dict(order.pos), {k: set(v) for k, v in order.succ.items()})
+    assert order.check([("D", "A"), ("C", "E"), ("E", "A")]) == ["E", "A", "B", "C", "E"]
+    assert order.check([("C", "D"), ("D", "E")]) is None
+    assert (order.pos, order.succ) == before
+
+
+def test_existing_cycles_are_skipped_on_load():
+    order = IncrementalTopoOrder.from_edges([("A", "B"), ("B", "A"), ("B", "C")])
+    assert order.skipped == 1 and len(order) == 3
+
+
+def test_gate_uses_graph_edges_and_tracks_versions(monkeypatch):
+    loads = []
+
+    class Repo:
+        def read(self, query, params):
+            loads.append(params["tid"])
+            return [{"uid": "A", "prereqs": ["B"]}, {"uid": "B", "prereqs": ["C"]}, {"uid": "C", "prereqs": []}]
+
+        def close(self):
+            ...
+    monkeypatch.setattr(reachability, "Neo4jRepo", Repo)
+    monkeypatch.setattr(reachability, "_indexes", {})
+    monkeypatch.setattr(reachability, "_load_locks", {})
+    monkeypatch.setattr(prereq_order, "_orders", {})
+    assert prereq_order.find_prereq_cycle("t1", [("C", "A")], 3) == ["C", "A", "B", "C"]
+    assert prereq_order.find_prereq_cycle("t1", [("C", "D")], 3) is None
+    prereq_order.record_prereq_edges("t1", [("C", "D")], 3, 4)
+    assert prereq_order.find_prereq_cycle("t1", [("D", "A")], 4) == ["D", "A", "B", "C", "D"]
+    assert loads == ["t1"]
+    prereq_order.on_graph_committed({"tenant_id": "t1", "graph_version": 5})
+    assert prereq_order.find_prereq_cycle("t1", [("D", "A")], 5) is None
+    assert loads == ["t1", "t1"]
+    # the order is built from the shared PREREQ index, not a read of its own
+    assert reachability._indexes["t1"].graph_version == 5
+
+
+def test_cold_load_does_not_block_other_tenants(monkeypatch):
+    import threading
+    release = threading.Event()
+
+    class Repo:
+        def read(self, query, params):
+            if params["tid"] == "slow":
+                release.wait(5)
+            return [{"uid": "A", "prereqs": ["B"]}, {"uid": "B", "prereqs": []}]
+
+        def close(self):
+            ...
+    monkeypatch.setattr(reachability, "Neo4jRepo", Repo)
+    monkeypatch.setattr(reachability, "_indexes", {})
+    monkeypatch.setattr(reachability, "_load_locks", {})
+    monkeypatch.setattr(prereq_order, "_orders", {})
+    monkeypatch.setattr(prereq_order, "_load_locks", {})
+    slow = threading.Thread(target=prereq_order.find_prereq_cycle, args=("slow", [("B", "A")], 1))
+    slow.start()
+    try:
+        # answered while the other tenant's edge read is still in flight
+        assert prereq_order.find_prereq_cycle("fast", [("B", "A")], 1) == ["B", "A", "B"]
+        assert slow.is_alive()
+    finally:
+        release.set()
+        slow.join()
+    assert prereq_order._orders["slow"].graph_version == 1
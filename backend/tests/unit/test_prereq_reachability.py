@@ -0,0 +1,169 @@
+import asyncio
+from src.services.graph import reachability
+from src.services.graph.reachability import PrereqIndex
+
+ROWS = [
+    {"uid": "T-D", "prereqs": ["T-B", "T-C"]},
+    {"uid": "T-B", "prereqs": ["T-A"]},
+    {"uid": "T-C", "prereqs": ["T-A"]},
+    {"uid": "T-A", "prereqs": []},
+    {"uid": "T-X", "prereqs": ["T-Y"]},
+    {"uid": "T-Y", "prereqs": ["T-X"]},
+    {"uid": "T-Z", "prereqs": ["T-Y", "MISSING"]},
+]
+
+
+def _assert_topological(plan, rows):
+    pos = {u: i for i, u in enumerate(plan)}
+    for r in rows:
+        for p in r["prereqs"]:
+            if r["uid"] in pos and p in pos and not {r["uid"], p} <= {"T-X", "T-Y"}:
+                assert pos[p] < pos[r["uid"]]
+
+
+def test_single_target_plan_is_closure_in_topological_order():
+    idx = PrereqIndex.from_rows(ROWS)
+    plan = idx.plan(["T-D"])
+    assert set(plan) == {"T-A", "T-B", "T-C", "T-D"} and plan[0] == "T-A" and plan[-1] == "T-D"
+    _assert_topological(plan, ROWS)
+    assert idx.plan(["T-B"]) == ["T-A", "T-B"]
+    assert idx.plan(["UNKNOWN"]) == []
+    assert idx.is_prereq("T-A", "T-D") and not idx.is_prereq("T-D", "T-A")
+
+
+def test_multi_target_plan_merges_without_duplicates():
+    idx = PrereqIndex.from_rows(ROWS)
+    plan = idx.plan(["T-B", "T-C"])
+    assert sorted(plan) == ["T-A", "T-B", "T-C"] and plan[0] == "T-A"
+
+
+def test_cycles_do_not_break_the_index():
+    idx = PrereqIndex.from_rows(ROWS)
+    assert set(idx.plan(["T-Z"])) == {"T-X", "T-Y", "T-Z"}
+    assert idx.plan(["T-Z"])[-1] == "T-Z"
+
+
+def test_index_is_versioned_and_refreshed_on_commit(monkeypatch):
+    builds = []
+
+    def load(tenant_id=None, graph_version=0):
+        builds.append((tenant_id, graph_version))
+        return PrereqIndex.from_rows(ROWS, tenant_id=tenant_id, graph_version=graph_version)
+
+    monkeypatch.setattr(reachability, "_indexes", {})
+    monkeypatch.setattr(reachability, "_load_locks", {})
+    monkeypatch.setattr(reachability, "load_prereq_index", load)
+    monkeypatch.setattr(reachability, "_tenant_graph_version", lambda tid: 0)
+    a = reachability.get_prereq_index("t1")
+    assert reachability.get_prereq_index("t1") is a and builds == [("t1", 0)]
+    reachability.on_graph_committed({"tenant_id": "t2", "graph_version": 3})
+    assert builds == [("t1", 0)]
+    reachability.on_graph_committed({"tenant_id": "t1", "graph_version": 3})
+    reachability.on_graph_committed({"tenant_id": "t1", "graph_version": 3})
+    assert builds == [("t1", 0), ("t1", 3)]
+    reachability.on_graph_committed({"tenant_id": None, "source": "kb_rebuild"})
+    assert builds[-1] == ("t1", 3) and reachability.get_prereq_index("t1").graph_version == 3
+
+
+def test_commit_refreshes_only_its_tenant_and_drops_shared_index(monkeypatch):
+    builds = []
+
+    def load(tenant_id=None, graph_version=0):
+        builds.append((tenant_id, graph_version))
+        return PrereqIndex.from_rows(ROWS, tenant_id=tenant_id, graph_version=graph_version)
+
+    monkeypatch.setattr(reachability, "_indexes", {})
+    monkeypatch.setattr(reachability, "_load_locks", {})
+    monkeypatch.setattr(reachability, "load_prereq_index", load)
+    monkeypatch.setattr(reachability, "_tenant_graph_version", lambda tid: 0)
+    reachability.get_prereq_index(None)
+    reachability.get_prereq_index("t1")
+    reachability.get_prereq_index("t2")
+    reachability.on_graph_committed({"tenant_id": "t1", "graph_version": 2})
+    assert builds == [(None, 0), ("t1", 0), ("t2", 0), ("t1", 2)]
+    assert "" not in reachability._indexes and reachability._indexes["t2"].graph_version == 0
+
+
+def test_pathfind_endpoints_use_index(monkeypatch):
+    from src.api import curriculum
+    monkeypatch.setattr(curriculum, "get_prereq_index", lambda tenant_id: PrereqIndex.from_rows(ROWS))
+    one = asyncio.run(curriculum.pathfind(curriculum.PathfindInput(target_uid="T-B")))
+    assert one == {"target": "T-B", "path": ["T-A", "T-B"], "frontier": ["T-A"]}
+    many = asyncio.run(curriculum.pathfind_multi(curriculum.MultiPathfindInput(target_uids=["T-B", "T-C"])))
+    assert many["targets"] == ["T-B", "T-C"] and sorted(many["path"]) == ["T-A", "T-B", "T-C"]
+
+
+def test_remaining_plan_prunes_mastered_subtrees():
+    idx = PrereqIndex.from_rows(ROWS)
+    full = idx.remaining_plan(["T-D"])
+    assert full["path"] == idx.plan(["T-D"]) and full["frontier"] == ["T-A"]
+    # T-B mastered: its subtree (T-A) is only kept because T-C still needs it
+    part = idx.remaining_plan(["T-D"], {"T-B": 0.9, "T-C": 0.2})
+    assert sorted(part["path"]) == ["T-A", "T-C", "T-D"] and part["frontier"] == ["T-A"]
+    done = idx.remaining_plan(["T-D"], {"T-B": 1.0, "T-C": 0.8})
+    assert done == {"path": ["T-D"], "frontier": ["T-D"]}
+    assert idx.remaining_plan(["T-D"], {"T-D": 0.95})["path"] == []
+    assert idx.remaining_plan(["T-D"], {"T-B": 0.5, "T-C": 0.5}, threshold=0.5)["frontier"] == ["T-D"]
+
+
+def test_remaining_plan_is_cached_per_mastered_set(monkeypatch):
+    idx = PrereqIndex.from_rows(ROWS)
+    first = idx.remaining_plan(["T-D"], {"T-B": 0.9, "T-X": 0.1})
+    # only the mastered set matters for the cache key, not unrelated progress values
+    assert idx.remaining_plan(["T-D"], {"T-B": 0.95}) is first
+    monkeypatch.setattr(reachability, "PLAN_CACHE_SIZE", 1)
+    idx.remaining_plan(["T-C"], {"T-A": 0.9})
+    assert len(idx._plan_cache) == 1
+    # without mastered topics in the closure the plan is read straight off the bitsets
+    idx.remaining_plan(["T-B"], {"T-X": 0.9})
+    assert len(idx._plan_cache) == 1
+
+
+def test_index_starts_at_and_catches_up_with_postgres_version(monkeypatch):
+    builds = []
+    pg_version = {"t1": 7}
+
+    def load(tenant_id=None, graph_version=0):
+        builds.append((tenant_id, graph_version))
+        return PrereqIndex.from_rows(ROWS, tenant_id=tenant_id, graph_version=graph_version)
+
+    monkeypatch.setattr(reachability, "_indexes", {})
+    monkeypatch.setattr(reachability, "_load_locks", {})
+    monkeypatch.setattr(reachability, "load_prereq_index", load)
+    monkeypatch.setattr(reachability, "_tenant_graph_version", lambda tid: pg_version[tid])
+    a = reachability.get_prereq_index("t1")
+    assert a.graph_version == 7
+    # a commit whose broadcast never arrived
+    pg_version["t1"] = 8
+    assert reachability.get_prereq_index("t1") is a
+    a.checked_at -= reachability.VERSION_CHECK_SEC
+    assert reachability.get_prereq_index("t1").graph_version == 8
+    assert builds == [("t1", 7), ("t1", 8)]
+
+
+def test_cold_load_does_not_block_other_tenants(monkeypatch):
+    import threading
+    release = threading.Event()
+
+    class Repo:
+        def read(self, query, params):
+            if params["tid"] == "slow":
+                release.wait(5)
+            return ROWS
+
+        def close(self):
+            ...
+    monkeypatch.setattr(reachability, "Neo4jRepo", Repo)
+    monkeypatch.setattr(reachability, "_indexes", {})
+    monkeypatch.setattr(reachability, "_load_locks", {})
+    monkeypatch.setattr(reachability, "_tenant_graph_version", lambda tid: 1)
+    slow = threading.Thread(target=reachability.get_prereq_index, args=("slow",))
+    slow.start()
+    try:
+        # built while the other tenant's PREREQ read is still in flight
+        assert reachability.get_prereq_index("fast").plan(["T-B"]) == ["T-A", "T-B"]
+        assert slow.is_alive()
+    finally:
+        release.set()
+        slow.join()
+    assert reachability._indexes["slow"].graph_version == 1
@@ -0,0 +1,40 @@
+import json
+from datetime import datetime
+import pytest
+from src.db.pg import PREPARED_STATEMENTS, decode_proposal_cursor, encode_proposal_cursor, ensure_tables, get_conn, list_proposals, proposal_list_query
+
+
+def test_cursor_roundtrip_and_query_choice():
+    ts = datetime(2026, 3, 1, 12, 30, 45, 123456)
+    cur = encode_proposal_cursor({"created_at": ts, "proposal_id": "P-1"})
+    assert "=" not in cur and decode_proposal_cursor(cur) == (ts, "P-1")
+    assert proposal_list_query("t", None, 10, 5, None) == ("proposals_list", ("t", 10, 5))
+    assert proposal_list_query("t", "DRAFT", 10, 5, cur) == ("proposals_list_status_after", ("t", "DRAFT", ts, "P-1", 10))
+    with pytest.raises(ValueError):
+        decode_proposal_cursor("not-a-cursor")
+
+
+def test_list_statements_do_not_read_operations():
+    for name, sql in PREPARED_STATEMENTS.items():
+        if name.startswith("proposals_list"):
+            assert "operations_json" not in sql and "proposal_id DESC" in sql
+
+
+def test_keyset_pages_cover_all_rows_once():
+    ensure_tables()
+    tenant = "tenant-keyset"
+    conn = get_conn(); conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM proposals WHERE tenant_id=%s", (tenant,))
+        # equal created_at on purpose: proposal_id breaks the tie
+        for i in range(7):
+            cur.execute("INSERT INTO proposals (proposal_id, tenant_id, base_graph_version, proposal_checksum, status, operations_json, created_at) VALUES (%s,%s,0,'x','DRAFT',%s,%s)", (f"P-KS-{i}", tenant, json.dumps([]), datetime(2026, 1, 1)))
+    conn.close()
+    seen, cursor = [], None
+    while True:
+        page = list_proposals(tenant, "DRAFT", limit=3, cursor=cursor)
+        seen.extend(p["proposal_id"] for p in page)
+        if len(page) < 3:
+            break
+        cursor = encode_proposal_cursor(page[-1])
+    assert seen == [f"P-KS-{i}" for i in reversed(range(7))]
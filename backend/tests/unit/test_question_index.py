@@ -0,0 +1,50 @@
+import json
+from src.services import questions
+from src.services.questions import QuestionIndex
+
+
+def _rows():
+    rows = []
+    for t in ("T1", "T2"):
+        for i, d in enumerate([5, 1, 3, 2, 4, 3, "x", 0.4]):
+            rows.append({"uid": f"{t}-Q{i}", "title": f"q{i}", "statement": "s", "topic_uid": t, "difficulty": d})
+    return rows
+
+
+def test_range_selection_is_breadth_first_and_bounded():
+    idx = QuestionIndex(_rows())
+    out = idx.select(["T1", "T2"], limit=5, difficulty_min=2, difficulty_max=3, exclude={"T1-Q3"})
+    # levels 2..3 per topic in level order: Q3 (2), Q2 (3), Q5 (3), Q6 (unparsable -> 3)
+    assert [q["uid"] for q in out] == ["T1-Q2", "T1-Q5", "T2-Q3", "T2-Q2", "T1-Q6"]
+    assert out[0] == {"uid": "T1-Q2", "title": "q2", "statement": "s", "difficulty": 0.6, "topic_uid": "T1"}
+    assert all(q["difficulty"] <= 1.0 for q in out)
+
+
+def test_selection_does_not_mutate_index():
+    idx = QuestionIndex(_rows())
+    a = idx.select(["T1"], limit=3, difficulty_min=1, difficulty_max=5, exclude=set())
+    a[0]["difficulty"] = 42
+    b = idx.select(["T1"], limit=3, difficulty_min=1, difficulty_max=5, exclude=set())
+    assert b[0]["difficulty"] != 42 and [q["uid"] for q in a] == [q["uid"] for q in b]
+
+
+def test_duplicate_topics_and_uids_are_deduplicated():
+    rows = _rows() + [{"uid": "T1-Q1", "topic_uid": "T2", "difficulty": 1}]
+    out = QuestionIndex(rows).select(["T1", "T1", "T2"], limit=100, difficulty_min=1, difficulty_max=5, exclude=set())
+    uids = [q["uid"] for q in out]
+    assert len(uids) == len(set(uids)) == 14
+
+
+def test_jsonl_index_rebuilds_when_file_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(questions, "KB_DIR", str(tmp_path))
+    monkeypatch.setattr(questions, "_jsonl_index", None)
+    monkeypatch.setattr(questions, "_graph_index", None)
+    monkeypatch.setattr(questions, "_graph_configured", lambda: False)
+    path = tmp_path / "examples.jsonl"
+    path.write_text(json.dumps({"uid": "E1", "topic_uid": "T", "difficulty": 2}) + "\n", encoding="utf-8")
+    first = questions.get_examples_index()
+    assert questions.get_examples_index() is first
+    assert [q["uid"] for q in questions.select_examples_for_topics(["T"], limit=5)] == ["E1"]
+    path.write_text("".join(json.dumps({"uid": f"E{i}", "topic_uid": "T", "difficulty": 2}) + "\n" for i in range(3)), encoding="utf-8")
+    assert len(questions.get_examples_index()) == 3
+    assert questions.all_topic_uids_from_examples() == ["T"]
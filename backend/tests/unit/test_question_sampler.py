@@ -0,0 +1,83 @@
+import random
+from collections import Counter
+from src.services import question_sampler as qs
+from src.services.graph.reachability import PrereqIndex
+from src.services.questions import QuestionIndex
+
+TOPICS = [
+    {"uid": "T-A", "prereqs": [], "subjects": ["SUB"]},
+    {"uid": "T-B", "prereqs": ["T-A"], "subjects": ["SUB"]},
+    {"uid": "T-C", "prereqs": ["T-A"], "subjects": ["SUB"]},
+    {"uid": "T-OTHER", "prereqs": [], "subjects": ["SUB-2"]},
+]
+
+
+def _questions():
+    rows = []
+    for t in ("T-A", "T-B", "T-C", "T-OTHER"):
+        for d in range(1, 6):
+            for k in range(4):
+                rows.append({"uid": f"{t}-{d}-{k}", "topic_uid": t, "difficulty": d, "title": "q"})
+    return QuestionIndex(rows)
+
+
+def _setup(monkeypatch):
+    monkeypatch.setattr(qs, "get_question_index", _questions)
+    monkeypatch.setattr(qs, "get_prereq_index", lambda tenant_id: PrereqIndex.from_rows(TOPICS))
+
+
+def test_alias_table_follows_weights():
+    table = qs.AliasTable([1.0, 0.0, 3.0])
+    rng = random.Random(1)
+    counts = Counter(table.draw(rng) for _ in range(20000))
+    assert counts[1] == 0
+    assert 2.7 < counts[2] / counts[0] < 3.3
+    assert qs.AliasTable([0.0, 0.0]).n == 0
+
+
+def test_bloom_filter_roundtrip_has_no_false_negatives():
+    bf = qs.BloomFilter.empty(4096, 4)
+    for i in range(200):
+        bf.add(f"Q-{i}")
+    back = qs.BloomFilter.from_payload(**bf.to_payload())
+    assert all(f"Q-{i}" in back for i in range(200))
+    assert sum(f"X-{i}" in back for i in range(1000)) < 50
+
+
+def test_sampler_targets_ready_unmastered_topics(monkeypatch):
+    _setup(monkeypatch)
+    progress = {"T-A": 0.2}
+    counts = Counter()
+    for seed in range(200):
+        out = qs.sample_questions("SUB", progress, 5, difficulty_min=1, difficulty_max=5, seed=seed)
+        assert len(out) == 5 and len({q["uid"] for q in out}) == 5
+        counts.update(q["topic_uid"] for q in out)
+    # T-B/T-C still miss T-A, so T-A dominates; other subjects are never drawn
+    assert counts["T-A"] > counts["T-B"] and counts["T-A"] > counts["T-C"]
+    assert "T-OTHER" not in counts
+
+
+def test_sampler_prefers_difficulty_near_mastery(monkeypatch):
+    _setup(monkeypatch)
+    progress = {"T-A": 1.0, "T-B": 0.0, "T-C": 0.75}
+    diffs = Counter()
+    for seed in range(100):
+        for q in qs.sample_questions("SUB", progress, 3, seed=seed):
+            if q["topic_uid"] == "T-B":
+                diffs[q["difficulty"]] += 1
+    # mastery 0 aims at the easiest end (level 2 -> 0.4), not the hardest
+    assert diffs[0.4] > diffs[1.0] and diffs[0.4] > diffs[0.8]
+
+
+def test_sampler_honours_exclusions_and_range(monkeypatch):
+    _setup(monkeypatch)
+    bloom = qs.BloomFilter.empty(1 << 12, 3)
+    for k in range(4):
+        bloom.add(f"T-A-2-{k}")
+    exclude = qs.ExcludeSet(frozenset({"T-A-3-0", "T-A-3-1"}), bloom)
+    out = qs.sample_questions("SUB", {"T-B": 1.0, "T-C": 1.0}, 20, difficulty_min=2, difficulty_max=3, exclude=exclude, seed=3)
+    uids = {q["uid"] for q in out}
+    # levels 2..3: 8 per topic, 6 of T-A's excluded
+    assert len(out) == 18 and len(uids) == 18
+    assert not uids & {"T-A-3-0", "T-A-3-1", "T-A-2-0", "T-A-2-1", "T-A-2-2", "T-A-2-3"}
+    assert all(q["uid"].split("-")[2] in ("2", "3") for q in out)
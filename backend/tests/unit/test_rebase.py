@@ -1,5 +1,5 @@
 from src.db.pg import ensure_tables, set_graph_version, add_graph_change
-from src.services.rebase import rebase_check, RebaseResult
+from src.services.rebase import rebase_check, rebase_check_batch, RebaseResult
 import uuid
 
 def test_same_version():
@@ -24,3 +24,13 @@ def test_conflict_with_intersection():
     add_graph_change(tid, 31, "A")
     set_graph_version(tid, 31)
     assert rebase_check(tid, 30, ["A","B"]) == RebaseResult.CONFLICT
+
+def test_batch_returns_conflicting_targets():
+    ensure_tables()
+    tid = "tenant-" + uuid.uuid4().hex[:8]
+    set_graph_version(tid, 40)
+    add_graph_change(tid, 41, "A")
+    add_graph_change(tid, 42, "C")
+    set_graph_version(tid, 42)
+    res = rebase_check_batch([("P-1", tid, 40, ["A", "B", "C"]), ("P-2", tid, 41, ["A"]), ("P-3", tid, 42, ["A"])])
+    assert res == {"P-1": (RebaseResult.CONFLICT, ["A", "C"]), "P-2": (RebaseResult.FAST_REBASE, []), "P-3": (RebaseResult.SAME_VERSION, [])}
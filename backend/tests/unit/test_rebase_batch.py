@@ -0,0 +1,24 @@
+from src.services import rebase
+from src.services.rebase import RebaseResult, rebase_check_batch, rebase_check_conflicts
+
+
+def test_conflicts_are_returned_and_same_version_skips_query(monkeypatch):
+    calls = []
+    monkeypatch.setattr(rebase, "get_graph_version", lambda tid: 5)
+    monkeypatch.setattr(rebase, "get_conflicting_targets", lambda tid, base, targets: calls.append(base) or [t for t in targets if t == "A"])
+    assert rebase_check_conflicts("t", 5, ["A"]) == (RebaseResult.SAME_VERSION, [])
+    assert rebase_check_conflicts("t", 3, ["A", "B"]) == (RebaseResult.CONFLICT, ["A"])
+    assert rebase_check_conflicts("t", 3, ["B"]) == (RebaseResult.FAST_REBASE, [])
+    assert calls == [3, 3]
+
+
+def test_batch_maps_rows_per_proposal(monkeypatch):
+    seen = {}
+    def fake_batch(items):
+        seen["items"] = list(items)
+        return {"P1": (7, ["A"]), "P2": (7, []), "P3": (4, [])}
+    monkeypatch.setattr(rebase, "get_conflicting_targets_batch", fake_batch)
+    items = [("P1", "t", 5, ["A", "B"]), ("P2", "t", 5, ["C"]), ("P3", "u", 4, ["A"])]
+    res = rebase_check_batch(items)
+    assert seen["items"] == items
+    assert res == {"P1": (RebaseResult.CONFLICT, ["A"]), "P2": (RebaseResult.FAST_REBASE, []), "P3": (RebaseResult.SAME_VERSION, [])}
@@ -0,0 +1,15 @@
+from src.events import publisher
+from src.services.jobs import rebuild
+
+
+def test_fallback_rebuild_broadcasts_graph_rebuilt(monkeypatch):
+    sent = []
+    monkeypatch.setattr(rebuild, "sync_from_jsonl", lambda mode: {"mode": mode})
+    monkeypatch.setattr(rebuild, "compute_static_weights", lambda: {})
+    monkeypatch.setattr(rebuild, "add_prereqs_heuristic", lambda: 0)
+    monkeypatch.setattr(rebuild, "analyze_knowledge", lambda: {})
+    monkeypatch.setattr(publisher, "publish_graph_rebuilt", sent.append)
+    rebuild._run_job("J1")
+    assert rebuild.get_job_status("J1")["status"] == "done"
+    # in-memory graph views refresh on this broadcast, as after the arq rebuild job
+    assert sent == ["J1"]
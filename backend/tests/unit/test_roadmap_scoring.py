@@ -0,0 +1,67 @@
+import random
+import numpy as np
+from pydantic import SecretStr
+from src.config.settings import settings
+from src.services.graph import utils
+
+
+def _reference(rows, user_topic_weights, limit, penalty_factor=0.15):
+    index = {r["uid"]: r for r in rows}
+    out = []
+    for r in rows:
+        base = float(r["dw"] or r["sw"] or 0.5)
+        user_w = float(user_topic_weights.get(r["uid"], base))
+        missing = 0
+        for pre in r["prereqs"]:
+            if pre in user_topic_weights:
+                pw = float(user_topic_weights[pre])
+            else:
+                pr = index.get(pre)
+                pw = float((pr.get("dw") if pr else 0.5) or 0.5)
+            if pw <= 0.3:
+                missing += 1
+        out.append((r["uid"], max(0.0, user_w - penalty_factor * missing)))
+    out.sort(key=lambda x: x[1], reverse=True)
+    return out[:limit]
+
+
+def _rows(n, seed=7):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        prereqs = [f"T{j}" for j in rnd.sample(range(n), k=min(3, n)) if j != i] + (["EXT"] if i % 5 == 0 else [])
+        rows.append({"uid": f"T{i}", "title": f"T{i}", "sw": 0.5, "dw": round(rnd.choice([0.1, 0.2, 0.5, 0.8]), 2), "prereqs": prereqs,
+                     "skills": [{"uid": "S1", "title": "s", "w": 0.4}, {"uid": "S1", "title": "s", "w": 0.4}]})
+    return rows
+
+
+def test_vectorized_scoring_matches_reference():
+    rows = _rows(200)
+    weights = {f"T{i}": 0.2 for i in range(0, 200, 7)}
+    for limit in (1, 10, 50, 500):
+        got = utils.roadmap_from_rows(rows, weights, {"S1": 0.9}, limit=limit)
+        ref = _reference(rows, weights, limit)
+        assert [(x["topic_uid"], round(x["effective_weight"], 9)) for x in got] == [(u, round(w, 9)) for u, w in ref]
+    assert got[0]["skills"] == [{"uid": "S1", "title": "s", "base_weight": 0.4, "user_weight": 0.9}]
+
+
+def test_top_k_keeps_input_order_on_ties():
+    scores = np.array([0.5, 0.9, 0.5, 0.5, 0.1])
+    assert list(utils.top_k_indices(scores, 3)) == [1, 0, 2]
+    assert list(utils.top_k_indices(scores, 0)) == []
+
+
+def test_single_round_trip(monkeypatch):
+    calls = []
+    class FakeRepo:
+        def read(self, query, params=None):
+            calls.append(query)
+            return _rows(50)
+        def close(self):
+            ...
+    monkeypatch.setattr(settings, "neo4j_uri", "bolt://x")
+    monkeypatch.setattr(settings, "neo4j_user", "u")
+    monkeypatch.setattr(settings, "neo4j_password", SecretStr("p"))
+    monkeypatch.setattr(utils, "Neo4jRepo", FakeRepo)
+    items = utils.build_user_roadmap_stateless("SUB", {}, limit=10)
+    assert len(items) == 10 and len(calls) == 1
@@ -0,0 +1,37 @@
+from src.services.graph.scc import find_cycles, index_graph, strongly_connected_components
+from src.services.validation import validate_canonical_graph_snapshot
+
+
+def _is_cycle(adj, cyc):
+    return cyc[0] == cyc[-1] and all(b in adj.get(a, ()) for a, b in zip(cyc, cyc[1:]))
+
+
+def test_each_scc_reported_once_with_witness():
+    adj = {"A": ["B"], "B": ["C", "A"], "C": ["A"], "D": ["D"], "E": ["F"], "F": []}
+    cycles = find_cycles(adj)
+    assert len(cycles) == 2
+    assert all(_is_cycle(adj, c) for c in cycles)
+    assert ["D", "D"] in cycles
+    assert any(len(c) > 2 and set(c) <= {"A", "B", "C"} for c in cycles)
+
+
+def test_components_partition_nodes():
+    uids, indptr, indices = index_graph({"A": ["B"], "B": ["A", "C"], "C": ["D"]})
+    comps = strongly_connected_components(indptr, indices)
+    assert sorted(sorted(uids[i] for i in c) for c in comps) == [["A", "B"], ["C"], ["D"]]
+
+
+def test_deep_chain_does_not_recurse():
+    n = 50000
+    adj = {f"T{i}": [f"T{i + 1}"] for i in range(n)}
+    assert find_cycles(adj) == []
+    adj[f"T{n}"] = ["T0"]
+    (cyc,) = find_cycles(adj)
+    assert len(cyc) == n + 2 and _is_cycle(adj, cyc)
+
+
+def test_validation_reports_prereq_cycle():
+    nodes = [{"id": u, "type": "concept"} for u in "ABC"]
+    edges = [{"source": "A", "target": "B", "rel": "prereq"}, {"source": "B", "target": "C", "rel": "prereq"}, {"source": "C", "target": "A", "rel": "prereq"}]
+    res = validate_canonical_graph_snapshot({"nodes": nodes, "edges": edges})
+    assert sum("prereq graph has cycles" in e for e in res["errors"]) == 1
@@ -0,0 +1,42 @@
+from src.config.settings import settings
+from src.services.graph import utils
+from src.services.kb import search_index
+from src.services.kb.search_index import TitleSearchIndex
+
+DOCS = [
+    ("TOP-1", "Topic", "Линейные уравнения", "Решение уравнений первой степени"),
+    ("TOP-2", "Topic", "Квадратные уравнения", ""),
+    ("SK-1", "Skill", "Решение линейных уравнений", ""),
+    ("SUB-1", "Subject", "Алгебра", ""),
+]
+
+
+def test_substring_and_ranking():
+    idx = TitleSearchIndex(DOCS)
+    assert [r["uid"] for r in idx.search("уравнени")] == ["TOP-1", "TOP-2", "SK-1"]
+    assert [r["uid"] for r in idx.search("Линейн")] == ["TOP-1", "SK-1"]
+    # definition text is searchable but ranks below title hits
+    assert [r["uid"] for r in idx.search("первой степени")] == ["TOP-1"]
+    assert idx.search("") == [] and idx.search("геометрия") == []
+
+
+def test_short_prefix_labels_and_pagination():
+    idx = TitleSearchIndex(DOCS)
+    assert {r["uid"] for r in idx.search("ал")} == {"SUB-1"}
+    assert [r["uid"] for r in idx.search("уравнени", labels=["Skill"])] == ["SK-1"]
+    page1 = idx.search("уравнени", limit=2)
+    page2 = idx.search("уравнени", limit=2, offset=2)
+    assert [r["uid"] for r in page1 + page2] == ["TOP-1", "TOP-2", "SK-1"]
+
+
+def test_fulltext_query_escapes_and_prefixes():
+    assert utils.fulltext_query("линейные ур") == "линейные AND ур*"
+    assert utils.fulltext_query("a+b") == "a\\+b*"
+    assert utils.fulltext_query("   ") == ""
+
+
+def test_search_titles_falls_back_to_jsonl(monkeypatch):
+    monkeypatch.setattr(settings, "neo4j_uri", None)
+    monkeypatch.setattr(search_index, "build_index", lambda: TitleSearchIndex(DOCS))
+    monkeypatch.setattr(search_index, "_index", None)
+    assert [r["uid"] for r in utils.search_titles("квадрат")] == ["TOP-2"]
@@ -0,0 +1,49 @@
+from src.services.graph import utils
+
+
+def test_scores_match_scalar_formula():
+    texts = ["", "Линейные уравнения", "Интеграл и предел функции, вектор", " ".join(["слово"] * 60)]
+    got = list(utils.static_weight_scores(texts))
+    assert got[0] == 0.3
+    assert abs(got[1] - (0.3 + 0.04)) < 1e-9
+    assert abs(got[2] - (0.3 + 0.02 * 5 + 0.3)) < 1e-9
+    assert got[3] == 1.0
+
+
+def test_prereq_min_propagates_transitively():
+    # D -> C -> B -> A (topic -> prereq); one hop clamping would leave D above A
+    w = {"A": 0.3, "B": 0.9, "C": 0.8, "D": 0.95, "E": 0.2}
+    out = utils.propagate_prereq_min(w, [("B", "A"), ("C", "B"), ("D", "C"), ("D", "E"), ("X", "A")])
+    assert out == {"A": 0.3, "B": 0.3, "C": 0.3, "D": 0.2, "E": 0.2}
+
+
+def test_prereq_min_terminates_on_cycles():
+    w = {"A": 0.9, "B": 0.5, "C": 0.7, "D": 0.8}
+    out = utils.propagate_prereq_min(w, [("A", "B"), ("B", "C"), ("C", "A"), ("D", "A")])
+    assert out == {"A": 0.5, "B": 0.5, "C": 0.5, "D": 0.5}
+
+
+def test_compute_static_weights_batches_writes(monkeypatch):
+    class FakeRepo:
+        def __init__(self):
+            self.unwinds = []
+
+        def read(self, query, params=None):
+            if "PREREQ" in query:
+                return [{"au": "T2", "bu": "T1"}]
+            if ":Topic" in query:
+                return [{"uid": "T1", "title": "a", "desc": None}, {"uid": "T2", "title": "интеграл предел", "desc": "x"}]
+            return [{"uid": "S1", "title": "s", "def": ""}]
+
+        def write_unwind(self, query, rows, chunk_size=500, parallel=False, progress=None):
+            self.unwinds.append((query, rows))
+
+        def close(self):
+            ...
+    repo = FakeRepo()
+    monkeypatch.setattr(utils, "Neo4jRepo", lambda: repo)
+    res = utils.compute_static_weights()
+    assert res == {"topics": 2, "skills": 1, "capped_by_prereqs": 1}
+    assert len(repo.unwinds) == 2
+    topic_rows = {r["uid"]: r["sw"] for r in repo.unwinds[0][1]}
+    assert topic_rows["T2"] == topic_rows["T1"]
@@ -0,0 +1,131 @@
+from src.services.graph import utils
+from src.services.graph.neo4j_writer import merge_nodes_batch
+
+
+class FakeRepo:
+    def __init__(self, rows=None, migrated=False):
+        self.rows = rows or []
+        self.migrated = migrated
+        self.calls = []
+
+    def write_returning(self, query, params=None):
+        self.calls.append(("write_returning", query, params))
+        return self.rows
+
+    def read(self, query, params=None):
+        self.calls.append(("read", query, params))
+        return [{"id": params["id"]}] if self.migrated else []
+
+    def write(self, query, params=None):
+        self.calls.append(("write", query, params))
+
+    def close(self):
+        ...
+
+
+def test_topic_update_is_one_atomic_statement(monkeypatch):
+    repo = FakeRepo(rows=[{"uid": "T1", "title": "t", "static_weight": 0.5, "dynamic_weight": 0.3}])
+    monkeypatch.setattr(utils, "Neo4jRepo", lambda: repo)
+    out = utils.update_dynamic_weight("T1", 70)
+    assert out["dynamic_weight"] == 0.3
+    assert len(repo.calls) == 1
+    kind, query, params = repo.calls[0]
+    assert kind == "write_returning" and params == {"uid": "T1", "delta": -0.2}
+    assert "IS NULL" not in query and "SET t.dynamic_weight = CASE" in query
+
+
+def test_skill_update_also_refreshes_linked_weights(monkeypatch):
+    repo = FakeRepo(rows=[])
+    monkeypatch.setattr(utils, "Neo4jRepo", lambda: repo)
+    out = utils.update_skill_dynamic_weight("S-missing", 10)
+    assert out == {"uid": "S-missing", "title": None, "static_weight": None, "dynamic_weight": None}
+    assert len(repo.calls) == 1 and "r.adaptive_weight = s.dynamic_weight" in repo.calls[0][1]
+
+
+def test_weight_defaults_migration_runs_once(monkeypatch):
+    monkeypatch.setattr(utils, "_applied_migrations", set())
+    repo = FakeRepo()
+    assert utils.ensure_weight_defaults_migrated(repo) is True
+    writes = [c for c in repo.calls if c[0] == "write"]
+    assert len(writes) == 5 and "GraphMigration" in writes[-1][1]
+    assert utils.ensure_weight_defaults_migrated(repo) is False
+    assert len(repo.calls) == 6
+
+    monkeypatch.setattr(utils, "_applied_migrations", set())
+    done = FakeRepo(migrated=True)
+    assert utils.ensure_weight_defaults_migrated(done) is False
+    assert [c[0] for c in done.calls] == ["read"]
+
+
+def test_merge_nodes_batch_sets_weight_defaults_for_weighted_labels():
+    class Tx:
+        def __init__(self):
+            self.queries = []
+
+        def run(self, query, **params):
+            self.queries.append(query)
+    tx = Tx()
+    merge_nodes_batch(tx, "t1", "Topic", [{"uid": "T1", "props": {"title": "x"}}])
+    merge_nodes_batch(tx, "t1", "Method", [{"uid": "M1", "props": {"title": "m"}}])
+    assert "static_weight" in tx.queries[0] and "static_weight" not in tx.queries[1]
+
+
+class _BatchResult(list):
+    def single(self):
+        return self[0] if self else None
+
+
+class BatchTx:
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.runs = []
+
+    def run(self, query, **params):
+        self.runs.append((query, params))
+        if query is utils.BATCH_WEIGHTS_LOCK_READ_QUERY:
+            return _BatchResult(
+                {"kind": kind, "uid": uid, "title": uid, "static_weight": 0.5, "base_weight": w}
+                for (kind, uid), w in self.nodes.items()
+                if uid in params[kind + "s"]
+            )
+        return _BatchResult([{"topics": len(params["topics"]), "skills": len(params["skills"]), "links": 2 * len(params["skills"])}])
+
+
+class BatchRepo:
+    def __init__(self, tx):
+        self.tx = tx
+        self.transactions = 0
+
+    def write_transaction(self, work):
+        self.transactions += 1
+        return work(self.tx)
+
+    def close(self):
+        ...
+
+
+def test_batch_user_weights_matches_scalar_semantics():
+    base = [0.5, 0.9, 0.05]
+    scores = [20.0, 0.0, 100.0]
+    out = utils.batch_user_weights(base, scores)
+    assert list(out) == [utils.compute_user_weight(b, s) for b, s in zip(base, scores)]
+
+
+def test_levels_batch_is_one_transaction_with_two_statements(monkeypatch):
+    tx = BatchTx({("topic", "T1"): 0.5, ("topic", "T2"): 0.2, ("skill", "S1"): 0.6})
+    repo = BatchRepo(tx)
+    monkeypatch.setattr(utils, "Neo4jRepo", lambda: repo)
+    out = utils.update_dynamic_weights_batch(
+        topics=[("T1", 30), ("T2", 100), ("T1", 40), ("T-missing", 10)],
+        skills=[("S1", 90)],
+    )
+    assert repo.transactions == 1 and len(tx.runs) == 2
+    read_params, write_params = tx.runs[0][1], tx.runs[1][1]
+    assert read_params == {"topics": ["T1", "T2", "T-missing"], "skills": ["S1"]}
+    # the two T1 scores are combined into one shift: 0.5 + 0.2 + 0.1
+    assert write_params["topics"] == [{"uid": "T1", "w": 0.8}, {"uid": "T2", "w": 0.0}]
+    assert [r["uid"] for r in write_params["skills"]] == ["S1"] and abs(write_params["skills"][0]["w"] - 0.2) < 1e-9
+    assert out["not_found"] == [{"kind": "topic", "uid": "T-missing"}]
+    assert out["updated_links"] == 2
+    levels = {i["uid"]: i["level"] for i in out["items"]}
+    assert levels == {"T1": "high", "T2": "low", "S1": "low"}